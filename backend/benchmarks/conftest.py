@@ -0,0 +1,209 @@
+"""マイクロベンチマーク共通のフィクスチャ（実際の API に近い大きさの入力）。
+
+- 25 か所の経由地を通るルート（Routes API の応答・Route）
+- 約 3000 点のポリライン（長距離ドライブ相当）
+- 20 件のスポット（Places API の応答）
+- 40 発言の会話履歴と、ツールの実行結果を含む Gemini の履歴
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from vertexai.generative_models import Content, Part  # noqa: E402
+
+from navigation.services import polyline  # noqa: E402
+from navigation.services.domain import Place, Route  # noqa: E402
+from navigation.services.gemini import _tool_response  # noqa: E402
+from navigation.services.google_maps import _parse_places, _parse_route  # noqa: E402
+
+WAYPOINT_COUNT = 25
+POLYLINE_POINTS = 3000
+PLACE_COUNT = 20
+HISTORY_MESSAGES = 40
+
+ORIGIN = "東京駅"
+DESTINATION = "道の駅 みのぶ富士川観光センター"
+
+
+@pytest.fixture(scope="session")
+def origin() -> str:
+    return ORIGIN
+
+
+@pytest.fixture(scope="session")
+def destination() -> str:
+    return DESTINATION
+
+
+@pytest.fixture(scope="session")
+def waypoints() -> list[str]:
+    return [
+        f"道の駅 寄り道スポット{i + 1}（山梨県南巨摩郡）" for i in range(WAYPOINT_COUNT)
+    ]
+
+
+@pytest.fixture(scope="session")
+def route_points() -> list[tuple[float, float]]:
+    """東京から西へ約 150km の、細かく曲がる経路。"""
+    return [
+        (
+            35.681 - 0.3 * t + 0.01 * math.sin(t * 300),
+            139.767 - 1.4 * t + 0.01 * math.cos(t * 300),
+        )
+        for t in (i / (POLYLINE_POINTS - 1) for i in range(POLYLINE_POINTS))
+    ]
+
+
+@pytest.fixture(scope="session")
+def encoded_polyline(route_points: list[tuple[float, float]]) -> str:
+    return polyline.encode(route_points)
+
+
+@pytest.fixture(scope="session")
+def routes_api_response(
+    waypoints: list[str],
+    route_points: list[tuple[float, float]],
+    encoded_polyline: str,
+) -> dict[str, Any]:
+    """経由地 25 か所の computeRoutes の応答（経由地の順序は最適化で逆順）。"""
+    step = (len(route_points) - 1) // (len(waypoints) + 1)
+    legs = [
+        {
+            "endLocation": {
+                "latLng": {
+                    "latitude": route_points[(i + 1) * step][0],
+                    "longitude": route_points[(i + 1) * step][1],
+                }
+            }
+        }
+        for i in range(len(waypoints) + 1)
+    ]
+    return {
+        "routes": [
+            {
+                "duration": "18234s",
+                "distanceMeters": 162345,
+                "polyline": {"encodedPolyline": encoded_polyline},
+                "legs": legs,
+                "optimizedIntermediateWaypointIndex": list(
+                    reversed(range(len(waypoints)))
+                ),
+                "travelAdvisory": {
+                    "tollInfo": {
+                        "estimatedPrice": [{"currencyCode": "JPY", "units": "4560"}]
+                    }
+                },
+            }
+        ]
+    }
+
+
+@pytest.fixture(scope="session")
+def route(routes_api_response: dict[str, Any], waypoints: list[str]) -> Route:
+    result = _parse_route(routes_api_response, ORIGIN, DESTINATION, waypoints)
+    assert isinstance(result, Route)
+    return result
+
+
+@pytest.fixture(scope="session")
+def places_api_response() -> dict[str, Any]:
+    """20 件のスポットの textSearch の応答。"""
+    return {
+        "places": [
+            {
+                "id": f"ChIJ{i:04d}abcdefghijklmnopqrstuv",
+                "displayName": {"text": f"高原のカフェ {i + 1}", "languageCode": "ja"},
+                "formattedAddress": f"日本、〒400-0000 山梨県甲府市丸の内{i + 1}丁目",
+                "rating": 4.0 + i % 10 / 10,
+                "userRatingCount": 120 + i,
+                "location": {"latitude": 35.66 + i / 1000, "longitude": 138.56},
+                "priceLevel": "PRICE_LEVEL_MODERATE",
+            }
+            for i in range(PLACE_COUNT)
+        ]
+    }
+
+
+@pytest.fixture(scope="session")
+def places(places_api_response: dict[str, Any]) -> list[Place]:
+    return _parse_places(places_api_response)
+
+
+@pytest.fixture(scope="session")
+def history() -> list[dict[str, str]]:
+    """フロントエンドが送る 40 発言の会話履歴。"""
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": (
+                f"{i // 2 + 1}回目の相談です。"
+                + "箱根の温泉に寄ってから富士山を眺めたい。" * 5
+            ),
+        }
+        for i in range(HISTORY_MESSAGES)
+    ]
+
+
+@pytest.fixture(scope="session")
+def tool_history(
+    history: list[dict[str, str]], route: Route, places: list[Place]
+) -> list[Content]:
+    """毎ターン search_places と calculate_route を呼んだ Gemini の履歴（20 ターン）。"""
+    contents = []
+    for i in range(0, len(history), 2):
+        contents.append(
+            Content(role="user", parts=[Part.from_text(history[i]["content"])])
+        )
+        contents.append(
+            Content.from_dict(
+                {
+                    "role": "model",
+                    "parts": [
+                        {
+                            "function_call": {
+                                "name": "search_places",
+                                "args": {"location_query": DESTINATION},
+                            }
+                        },
+                        {
+                            "function_call": {
+                                "name": "calculate_route",
+                                "args": {"origin": ORIGIN, "destination": DESTINATION},
+                            }
+                        },
+                    ],
+                }
+            )
+        )
+        contents.append(
+            Content(
+                role="user",
+                parts=[
+                    Part.from_function_response(
+                        "search_places", _tool_response(places)
+                    ),
+                    Part.from_function_response(
+                        "calculate_route", _tool_response(route)
+                    ),
+                ],
+            )
+        )
+        contents.append(
+            Content(role="model", parts=[Part.from_text(history[i + 1]["content"])])
+        )
+    return contents
@@ -0,0 +1,45 @@
+"""deep_link（Google Maps ディープリンク URL の生成）のベンチマーク。"""
+
+from __future__ import annotations
+
+import pytest
+
+from navigation.services.deep_link import _sanitize_place_name, generate_google_maps_url
+
+pytestmark = pytest.mark.benchmark(group="deep_link")
+
+
+def test_generate_url_25_waypoints(
+    benchmark, origin: str, destination: str, waypoints: list[str]
+) -> None:
+    url = benchmark(generate_google_maps_url, origin, destination, waypoints)
+
+    assert url.startswith("https://www.google.com/maps/dir/")
+
+
+def test_generate_url_with_place_ids(
+    benchmark, origin: str, destination: str, waypoints: list[str]
+) -> None:
+    """全地点の Place ID が分かっている場合（waypoint_place_ids も付与する）。"""
+    place_ids = {
+        name: f"ChIJ{i:04d}abcdefghijklmnopqrstuv"
+        for i, name in enumerate([origin, destination, *waypoints])
+    }
+
+    url = benchmark(
+        generate_google_maps_url,
+        origin,
+        destination,
+        waypoints,
+        place_ids=place_ids,
+    )
+
+    assert "waypoint_place_ids" in url
+
+
+def test_sanitize_place_name(benchmark, waypoints: list[str]) -> None:
+    names = [f" {name}|{name} " for name in waypoints]
+
+    result = benchmark(lambda: [_sanitize_place_name(name) for name in names])
+
+    assert "|" not in result[0]
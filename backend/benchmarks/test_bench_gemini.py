@@ -0,0 +1,34 @@
+"""gemini（会話履歴の変換・ツールの実行結果の抽出）のベンチマーク。"""
+
+from __future__ import annotations
+
+import pytest
+from vertexai.generative_models import Content
+
+from navigation.services.gemini import (
+    _build_history,
+    _compact_history,
+    _extract_function_results,
+)
+
+pytestmark = pytest.mark.benchmark(group="gemini")
+
+
+def test_build_history(benchmark, history: list[dict[str, str]]) -> None:
+    contents = benchmark(_build_history, history)
+
+    assert len(contents) == len(history)
+
+
+def test_extract_function_results(benchmark, tool_history: list[Content]) -> None:
+    route_data, places_data = benchmark(_extract_function_results, tool_history)
+
+    assert route_data is not None
+    assert places_data
+
+
+def test_compact_history(benchmark, tool_history: list[Content]) -> None:
+    """上限を超えた履歴の古いターンを要約する（毎ターンのリクエスト前に行う）。"""
+    contents = benchmark(_compact_history, tool_history, 10, 4000)
+
+    assert len(contents) < len(tool_history)
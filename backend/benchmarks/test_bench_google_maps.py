@@ -0,0 +1,31 @@
+"""google_maps（Places API / Routes API の応答の整形）のベンチマーク。"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from navigation.services.domain import Route
+from navigation.services.google_maps import _parse_places, _parse_route
+
+pytestmark = pytest.mark.benchmark(group="google_maps")
+
+
+def test_parse_places(benchmark, places_api_response: dict[str, Any]) -> None:
+    places = benchmark(_parse_places, places_api_response)
+
+    assert len(places) == len(places_api_response["places"])
+
+
+def test_parse_route_25_waypoints(
+    benchmark,
+    routes_api_response: dict[str, Any],
+    origin: str,
+    destination: str,
+    waypoints: list[str],
+) -> None:
+    route = benchmark(_parse_route, routes_api_response, origin, destination, waypoints)
+
+    assert isinstance(route, Route)
+    assert len(route.waypoint_coords) == len(waypoints)
@@ -0,0 +1,87 @@
+"""serializers（リクエストの検証・レスポンスの生成）とポリラインの簡略化のベンチマーク。
+
+レスポンスは DRF の Serializer(...).data と、ビューが使う compile_output() の両方を計測する。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from navigation.serializers import (
+    CalculateRouteRequestSerializer,
+    ChatRequestSerializer,
+    ChatResponseSerializer,
+    chat_response_data,
+)
+from navigation.services.domain import Place, Route
+from navigation.services.polyline import polyline_levels, simplify_polyline
+
+
+@pytest.fixture(scope="module")
+def chat_result(route: Route, places: list[Place]) -> dict[str, Any]:
+    return {"reply": "おすすめのルートです。" * 20, "route": route, "places": places}
+
+
+@pytest.mark.benchmark(group="serializers-request")
+def test_chat_request(benchmark, history: list[dict[str, str]]) -> None:
+    data = {"message": "次は海沿いの道を通りたい", "history": history}
+
+    def validate() -> dict[str, Any]:
+        serializer = ChatRequestSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    assert len(benchmark(validate)["history"]) == len(history)
+
+
+@pytest.mark.benchmark(group="serializers-request")
+def test_calculate_route_request(
+    benchmark, origin: str, destination: str, waypoints: list[str]
+) -> None:
+    data = {
+        "origin": origin,
+        "destination": destination,
+        "waypoints": waypoints,
+        "polyline_options": {"zoom": 12, "precision": 5, "levels": [8, 12, 16]},
+    }
+
+    def validate() -> dict[str, Any]:
+        serializer = CalculateRouteRequestSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    assert len(benchmark(validate)["waypoints"]) == len(waypoints)
+
+
+@pytest.mark.benchmark(group="serializers-response")
+def test_chat_response_drf(benchmark, chat_result: dict[str, Any]) -> None:
+    data = benchmark(lambda: ChatResponseSerializer(chat_result).data)
+
+    assert len(data["route"]["waypoints"]) == len(chat_result["route"].waypoints)
+
+
+@pytest.mark.benchmark(group="serializers-response")
+def test_chat_response_compiled(benchmark, chat_result: dict[str, Any]) -> None:
+    data = benchmark(chat_response_data, chat_result)
+
+    # compile_output() は未設定（None）の任意項目を省略する
+    expected = ChatResponseSerializer(chat_result).data["route"]
+    assert data["route"] == {name: expected[name] for name in data["route"]}
+    assert all(expected[name] is None for name in expected.keys() - data["route"])
+    assert len(data["places"]) == len(chat_result["places"])
+
+
+@pytest.mark.benchmark(group="polyline")
+def test_simplify_polyline(benchmark, encoded_polyline: str) -> None:
+    simplified = benchmark(simplify_polyline, encoded_polyline, 12, 5)
+
+    assert len(simplified) < len(encoded_polyline)
+
+
+@pytest.mark.benchmark(group="polyline")
+def test_polyline_levels(benchmark, encoded_polyline: str) -> None:
+    levels = benchmark(polyline_levels, encoded_polyline, [8, 12, 16], 5)
+
+    assert len(levels) == 3
@@ -21,6 +21,13 @@
     }:
     let
       inherit (inputs'.nix2container.packages) nix2container;
+
+      # gunicorn の各ワーカーのメトリクスを合算するためのディレクトリ
+      # （コンテナの起動ごとに空の状態から始まる）
+      prometheusMultiprocDir = "/tmp/prometheus";
+      prometheusMultiproc = pkgs.runCommand "prometheus-multiproc-dir" { } ''
+        mkdir -p $out${prometheusMultiprocDir}
+      '';
     in
     {
       ciPackages = [
@@ -40,9 +47,17 @@
             paths = [
               config.prodVirtualenv
               config.backendSrc
+              prometheusMultiproc
             ];
             pathsToLink = [ "/" ];
           };
+          perms = [
+            {
+              path = prometheusMultiproc;
+              regex = "/tmp.*";
+              mode = "1777";
+            }
+          ];
           config = {
             Cmd = [
               "${lib.getExe' config.prodVirtualenv "gunicorn"}"
@@ -50,8 +65,11 @@
               "0.0.0.0:8000"
               "--workers"
               "2"
-              "yorimichi_map_backend.wsgi"
+              "--worker-class"
+              "uvicorn_worker.UvicornWorker"
+              "yorimichi_map_backend.asgi"
             ];
+            Env = [ "PROMETHEUS_MULTIPROC_DIR=${prometheusMultiprocDir}" ];
             WorkingDir = "${config.backendSrc}";
             ExposedPorts = {
               "8000/tcp" = { };
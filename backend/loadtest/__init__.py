@@ -0,0 +1,13 @@
+"""オフラインの負荷試験・ベンチマーク。
+
+Google API（Places API / Routes API / Vertex AI Gemini）の代わりにローカルの疑似サーバー
+（fake_google）を立て、バックエンドを gunicorn で起動してシナリオ（scenarios）の
+リクエストを送り、スループット・レイテンシー・ワーカーごとのメモリを計測する（runner）。
+外部 API の認証情報やクォータを使わずに、1台の Linux マシン（CI を含む）で
+ワーカーの種類（uvicorn / gthread）・キャッシュの有無・ワーカー数などの条件を比較できる。
+
+例:
+    python -m loadtest --scenario chat --server asgi,gthread --cache on,off --workers 1,2
+    python -m loadtest --scenario calculate-route --requests 2000 --json report.json \\
+        --upstream "routes=lognormal:250:0.4,throttle=0.02,retry_after=1"
+"""
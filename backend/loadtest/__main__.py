@@ -0,0 +1,167 @@
+"""負荷試験のコマンドライン（python -m loadtest --help）。
+
+カンマ区切りで複数指定した条件（--server / --cache / --workers / --scenario）は
+全ての組み合わせを順に試し、結果を1つの表にまとめて表示する。
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from .fake_google import add_arguments, parse_upstreams
+from .runner import Report, RunConfig, format_table, run
+from .scenarios import SCENARIOS
+
+
+def _choices(allowed: tuple[str, ...]) -> Callable[[str], list[str]]:
+    def parse(value: str) -> list[str]:
+        items = [item.strip() for item in value.split(",") if item.strip()]
+        invalid = [item for item in items if item not in allowed]
+        if not items or invalid:
+            msg = f"expected comma-separated values from {allowed}, got {value!r}"
+            raise argparse.ArgumentTypeError(msg)
+        return items
+
+    return parse
+
+
+def _ints(value: str) -> list[int]:
+    try:
+        items = [int(item) for item in value.split(",")]
+    except ValueError:
+        msg = f"expected comma-separated integers, got {value!r}"
+        raise argparse.ArgumentTypeError(msg) from None
+    if any(item < 1 for item in items):
+        msg = f"expected positive integers, got {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+    return items
+
+
+def _env(value: str) -> tuple[str, str]:
+    key, sep, setting = value.partition("=")
+    if not sep or not key:
+        msg = f"expected KEY=VALUE, got {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+    return key, setting
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="疑似 Google API を相手にバックエンドの負荷試験を行う",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=_choices(tuple(SCENARIOS)),
+        default=["chat"],
+        help=f"シナリオ（カンマ区切りで複数可）: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument(
+        "--server",
+        type=_choices(("asgi", "gthread")),
+        default=["asgi"],
+        help="asgi（uvicorn ワーカー）/ gthread（WSGI のスレッドワーカー）。カンマ区切りで比較",
+    )
+    parser.add_argument(
+        "--cache",
+        type=_choices(("on", "off")),
+        default=["on"],
+        help="Places / Routes / 経由地候補のキャッシュの有無。カンマ区切りで比較",
+    )
+    parser.add_argument(
+        "--workers",
+        type=_ints,
+        default=[2],
+        help="gunicorn のワーカー数（カンマ区切り可）",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="gthread の場合のワーカーごとのスレッド数",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="同時接続数")
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="1回の試行で負荷をかける秒数"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=None,
+        help="1回の試行で送るリクエスト数（指定すると --duration より優先）",
+    )
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=50,
+        help="リクエストの地点の組み合わせの種類数（小さいほどキャッシュに当たる）",
+    )
+    parser.add_argument(
+        "--env",
+        type=_env,
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="バックエンドに渡す環境変数（例: GEMINI_MAX_CONCURRENCY=4）",
+    )
+    parser.add_argument("--json", type=Path, help="結果を JSON で書き出すファイル")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=None,
+        help="いずれかの試行のエラー率（0〜1）がこれを超えたら終了コード 1 で終わる",
+    )
+    add_arguments(parser)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        parse_upstreams(args.upstream)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    reports: list[Report] = []
+    for scenario, server, cache, workers in itertools.product(
+        args.scenario, args.server, args.cache, args.workers
+    ):
+        config = RunConfig(
+            scenario=scenario,
+            server=server,
+            workers=workers,
+            threads=args.threads,
+            cache=cache == "on",
+            concurrency=args.concurrency,
+            duration=args.duration,
+            requests=args.requests,
+            distinct=args.distinct,
+            upstreams=tuple(args.upstream),
+            seed=args.seed,
+            polyline_points=args.polyline_points,
+            env=tuple(args.env),
+        )
+        report = run(config)
+        print(format_table([report]).splitlines()[-1], file=sys.stderr)
+        reports.append(report)
+
+    print(format_table(reports))
+    if args.json is not None:
+        args.json.write_text(
+            json.dumps([report.to_dict() for report in reports], indent=2)
+        )
+    if args.max_error_rate is not None and any(
+        report.error_rate > args.max_error_rate for report in reports
+    ):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
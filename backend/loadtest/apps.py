@@ -0,0 +1,21 @@
+"""loadtest アプリの設定（負荷試験用の設定 loadtest.settings でだけ有効にする）。"""
+
+import functools
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class LoadtestConfig(AppConfig):
+    name = "loadtest"
+
+    def ready(self) -> None:
+        """Gemini の用途ごとのモデルを、疑似サーバーを呼ぶ FakeGenerativeModel に差し替える。"""
+        from navigation.services import gemini
+
+        from .vertex import FakeGenerativeModel
+
+        for name in gemini._MODEL_FACTORIES:
+            gemini._MODEL_FACTORIES[name] = functools.partial(
+                FakeGenerativeModel, name, settings.LOADTEST_FAKE_GOOGLE_URL
+            )
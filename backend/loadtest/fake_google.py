@@ -0,0 +1,500 @@
+"""Google API（Places API / Routes API / Vertex AI Gemini）の疑似サーバー。
+
+負荷試験で本物の API を呼ばずに済むよう、バックエンドが使うエンドポイントと
+同じ形式の応答を返す ASGI アプリ。上流（"places" / "routes" / "vertex"）ごとに
+応答までの待ち時間の分布・エラー（500）の割合・429 の割合を指定できる。
+
+- POST /v1/places:searchText                   - Places API (New) の textSearch
+- POST /directions/v2:computeRoutes            - Routes API の computeRoutes
+- POST /distanceMatrix/v2:computeRouteMatrix   - Routes API の computeRouteMatrix（"routes" として扱う）
+- POST /vertex/<モデル名>:generateContent       - Gemini（loadtest.vertex.FakeGenerativeModel が呼ぶ）
+- GET  /stats                                  - 上流ごとのリクエスト数・エラー数・429 の数
+
+Gemini の応答は決まった筋書きで返す。チャット（"chat"）は、ユーザーの発話
+（「AからBまで…」）に対して search_places と calculate_route を同時に呼び出し、
+関数の実行結果を受け取ったらテキストで応答する。経由地候補（"waypoints"）は
+3件の候補の JSON を返す。
+
+単体で起動する場合:
+    python -m loadtest.fake_google --port 8900 --upstream "vertex=lognormal:1500:0.5,throttle=0.05"
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from navigation.services import polyline
+
+UPSTREAMS = ("places", "routes", "vertex")
+
+# 東京駅付近。疑似スポットの座標とポリラインの基準にする
+_BASE_LATITUDE = 35.681
+_BASE_LONGITUDE = 139.767
+
+_ROUTE_PATTERN = re.compile(
+    r"(?P<origin>[^\s、。]+?)から(?P<destination>[^\s、。]+?)まで"
+)
+_DEFAULT_ORIGIN = "東京駅"
+_DEFAULT_DESTINATION = "箱根湯本駅"
+
+
+@dataclass(frozen=True, slots=True)
+class Latency:
+    """応答までの待ち時間の分布。
+
+    spec は "fixed:<ミリ秒>" / "uniform:<最小ミリ秒>:<最大ミリ秒>" /
+    "lognormal:<中央値ミリ秒>:<sigma>" のいずれか。
+    """
+
+    distribution: str = "fixed"
+    params: tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> Latency:
+        distribution, *values = spec.split(":")
+        arity = {"fixed": 1, "uniform": 2, "lognormal": 2}.get(distribution)
+        if arity is None or len(values) != arity:
+            msg = f"Invalid latency spec: {spec!r}"
+            raise ValueError(msg)
+        params = tuple(float(value) for value in values)
+        if any(value < 0 for value in params):
+            msg = f"Latency must not be negative: {spec!r}"
+            raise ValueError(msg)
+        return cls(distribution, params)
+
+    def sample(self, rng: random.Random) -> float:
+        """待ち時間（秒）を1つ返す。"""
+        if self.distribution == "uniform":
+            low, high = self.params
+            milliseconds = rng.uniform(low, high)
+        elif self.distribution == "lognormal":
+            median, sigma = self.params
+            milliseconds = rng.lognormvariate(math.log(max(median, 1e-3)), sigma)
+        else:
+            milliseconds = self.params[0]
+        return milliseconds / 1000
+
+
+@dataclass(frozen=True, slots=True)
+class Behavior:
+    """1つの上流の振る舞い（待ち時間・エラーの割合・429 の割合）。
+
+    spec は "<待ち時間の分布>[,error=<割合>][,throttle=<割合>][,retry_after=<秒>]"。
+    例: "lognormal:1500:0.5,error=0.01,throttle=0.05,retry_after=1"
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> Behavior:
+        latency_spec, *options = spec.split(",")
+        values: dict[str, float] = {}
+        for option in options:
+            key, sep, value = option.partition("=")
+            if not sep or key not in ("error", "throttle", "retry_after"):
+                msg = f"Invalid upstream option: {option!r}"
+                raise ValueError(msg)
+            values[key] = float(value)
+        behavior = cls(
+            latency=Latency.parse(latency_spec),
+            error_rate=values.get("error", 0.0),
+            throttle_rate=values.get("throttle", 0.0),
+            retry_after=values.get("retry_after"),
+        )
+        if not 0 <= behavior.error_rate + behavior.throttle_rate <= 1:
+            msg = f"error + throttle must be between 0 and 1: {spec!r}"
+            raise ValueError(msg)
+        return behavior
+
+
+# 本番の Google API に近い待ち時間（ミリ秒）。--upstream で上書きする
+DEFAULT_BEHAVIORS: Mapping[str, Behavior] = {
+    "places": Behavior(Latency("lognormal", (150.0, 0.4))),
+    "routes": Behavior(Latency("lognormal", (250.0, 0.4))),
+    "vertex": Behavior(Latency("lognormal", (1500.0, 0.5))),
+}
+
+
+def parse_upstreams(specs: list[str]) -> dict[str, Behavior]:
+    """ "<上流>=<Behavior の spec>" のリストを DEFAULT_BEHAVIORS に上書きした辞書を返す。"""
+    behaviors = dict(DEFAULT_BEHAVIORS)
+    for spec in specs:
+        name, sep, behavior_spec = spec.partition("=")
+        if not sep or name not in UPSTREAMS:
+            msg = (
+                f"Invalid upstream spec: {spec!r} (upstream must be one of {UPSTREAMS})"
+            )
+            raise ValueError(msg)
+        behaviors[name] = Behavior.parse(behavior_spec)
+    return behaviors
+
+
+def _digest(text: str) -> int:
+    """文字列から決まる整数（同じ検索・ルートには同じ疑似データを返すため）。"""
+    return int.from_bytes(hashlib.sha1(text.encode()).digest()[:4], "big")
+
+
+def _offset(seed: int, scale: float = 0.5) -> tuple[float, float]:
+    """基準点からのずれ（緯度・経度）を seed から決める。"""
+    return (
+        (seed % 1000 / 1000 - 0.5) * scale,
+        (seed // 1000 % 1000 / 1000 - 0.5) * scale,
+    )
+
+
+def places_response(payload: dict[str, Any]) -> dict[str, Any]:
+    """textSearch の応答（maxResultCount 件のスポット）を返す。"""
+    query = str(payload.get("textQuery", ""))
+    count = int(payload.get("maxResultCount", 3))
+    seed = _digest(query)
+    places = []
+    for i in range(count):
+        latitude, longitude = _offset(seed + i * 7919)
+        places.append(
+            {
+                "id": f"fake-{seed:08x}-{i}",
+                "displayName": {
+                    "text": f"{query} スポット{i + 1}",
+                    "languageCode": "ja",
+                },
+                "formattedAddress": f"日本、東京都疑似区{seed % 100}-{i + 1}",
+                "rating": 4.0 + (seed + i) % 10 / 10,
+                "userRatingCount": 100 + (seed + i) % 900,
+                "location": {
+                    "latitude": _BASE_LATITUDE + latitude,
+                    "longitude": _BASE_LONGITUDE + longitude,
+                },
+                "priceLevel": "PRICE_LEVEL_MODERATE",
+            }
+        )
+    return {"places": places}
+
+
+def _route_points(seed: int, count: int) -> list[tuple[float, float]]:
+    """基準点から seed で決まる地点までの、少しずつ曲がる count 点の経路。"""
+    end_latitude, end_longitude = _offset(seed, scale=1.5)
+    return [
+        (
+            _BASE_LATITUDE + end_latitude * t + 0.002 * math.sin(t * 40),
+            _BASE_LONGITUDE + end_longitude * t + 0.002 * math.cos(t * 40),
+        )
+        for t in (i / max(count - 1, 1) for i in range(count))
+    ]
+
+
+def routes_response(payload: dict[str, Any], polyline_points: int) -> dict[str, Any]:
+    """computeRoutes の応答（ルート1件）を返す。経由地は入力の順のまま最適化済みとする。"""
+    intermediates = payload.get("intermediates", [])
+    seed = _digest(json.dumps([payload.get("origin"), payload.get("destination")]))
+    points = _route_points(seed, polyline_points)
+    legs = []
+    for i in range(len(intermediates) + 1):
+        latitude, longitude = points[
+            (i + 1) * (len(points) - 1) // (len(intermediates) + 1)
+        ]
+        legs.append(
+            {"endLocation": {"latLng": {"latitude": latitude, "longitude": longitude}}}
+        )
+    return {
+        "routes": [
+            {
+                "duration": f"{1800 + seed % 7200}s",
+                "distanceMeters": 20000 + seed % 80000,
+                "polyline": {"encodedPolyline": polyline.encode(points)},
+                "legs": legs,
+                "optimizedIntermediateWaypointIndex": list(range(len(intermediates))),
+                "travelAdvisory": {
+                    "tollInfo": {
+                        "estimatedPrice": [
+                            {"currencyCode": "JPY", "units": str(500 + seed % 3000)}
+                        ]
+                    }
+                },
+            }
+        ]
+    }
+
+
+def route_matrix_response(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    """computeRouteMatrix の応答（全ての組み合わせの要素）を返す。"""
+    elements = []
+    for i, origin in enumerate(payload.get("origins", [])):
+        for j, destination in enumerate(payload.get("destinations", [])):
+            seed = _digest(json.dumps([origin, destination]))
+            elements.append(
+                {
+                    "originIndex": i,
+                    "destinationIndex": j,
+                    "condition": "ROUTE_EXISTS",
+                    "duration": f"{600 + seed % 3600}s",
+                    "distanceMeters": 5000 + seed % 50000,
+                }
+            )
+    return elements
+
+
+def _text(part: dict[str, Any]) -> str:
+    return str(part.get("text", ""))
+
+
+def _chat_parts(contents: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """チャットの筋書き: 発話にはツール呼び出し、ツールの実行結果にはテキストで応答する。"""
+    parts = contents[-1].get("parts", []) if contents else []
+    if any("function_response" in part for part in parts):
+        names = [part["function_response"].get("name") for part in parts]
+        return [
+            {
+                "text": (
+                    f"{'・'.join(names)} の結果をもとにルートを提案します。"
+                    "途中のスポットに立ち寄りながら、ゆったりとしたドライブをお楽しみください。"
+                )
+            }
+        ]
+    match = _ROUTE_PATTERN.search("".join(_text(part) for part in parts))
+    origin = match["origin"] if match else _DEFAULT_ORIGIN
+    destination = match["destination"] if match else _DEFAULT_DESTINATION
+    return [
+        {
+            "function_call": {
+                "name": "search_places",
+                "args": {"location_query": destination, "place_type": "cafe"},
+            }
+        },
+        {
+            "function_call": {
+                "name": "calculate_route",
+                "args": {"origin": origin, "destination": destination},
+            }
+        },
+    ]
+
+
+def _waypoint_parts(contents: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """経由地候補の筋書き: 発話から決まる3件の候補の JSON を返す。"""
+    message = "".join(_text(part) for part in contents[-1].get("parts", []))
+    seed = _digest(message)
+    candidates = []
+    for i in range(3):
+        latitude, longitude = _offset(seed + i * 104729)
+        candidates.append(
+            {
+                "name": f"疑似スポット{seed % 1000}-{i + 1}",
+                "description": "負荷試験用の経由地候補です。",
+                "address": f"日本、神奈川県疑似市{i + 1}",
+                "coords": {
+                    "latitude": _BASE_LATITUDE + latitude,
+                    "longitude": _BASE_LONGITUDE + longitude,
+                },
+            }
+        )
+    result = {"candidates": candidates, "ai_comment": "寄り道におすすめの3件です。"}
+    return [{"text": json.dumps(result, ensure_ascii=False)}]
+
+
+def generate_content_response(model: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """generateContent の応答（GenerationResponse.from_dict で読める形式）を返す。"""
+    contents = payload.get("contents", [])
+    parts = _waypoint_parts(contents) if model == "waypoints" else _chat_parts(contents)
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": parts},
+                "finish_reason": "STOP",
+            }
+        ],
+        # トークン数は文字数からのおおよその値
+        "usage_metadata": {
+            "prompt_token_count": len(json.dumps(contents, ensure_ascii=False)) // 2,
+            "candidates_token_count": len(json.dumps(parts, ensure_ascii=False)) // 2,
+        },
+    }
+
+
+_ERROR_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 404: "NOT_FOUND"}
+
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+
+
+class FakeGoogle:
+    """Google API の疑似サーバー（ASGI アプリ）。
+
+    behaviors にない上流は待ち時間なし・エラーなしで応答する。
+    seed を指定すると待ち時間とエラーの発生が再現できる。
+    """
+
+    def __init__(
+        self,
+        behaviors: Mapping[str, Behavior] | None = None,
+        *,
+        seed: int | None = None,
+        polyline_points: int = 500,
+    ) -> None:
+        self.behaviors = dict(behaviors or {})
+        self.polyline_points = max(polyline_points, 2)
+        self._random = random.Random(seed)
+        self.stats = {
+            upstream: {"requests": 0, "errors": 0, "throttled": 0}
+            for upstream in UPSTREAMS
+        }
+
+    def _handler(self, path: str) -> tuple[str, Callable[[dict[str, Any]], Any]] | None:
+        """パスに対応する (上流名, 応答を作る関数) を返す。"""
+        if path == "/v1/places:searchText":
+            return "places", places_response
+        if path == "/directions/v2:computeRoutes":
+            return "routes", lambda payload: routes_response(
+                payload, self.polyline_points
+            )
+        if path == "/distanceMatrix/v2:computeRouteMatrix":
+            return "routes", route_matrix_response
+        if path.startswith("/vertex/") and path.endswith(":generateContent"):
+            model = path.removeprefix("/vertex/").removesuffix(":generateContent")
+            return "vertex", lambda payload: generate_content_response(model, payload)
+        return None
+
+    async def __call__(
+        self, scope: dict[str, Any], receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] == "lifespan":
+            await _lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] == "GET" and scope["path"] == "/stats":
+            await _respond(send, 200, self.stats)
+            return
+        handler = self._handler(scope["path"]) if scope["method"] == "POST" else None
+        if handler is None:
+            await _respond(send, 404, _error_body(404, "Not found"))
+            return
+        upstream, build = handler
+        try:
+            payload = json.loads(await _read_body(receive) or b"{}")
+        except json.JSONDecodeError:
+            await _respond(send, 400, _error_body(400, "Invalid JSON"))
+            return
+
+        behavior = self.behaviors.get(upstream, Behavior())
+        stats = self.stats[upstream]
+        stats["requests"] += 1
+        await asyncio.sleep(behavior.latency.sample(self._random))
+
+        roll = self._random.random()
+        if roll < behavior.throttle_rate:
+            stats["throttled"] += 1
+            headers = {}
+            if behavior.retry_after is not None:
+                headers["retry-after"] = f"{behavior.retry_after:g}"
+            await _respond(
+                send, 429, _error_body(429, "Resource exhausted"), headers=headers
+            )
+        elif roll < behavior.throttle_rate + behavior.error_rate:
+            stats["errors"] += 1
+            await _respond(send, 500, _error_body(500, "Internal error"))
+        else:
+            await _respond(send, 200, build(payload))
+
+
+def _error_body(code: int, message: str) -> dict[str, Any]:
+    """Google API のエラー応答の形式。"""
+    return {
+        "error": {
+            "code": code,
+            "message": message,
+            "status": _ERROR_STATUS.get(code, "INVALID_ARGUMENT"),
+        }
+    }
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _respond(
+    send: Send, status: int, data: Any, headers: Mapping[str, str] | None = None
+) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode()
+    raw_headers = [
+        (b"content-type", b"application/json; charset=utf-8"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    raw_headers += [
+        (key.encode(), value.encode()) for key, value in (headers or {}).items()
+    ]
+    await send(
+        {"type": "http.response.start", "status": status, "headers": raw_headers}
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """疑似サーバーの振る舞いを指定する引数を parser に追加する。"""
+    parser.add_argument(
+        "--upstream",
+        action="append",
+        default=[],
+        metavar="NAME=SPEC",
+        help=(
+            "上流（places / routes / vertex）の振る舞い。"
+            '例: "vertex=lognormal:1500:0.5,error=0.01,throttle=0.05,retry_after=1"'
+        ),
+    )
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード")
+    parser.add_argument(
+        "--polyline-points",
+        type=int,
+        default=500,
+        help="ルートのポリラインの点数（レスポンスの大きさ）",
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(
+        description="Google API（Places API / Routes API / Vertex AI Gemini）の疑似サーバー"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    app = FakeGoogle(
+        parse_upstreams(args.upstream),
+        seed=args.seed,
+        polyline_points=args.polyline_points,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
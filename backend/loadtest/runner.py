@@ -0,0 +1,394 @@
+"""負荷試験の実行とレポート。
+
+1回の試行（run()）では以下を行う:
+
+1. 疑似サーバー（loadtest.fake_google）を起動する
+2. バックエンドを gunicorn で起動する（設定は loadtest.settings）
+   - server="asgi": 本番と同じ uvicorn_worker.UvicornWorker（非同期ビューを1プロセスで並行処理）
+   - server="gthread": WSGI の gthread ワーカー。ビューは同じ非同期ビューで、リクエストごとの
+     スレッドで async_to_sync により実行する（同期版のビューを比べるものではなく、
+     ワーカーの種類による差を比べる）
+   - cache=False: Places / Routes / 経由地候補のキャッシュを "none" にする
+3. concurrency 本の接続からシナリオのリクエストを duration 秒間（または requests 件）送り続ける
+4. スループット（req/s）・レイテンシーのパーセンタイル・ステータスごとの件数・
+   ワーカーごとの最大 RSS・上流ごとのリクエスト数を Report にまとめる
+
+メモリは /proc から読むため Linux でのみ計測できる（他の OS では空になる）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+import httpx
+
+from .scenarios import SCENARIOS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# キャッシュを無効にする（cache=False）場合に "none" にする設定
+_CACHE_SETTINGS = (
+    "PLACES_CACHE_BACKEND",
+    "ROUTES_CACHE_BACKEND",
+    "WAYPOINT_SUGGESTIONS_CACHE_BACKEND",
+)
+# サーバーの起動を待つ最大秒数
+_STARTUP_TIMEOUT = 60.0
+# RSS を計測する間隔（秒）
+_SAMPLE_INTERVAL = 0.5
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(frozen=True, slots=True)
+class RunConfig:
+    """1回の試行の条件。"""
+
+    scenario: str
+    server: str = "asgi"
+    workers: int = 2
+    threads: int = 8
+    cache: bool = True
+    concurrency: int = 16
+    duration: float = 30.0
+    requests: int | None = None
+    distinct: int = 50
+    upstreams: tuple[str, ...] = ()
+    seed: int | None = None
+    polyline_points: int = 500
+    env: tuple[tuple[str, str], ...] = ()
+
+
+@dataclass(slots=True)
+class Report:
+    """1回の試行の結果。"""
+
+    config: RunConfig
+    requests: int
+    elapsed: float
+    statuses: dict[str, int]
+    latency: dict[str, float]
+    worker_rss_mib: dict[str, float]
+    upstream: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """2xx 以外（接続エラーを含む）の割合。"""
+        if not self.requests:
+            return 0.0
+        ok = sum(n for status, n in self.statuses.items() if status.startswith("2"))
+        return 1 - ok / self.requests
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["rps"] = self.rps
+        data["error_rate"] = self.error_rate
+        return data
+
+    def label(self) -> str:
+        config = self.config
+        workers = f"{config.workers}w"
+        if config.server == "gthread":
+            workers += f"x{config.threads}t"
+        cache = "cache" if config.cache else "nocache"
+        return f"{config.scenario} {config.server} {workers} {cache}"
+
+
+def percentile(values: list[float], q: float) -> float:
+    """values の q パーセンタイル（0〜100、線形補間）を返す。values が空なら 0 を返す。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latency(seconds: list[float]) -> dict[str, float]:
+    """レイテンシー（秒）の p50 / p95 / p99 / 最大（ミリ秒）を返す。"""
+    return {
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "max_ms": max(seconds, default=0.0) * 1000,
+    }
+
+
+# ---------------------------------------------------------------------------
+# プロセスの起動とメモリの計測
+# ---------------------------------------------------------------------------
+
+
+def free_port() -> int:
+    """空いている TCP ポートを返す。"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_pids(pid: int) -> list[int]:
+    """pid の子プロセス（gunicorn のワーカー）の PID を返す（Linux のみ）。"""
+    children = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # ")" の後は state, ppid, ... の順
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return sorted(children)
+
+
+def rss_bytes(pid: int) -> int | None:
+    """プロセスの RSS（バイト）を返す。読めなければ None を返す。"""
+    try:
+        resident = Path(f"/proc/{pid}/statm").read_text().split()[1]
+    except (OSError, IndexError):
+        return None
+    return int(resident) * _PAGE_SIZE
+
+
+class RssSampler:
+    """gunicorn のワーカーごとの最大 RSS を別スレッドで定期的に計測する。"""
+
+    def __init__(self, master_pid: int) -> None:
+        self._master_pid = master_pid
+        self._peaks: dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> None:
+        for pid in child_pids(self._master_pid):
+            rss = rss_bytes(pid)
+            if rss is not None:
+                self._peaks[pid] = max(self._peaks.get(pid, 0), rss)
+
+    def _run(self) -> None:
+        while not self._stop.wait(_SAMPLE_INTERVAL):
+            self._sample()
+
+    def __enter__(self) -> Self:
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def peaks_mib(self) -> dict[str, float]:
+        """{"worker-<PID>": 最大 RSS（MiB）} を返す。"""
+        return {
+            f"worker-{pid}": round(rss / 2**20, 1)
+            for pid, rss in sorted(self._peaks.items())
+        }
+
+
+def _wait_ready(url: str, process: subprocess.Popen[bytes]) -> None:
+    """url が応答するまで待つ。プロセスが終了した・時間切れの場合は RuntimeError を送出する。"""
+    deadline = time.monotonic() + _STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            msg = f"Process exited with {process.returncode} before {url} was ready"
+            raise RuntimeError(msg)
+        try:
+            httpx.get(url, timeout=1)
+        except httpx.HTTPError:
+            time.sleep(0.2)
+        else:
+            return
+    msg = f"Timed out waiting for {url}"
+    raise RuntimeError(msg)
+
+
+@contextlib.contextmanager
+def _process(
+    args: list[str], env: dict[str, str], ready_url: str
+) -> Iterator[subprocess.Popen[bytes]]:
+    """プロセスを起動し、ready_url が応答してからブロックを実行する。終了時に停止する。"""
+    process = subprocess.Popen(args, cwd=BACKEND_DIR, env=env)
+    try:
+        _wait_ready(ready_url, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def fake_google_args(config: RunConfig, port: int) -> list[str]:
+    args = [sys.executable, "-m", "loadtest.fake_google", "--port", str(port)]
+    args += ["--polyline-points", str(config.polyline_points)]
+    for spec in config.upstreams:
+        args += ["--upstream", spec]
+    if config.seed is not None:
+        args += ["--seed", str(config.seed)]
+    return args
+
+
+def backend_args(config: RunConfig, port: int) -> list[str]:
+    args = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}"]
+    args += [
+        "--workers",
+        str(config.workers),
+        "--timeout",
+        "120",
+        "--log-level",
+        "warning",
+    ]
+    if config.server == "asgi":
+        return [
+            *args,
+            "--worker-class",
+            "uvicorn_worker.UvicornWorker",
+            "yorimichi_map_backend.asgi",
+        ]
+    return [
+        *args,
+        "--worker-class",
+        "gthread",
+        "--threads",
+        str(config.threads),
+        "yorimichi_map_backend.wsgi",
+    ]
+
+
+def backend_env(config: RunConfig, fake_google_url: str) -> dict[str, str]:
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "loadtest.settings",
+        "LOADTEST_FAKE_GOOGLE_URL": fake_google_url,
+    }
+    if not config.cache:
+        env.update(dict.fromkeys(_CACHE_SETTINGS, "none"))
+    env.update(config.env)
+    return env
+
+
+# ---------------------------------------------------------------------------
+# 負荷の生成
+# ---------------------------------------------------------------------------
+
+
+async def generate_load(
+    base_url: str, config: RunConfig
+) -> tuple[list[float], Counter[str], float]:
+    """concurrency 本の接続からリクエストを送り、(各レイテンシー, ステータスの件数, 経過秒数) を返す。
+
+    接続エラー・タイムアウトはステータス "error" として数える。
+    """
+    scenario = SCENARIOS[config.scenario]
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + config.duration
+
+    def next_index() -> int | None:
+        nonlocal sent
+        if config.requests is not None and sent >= config.requests:
+            return None
+        if config.requests is None and time.perf_counter() >= deadline:
+            return None
+        sent += 1
+        return sent - 1
+
+    async def user(client: httpx.AsyncClient) -> None:
+        while (i := next_index()) is not None:
+            request_start = time.perf_counter()
+            try:
+                response = await client.post(
+                    scenario.path, json=scenario.request(i, config.distinct)
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append(time.perf_counter() - request_start)
+            statuses[status] += 1
+
+    limits = httpx.Limits(max_connections=config.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=120
+    ) as client:
+        await asyncio.gather(*(user(client) for _ in range(config.concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run(config: RunConfig) -> Report:
+    """疑似サーバーとバックエンドを起動して1回の試行を行い、結果を返す。"""
+    if config.scenario not in SCENARIOS:
+        msg = f"Unknown scenario: {config.scenario!r}"
+        raise ValueError(msg)
+    if config.server not in ("asgi", "gthread"):
+        msg = f"Unknown server: {config.server!r} (expected 'asgi' or 'gthread')"
+        raise ValueError(msg)
+
+    fake_port, backend_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+
+    with (
+        _process(
+            fake_google_args(config, fake_port), dict(os.environ), f"{fake_url}/stats"
+        ),
+        _process(
+            backend_args(config, backend_port),
+            backend_env(config, fake_url),
+            f"{backend_url}/api/health/",
+        ) as backend,
+        RssSampler(backend.pid) as sampler,
+    ):
+        latencies, statuses, elapsed = asyncio.run(generate_load(backend_url, config))
+        upstream = httpx.get(f"{fake_url}/stats", timeout=5).json()
+
+    return Report(
+        config=config,
+        requests=len(latencies),
+        elapsed=elapsed,
+        statuses=dict(sorted(statuses.items())),
+        latency=summarize_latency(latencies),
+        worker_rss_mib=sampler.peaks_mib(),
+        upstream=upstream,
+    )
+
+
+def format_table(reports: list[Report]) -> str:
+    """複数の試行の結果を比較しやすい表（テキスト）にする。"""
+    header = (
+        f"{'run':<36} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} "
+        f"{'err%':>6} {'rss MiB/worker':>16} {'upstream/req':>12}"
+    )
+    lines = [header, "-" * len(header)]
+    for report in reports:
+        rss = report.worker_rss_mib.values()
+        rss_text = f"{max(rss):.0f} (max)" if rss else "-"
+        upstream_calls = sum(stats["requests"] for stats in report.upstream.values())
+        per_request = upstream_calls / report.requests if report.requests else 0.0
+        lines.append(
+            f"{report.label():<36} {report.rps:>8.1f} "
+            f"{report.latency['p50_ms']:>8.1f} {report.latency['p95_ms']:>8.1f} "
+            f"{report.latency['p99_ms']:>8.1f} {report.error_rate * 100:>6.1f} "
+            f"{rss_text:>16} {per_request:>12.2f}"
+        )
+    return "\n".join(lines)
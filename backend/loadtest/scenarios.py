@@ -0,0 +1,83 @@
+"""負荷試験のシナリオ（API エンドポイントごとのリクエストの作り方）。
+
+各シナリオは i 番目のリクエストのボディを返す。distinct 種類の地点の組み合わせを
+順に使うため、distinct を小さくするとキャッシュに当たりやすく、大きくすると外れやすくなる。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+_PLACES = (
+    "東京駅",
+    "箱根湯本駅",
+    "鎌倉駅",
+    "横浜駅",
+    "河口湖駅",
+    "軽井沢駅",
+    "日光駅",
+    "熱海駅",
+    "御殿場駅",
+    "館山駅",
+    "秩父駅",
+    "草津温泉",
+)
+
+
+def _endpoints(i: int, distinct: int) -> tuple[str, str, str]:
+    """i 番目のリクエストの (出発地, 目的地, 経由地)。distinct 種類を繰り返す。"""
+    n = i % max(distinct, 1)
+    count = len(_PLACES)
+    origin = _PLACES[n % count]
+    destination = _PLACES[(n // count + n + 1) % count]
+    if destination == origin:
+        destination = _PLACES[(n + 2) % count]
+    waypoint = f"{_PLACES[(n + 5) % count]}周辺 {n // count}"
+    return origin, destination, waypoint
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """1つの API エンドポイントへのリクエスト。"""
+
+    name: str
+    path: str
+    body: Callable[[int, int], dict[str, Any]]
+
+    def request(self, i: int, distinct: int) -> dict[str, Any]:
+        """i 番目のリクエストのボディを返す。"""
+        return self.body(i, distinct)
+
+
+def _chat(i: int, distinct: int) -> dict[str, Any]:
+    origin, destination, _ = _endpoints(i, distinct)
+    return {"message": f"{origin}から{destination}まで、途中でカフェに寄りたい"}
+
+
+def _calculate_route(i: int, distinct: int) -> dict[str, Any]:
+    origin, destination, waypoint = _endpoints(i, distinct)
+    return {"origin": origin, "destination": destination, "waypoints": [waypoint]}
+
+
+def _suggest_waypoints(i: int, distinct: int) -> dict[str, Any]:
+    origin, destination, _ = _endpoints(i, distinct)
+    return {"origin": origin, "destination": destination, "prompt": "景色の良い休憩所"}
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("chat", "/api/navigation/chat/", _chat),
+        Scenario(
+            "calculate-route", "/api/navigation/calculate-route/", _calculate_route
+        ),
+        Scenario("return-route", "/api/navigation/return-route/", _calculate_route),
+        Scenario(
+            "suggest-waypoints",
+            "/api/navigation/suggest-waypoints/",
+            _suggest_waypoints,
+        ),
+    )
+}
@@ -0,0 +1,33 @@
+"""負荷試験用の Django 設定。
+
+本番の設定（yorimichi_map_backend.settings）をもとに、Google API の呼び出し先を
+疑似サーバー（環境変数 LOADTEST_FAKE_GOOGLE_URL）に向ける。
+キャッシュ・レート制限・再試行などの設定は本番と同じ環境変数で変更できる。
+"""
+
+import os
+
+# 本番の設定をすべて引き継ぎ、負荷試験で変える値だけを下で上書きする
+from yorimichi_map_backend.settings import *  # noqa: F403
+from yorimichi_map_backend.settings import INSTALLED_APPS
+
+LOADTEST_FAKE_GOOGLE_URL = os.environ.get(
+    "LOADTEST_FAKE_GOOGLE_URL", "http://127.0.0.1:8900"
+).rstrip("/")
+
+INSTALLED_APPS = [*INSTALLED_APPS, "loadtest"]
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+
+MAPS_API_KEY = "loadtest"
+PLACES_API_URL = f"{LOADTEST_FAKE_GOOGLE_URL}/v1/places:searchText"
+ROUTES_API_URL = f"{LOADTEST_FAKE_GOOGLE_URL}/directions/v2:computeRoutes"
+ROUTE_MATRIX_API_URL = (
+    f"{LOADTEST_FAKE_GOOGLE_URL}/distanceMatrix/v2:computeRouteMatrix"
+)
+
+# Gemini は LoadtestConfig.ready() で疑似サーバーを呼ぶモデルに差し替える。
+# コンテキストキャッシュは Vertex AI の API を直接呼ぶため使わない
+GEMINI_WARM_UP = False
+GEMINI_CONTEXT_CACHE_ENABLED = False
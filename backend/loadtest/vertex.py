@@ -0,0 +1,81 @@
+"""Vertex AI の GenerativeModel の代わりに疑似サーバーを呼ぶモデル。
+
+Vertex AI SDK は gRPC（TLS）で Google のエンドポイントに接続するため、接続先を
+ローカルの疑似サーバーに向けられない。負荷試験では LoadtestConfig.ready() で
+gemini の用途ごとのモデルをこのクラスに差し替え、generateContent の要求・応答だけを
+HTTP（JSON）で疑似サーバーとやり取りする。応答は SDK と同じ GenerationResponse に変換し、
+HTTP のエラーは SDK と同じ google.api_core の例外（429 なら ResourceExhausted）として送出する。
+そのため、レート制限・再試行・ツール呼び出しのループなどはバックエンドのコードがそのまま動く。
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+from google.api_core import exceptions as google_exceptions
+from vertexai.generative_models import Content, GenerationResponse
+
+# Gemini の応答を待つ最大秒数
+_TIMEOUT = 120.0
+
+
+def _content_dict(content: Any) -> dict[str, Any]:
+    if isinstance(content, str):
+        return {"role": "user", "parts": [{"text": content}]}
+    if isinstance(content, Content):
+        return content.to_dict()
+    return dict(content)
+
+
+def _contents(contents: Any) -> list[dict[str, Any]]:
+    """generate_content_async に渡された contents を generateContent の要求の形式に変換する。"""
+    if isinstance(contents, (str, Content)):
+        contents = [contents]
+    return [_content_dict(content) for content in contents]
+
+
+def _check(response: httpx.Response) -> GenerationResponse:
+    if response.status_code >= 400:
+        message = response.json().get("error", {}).get("message", "")
+        if response.status_code == 429:
+            # gRPC の SDK と同じく、クォータ超過は ResourceExhausted として送出する
+            raise google_exceptions.ResourceExhausted(message, response=response)
+        raise google_exceptions.from_http_status(
+            response.status_code, message, response=response
+        )
+    return GenerationResponse.from_dict(response.json())
+
+
+class FakeGenerativeModel:
+    """疑似サーバーの /vertex/<name>:generateContent を呼ぶ GenerativeModel の代わり。
+
+    バックエンドは generate_content_async だけを使うため、それだけを実装する。
+    """
+
+    def __init__(self, name: str, base_url: str) -> None:
+        self.name = name
+        self._url = f"{base_url.rstrip('/')}/vertex/{name}:generateContent"
+        self._async_client: httpx.AsyncClient | None = None
+
+    async def generate_content_async(
+        self, contents: Any, *, stream: bool = False, **_: Any
+    ) -> Any:
+        # gemini.get_model() はイベントループごとに共有モデルの浅いコピーを返し、
+        # 共有モデル自体は generate_content_async を呼ばない（クライアントを持たない）ため、
+        # クライアントをコピーごとに持てば、生成したループ以外から使われることはない
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=_TIMEOUT)
+        response = await self._async_client.post(
+            self._url, json={"contents": _contents(contents)}
+        )
+        generation_response = _check(response)
+        if stream:
+            return _single_chunk(generation_response)
+        return generation_response
+
+
+async def _single_chunk(response: GenerationResponse) -> AsyncIterator[Any]:
+    """ストリーミングの応答として、応答全体を1つのチャンクで返す。"""
+    yield response
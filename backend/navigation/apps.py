@@ -5,9 +5,31 @@ Vertex AI Gemini と Google Maps API を連携して、
 チャット形式でドライブルートの提案を行う。
 """
 
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class NavigationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "navigation"
+
+    def ready(self) -> None:
+        """起動時にトレースの送信先を設定し、Gemini のモデルを生成しておく（初回リクエストの遅延を避ける）。"""
+        from .services import tracing
+
+        tracing.configure()
+
+        if not settings.GEMINI_WARM_UP:
+            return
+
+        from .services.gemini import warm_up_models
+
+        try:
+            warm_up_models()
+        except Exception:
+            # 起動自体は妨げない（初回リクエスト時に再度生成を試みる）
+            logger.exception("Failed to warm up Gemini models")
@@ -2,10 +2,18 @@
 
 drf-spectacular と連携し、OpenAPI スキーマ（/api/docs/）を自動生成する。
 フロントエンドとの型契約（API コントラクト）をここで一元管理している。
+
+レスポンスは Serializer(...).data の代わりに、末尾で compile_output により生成した
+関数（chat_response_data など）で組み立てる。出力は .data と同じで、
+フィールド定義の解釈を起動時に1回だけ行うため、リクエストごとの CPU 時間が少ない。
 """
 
-from rest_framework import serializers
+from collections.abc import Callable, Mapping
+from typing import Any
 
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.fields import empty
 
 # --- チャット関連 ---
 
@@ -17,15 +25,55 @@ class ChatMessageSerializer(serializers.Serializer):
     content = serializers.CharField()
 
 
+class PolylineOptionsSerializer(serializers.Serializer):
+    """ルートのポリラインを軽量化するオプション（指定しなければ Routes API の結果をそのまま返す）。
+
+    zoom: このズームレベルの地図で見分けがつかない点を間引く
+    precision: 再エンコードする精度（小数点以下の桁数）
+    levels: 指定したズームレベルごとに簡略化したポリラインを polylines で追加で返す
+    """
+
+    zoom = serializers.IntegerField(
+        min_value=0,
+        max_value=21,
+        required=False,
+        help_text="簡略化に使う地図のズームレベル（省略時は簡略化しない）",
+    )
+    precision = serializers.IntegerField(
+        min_value=1,
+        max_value=5,
+        required=False,
+        default=5,
+        help_text="ポリラインの精度（小数点以下の桁数）",
+    )
+    levels = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=21),
+        required=False,
+        default=[],
+        max_length=5,
+        help_text="多段階表示用のズームレベル（粗い順に polylines で返す）",
+    )
+
+
 class ChatRequestSerializer(serializers.Serializer):
     """POST /api/navigation/chat/ のリクエストボディ。
 
     message: ユーザーの入力テキスト
     history: これまでの会話履歴（フロントエンドが保持して毎回送る）
+    session_id: サーバー側セッションを使う場合に指定する。空文字で新しいセッションを開始し、
+        以降はレスポンスの session_id を送れば history は不要
+    polyline_options: 応答に含まれるルートのポリラインを軽量化する場合に指定する
     """
 
     message = serializers.CharField(help_text="ユーザーのメッセージ")
     history = ChatMessageSerializer(many=True, required=False, default=[])
+    session_id = serializers.RegexField(
+        r"^[0-9a-f]{32}$",
+        required=False,
+        allow_blank=True,
+        help_text="サーバー側セッションの ID。空文字で新しいセッションを開始する",
+    )
+    polyline_options = PolylineOptionsSerializer(required=False)
 
 
 # --- 地理座標・スポット ---
@@ -58,6 +106,13 @@ class TollSerializer(serializers.Serializer):
     units = serializers.CharField()
 
 
+class PolylineLevelSerializer(serializers.Serializer):
+    """ズームレベル向けに簡略化したポリライン1件。"""
+
+    zoom = serializers.IntegerField()
+    encoded_polyline = serializers.CharField()
+
+
 class RouteSerializer(serializers.Serializer):
     """Routes API で計算したルート情報。
 
@@ -65,6 +120,7 @@ class RouteSerializer(serializers.Serializer):
     フロントエンドでデコードして地図上にポリラインを描画する。
     google_maps_url は Google Maps アプリを開くためのディープリンク。
     waypoint_coords は経由地の座標リスト（マップ上にマーカーを表示するため）。
+    polyline_precision / polylines は polyline_options を指定した場合のみ含まれる。
     """
 
     origin = serializers.CharField()
@@ -76,6 +132,14 @@ class RouteSerializer(serializers.Serializer):
     encoded_polyline = serializers.CharField()
     tolls = TollSerializer(many=True, required=False, default=[])
     google_maps_url = serializers.CharField()
+    polyline_precision = serializers.IntegerField(
+        required=False, help_text="encoded_polyline の精度（小数点以下の桁数）"
+    )
+    polylines = PolylineLevelSerializer(
+        many=True,
+        required=False,
+        help_text="ズームレベルごとに簡略化したポリライン（粗い順）",
+    )
 
 
 # --- レスポンス ---
@@ -87,11 +151,16 @@ class ChatResponseSerializer(serializers.Serializer):
     reply: AI の応答テキスト
     route: Gemini が calculate_route を呼んだ場合にルートデータが入る（それ以外は null）
     places: Gemini が search_places を呼んだ場合にスポット一覧が入る（それ以外は null）
+    session_id: リクエストで session_id を指定した場合のみ。次のリクエストで送る ID
     """
 
     reply = serializers.CharField()
     route = RouteSerializer(required=False, allow_null=True)
     places = PlaceSerializer(many=True, required=False, allow_null=True)
+    session_id = serializers.CharField(
+        required=False,
+        help_text="サーバー側セッションの ID（リクエストで session_id を指定した場合のみ）",
+    )
 
 
 class ReturnRouteRequestSerializer(serializers.Serializer):
@@ -104,6 +173,7 @@ class ReturnRouteRequestSerializer(serializers.Serializer):
     origin = serializers.CharField()
     destination = serializers.CharField()
     waypoints = serializers.ListField(child=serializers.CharField())
+    polyline_options = PolylineOptionsSerializer(required=False)
 
 
 class ReturnRouteResponseSerializer(serializers.Serializer):
@@ -116,12 +186,27 @@ class ReturnRouteResponseSerializer(serializers.Serializer):
 
 
 class WaypointCandidateSerializer(serializers.Serializer):
-    """AI が提案する経由地候補1件。"""
+    """AI が提案する経由地候補1件。
+
+    detour_seconds / detour_meters は出発地→候補→目的地と出発地→目的地の差分。
+    """
 
     name = serializers.CharField()
     description = serializers.CharField()
     address = serializers.CharField(required=False, allow_blank=True, default="")
     coords = CoordsSerializer(required=False, allow_null=True, default=None)
+    detour_seconds = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        default=None,
+        help_text="寄り道による所要時間の増分（秒）。求められない場合は null",
+    )
+    detour_meters = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        default=None,
+        help_text="寄り道による走行距離の増分（メートル）。求められない場合は null",
+    )
 
 
 class WaypointSuggestRequestSerializer(serializers.Serializer):
@@ -152,9 +237,142 @@ class CalculateRouteRequestSerializer(serializers.Serializer):
         default=[],
         help_text="経由地のリスト",
     )
+    polyline_options = PolylineOptionsSerializer(required=False)
 
 
 class CalculateRouteResponseSerializer(serializers.Serializer):
     """POST /api/navigation/calculate-route/ のレスポンスボディ。"""
 
     route = RouteSerializer()
+
+
+# --- ルート一括計算 ---
+
+
+class CalculateRoutesBatchRequestSerializer(serializers.Serializer):
+    """POST /api/navigation/calculate-routes/batch/ のリクエストボディ。
+
+    routes の各要素は POST /api/navigation/calculate-route/ のリクエストボディと同じ。
+    """
+
+    routes = CalculateRouteRequestSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.ROUTES_BATCH_MAX_ITEMS,
+        help_text="計算するルートのリスト",
+    )
+
+
+class CalculateRoutesBatchItemSerializer(serializers.Serializer):
+    """ルート一括計算の結果1件。
+
+    成功時は route にルート（ディープリンク付き）、失敗時は detail にエラーメッセージが入る。
+    status は単体のルート計算 API が返す HTTP ステータスコードに相当する（200 / 400 / 502）。
+    """
+
+    status = serializers.IntegerField()
+    route = RouteSerializer(required=False, allow_null=True)
+    detail = serializers.CharField(required=False, allow_null=True)
+
+
+class CalculateRoutesBatchResponseSerializer(serializers.Serializer):
+    """POST /api/navigation/calculate-routes/batch/ のレスポンスボディ。
+
+    results はリクエストの routes と同じ順序で並ぶ。
+    """
+
+    results = CalculateRoutesBatchItemSerializer(many=True)
+
+
+# --- 高速出力 ---
+
+_Output = Callable[[Any], Any]
+
+# to_representation が組み込み型への変換だけのフィールド
+_CONVERTERS: dict[type[serializers.Field], _Output] = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+
+
+def _compile_field(field: serializers.Field) -> _Output:
+    """フィールドの to_representation と同じ変換を行う関数を返す。"""
+    if isinstance(field, serializers.ListSerializer) and field.child is not None:
+        child = _compile_field(field.child)
+        return lambda value: [child(item) for item in value]
+    if isinstance(field, serializers.Serializer):
+        return compile_output(field)
+    if isinstance(field, serializers.ListField):
+        child = _compile_field(field.child)
+        return lambda value: [None if item is None else child(item) for item in value]
+    return _CONVERTERS.get(type(field), field.to_representation)
+
+
+def compile_output(
+    serializer: serializers.Serializer | type[serializers.Serializer],
+) -> Callable[[Any], dict[str, Any]]:
+    """辞書・オブジェクトから serializer(instance).data と同じ出力を組み立てる関数を返す。
+
+    フィールドごとの変換関数・既定値・null 可否を事前に求めておき、出力時は
+    キー（辞書）・属性（domain の Route 等）の参照と型変換だけを行う。
+    欠けているキー・属性の扱い（default → null → 省略 → 例外）は Field.get_attribute と同じ。
+    source の "." / "*" には対応しない。
+
+    .data と異なる点: domain のモデルは未設定の任意項目を None で表すため、オブジェクトの
+    属性が None で、フィールドが null を許可しない任意項目（default なし）の場合は省略する
+    （辞書でキーがない場合と同じ出力になり、スキーマどおり null を返さない）。
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+
+    specs = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*" or "." in field.source:
+            msg = f"Unsupported source for compile_output: {field.source!r}"
+            raise ValueError(msg)
+        specs.append(
+            (
+                field.field_name,
+                field.source,
+                _compile_field(field),
+                field.default,
+                field.allow_null,
+                field.required,
+                not field.required and not field.allow_null and field.default is empty,
+            )
+        )
+
+    def output(instance: Any) -> dict[str, Any]:
+        is_mapping = isinstance(instance, Mapping)
+        ret = {}
+        for name, source, convert, default, allow_null, required, optional in specs:
+            try:
+                value = instance[source] if is_mapping else getattr(instance, source)
+            except (KeyError, AttributeError):
+                if default is not empty:
+                    value = default() if callable(default) else default
+                elif allow_null:
+                    value = None
+                elif not required:
+                    continue
+                else:
+                    raise
+            if value is not None:
+                ret[name] = convert(value)
+            elif is_mapping or not optional:
+                ret[name] = None
+        return ret
+
+    return output
+
+
+chat_response_data = compile_output(ChatResponseSerializer)
+return_route_response_data = compile_output(ReturnRouteResponseSerializer)
+calculate_route_response_data = compile_output(CalculateRouteResponseSerializer)
+calculate_routes_batch_response_data = compile_output(
+    CalculateRoutesBatchResponseSerializer
+)
+waypoint_suggest_response_data = compile_output(WaypointSuggestResponseSerializer)
@@ -0,0 +1,618 @@
+"""Google Maps API 呼び出し結果のキャッシュ。
+
+同じ検索条件のリクエストを Places API / Routes API に何度も送らないよう、
+結果を TTL 付きでキャッシュする。バックエンドは設定で切り替えられる:
+
+  - "memory": プロセス内の LRU キャッシュ（最大件数と TTL で管理）
+  - "sqlite": SQLite ファイルに保存する永続キャッシュ（settings.MAPS_CACHE_SQLITE_PATH）
+  - "tiered": "memory" を前段、"sqlite" を後段に置く2段キャッシュ。
+    Cloud Run のコールドスタート後もディスクから温まった状態で始められる。
+  - "django": Django のキャッシュフレームワーク（settings.CACHES）。
+    Redis / memcached を指定すれば Cloud Run の複数インスタンス間で共有できる。
+  - "none": キャッシュしない
+
+キャッシュは名前（"places" など）ごとに get_cache() で取得する。
+設定は settings の <NAME>_CACHE_BACKEND / <NAME>_CACHE_TTL / <NAME>_CACHE_MAX_ENTRIES /
+<NAME>_CACHE_DISK_MAX_ENTRIES から読み取る。ヒット・ミス数は cache_stats() で参照できる
+（metrics にも記録し、/api/metrics/ で全ワーカーの合計を参照できる）。
+
+"sqlite" / "tiered" / "django" は複数プロセスで共有されるため、ResultCache.lock() で
+プロセス間のロックも取れる（single_flight が同じ API 呼び出しをワーカー間でまとめるのに使う）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Protocol, runtime_checkable
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .domain import json_default, json_object_hook
+
+logger = logging.getLogger(__name__)
+
+# キャッシュに値が無いことを表す番兵（None もキャッシュ値になり得るため）
+MISSING: Any = object()
+
+_KEY_PREFIX = "yorimichi"
+
+
+def normalize_query(value: str) -> str:
+    """キャッシュキー用に文字列を正規化する。
+
+    全角・半角の揺れ（NFKC）、前後の空白、連続する空白、大文字・小文字の違いを吸収する。
+    """
+    normalized = unicodedata.normalize("NFKC", value)
+    return " ".join(normalized.split()).casefold()
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """キャッシュキーを生成する。
+
+    memcached のキー制約（250文字以内・空白不可）に収まるよう、
+    キー要素の JSON を SHA-256 でハッシュ化する。
+    """
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(raw.encode()).hexdigest()
+    return f"{_KEY_PREFIX}:{namespace}:{digest}"
+
+
+class CacheBackend(Protocol):
+    """キャッシュバックエンドのインターフェース。"""
+
+    def get(self, key: str) -> Any: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def clear(self) -> None: ...
+
+    async def aget(self, key: str) -> Any: ...
+
+    async def aset(self, key: str, value: Any) -> None: ...
+
+
+@runtime_checkable
+class SharedCacheBackend(CacheBackend, Protocol):
+    """複数プロセスで共有されるキャッシュバックエンドのインターフェース。
+
+    add / delete はプロセス間ロック（ResultCache.lock）に使う。
+    """
+
+    def add(self, key: str, value: Any, timeout: float) -> bool: ...
+
+    def delete(self, key: str) -> None: ...
+
+    async def aadd(self, key: str, value: Any, timeout: float) -> bool: ...
+
+    async def adelete(self, key: str) -> None: ...
+
+
+class LRUCache:
+    """TTL 付きのプロセス内 LRU キャッシュ（スレッドセーフ）。"""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        """値を返す。存在しないか期限切れの場合は MISSING を返す。"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+        # 呼び出し元での書き換えがキャッシュに波及しないようコピーを返す
+        # （domain のモデルは変更できないため、コピーされずそのまま共有される）
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """値を保存し、最大件数を超えた分を古い順に破棄する。"""
+        expires_at = time.monotonic() + self._ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    # プロセス内の操作なので、非同期版もそのまま同期版を呼ぶ
+    async def aget(self, key: str) -> Any:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """キャッシュ用の SQLite 接続を開く（スレッド間で共有し、呼び出し側のロックで保護する）。
+
+    WAL + synchronous=NORMAL にして、リクエスト処理中の書き込みで毎回 fsync しないようにする。
+    キャッシュは失っても再取得できるデータなので、電源断時に直近の書き込みが失われてもよい。
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+_TABLE_NAME_RE = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+class SQLiteCache:
+    """SQLite ファイルに保存する TTL 付きの永続 LRU キャッシュ（スレッドセーフ）。
+
+    値は JSON を zlib で圧縮して保存する（JSON で表せる値と domain のモデルのみ保存できる）。
+    最大件数を超えた分は最終アクセスが古い順に破棄する。
+    add / delete（プロセス間ロック用）は値を保存せず、追い出しの対象外の別テーブル
+    （<テーブル名>_locks）にキーと期限だけを置く（保持中のロックが追い出されないように）。
+    SQLite を開けない場合は警告を記録し、常にミスとして振る舞う。
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int, ttl: float) -> None:
+        if not _TABLE_NAME_RE.fullmatch(table):
+            msg = f"Invalid cache table name: {table!r}"
+            raise ValueError(msg)
+        self._path = path
+        self._table = f"cache_{table}"
+        self._locks_table = f"{self._table}_locks"
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._unavailable = False
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """接続を返す（ロック取得済みで呼ぶ）。開けない場合は None を返す。"""
+        if self._conn is None and not self._unavailable:
+            try:
+                conn = connect_sqlite(self._path)
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self._table} ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self._table}_accessed_at "
+                    f"ON {self._table} (accessed_at)"
+                )
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self._locks_table} ("
+                    "key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+                )
+            except sqlite3.Error:
+                logger.warning(
+                    "SQLite cache is unavailable (%s)", self._path, exc_info=True
+                )
+                self._unavailable = True
+                return None
+            self._conn = conn
+        return self._conn
+
+    def __len__(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return 0
+            return conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def get(self, key: str) -> Any:
+        """値を返す。存在しないか期限切れの場合は MISSING を返す。"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return MISSING
+            try:
+                row = conn.execute(
+                    f"SELECT value FROM {self._table} WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    return MISSING
+                conn.execute(
+                    f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+            except sqlite3.Error:
+                logger.warning("Failed to read SQLite cache", exc_info=True)
+                return MISSING
+        return json.loads(zlib.decompress(row[0]), object_hook=json_object_hook)
+
+    def set(self, key: str, value: Any) -> None:
+        """値を保存し、期限切れのエントリと最大件数を超えた分を破棄する。"""
+        now = time.time()
+        blob = zlib.compress(
+            json.dumps(
+                value, ensure_ascii=False, separators=(",", ":"), default=json_default
+            ).encode()
+        )
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute("BEGIN")
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?, ?, ?)",
+                        (key, blob, now + self._ttl, now),
+                    )
+                    conn.execute(
+                        f"DELETE FROM {self._table} WHERE expires_at <= ? OR key IN ("
+                        f"SELECT key FROM {self._table} ORDER BY accessed_at DESC "
+                        "LIMIT -1 OFFSET ?)",
+                        (now, self._max_entries),
+                    )
+            except sqlite3.Error:
+                logger.warning("Failed to write SQLite cache", exc_info=True)
+
+    def add(self, key: str, value: Any, timeout: float) -> bool:
+        """ロック key が無いか期限切れの場合だけ timeout 秒置く。置けたら True を返す。
+
+        value は保存しない（ロックの有無だけを記録する）。
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return False
+            try:
+                cursor = conn.execute(
+                    f"INSERT INTO {self._locks_table} VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at "
+                    f"WHERE {self._locks_table}.expires_at <= ?",
+                    (key, now + timeout, now),
+                )
+            except sqlite3.Error:
+                logger.warning("Failed to write SQLite cache", exc_info=True)
+                return False
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        """add で置いたロックを外す。"""
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(f"DELETE FROM {self._locks_table} WHERE key = ?", (key,))
+            except sqlite3.Error:
+                logger.warning("Failed to write SQLite cache", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute(f"DELETE FROM {self._table}")
+                conn.execute(f"DELETE FROM {self._locks_table}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ディスク I/O でイベントループを止めないよう、非同期版はスレッドで実行する
+    async def aget(self, key: str) -> Any:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    async def aadd(self, key: str, value: Any, timeout: float) -> bool:
+        return await asyncio.to_thread(self.add, key, value, timeout)
+
+    async def adelete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+
+class TieredCache:
+    """前段（プロセス内 LRU）と後段（永続キャッシュ）の2段キャッシュ。
+
+    前段でミスした場合は後段を参照し、ヒットした値を前段に載せる。
+    前段の TTL は前段に載せた時点から数えるため、後段の期限より最大 TTL 分長く残ることがある。
+    """
+
+    def __init__(self, front: CacheBackend, back: SharedCacheBackend) -> None:
+        self.front = front
+        self.back = back
+
+    def get(self, key: str) -> Any:
+        value = self.front.get(key)
+        if value is MISSING:
+            value = self.back.get(key)
+            if value is not MISSING:
+                self.front.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.front.set(key, value)
+        self.back.set(key, value)
+
+    def clear(self) -> None:
+        self.front.clear()
+        self.back.clear()
+
+    # ロックはプロセス間で共有される後段にだけ置く
+    def add(self, key: str, value: Any, timeout: float) -> bool:
+        return self.back.add(key, value, timeout)
+
+    def delete(self, key: str) -> None:
+        self.back.delete(key)
+
+    def close(self) -> None:
+        close = getattr(self.back, "close", None)
+        if close is not None:
+            close()
+
+    async def aget(self, key: str) -> Any:
+        value = await self.front.aget(key)
+        if value is MISSING:
+            value = await self.back.aget(key)
+            if value is not MISSING:
+                await self.front.aset(key, value)
+        return value
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self.front.aset(key, value)
+        await self.back.aset(key, value)
+
+    async def aadd(self, key: str, value: Any, timeout: float) -> bool:
+        return await self.back.aadd(key, value, timeout)
+
+    async def adelete(self, key: str) -> None:
+        await self.back.adelete(key)
+
+
+class DjangoCacheBackend:
+    """Django のキャッシュフレームワークを使うバックエンド。
+
+    件数の上限・追い出しはキャッシュサーバー側の設定に従う。
+    """
+
+    def __init__(self, alias: str, ttl: float) -> None:
+        self._alias = alias
+        self._ttl = ttl
+
+    def get(self, key: str) -> Any:
+        return caches[self._alias].get(key, MISSING)
+
+    def set(self, key: str, value: Any) -> None:
+        caches[self._alias].set(key, value, timeout=self._ttl)
+
+    def clear(self) -> None:
+        # 共有キャッシュ全体を消さないよう、何もしない（TTL で失効させる）
+        pass
+
+    def add(self, key: str, value: Any, timeout: float) -> bool:
+        return caches[self._alias].add(key, value, timeout=timeout)
+
+    def delete(self, key: str) -> None:
+        caches[self._alias].delete(key)
+
+    async def aget(self, key: str) -> Any:
+        return await caches[self._alias].aget(key, MISSING)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await caches[self._alias].aset(key, value, timeout=self._ttl)
+
+    async def aadd(self, key: str, value: Any, timeout: float) -> bool:
+        return await caches[self._alias].aadd(key, value, timeout=timeout)
+
+    async def adelete(self, key: str) -> None:
+        await caches[self._alias].adelete(key)
+
+
+class NullCache:
+    """何もキャッシュしないバックエンド。"""
+
+    def get(self, key: str) -> Any:
+        return MISSING
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    async def aget(self, key: str) -> Any:
+        return MISSING
+
+    async def aset(self, key: str, value: Any) -> None:
+        pass
+
+
+def _lock_key(key: str) -> str:
+    return f"{key}:lock"
+
+
+class ResultCache:
+    """名前空間付きの結果キャッシュ。ヒット・ミス数を記録する。
+
+    バックエンドが複数プロセスで共有される（SharedCacheBackend）場合は、lock でプロセス間の
+    ロックも取れる。
+    """
+
+    def __init__(self, namespace: str, backend: CacheBackend) -> None:
+        self.namespace = namespace
+        self.backend = backend
+        self._shared: SharedCacheBackend | None = (
+            backend if isinstance(backend, SharedCacheBackend) else None
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self) -> bool:
+        """バックエンドが複数プロセスで共有されるかどうか。"""
+        return self._shared is not None
+
+    def key(self, *parts: Any) -> str:
+        return make_key(self.namespace, *parts)
+
+    def get(self, key: str) -> Any:
+        """値を返す。ミスの場合は MISSING を返す。"""
+        value = self.backend.get(key)
+        self._record(value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, value)
+
+    async def aget(self, key: str) -> Any:
+        """get の asyncio 版。"""
+        value = await self.backend.aget(key)
+        self._record(value)
+        return value
+
+    async def aset(self, key: str, value: Any) -> None:
+        """set の asyncio 版。"""
+        await self.backend.aset(key, value)
+
+    def peek(self, key: str) -> Any:
+        """ヒット・ミス数を記録せずに値を返す（結果が保存されるのを待つ間のポーリング用）。"""
+        return self.backend.get(key)
+
+    async def apeek(self, key: str) -> Any:
+        """peek の asyncio 版。"""
+        return await self.backend.aget(key)
+
+    def lock(self, key: str, timeout: float) -> bool:
+        """key のプロセス間ロックを取る。取れたら True を返す。
+
+        ロックは timeout 秒で失効する（保持したプロセスが落ちても残り続けない）。
+        共有されないバックエンドでは何もせず True を返す。
+        """
+        if self._shared is None:
+            return True
+        return self._shared.add(_lock_key(key), True, timeout)
+
+    def unlock(self, key: str) -> None:
+        """lock で取ったロックを外す。"""
+        if self._shared is not None:
+            self._shared.delete(_lock_key(key))
+
+    async def alock(self, key: str, timeout: float) -> bool:
+        """lock の asyncio 版。"""
+        if self._shared is None:
+            return True
+        return await self._shared.aadd(_lock_key(key), True, timeout)
+
+    async def aunlock(self, key: str) -> None:
+        """unlock の asyncio 版。"""
+        if self._shared is not None:
+            await self._shared.adelete(_lock_key(key))
+
+    def _record(self, value: Any) -> None:
+        hit = value is not MISSING
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.observe_cache(self.namespace, hit)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        """ヒット数・ミス数・ヒット率を返す。"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+
+_caches: dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _build_backend(name: str) -> CacheBackend:
+    """settings の <NAME>_CACHE_* からバックエンドを生成する。"""
+    prefix = name.upper()
+    backend = getattr(settings, f"{prefix}_CACHE_BACKEND", "memory")
+    ttl = getattr(settings, f"{prefix}_CACHE_TTL", 300)
+    max_entries = getattr(settings, f"{prefix}_CACHE_MAX_ENTRIES", 1000)
+    if backend == "memory":
+        return LRUCache(max_entries=max_entries, ttl=ttl)
+    if backend in ("sqlite", "tiered"):
+        disk = SQLiteCache(
+            path=str(settings.MAPS_CACHE_SQLITE_PATH),
+            table=name,
+            max_entries=getattr(settings, f"{prefix}_CACHE_DISK_MAX_ENTRIES", 10000),
+            ttl=ttl,
+        )
+        if backend == "sqlite":
+            return disk
+        return TieredCache(LRUCache(max_entries=max_entries, ttl=ttl), disk)
+    if backend == "django":
+        return DjangoCacheBackend(alias=settings.MAPS_CACHE_ALIAS, ttl=ttl)
+    if backend == "none":
+        return NullCache()
+    msg = f"Unknown cache backend for {name}: {backend!r}"
+    raise ValueError(msg)
+
+
+def get_cache(name: str) -> ResultCache:
+    """名前に対応する ResultCache を返す（初回呼び出し時に生成）。"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = ResultCache(name, _build_backend(name))
+                _caches[name] = cache
+    return cache
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """生成済みの全キャッシュのヒット・ミス統計を返す。"""
+    with _caches_lock:
+        items = list(_caches.items())
+    return {name: cache.stats() for name, cache in items}
+
+
+def reset_caches() -> None:
+    """全キャッシュを破棄する。次回の get_cache() で設定から再生成される。"""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
+            # SQLite バックエンドの接続を閉じる
+            close = getattr(cache.backend, "close", None)
+            if close is not None:
+                close()
+        _caches.clear()
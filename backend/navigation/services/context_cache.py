@@ -0,0 +1,204 @@
+"""Vertex AI のコンテキストキャッシュ（CachedContent）の管理。
+
+チャットの各ターンで毎回送っているシステムプロンプトと FunctionDeclaration を
+Vertex AI 側にキャッシュしておき、入力トークンのコストと TTFT（最初のトークンまでの時間）を減らす。
+
+- キャッシュは初回利用時にバックグラウンドスレッドで作成し、同じスレッドで TTL を定期的に延長する。
+  作成（Vertex AI への通信）は呼び出し元をブロックしないため、イベントループ上から呼んでもよい。
+- 作成が終わるまでと、作成・延長に失敗した場合や期限切れの場合は None を返し、呼び出し元は
+  通常の（キャッシュを使わない）モデルにフォールバックする。作成が終わると on_ready を呼ぶ。
+- 作成に失敗した直後は retry_interval の間は再作成を試みない（リクエストごとの作成失敗を防ぐ）。
+  リクエスト自体が不正（InvalidArgument）で拒否された場合は、再作成しても同じ結果になるため
+  以降は作成を試みない。
+- close() で Vertex AI 側のキャッシュも削除する（TTL まで課金され続けないように）。
+
+注意: Vertex AI のコンテキストキャッシュには最小トークン数の制約がある。
+プレフィックスが短すぎる場合は InvalidArgument で作成に失敗し、以降は常にフォールバックで動作する
+（そのため settings.GEMINI_CONTEXT_CACHE_ENABLED は既定で無効にしている）。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from google.api_core.exceptions import InvalidArgument
+from vertexai.generative_models import Content, Part
+from vertexai.preview.caching import CachedContent
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    """1つの静的プレフィックス（システムプロンプト + ツール）に対応する CachedContent。"""
+
+    def __init__(
+        self,
+        *,
+        model_name: str,
+        system_instruction: str,
+        tools: list[Any],
+        ttl: timedelta,
+        retry_interval: float = 300,
+        on_invalidate: Callable[[], None] | None = None,
+        on_ready: Callable[[], None] | None = None,
+    ) -> None:
+        self._model_name = model_name
+        self._system_instruction = system_instruction
+        self._tools = tools
+        self._ttl = ttl
+        # TTL の半分ごとに延長し、1回延長に失敗しても期限切れ前に再試行できるようにする
+        self._refresh_interval = ttl.total_seconds() / 2
+        self._retry_interval = retry_interval
+        self._on_invalidate = on_invalidate
+        self._on_ready = on_ready
+
+        self._cached_content: CachedContent | None = None
+        self._expires_at = 0.0
+        self._retry_after = 0.0
+        self._creating = False
+        self._disabled = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def get(self) -> CachedContent | None:
+        """有効な CachedContent を返す。
+
+        利用できない場合は None を返し、必要ならバックグラウンドで作成を開始する。
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._cached_content is not None and now < self._expires_at:
+                return self._cached_content
+            if self._disabled or self._creating or now < self._retry_after:
+                return None
+            self._creating = True
+            # 前のスレッド（期限切れのキャッシュの TTL 延長）は止め、スレッドごとに停止用の Event を持たせる
+            self._stop.set()
+            stop = self._stop = threading.Event()
+        self._start_worker(stop)
+        return None
+
+    def _start_worker(self, stop: threading.Event) -> None:
+        self._worker = threading.Thread(
+            target=self._run,
+            args=(stop,),
+            name="vertex-context-cache",
+            daemon=True,
+        )
+        self._worker.start()
+
+    def _run(self, stop: threading.Event) -> None:
+        if self._create(stop):
+            self._refresh_loop(stop)
+
+    def _create(self, stop: threading.Event) -> bool:
+        """CachedContent を作成する。作成できたら on_ready を呼んで True を返す。"""
+        try:
+            cached_content = CachedContent.create(
+                model_name=self._model_name,
+                system_instruction=Content(
+                    role="user", parts=[Part.from_text(self._system_instruction)]
+                ),
+                tools=self._tools,
+                ttl=self._ttl,
+            )
+        except InvalidArgument:
+            logger.warning(
+                "Vertex AI rejected the context cache (the prefix may be below the "
+                "minimum token count); using uncached model",
+                exc_info=True,
+            )
+            with self._lock:
+                self._creating = False
+                self._disabled = True
+            return False
+        except Exception:
+            logger.warning(
+                "Failed to create Vertex AI context cache; using uncached model",
+                exc_info=True,
+            )
+            with self._lock:
+                self._creating = False
+                self._retry_after = time.monotonic() + self._retry_interval
+            return False
+
+        with self._lock:
+            self._creating = False
+            # 作成中に close() / invalidate() された場合は使わずに削除する
+            stopped = stop.is_set()
+            if not stopped:
+                self._cached_content = cached_content
+                self._expires_at = time.monotonic() + self._ttl.total_seconds()
+        if stopped:
+            _delete(cached_content)
+            return False
+
+        logger.info("Created Vertex AI context cache %s", cached_content.resource_name)
+        if self._on_ready is not None:
+            self._on_ready()
+        return True
+
+    def _refresh_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(self._refresh_interval):
+            if not self.refresh():
+                return
+
+    def refresh(self) -> bool:
+        """TTL を延長する。失敗した場合はキャッシュを無効化して False を返す。"""
+        with self._lock:
+            cached_content = self._cached_content
+        if cached_content is None:
+            return False
+
+        try:
+            cached_content.update(ttl=self._ttl)
+        except Exception:
+            logger.warning(
+                "Failed to extend Vertex AI context cache TTL", exc_info=True
+            )
+            self.invalidate()
+            return False
+
+        with self._lock:
+            self._expires_at = time.monotonic() + self._ttl.total_seconds()
+        return True
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄する。次回の get() で再作成を試みる。"""
+        with self._lock:
+            had_cache = self._cached_content is not None
+            self._cached_content = None
+            self._expires_at = 0.0
+            # 作成中のキャッシュは新しいものなので止めない
+            if not self._creating:
+                self._stop.set()
+        if had_cache and self._on_invalidate is not None:
+            self._on_invalidate()
+
+    def close(self) -> None:
+        """TTL 延長を止め、Vertex AI 側のキャッシュを削除する。"""
+        with self._lock:
+            self._stop.set()
+            cached_content, self._cached_content = self._cached_content, None
+            self._expires_at = 0.0
+        if cached_content is not None:
+            _delete(cached_content)
+
+
+def _delete(cached_content: CachedContent) -> None:
+    try:
+        cached_content.delete()
+    except Exception:
+        logger.warning(
+            "Failed to delete Vertex AI context cache %s",
+            cached_content.resource_name,
+            exc_info=True,
+        )
+    else:
+        logger.info("Deleted Vertex AI context cache %s", cached_content.resource_name)
@@ -8,10 +8,12 @@
 
 この URL をスマートフォンでタップすると Google Maps アプリが起動し、
 指定されたルートでナビゲーションを開始できる。
+Place ID が分かっている地点は *_place_id パラメータも付与する。
 """
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 from urllib.parse import quote, urlencode
 
 _MAX_WAYPOINT_LENGTH = 200
@@ -36,6 +38,8 @@ def generate_google_maps_url(
     origin: str,
     destination: str,
     waypoints: list[str] | None = None,
+    *,
+    place_ids: Mapping[str, str] | None = None,
 ) -> str:
     """Google Maps ディープリンク URL を生成する。
 
@@ -46,6 +50,10 @@ def generate_google_maps_url(
         origin: 出発地の地名（例: "東京駅"）
         destination: 目的地の地名（例: "箱根湯本駅"）
         waypoints: 経由地のリスト（省略可）。パイプ(|)区切りで連結される。
+        place_ids: 地名 → Place ID の対応（省略可）。含まれる地名は
+            origin_place_id / destination_place_id / waypoint_place_ids も付与し、
+            Google Maps 側で地名を検索し直さずに同じ地点を開けるようにする。
+            waypoint_place_ids は全経由地の Place ID が揃っている場合のみ付与する。
 
     Returns:
         Google Maps を開くための完全な URL 文字列。
@@ -68,4 +76,12 @@ def generate_google_maps_url(
         sanitized = [_sanitize_place_name(wp) for wp in waypoints]
         params["waypoints"] = "|".join(sanitized)
 
+    if place_ids:
+        if origin in place_ids:
+            params["origin_place_id"] = place_ids[origin]
+        if destination in place_ids:
+            params["destination_place_id"] = place_ids[destination]
+        if waypoints and all(wp in place_ids for wp in waypoints):
+            params["waypoint_place_ids"] = "|".join(place_ids[wp] for wp in waypoints)
+
     return f"{base_url}?{urlencode(params, quote_via=quote)}"
@@ -0,0 +1,173 @@
+"""Places API / Routes API の結果を表すドメインモデル（Place / Route / Toll / Coords）。
+
+google_maps が API の JSON から1回だけ生成し、キャッシュ・gemini・views・serializers の間は
+同じオブジェクトを参照のまま受け渡す。
+
+- frozen + slots の dataclass なので、属性辞書を持たず生成・属性参照が速い
+- 変更できないため、キャッシュ（LRUCache）は copy.deepcopy せずに共有できる
+  （__copy__ / __deepcopy__ は自身を返す）。views でディープリンク等を付与する場合は
+  dataclasses.replace で新しいオブジェクトを作る
+- Gemini の FunctionResponse や SQLite キャッシュに渡すときだけ to_dict() で辞書にする
+  （json_default / json_object_hook で JSON との相互変換ができる）
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Self
+
+# JSON に変換したモデルの型名を入れるキー（json_default / json_object_hook）
+_MODEL_KEY = "__model__"
+
+
+class _Immutable:
+    """frozen な dataclass 用の mixin。コピーの代わりに自身を返す。"""
+
+    __slots__ = ()
+
+    def __copy__(self) -> Self:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Self:
+        return self
+
+
+@dataclass(frozen=True, slots=True)
+class Coords(_Immutable):
+    """緯度・経度の座標ペア。"""
+
+    latitude: float
+    longitude: float
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> Coords:
+        return cls(latitude=data["latitude"], longitude=data["longitude"])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"latitude": self.latitude, "longitude": self.longitude}
+
+
+@dataclass(frozen=True, slots=True)
+class Place(_Immutable):
+    """search_places で取得したスポット1件。"""
+
+    name: str
+    address: str
+    rating: float
+    coords: Coords
+    price_level: str
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> Place:
+        return cls(
+            name=data["name"],
+            address=data["address"],
+            rating=data["rating"],
+            coords=Coords.from_dict(data["coords"]),
+            price_level=data["price_level"],
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "address": self.address,
+            "rating": self.rating,
+            "coords": self.coords.to_dict(),
+            "price_level": self.price_level,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Toll(_Immutable):
+    """高速道路料金の通貨コードと金額。キー名は Routes API・フロントエンドに合わせる。"""
+
+    currencyCode: str  # noqa: N815
+    units: str
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> Toll:
+        return cls(currencyCode=data["currencyCode"], units=data["units"])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"currencyCode": self.currencyCode, "units": self.units}
+
+
+@dataclass(frozen=True, slots=True)
+class PolylineLevel(_Immutable):
+    """ズームレベル向けに簡略化したポリライン1件（polyline_options の levels）。"""
+
+    zoom: int
+    encoded_polyline: str
+
+
+@dataclass(frozen=True, slots=True)
+class Route(_Immutable):
+    """calculate_route で計算したルート。
+
+    google_maps_url / polyline_precision / polylines はキャッシュには含めず、
+    views がレスポンスを返す直前に dataclasses.replace で付与する（None は未設定）。
+    """
+
+    origin: str
+    destination: str
+    waypoints: tuple[str, ...]
+    waypoint_coords: tuple[Coords, ...]
+    duration_seconds: str
+    distance_meters: int
+    encoded_polyline: str
+    tolls: tuple[Toll, ...]
+    google_maps_url: str | None = None
+    polyline_precision: int | None = None
+    polylines: tuple[PolylineLevel, ...] | None = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> Route:
+        """to_dict() の辞書から復元する（views で付与する項目は含めない）。"""
+        return cls(
+            origin=data["origin"],
+            destination=data["destination"],
+            waypoints=tuple(data["waypoints"]),
+            waypoint_coords=tuple(
+                Coords.from_dict(coords) for coords in data["waypoint_coords"]
+            ),
+            duration_seconds=data["duration_seconds"],
+            distance_meters=data["distance_meters"],
+            encoded_polyline=data["encoded_polyline"],
+            tolls=tuple(Toll.from_dict(toll) for toll in data["tolls"]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Gemini に渡す calculate_route の結果（views で付与する項目は含めない）。"""
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "waypoints": list(self.waypoints),
+            "waypoint_coords": [coords.to_dict() for coords in self.waypoint_coords],
+            "duration_seconds": self.duration_seconds,
+            "distance_meters": self.distance_meters,
+            "encoded_polyline": self.encoded_polyline,
+            "tolls": [toll.to_dict() for toll in self.tolls],
+        }
+
+
+_MODELS: dict[str, type[Coords | Place | Toll | Route]] = {
+    model.__name__: model for model in (Coords, Place, Toll, Route)
+}
+
+
+def json_default(value: Any) -> dict[str, Any]:
+    """json.dumps の default。モデルを型名付きの辞書にする。"""
+    model = _MODELS.get(type(value).__name__)
+    if model is None or not isinstance(value, model):
+        msg = f"Object of type {type(value).__name__} is not JSON serializable"
+        raise TypeError(msg)
+    return {_MODEL_KEY: model.__name__, "data": value.to_dict()}
+
+
+def json_object_hook(data: dict[str, Any]) -> Any:
+    """json.loads の object_hook。json_default で変換した辞書をモデルに戻す。"""
+    name = data.get(_MODEL_KEY)
+    if name is None:
+        return data
+    return _MODELS[name].from_dict(data["data"])
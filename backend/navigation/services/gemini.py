@@ -3,14 +3,22 @@
 このモジュールは以下の処理を担当する:
 1. Gemini 1.5 Pro モデルの初期化（Vertex AI SDK 経由）
 2. search_places / calculate_route を FunctionDeclaration として定義し、Gemini に登録
-3. AutomaticFunctionCallingResponder により、Gemini が必要に応じてツールを自動実行
+3. Gemini がツール呼び出しを返したら asearch_places / acalculate_route を並行実行して結果を返す
+   （_agenerate_with_tools）
 4. フロントエンドから受け取った会話履歴を Vertex AI の Content 形式に変換
+   （session_id 指定時はサーバー側に保存した履歴を使う。session_store を参照）
 5. Gemini の応答テキストと、Function Calling で得られたルート・スポットデータを返却
+   （ツールの戻り値の Route / Place をそのまま返す。_ToolResults を参照）
 
 動作の流れ:
   ユーザーメッセージ → Gemini に送信 → Gemini がツール呼び出しを判断
   → search_places / calculate_route が自動実行される → 結果を Gemini が要約して応答
 
+Gemini の呼び出しは rate_limit の "gemini" で同時実行数を制限する（429 を受けると上限を下げる）。
+429 は retry の "gemini" ポリシー（ジッター付き指数バックオフ・全体の期限・Retry-After）で再試行し、
+再試行しない場合や枠が空くのを待ちきれなかった場合は「混み合っています」の応答
+（経由地の提案は、あれば直近の同じ提案）を返す。
+
 認証:
   Application Default Credentials (ADC) を使用。
   開発時は `gcloud auth application-default login` で認証する。
@@ -18,27 +26,38 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import copy
+import json
 import logging
 import os
-import time
-from typing import Any
+import threading
+import weakref
+from collections.abc import AsyncIterator, Coroutine, Mapping
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Any, cast
 
 import vertexai
-from google.api_core.exceptions import ResourceExhausted
 from django.conf import settings
+from google.api_core.exceptions import FailedPrecondition, NotFound, ResourceExhausted
+from google.protobuf import json_format
 from vertexai.generative_models import (
     Content,
     FunctionDeclaration,
     Part,
     Tool,
 )
-from vertexai.preview.generative_models import (
-    AutomaticFunctionCallingResponder,
-    GenerativeModel,
-)
+from vertexai.preview.generative_models import GenerativeModel
 
 from ..exceptions import GeminiFunctionCallingError
-from . import google_maps
+from . import google_maps, http_client, metrics, session_store, tracing
+from .cache import MISSING, get_cache
+from .context_cache import CachedContent, ContextCache
+from .domain import Place, Route
+from .rate_limit import RateLimitExceeded, get_limiter
+from .retry import get_policy
 
 logger = logging.getLogger(__name__)
 
@@ -129,15 +148,6 @@ _calculate_route_func = FunctionDeclaration(
 # この Tool を GenerativeModel に渡すことで Gemini がツールとして認識する。
 _tools = Tool(function_declarations=[_search_places_func, _calculate_route_func])
 
-# AutomaticFunctionCallingResponder が Gemini のツール呼び出しを受け取り、
-# 対応する Python 関数を自動実行するためのマッピングを登録する。
-# SDK は CallableFunctionDeclaration（._function 属性を持つ）を要求するため、
-# FunctionDeclaration.from_func() で生成したオブジェクトをマッピングに使う。
-_tools._callable_functions = {
-    "search_places": FunctionDeclaration.from_func(google_maps.search_places),
-    "calculate_route": FunctionDeclaration.from_func(google_maps.calculate_route),
-}
-
 # Vertex AI SDK の初期化フラグ（1プロセスで1回だけ初期化する）
 _initialized = False
 
@@ -150,13 +160,289 @@ def _ensure_initialized() -> None:
     """
     global _initialized  # noqa: PLW0603
     if not _initialized:
-        vertexai.init(
-            project=settings.GOOGLE_CLOUD_PROJECT,
-            location=settings.GOOGLE_CLOUD_LOCATION,
-        )
+        with tracing.span("gemini.init"):
+            vertexai.init(
+                project=settings.GOOGLE_CLOUD_PROJECT,
+                location=settings.GOOGLE_CLOUD_LOCATION,
+            )
         _initialized = True
 
 
+# --- モデルレジストリ ---
+# モデル名・システムプロンプト・ツールはリクエストごとに変わらないため、
+# GenerativeModel は用途ごとにプロセスで1つだけ生成して使い回す。
+# NavigationConfig.ready() から warm_up_models() を呼び、起動時に生成しておく。
+#
+# 非同期 API（generate_content_async）のクライアントは生成時のイベントループに紐づくため、
+# イベントループ上から取得した場合は、共有モデルの浅いコピー（非同期クライアントだけを
+# 持たない）をループごとに保持する。モデル自体の生成はプロセスで1回だけ。
+
+# --- コンテキストキャッシュ ---
+# GEMINI_CONTEXT_CACHE_ENABLED の場合、チャット用モデルのシステムプロンプトとツール宣言を
+# Vertex AI のコンテキストキャッシュに載せ、毎ターン送り直さないようにする。
+# キャッシュを利用できない場合は通常のモデルにフォールバックする。
+# キャッシュ済みのモデルは tools / system_instruction を持たない（Vertex AI の制約）。
+
+# キャッシュが期限切れ・削除済みの場合に Vertex AI が返すエラー
+_CONTEXT_CACHE_ERRORS = (NotFound, FailedPrecondition)
+
+_chat_context_cache: ContextCache | None = None
+_context_cache_lock = threading.Lock()
+
+
+def _get_chat_context_cache() -> ContextCache:
+    """チャット用の ContextCache を返す（初回呼び出し時に生成）。"""
+    global _chat_context_cache  # noqa: PLW0603
+    with _context_cache_lock:
+        if _chat_context_cache is None:
+            _chat_context_cache = ContextCache(
+                model_name=settings.GEMINI_MODEL,
+                system_instruction=SYSTEM_PROMPT,
+                tools=[_tools],
+                ttl=timedelta(seconds=settings.GEMINI_CONTEXT_CACHE_TTL),
+                on_invalidate=lambda: _discard_model("chat"),
+                # キャッシュができたら、キャッシュを使わずに生成したモデルを作り直す
+                on_ready=lambda: _discard_model("chat"),
+            )
+            # 終了時に Vertex AI 側のキャッシュを削除する
+            atexit.register(_chat_context_cache.close)
+        return _chat_context_cache
+
+
+def _build_chat_model() -> GenerativeModel:
+    """チャット用モデルを生成する。コンテキストキャッシュが使えればそれを使う。
+
+    キャッシュの作成はバックグラウンドで行うため、作成が終わるまではキャッシュを使わない
+    モデルを返す（作成が終わると _discard_model で破棄され、次の get_model で作り直される）。
+    """
+    if settings.GEMINI_CONTEXT_CACHE_ENABLED:
+        cached_content = _get_chat_context_cache().get()
+        if cached_content is not None:
+            # from_cached_content は cls のインスタンスを返す（型注釈は基底クラス）
+            return cast(
+                GenerativeModel, GenerativeModel.from_cached_content(cached_content)
+            )
+    return GenerativeModel(
+        settings.GEMINI_MODEL,
+        system_instruction=SYSTEM_PROMPT,
+        tools=[_tools],
+    )
+
+
+def _uses_context_cache(model: GenerativeModel) -> bool:
+    """モデルがコンテキストキャッシュから生成されたものかを返す。"""
+    return isinstance(getattr(model, "_cached_content", None), CachedContent)
+
+
+def _invalidate_context_cache() -> None:
+    """コンテキストキャッシュを破棄する（キャッシュ済みのチャット用モデルも破棄される）。"""
+    logger.warning("Vertex AI context cache is unavailable; rebuilding chat model")
+    _get_chat_context_cache().invalidate()
+
+
+class _ToolResults:
+    """1ターンで実行したツールの戻り値（Route / Place のリスト）を保持する。
+
+    ビューにはここに記録した Route / Place をそのまま返す
+    （Gemini に渡した FunctionResponse の Content から辞書を作り直さない）。
+    同じツールが複数回呼ばれた場合は、呼び出し順で最後に成功した結果を使う。
+    メトリクス用に、ツールの呼び出し回数とモデルの応答のトークン数も数える。
+    """
+
+    __slots__ = ("calls", "output_tokens", "places", "prompt_tokens", "route")
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def record(self, name: str, result: Any) -> None:
+        self.calls += 1
+        # エラー（{"error": ...} の辞書）は記録しない
+        if name == "calculate_route" and isinstance(result, Route):
+            self.route = result
+        elif name == "search_places" and isinstance(result, list):
+            self.places = result
+
+    def add_usage(self, response: Any) -> None:
+        """モデルの応答（ストリームの場合は最後のチャンク）のトークン数を加える。"""
+        prompt_tokens, output_tokens = _usage(response)
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+
+    def observe(self) -> None:
+        """1ターン分のトークン数・ツール呼び出し回数をメトリクスに記録する。"""
+        metrics.observe_gemini_turn(self.prompt_tokens, self.output_tokens, self.calls)
+
+    def clear(self) -> None:
+        self.route: Route | None = None
+        self.places: list[Place] | None = None
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+
+def _usage(response: Any) -> tuple[int, int]:
+    """モデルの応答の (入力トークン数, 出力トークン数) を返す。"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return (
+        int(getattr(usage, "prompt_token_count", 0) or 0),
+        int(getattr(usage, "candidates_token_count", 0) or 0),
+    )
+
+
+def _tool_response(result: Any) -> dict[str, Any]:
+    """ツールの戻り値を FunctionResponse の response（辞書）に変換する。
+
+    SDK の Automatic Function Calling と同様、辞書以外は {"result": ...} で包む。
+    """
+    if isinstance(result, Route):
+        return result.to_dict()
+    if isinstance(result, dict):
+        return result
+    if isinstance(result, Mapping):
+        return dict(result)
+    if isinstance(result, list):
+        result = [
+            item.to_dict() if isinstance(item, Place) else item for item in result
+        ]
+    return {"result": result}
+
+
+_MODEL_FACTORIES: dict[str, Any] = {
+    "chat": _build_chat_model,
+    "waypoints": lambda: GenerativeModel(
+        settings.GEMINI_MODEL,
+        system_instruction=WAYPOINT_SUGGEST_PROMPT,
+        generation_config={"response_mime_type": "application/json"},
+    ),
+}
+
+_models: dict[str, GenerativeModel] = {}
+_loop_models: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, GenerativeModel]
+] = weakref.WeakKeyDictionary()
+_models_lock = threading.Lock()
+
+# GenerativeModel が遅延生成して保持する非同期クライアント（イベントループに紐づく）
+_ASYNC_CLIENT_ATTRS = ("_prediction_async_client", "_llm_utility_async_client")
+
+
+def get_model(name: str) -> GenerativeModel:
+    """用途名（"chat" / "waypoints"）に対応する共有 GenerativeModel を返す。
+
+    初回呼び出し時に Vertex AI SDK を初期化してモデルを生成する。
+    イベントループ上から呼んだ場合は、共有モデルをそのループ用に複製したものを返す。
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            _ensure_initialized()
+            with tracing.span("gemini.build_model", model=name):
+                model = _MODEL_FACTORIES[name]()
+            _models[name] = model
+        if loop is None:
+            return model
+        loop_models = _loop_models.setdefault(loop, {})
+        bound = loop_models.get(name)
+        if bound is None:
+            bound = loop_models[name] = _bind_to_loop(model)
+    return bound
+
+
+def _bind_to_loop(model: GenerativeModel) -> GenerativeModel:
+    """共有モデルの浅いコピーを、非同期クライアントを持たない状態で返す。
+
+    モデル名・プロンプト・ツール・コンテキストキャッシュは共有モデルのものをそのまま使い、
+    非同期クライアントだけがコピーごと（＝イベントループごと）に初回使用時に生成される。
+    """
+    bound = copy.copy(model)
+    for attr in _ASYNC_CLIENT_ATTRS:
+        bound.__dict__.pop(attr, None)
+    return bound
+
+
+async def aclose_loop_models() -> None:
+    """実行中のイベントループ用のモデルを破棄し、その非同期クライアントを閉じる。"""
+    with _models_lock:
+        models = _loop_models.pop(asyncio.get_running_loop(), {})
+    for model in models.values():
+        for attr in _ASYNC_CLIENT_ATTRS:
+            client = model.__dict__.get(attr)
+            if client is not None:
+                await client.transport.close()
+
+
+def warm_up_models() -> None:
+    """設定済みの全モデルを生成しておく（アプリ起動時に呼ぶ）。
+
+    生成したモデルは全イベントループで共有するため、起動時に呼べば初回リクエストでは
+    モデルを生成しない（ループごとの非同期クライアントの生成だけが残る）。
+    """
+    for name in _MODEL_FACTORIES:
+        get_model(name)
+
+
+def _discard_model(name: str) -> None:
+    """生成済みのモデルを破棄し、次回の get_model() で再生成されるようにする。"""
+    with _models_lock:
+        _models.pop(name, None)
+        for models in _loop_models.values():
+            models.pop(name, None)
+
+
+def reset_models() -> None:
+    """生成済みのモデルとコンテキストキャッシュを破棄する（テスト・設定変更用）。"""
+    global _chat_context_cache  # noqa: PLW0603
+    with _context_cache_lock:
+        context_cache, _chat_context_cache = _chat_context_cache, None
+    if context_cache is not None:
+        atexit.unregister(context_cache.close)
+        context_cache.close()
+    with _models_lock:
+        _models.clear()
+        _loop_models.clear()
+
+
+# --- レート制限 ---
+# Vertex AI の呼び出しは rate_limit の "gemini" の枠を取ってから行う。
+# 429（ResourceExhausted）を受けた場合は枠に記録し、同時実行数の上限を下げる。
+
+
+@asynccontextmanager
+async def _agemini_slot() -> AsyncIterator[None]:
+    """Vertex AI のレート制限の枠を取ってブロック内の処理を実行する。
+
+    リクエスト数・所要時間・エラーは metrics に "vertex" として記録する。
+    """
+    try:
+        async with get_limiter("gemini").aslot() as permit:
+            with metrics.upstream_request("vertex"):
+                try:
+                    yield
+                except ResourceExhausted:
+                    permit.throttled()
+                    raise
+    except RateLimitExceeded:
+        metrics.upstream_error("vertex", "rate_limit")
+        raise
+
+
+# 再試行しても Vertex AI のクォータ超過が続いた場合（またはレート制限の待ち時間切れ）
+_RATE_LIMIT_ERRORS = (ResourceExhausted, RateLimitExceeded)
+_BUSY_REPLY = "申し訳ありません。サーバーが混み合っています。しばらく待ってから再度お試しください。"
+_BUSY_WAYPOINT_RESPONSE = {
+    "candidates": [],
+    "ai_comment": "サーバーが混み合っています。しばらく待ってから再度お試しください。",
+    "error": "rate_limit",
+}
+
+
 def _build_history(history: list[dict[str, str]]) -> list[Content]:
     """フロントエンドから受け取ったチャット履歴を Vertex AI の Content 形式に変換する。"""
     contents: list[Content] = []
@@ -168,12 +454,14 @@ def _build_history(history: list[dict[str, str]]) -> list[Content]:
     return contents
 
 
+@tracing.traced("gemini.extract_results")
 def _extract_function_results(
     history: list[Content],
 ) -> tuple[dict[str, Any] | None, list[dict[str, Any]] | None]:
-    """チャット履歴から Function Calling の実行結果を抽出する。
+    """チャット履歴から Function Calling の実行結果を辞書のまま抽出する（履歴の要約用）。
 
     Gemini が複数回ツールを呼ぶ可能性があるため、最後の結果で上書きする。
+    search_places の結果（リスト）は _tool_response で {"result": [...]} に包まれている。
 
     Returns:
         (route_data_or_none, places_data_or_none) のタプル
@@ -187,52 +475,415 @@ def _extract_function_results(
             if fn_response is None:
                 continue
             name = fn_response.name
-            result = dict(fn_response.response) if fn_response.response else {}
+            # proto の Struct を入れ子まで Python の値に変換する（リストのスライス等のため）
+            result = (
+                type(fn_response).to_dict(fn_response)["response"]
+                if fn_response.response
+                else {}
+            )
 
             if name == "calculate_route" and "error" not in result:
                 route_data = result
             elif name == "search_places" and isinstance(result, list):
                 places_data = result
             elif name == "search_places" and "error" not in result:
-                places_data = result.get("results", [])
+                places_data = result.get("result", [])
 
     return route_data, places_data
 
 
-def _truncate_history(
-    history: list[dict[str, str]],
-    max_length: int,
-) -> list[dict[str, str]]:
-    """会話履歴を最大長に切り詰め、ログを記録する。"""
-    if len(history) > max_length:
-        original_length = len(history)
-        history = history[-max_length:]
-        logger.info(
-            "Conversation history truncated from %d to %d messages",
-            original_length,
-            max_length,
-        )
-    return history
+# ---------------------------------------------------------------------------
+# 会話履歴の圧縮
+# ---------------------------------------------------------------------------
 
+# 古いターンをまとめた要約メッセージの先頭行と、要約の各行の見出し
+_SUMMARY_HEADER = "（これまでの会話の要約）"
+_SUMMARY_USER = "ユーザー: "
+_SUMMARY_MODEL = "AI: "
+_SUMMARY_ROUTE = "確定したルート: "
+_SUMMARY_PLACES = "直近のスポット候補: "
+# 要約に残す1発言あたりの最大文字数・スポット候補の最大件数
+_SUMMARY_LINE_CHARS = 80
+_SUMMARY_MAX_PLACES = 5
 
-def send_message(
+
+def _part_text(part: Part) -> str:
+    """Part のテキストを返す。テキストを持たない Part では空文字を返す。"""
+    # part.text はテキストがないと to_dict() でエラーメッセージを組み立ててから例外を送出するため、
+    # proto のフィールド（未設定なら空文字）を直接読む
+    return part._raw_part.text
+
+
+def _estimate_tokens(text: str) -> int:
+    """テキストのトークン数を概算する（API は呼ばない）。
+
+    日本語などの非 ASCII 文字は1文字≒1トークン、ASCII は4文字≒1トークンとして数える。
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def _content_text(content: Content) -> str:
+    """Content のテキスト部分を連結して返す（ツール呼び出し・結果は含めない）。"""
+    return "".join(_part_text(part) for part in content.parts)
+
+
+def _estimate_content_tokens(content: Content) -> int:
+    """Content のトークン数を概算する。ツール呼び出しの引数・実行結果も数える。"""
+    tokens = 0
+    for part in content.parts:
+        text = _part_text(part)
+        if not text:
+            # ツール呼び出し・実行結果は JSON にして数える
+            # （proto-plus の to_dict は非推奨警告が出るため protobuf で直接変換する）
+            raw = part._raw_part
+            text = json_format.MessageToJson(
+                type(raw).pb(raw), ensure_ascii=False, indent=None
+            )
+        tokens += _estimate_tokens(text)
+    return tokens
+
+
+def _split_turns(contents: list[Content]) -> list[list[Content]]:
+    """会話をユーザーの発話を起点とする往復ごとに分ける。
+
+    1往復はユーザーの発話・ツール呼び出しと実行結果・AI の応答からなる。
+    """
+    turns: list[list[Content]] = []
+    for content in contents:
+        if not turns or (content.role == "user" and _content_text(content)):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _clip(text: str, limit: int = _SUMMARY_LINE_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _format_route(route: dict[str, Any]) -> str:
+    text = f"{route.get('origin', '')} → {route.get('destination', '')}"
+    if route.get("waypoints"):
+        text += f"（経由: {'、'.join(route['waypoints'])}）"
+    if route.get("distance_meters") is not None:
+        text += f" / 距離 {route['distance_meters'] / 1000:.1f}km"
+    if route.get("duration_seconds"):
+        seconds = int(float(str(route["duration_seconds"]).rstrip("s") or 0))
+        text += f" / 所要 {seconds // 60}分"
+    return text
+
+
+def _format_places(places: list[dict[str, Any]]) -> str:
+    names = [
+        f"{place.get('name', '')}（{place.get('address', '')}）"
+        for place in places[:_SUMMARY_MAX_PLACES]
+    ]
+    return "、".join(names)
+
+
+def _summarize_turns(
+    turns: list[list[Content]],
+    max_tokens: int,
+    keep_route: bool,
+    keep_places: bool,
+) -> Content:
+    """古いターンを1つの要約メッセージ（user ロール）にまとめる。
+
+    各発言は先頭 _SUMMARY_LINE_CHARS 文字に切り詰め、max_tokens に収まるよう新しい発言から残す。
+    keep_route / keep_places が真なら、古いターン内の最後のルート・スポット一覧も残す
+    （以前の要約に含まれていたものは、より新しい結果がなければ引き継ぐ）。
+    """
+    lines: list[str] = []
+    route_line: str | None = None
+    places_line: str | None = None
+
+    for turn in turns:
+        for content in turn:
+            text = _content_text(content)
+            if text.startswith(_SUMMARY_HEADER):
+                # 以前の要約は各行をそのまま引き継ぐ
+                for line in text.splitlines()[1:]:
+                    if line.startswith(_SUMMARY_ROUTE):
+                        route_line = line
+                    elif line.startswith(_SUMMARY_PLACES):
+                        places_line = line
+                    else:
+                        lines.append(line)
+            elif text:
+                prefix = _SUMMARY_USER if content.role == "user" else _SUMMARY_MODEL
+                lines.append(prefix + _clip(text))
+        route, places = _extract_function_results(turn)
+        if route is not None:
+            route_line = _SUMMARY_ROUTE + _format_route(route)
+        if places:
+            places_line = _SUMMARY_PLACES + _format_places(places)
+
+    pinned = []
+    if keep_route and route_line:
+        pinned.append(route_line)
+    if keep_places and places_line:
+        pinned.append(places_line)
+
+    budget = max_tokens - sum(
+        _estimate_tokens(line) for line in [_SUMMARY_HEADER, *pinned]
+    )
+    kept: list[str] = []
+    for line in reversed(lines):
+        budget -= _estimate_tokens(line)
+        if budget < 0:
+            break
+        kept.append(line)
+
+    text = "\n".join([_SUMMARY_HEADER, *reversed(kept), *pinned])
+    return Content(role="user", parts=[Part.from_text(text)])
+
+
+def _compact_history(
+    contents: list[Content],
+    max_messages: int,
+    max_tokens: int,
+) -> list[Content]:
+    """会話履歴を最大メッセージ数・推定トークン数の範囲に収める。
+
+    直近のターンから順に、両方の上限に収まる分だけそのまま残す。
+    残せなかった古いターンは _summarize_turns で1つの要約メッセージにまとめて先頭に置く。
+    要約には古いターン内の最後のルート・スポット一覧を残す
+    （残したターンにより新しい結果がある場合は除く）。
+    """
+    turns = _split_turns(contents)
+    kept: list[list[Content]] = []
+    messages = 0
+    tokens = 0
+    for turn in reversed(turns):
+        turn_messages = sum(1 for content in turn if _content_text(content))
+        turn_tokens = sum(_estimate_content_tokens(content) for content in turn)
+        if messages + turn_messages > max_messages or tokens + turn_tokens > max_tokens:
+            break
+        kept.append(turn)
+        messages += turn_messages
+        tokens += turn_tokens
+    kept.reverse()
+
+    dropped = turns[: len(turns) - len(kept)]
+    if not dropped:
+        return contents
+
+    recent = [content for turn in kept for content in turn]
+    recent_route, recent_places = _extract_function_results(recent)
+    # 要約は残りのトークン予算（最低でも全体の1/4）に収める
+    summary = _summarize_turns(
+        dropped,
+        max(max_tokens - tokens, max_tokens // 4),
+        keep_route=recent_route is None,
+        keep_places=recent_places is None,
+    )
+    logger.info(
+        "Conversation history compacted: %d older turns summarized, %d turns kept",
+        len(dropped),
+        len(kept),
+    )
+    return [summary, *recent]
+
+
+def _initial_contents(
+    history: list[dict[str, str]] | None,
+    stored: list[Content] | None,
+    max_history: int,
+) -> list[Content]:
+    """送信前の会話履歴を返す。サーバー側セッションがあればそれを優先する。"""
+    contents = stored if stored is not None else _build_history(history or [])
+    return _compact_history(contents, max_history, settings.GEMINI_HISTORY_TOKEN_BUDGET)
+
+
+def _waypoint_cache_key(user_message: str) -> str:
+    return get_cache("waypoint_suggestions").key(user_message)
+
+
+def _busy_waypoint_response(cached: Any) -> dict[str, Any]:
+    """Vertex AI が混み合っている場合の経由地候補の応答。
+
+    同じ条件の提案を直近に返していれば（settings.WAYPOINT_SUGGESTIONS_CACHE_*）それを返す。
+    """
+    if cached is not MISSING:
+        return cached
+    return dict(_BUSY_WAYPOINT_RESPONSE)
+
+
+def _parse_waypoint_response(response: Any) -> dict[str, Any]:
+    """経由地候補提案の JSON 応答を辞書に変換する。"""
+    if response is None:
+        return {
+            "candidates": [],
+            "ai_comment": "予期しないエラーが発生しました。",
+            "error": "unexpected",
+        }
+
+    try:
+        result = json.loads(response.text)
+        return {
+            "candidates": result.get("candidates", []),
+            "ai_comment": result.get("ai_comment", ""),
+        }
+    except (json.JSONDecodeError, AttributeError):
+        logger.exception("Failed to parse Gemini JSON response")
+        return {
+            "candidates": [],
+            "ai_comment": "AIの応答を解析できませんでした。",
+            "error": "parse_error",
+        }
+
+
+# ---------------------------------------------------------------------------
+# asyncio 版（非同期ビューから呼び出す）
+# ---------------------------------------------------------------------------
+
+# Function Calling で実行するツール関数。
+# SDK の非同期チャット（send_message_async）は AutomaticFunctionCallingResponder に
+# 対応していないため、ツール呼び出しのループを _agenerate_with_tools で自前で回す。
+# 同じ応答内の複数の呼び出しは _acall_functions で並行実行する。
+_async_tool_functions = {
+    "search_places": google_maps.asearch_places,
+    "calculate_route": google_maps.acalculate_route,
+}
+
+
+async def _agenerate(model: GenerativeModel, contents: Any) -> Any:
+    """generate_content_async を呼び出す。429 は retry の "gemini" ポリシーで再試行する。
+
+    待機は asyncio.sleep で行うため、待機中もイベントループをブロックしない。
+    再試行しない場合は ResourceExhausted をそのまま送出する。
+    """
+
+    async def _generate() -> Any:
+        async with _agemini_slot():
+            with tracing.span("gemini.generate"):
+                return await model.generate_content_async(contents)
+
+    return await get_policy("gemini").acall(_generate, retry_on=(ResourceExhausted,))
+
+
+async def _acall_function(function_call: Any) -> tuple[Part, Any]:
+    """Gemini が要求したツールを asyncio 版の関数で実行し、(応答 Part, 戻り値) を返す。"""
+    function = _async_tool_functions.get(function_call.name)
+    if function is None:
+        msg = f'Model has asked to call function "{function_call.name}" which was not found.'
+        raise GeminiFunctionCallingError(msg)
+
+    try:
+        with tracing.span(f"tool.{function_call.name}"):
+            result = await function(**dict(function_call.args))
+    except Exception as ex:
+        msg = f'Error raised when calling function "{function_call.name}".'
+        raise GeminiFunctionCallingError(msg) from ex
+
+    part = Part.from_function_response(
+        name=function_call.name, response=_tool_response(result)
+    )
+    return part, result
+
+
+async def _acall_functions(function_calls: list[Any]) -> list[tuple[Part, Any]]:
+    """同じ応答内の関数呼び出しを並行実行し、呼び出し順に (応答 Part, 戻り値) を返す。
+
+    いずれかが失敗した場合は、実行中の残りの呼び出しをキャンセルして例外を送出する。
+    """
+    tasks = [asyncio.ensure_future(_acall_function(fc)) for fc in function_calls]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _agenerate_with_tools(
+    model: GenerativeModel,
+    contents: list[Content],
+    max_function_calls: int,
+    results: _ToolResults,
+) -> Any:
+    """Function Calling を asyncio で自動実行しながら応答を生成する。
+
+    モデルの応答と関数の実行結果は contents に追記される（send_message の chat.history 相当）。
+    ツールの戻り値は results に記録する。
+    """
+    remaining = max_function_calls
+    while True:
+        response = await _agenerate(model, contents)
+        results.add_usage(response)
+        candidate = response.candidates[0]
+        model_content = candidate.content
+        model_content.role = "model"
+        contents.append(model_content)
+
+        function_calls = candidate.function_calls
+        if not function_calls:
+            return response
+        if len(function_calls) > remaining:
+            msg = (
+                "Exceeded the maximum number of automatic function calls "
+                f"({max_function_calls})."
+            )
+            raise GeminiFunctionCallingError(msg)
+        remaining -= len(function_calls)
+
+        outputs = await _acall_functions(function_calls)
+        for function_call, (_, result) in zip(function_calls, outputs, strict=True):
+            results.record(function_call.name, result)
+        contents.append(Content(role="user", parts=[part for part, _ in outputs]))
+
+
+async def _agenerate_chat(
+    contents: list[Content],
+    max_function_calls: int,
+) -> tuple[Any, list[Content], _ToolResults]:
+    """チャット用モデルで応答を生成し、(応答, ツール実行結果を含む contents, ツールの戻り値) を返す。
+
+    コンテキストキャッシュが使えなくなっていた場合は、モデルを作り直して1回だけ再試行する。
+    """
+    model = get_model("chat")
+    turn = list(contents)
+    results = _ToolResults()
+    try:
+        response = await _agenerate_with_tools(model, turn, max_function_calls, results)
+    except _CONTEXT_CACHE_ERRORS:
+        if not _uses_context_cache(model):
+            raise
+        _invalidate_context_cache()
+    else:
+        return response, turn, results
+
+    turn = list(contents)
+    results = _ToolResults()
+    response = await _agenerate_with_tools(
+        get_model("chat"), turn, max_function_calls, results
+    )
+    return response, turn, results
+
+
+async def asend_message(
     message: str,
     history: list[dict[str, str]] | None = None,
-) -> tuple[str, dict[str, Any] | None, list[dict[str, Any]] | None]:
+    session_id: str | None = None,
+) -> tuple[str, Route | None, list[Place] | None]:
     """Gemini にメッセージを送信し、AI 応答と Function Calling 結果を返す。
 
     処理フロー:
-      1. Vertex AI SDK を初期化（初回のみ）
-      2. Gemini 2.5 Pro モデルをシステムプロンプト付きで生成
-      3. AutomaticFunctionCallingResponder を設定
-      4. フロントエンドの会話履歴を Content 形式に変換してチャットセッションを開始
-      5. ユーザーメッセージを送信 → Gemini が必要に応じてツールを自動実行
-      6. チャット履歴から Function Calling の結果を抽出
-      7. AI 応答テキスト + ルートデータ + スポットデータのタプルを返却
+      1. 会話履歴を GEMINI_MAX_HISTORY_LENGTH 件・GEMINI_HISTORY_TOKEN_BUDGET トークン以内に
+         圧縮（古いターンは要約にまとめる）
+      2. システムプロンプト・ツール設定済みの共有モデルを取得（初回のみ SDK 初期化・生成）
+      3. ユーザーメッセージを送信 → Gemini がツール呼び出しを返したら asearch_places /
+         acalculate_route を並行実行し、結果を Gemini に返す（_agenerate_with_tools）
+      4. 実行したツールの戻り値（Route / Place）を取り出す
+      5. AI 応答テキスト + ルートデータ + スポットデータのタプルを返却
+
+    Gemini の呼び出しは generate_content_async で行うため、処理中もイベントループをブロックしない。
 
     Args:
         message: ユーザーの入力テキスト
         history: これまでの会話履歴（[{role: "user"|"assistant", content: "..."}]）
+        session_id: 指定した場合はサーバー側に保存した会話履歴を使い（見つからなければ
+            history を使う）、応答後の履歴を Function Calling の結果も含めて保存する
 
     Returns:
         (reply_text, route_data_or_none, places_data_or_none) のタプル
@@ -240,86 +891,37 @@ def send_message(
         - route_data: calculate_route の結果（呼ばれなかった場合は None）
         - places_data: search_places の結果（呼ばれなかった場合は None）
     """
-    _ensure_initialized()
-
     max_history = int(os.environ.get("GEMINI_MAX_HISTORY_LENGTH", "10"))
-    if history:
-        history = _truncate_history(history, max_history)
+    stored = await session_store.aload_session(session_id) if session_id else None
 
-    # Gemini 2.5 Pro モデルを生成（システムプロンプトとツールを設定）
-    model = GenerativeModel(
-        "gemini-2.5-pro",
-        system_instruction=SYSTEM_PROMPT,
-        tools=[_tools],
-    )
-
-    # Automatic Function Calling: Gemini がツール呼び出しを判断したら、
-    # SDK が自動的に対応する Python 関数を実行し、結果を Gemini に返す。
     max_fc = int(os.environ.get("GEMINI_MAX_FUNCTION_CALLS", "5"))
-    afc_responder = AutomaticFunctionCallingResponder(
-        max_automatic_function_calls=max_fc,
-    )
-
-    # フロントエンドの会話履歴を Vertex AI の Content 形式に変換
-    contents = _build_history(history or [])
 
-    # 既存の会話履歴を引き継いでチャットセッションを開始
-    # responder を start_chat に渡すことで、Gemini のツール呼び出しが自動処理される。
-    chat = model.start_chat(history=contents, responder=afc_responder)
+    contents = _initial_contents(history, stored, max_history)
+    contents.append(Content(role="user", parts=[Part.from_text(message)]))
 
-    # メッセージを送信。Gemini がツール呼び出しを必要と判断した場合、
-    # afc_responder により自動的に search_places / calculate_route が実行される。
-    # Vertex AI のレート制限（429 ResourceExhausted）に対応するため、
-    # 指数バックオフ付きリトライを実装。
-    max_retries = 3
-    response = None
-    for attempt in range(max_retries):
-        try:
-            response = chat.send_message(message)
-            break
-        except ResourceExhausted:
-            if attempt == max_retries - 1:
-                logger.exception(
-                    "Gemini rate limit exceeded after %d retries", max_retries
-                )
-                return (
-                    "申し訳ありません。サーバーが混み合っています。しばらく待ってから再度お試しください。",
-                    None,
-                    None,
-                )
-            wait_time = 2**attempt  # 1, 2, 4 seconds
-            logger.warning(
-                "Rate limited, retrying in %ds (attempt %d/%d)",
-                wait_time,
-                attempt + 1,
-                max_retries,
-            )
-            time.sleep(wait_time)
-        except (ValueError, GeminiFunctionCallingError, RuntimeError):
-            logger.exception(
-                "Gemini send_message failed (possible function calling loop)"
-            )
-            return (
-                "申し訳ありません。処理中にエラーが発生しました。内容を変えて再度お試しください。",
-                None,
-                None,
-            )
-
-    if response is None:
-        # Should not reach here, but handle defensively
+    try:
+        response, contents, tool_results = await _agenerate_chat(contents, max_fc)
+    except _RATE_LIMIT_ERRORS:
+        logger.exception("Gemini rate limit exceeded")
+        return _BUSY_REPLY, None, None
+    except (ValueError, GeminiFunctionCallingError, RuntimeError):
+        logger.exception("Gemini send_message failed (possible function calling loop)")
         return (
-            "申し訳ありません。予期しないエラーが発生しました。",
+            "申し訳ありません。処理中にエラーが発生しました。内容を変えて再度お試しください。",
             None,
             None,
         )
 
-    route_data, places_data = _extract_function_results(chat.history)
     reply_text = response.text if response.text else ""
 
-    return reply_text, route_data, places_data
+    if session_id:
+        await session_store.asave_session(session_id, contents)
+
+    tool_results.observe()
+    return reply_text, tool_results.route, tool_results.places
 
 
-def suggest_waypoints(
+async def asuggest_waypoints(
     origin: str,
     destination: str,
     prompt: str,
@@ -336,60 +938,250 @@ def suggest_waypoints(
     Returns:
         {"candidates": [...], "ai_comment": "..."} 形式の辞書
     """
-    import json
+    model = get_model("waypoints")
 
-    _ensure_initialized()
+    user_message = f"出発地: {origin}\n目的地: {destination}\nリクエスト: {prompt}"
 
-    model = GenerativeModel(
-        "gemini-2.5-pro",
-        system_instruction=WAYPOINT_SUGGEST_PROMPT,
-        generation_config={"response_mime_type": "application/json"},
+    try:
+        response = await _agenerate(model, user_message)
+    except _RATE_LIMIT_ERRORS:
+        logger.exception("Gemini rate limit exceeded")
+        return _busy_waypoint_response(
+            await get_cache("waypoint_suggestions").aget(
+                _waypoint_cache_key(user_message)
+            )
+        )
+
+    metrics.observe_gemini_turn(*_usage(response), 0)
+    result = _parse_waypoint_response(response)
+    if "error" not in result:
+        await get_cache("waypoint_suggestions").aset(
+            _waypoint_cache_key(user_message), result
+        )
+    return result
+
+
+def send_message(
+    message: str,
+    history: list[dict[str, str]] | None = None,
+    session_id: str | None = None,
+) -> tuple[str, Route | None, list[Place] | None]:
+    """asend_message の同期版（管理コマンド・結合テストなどイベントループ外から呼ぶ）。"""
+    return http_client.run_sync(
+        _closing_loop_models(asend_message(message, history, session_id))
     )
 
-    user_message = f"出発地: {origin}\n目的地: {destination}\nリクエスト: {prompt}"
 
-    max_retries = 3
-    response = None
-    for attempt in range(max_retries):
-        try:
-            response = model.generate_content(user_message)
-            break
-        except ResourceExhausted:
-            if attempt == max_retries - 1:
-                logger.exception(
-                    "Gemini rate limit exceeded after %d retries", max_retries
-                )
-                return {
-                    "candidates": [],
-                    "ai_comment": "サーバーが混み合っています。しばらく待ってから再度お試しください。",
-                    "error": "rate_limit",
-                }
-            wait_time = 2**attempt
-            logger.warning(
-                "Rate limited, retrying in %ds (attempt %d/%d)",
-                wait_time,
-                attempt + 1,
-                max_retries,
-            )
-            time.sleep(wait_time)
+def suggest_waypoints(origin: str, destination: str, prompt: str) -> dict[str, Any]:
+    """asuggest_waypoints の同期版（管理コマンド・結合テストなどイベントループ外から呼ぶ）。"""
+    return http_client.run_sync(
+        _closing_loop_models(asuggest_waypoints(origin, destination, prompt))
+    )
 
-    if response is None:
-        return {
-            "candidates": [],
-            "ai_comment": "予期しないエラーが発生しました。",
-            "error": "unexpected",
-        }
 
+async def _closing_loop_models[T](coro: Coroutine[Any, Any, T]) -> T:
+    """coro を実行し、終了前に一時的なイベントループ用のモデルの非同期クライアントを閉じる。"""
     try:
-        result = json.loads(response.text)
-        return {
-            "candidates": result.get("candidates", []),
-            "ai_comment": result.get("ai_comment", ""),
-        }
-    except (json.JSONDecodeError, AttributeError):
-        logger.exception("Failed to parse Gemini JSON response")
-        return {
-            "candidates": [],
-            "ai_comment": "AIの応答を解析できませんでした。",
-            "error": "parse_error",
-        }
+        return await coro
+    finally:
+        await aclose_loop_models()
+
+
+# ---------------------------------------------------------------------------
+# ストリーミング版（SSE エンドポイントから呼び出す）
+# ---------------------------------------------------------------------------
+
+# ストリーミング中に送出するイベント名
+#   delta:      応答テキストの差分 {"text": ...}
+#   tool_start: ツール呼び出しの開始 {"name": ..., "args": {...}}
+#   tool_end:   ツール呼び出しの終了 {"name": ..., "ok": bool}
+#   done:       最終結果 {"reply": ..., "route": ..., "places": ...}
+#   error:      エラー {"detail": ...}
+StreamEvent = tuple[str, dict[str, Any]]
+
+
+# _apump_stream がストリームの終わりを知らせるためにキューに入れる値
+_STREAM_END = object()
+
+
+async def _apump_stream(
+    model: GenerativeModel, contents: list[Content], queue: asyncio.Queue[Any]
+) -> None:
+    """generate_content_async(stream=True) のチャンクを受け取り、順に queue に入れる。
+
+    Vertex AI の枠は上流のストリームを読み終えた時点で返す。最初のチャンクを受け取る前の 429 は
+    retry の "gemini" ポリシーで再試行する（途中まで返した後に再試行すると応答が重複するため、
+    その場合は送出する）。終了時（例外を含む）には _STREAM_END を入れる。
+    """
+    retry = get_policy("gemini").begin()
+    try:
+        while True:
+            received = False
+            try:
+                async with _agemini_slot():
+                    stream = await model.generate_content_async(contents, stream=True)
+                    async for chunk in stream:
+                        received = True
+                        queue.put_nowait(chunk)
+            except ResourceExhausted as e:
+                delay = None if received else retry.backoff(e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                return
+    finally:
+        queue.put_nowait(_STREAM_END)
+
+
+async def _astream_generate(
+    model: GenerativeModel, contents: list[Content]
+) -> AsyncIterator[Any]:
+    """generate_content_async(stream=True) のチャンクを順に返す。
+
+    上流のストリームは別タスク（_apump_stream）で読むため、呼び出し側が SSE の送信などで
+    遅れても Vertex AI のレート制限の枠を持ち続けない。上流のエラーはチャンクを返し終えた後に送出する。
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    pump = asyncio.create_task(_apump_stream(model, contents, queue))
+    try:
+        while (chunk := await queue.get()) is not _STREAM_END:
+            yield chunk
+        await pump
+    finally:
+        # 呼び出し側が途中でやめた場合は上流のストリームも打ち切る
+        pump.cancel()
+
+
+async def _astream_with_tools(
+    model: GenerativeModel,
+    contents: list[Content],
+    max_function_calls: int,
+    results: _ToolResults,
+) -> AsyncIterator[StreamEvent]:
+    """_agenerate_with_tools のストリーミング版。テキスト差分とツール実行をイベントとして返す。"""
+    remaining = max_function_calls
+    while True:
+        texts: list[str] = []
+        function_call_parts: list[Part] = []
+        last_chunk = None
+        async for chunk in _astream_generate(model, contents):
+            last_chunk = chunk
+            if not chunk.candidates:
+                continue
+            for part in chunk.candidates[0].content.parts:
+                if part.function_call:
+                    function_call_parts.append(part)
+                    continue
+                text = _part_text(part)
+                if text:
+                    texts.append(text)
+                    yield "delta", {"text": text}
+
+        # トークン数は最後のチャンクが応答全体の値を持つ
+        if last_chunk is not None:
+            results.add_usage(last_chunk)
+        # ストリームで分割されたテキストを1つにまとめ、モデルの発話として履歴に追加する
+        model_parts = [Part.from_text("".join(texts))] if texts else []
+        contents.append(Content(role="model", parts=model_parts + function_call_parts))
+
+        if not function_call_parts:
+            return
+        if len(function_call_parts) > remaining:
+            msg = (
+                "Exceeded the maximum number of automatic function calls "
+                f"({max_function_calls})."
+            )
+            raise GeminiFunctionCallingError(msg)
+        remaining -= len(function_call_parts)
+
+        # 呼び出しは並行実行し、tool_end は完了した順に返す。
+        # 履歴に追加する実行結果は呼び出し順に並べる。
+        function_calls = [part.function_call for part in function_call_parts]
+        for function_call in function_calls:
+            yield "tool_start", {"name": function_call.name, "args": function_call.args}
+        tasks = [asyncio.ensure_future(_acall_function(fc)) for fc in function_calls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                response_part, _ = await next_done
+                function_response = response_part.function_response
+                ok = "error" not in function_response.response
+                yield "tool_end", {"name": function_response.name, "ok": ok}
+        finally:
+            for task in tasks:
+                task.cancel()
+        outputs = [task.result() for task in tasks]
+        for function_call, (_, result) in zip(function_calls, outputs, strict=True):
+            results.record(function_call.name, result)
+        contents.append(Content(role="user", parts=[part for part, _ in outputs]))
+
+
+async def astream_message(
+    message: str,
+    history: list[dict[str, str]] | None = None,
+    session_id: str | None = None,
+) -> AsyncIterator[StreamEvent]:
+    """asend_message のストリーミング版。(イベント名, データ) を順に返す。
+
+    応答テキストは生成され次第 delta イベントとして返し、ツール呼び出しの前後に
+    tool_start / tool_end イベントを返す。最後に done イベントで
+    asend_message と同じ内容（reply はストリームしたテキスト全体）を返す。
+    エラー時は asend_message と同じメッセージを error イベントで返す。
+    """
+    max_history = int(os.environ.get("GEMINI_MAX_HISTORY_LENGTH", "10"))
+    stored = await session_store.aload_session(session_id) if session_id else None
+
+    max_fc = int(os.environ.get("GEMINI_MAX_FUNCTION_CALLS", "5"))
+
+    base_contents = _initial_contents(history, stored, max_history)
+    base_contents.append(Content(role="user", parts=[Part.from_text(message)]))
+
+    # コンテキストキャッシュが使えなくなっていた場合は、まだ何も返していなければ1回だけ作り直す
+    for retry_with_new_model in (False, True):
+        model = get_model("chat")
+        contents = list(base_contents)
+        tool_results = _ToolResults()
+        texts: list[str] = []
+        emitted = False
+        try:
+            async for event, data in _astream_with_tools(
+                model, contents, max_fc, tool_results
+            ):
+                if event == "delta":
+                    texts.append(data["text"])
+                emitted = True
+                yield event, data
+        except _CONTEXT_CACHE_ERRORS:
+            if retry_with_new_model or emitted or not _uses_context_cache(model):
+                raise
+            _invalidate_context_cache()
+            continue
+        except _RATE_LIMIT_ERRORS:
+            logger.exception("Gemini rate limit exceeded")
+            yield "error", {"detail": _BUSY_REPLY}
+            return
+        except (ValueError, GeminiFunctionCallingError, RuntimeError):
+            logger.exception(
+                "Gemini stream_message failed (possible function calling loop)"
+            )
+            yield (
+                "error",
+                {
+                    "detail": "申し訳ありません。処理中にエラーが発生しました。内容を変えて再度お試しください。"
+                },
+            )
+            return
+        break
+
+    # 次のリクエストが古い履歴を読まないよう、done を返す前に保存する
+    if session_id:
+        await session_store.asave_session(session_id, contents)
+    tool_results.observe()
+    yield (
+        "done",
+        {
+            "reply": "".join(texts),
+            "route": tool_results.route,
+            "places": tool_results.places,
+        },
+    )
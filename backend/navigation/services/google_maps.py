@@ -1,26 +1,51 @@
 """Google Maps API クライアント（Places API / Routes API）。
 
 このモジュールは Gemini の Function Calling から自動的に呼び出される。
-Gemini がユーザーの要望を解析し、必要に応じて search_places() や calculate_route() を
+Gemini がユーザーの要望を解析し、必要に応じて asearch_places() や acalculate_route() を
 ツールとして実行する。
 
 API キーは settings.MAPS_API_KEY から取得する（環境変数 MAPS_API_KEY で設定）。
+HTTP リクエストは http_client の共有 httpx.AsyncClient（Keep-Alive + コネクションプール）経由で
+送信し、非同期ビューからイベントループをブロックせずに呼び出せる。
+同期版の search_places / calculate_route は asyncio 版を http_client.run_sync で呼ぶだけの
+薄いラッパーで、イベントループの外（管理コマンド・結合テスト）から使う。
+acalculate_routes は複数ルートを同時実行数を制限しつつ並行計算する（バッチ API 用）。
+arank_by_detour は経由地候補の寄り道コストを computeRouteMatrix の1リクエストで求める。
+
+キャッシュミスした同じ呼び出しが同時に来た場合は single_flight で API 呼び出しを1回にまとめる
+（共有キャッシュを使う場合はワーカー間でもまとめる）。
+API へのリクエストは rate_limit で Places / Routes ごとに流量と同時実行数を制限し、
+枠が空くのを待ちきれなかった場合は 429 と同じエラーを返す。
+
+search_places で取得したスポットの Place ID・座標は住所（formattedAddress）をキーに place_store に
+保存し、同じ住所を Routes API に渡す際は住所文字列の代わりに placeId を使う（再ジオコーディングを省く）。
+
+結果は domain の Place / Route（変更不可のオブジェクト）で返す。エラー時は従来どおり
+{"error": "..."} の辞書を返す（Gemini にそのまま渡すため）。
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
-import requests
+import httpx
 from django.conf import settings
 
+from . import http_client, metrics, single_flight, tracing
+from .cache import MISSING, get_cache, normalize_query
+from .domain import Coords, Place, Route, Toll
+from .place_store import get_place_store
+from .rate_limit import RateLimitExceeded, get_limiter
+from .retry import get_policy
+
 logger = logging.getLogger(__name__)
 
-# Google Maps API (New) のエンドポイント
-PLACES_API_URL = "https://places.googleapis.com/v1/places:searchText"
-ROUTES_API_URL = "https://routes.googleapis.com/directions/v2:computeRoutes"
+_CONFIG_ERROR = "サービスの設定に問題があります。管理者にお問い合わせください。"
+_RATE_LIMIT_ERROR = "リクエストが集中しています。しばらく待ってから再度お試しください。"
 
 
 def _get_api_key() -> str | None:
@@ -32,9 +57,64 @@ def _get_api_key() -> str | None:
     return api_key
 
 
-def search_places(
+# 再試行する HTTP ステータス（サーバー側の一時的な障害のみ）。
+# 429 はクォータ超過なので再試行せず、呼び出し元でエラーとして扱う。
+_RETRY_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+
+class _RetryableStatus(Exception):
+    """再試行する HTTP ステータスを受けた（Retry-After を読めるよう response を持つ）。"""
+
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+async def _apost(upstream: str, url: str, **kwargs: Any) -> httpx.Response:
+    """upstream（"places" / "routes"）のレート制限の枠を取って POST する。
+
+    5xx 応答は retry の "maps" ポリシーでバックオフしながら再試行し、
+    再試行を諦めた場合は最後の応答を返す。
+    枠を取れなかった場合は RateLimitExceeded を送出する。
+    """
+
+    async def _attempt() -> httpx.Response:
+        response = await _apost_once(upstream, url, **kwargs)
+        if response.status_code in _RETRY_STATUS_CODES:
+            raise _RetryableStatus(response)
+        return response
+
+    try:
+        return await get_policy("maps").acall(_attempt, retry_on=(_RetryableStatus,))
+    except _RetryableStatus as e:
+        return e.response
+
+
+async def _apost_once(upstream: str, url: str, **kwargs: Any) -> httpx.Response:
+    """_apost の1回分の試行。リクエスト数・所要時間・エラーは metrics に記録する。"""
+    try:
+        async with get_limiter(upstream).aslot() as permit:
+            with (
+                tracing.span(f"{upstream}.request"),
+                metrics.upstream_request(upstream) as request,
+            ):
+                response = await http_client.apost(url, **kwargs)
+                request.observe(response.status_code)
+            permit.observe(response.status_code)
+    except RateLimitExceeded:
+        metrics.upstream_error(upstream, "rate_limit")
+        raise
+    return response
+
+
+# ---------------------------------------------------------------------------
+# search_places
+# ---------------------------------------------------------------------------
+
+
+async def asearch_places(
     location_query: str, place_type: str = "restaurant"
-) -> list[dict[str, Any]] | dict[str, str]:
+) -> list[Place] | dict[str, str]:
     """Places API (New) の textSearch で周辺スポットを検索する。
 
     Args:
@@ -47,18 +127,82 @@ def search_places(
     フィルタ条件:
         - minRating=settings.PLACES_MIN_RATING（デフォルト: 星4以上の高評価のみ）
         - maxResultCount=settings.PLACES_MAX_RESULTS（デフォルト: 最大3件）
+
+    キャッシュ:
+        正規化した (location_query, place_type, minRating, maxResultCount) をキーに
+        検索結果をキャッシュする（settings.PLACES_CACHE_*）。エラーはキャッシュしない。
+        キャッシュミスした同じ検索が同時に来た場合は、Places API を1回だけ呼んで結果を共有する。
     """
     api_key = _get_api_key()
     if not api_key:
-        return {
-            "error": "サービスの設定に問題があります。管理者にお問い合わせください。"
-        }
+        return {"error": _CONFIG_ERROR}
+
+    places_cache = get_cache("places")
+    cache_key = _places_cache_key(location_query, place_type)
+    cached = await places_cache.aget(cache_key)
+    if cached is not MISSING:
+        return cached
+    return await single_flight.ado(
+        places_cache,
+        cache_key,
+        lambda: _afetch_places(api_key, location_query, place_type, cache_key),
+    )
+
 
+async def _afetch_places(
+    api_key: str, location_query: str, place_type: str, cache_key: str
+) -> list[Place] | dict[str, str]:
+    """Places API を呼び、成功した結果をキャッシュに保存する。"""
+    headers, payload = _places_request(api_key, location_query, place_type)
+    try:
+        response = await _apost(
+            "places",
+            settings.PLACES_API_URL,
+            json=payload,
+            headers=headers,
+            timeout=settings.PLACES_API_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+    except RateLimitExceeded:
+        return _places_error(429)
+    except httpx.HTTPStatusError as e:
+        return _places_error(e.response.status_code)
+    except httpx.HTTPError:
+        return _places_error(None)
+
+    results = _parse_places(data)
+    await get_cache("places").aset(cache_key, results)
+    await get_place_store().aput_many(_place_entries(data))
+    return results
+
+
+def search_places(
+    location_query: str, place_type: str = "restaurant"
+) -> list[Place] | dict[str, str]:
+    """asearch_places の同期版（管理コマンド・結合テストなどイベントループ外から呼ぶ）。"""
+    return http_client.run_sync(asearch_places(location_query, place_type))
+
+
+def _places_cache_key(location_query: str, place_type: str) -> str:
+    return get_cache("places").key(
+        normalize_query(location_query),
+        normalize_query(place_type),
+        settings.PLACES_MIN_RATING,
+        settings.PLACES_MAX_RESULTS,
+    )
+
+
+def _places_request(
+    api_key: str, location_query: str, place_type: str
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """textSearch のリクエストヘッダーとボディを組み立てる。"""
     # レスポンスに含めるフィールドを指定（FieldMask）
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
         "X-Goog-FieldMask": (
+            "places.id,"
             "places.displayName,"
             "places.formattedAddress,"
             "places.rating,"
@@ -73,53 +217,82 @@ def search_places(
         "minRating": settings.PLACES_MIN_RATING,
         "maxResultCount": settings.PLACES_MAX_RESULTS,
     }
+    return headers, payload
 
-    try:
-        response = requests.post(
-            PLACES_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=settings.PLACES_API_TIMEOUT,
-        )
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.HTTPError as e:
-        if e.response is not None and e.response.status_code == 429:
-            logger.warning("Places API rate limit exceeded")
-            return {
-                "error": "リクエストが集中しています。しばらく待ってから再度お試しください。"
-            }
-        logger.exception("Places API request failed")
-        return {"error": "スポット検索に失敗しました。ネットワークを確認してください。"}
-    except requests.RequestException:
-        logger.exception("Places API request failed")
-        return {"error": "スポット検索に失敗しました。ネットワークを確認してください。"}
 
-    # API レスポンスからフロントエンド向けの形式に変換
+def _places_error(status_code: int | None) -> dict[str, str]:
+    """Places API の失敗をエラー辞書に変換する（except 節の中から呼ぶ）。"""
+    if status_code == 429:
+        logger.warning("Places API rate limit exceeded")
+        return {"error": _RATE_LIMIT_ERROR}
+    logger.exception("Places API request failed")
+    return {"error": "スポット検索に失敗しました。ネットワークを確認してください。"}
+
+
+def _parse_places(data: dict[str, Any]) -> list[Place]:
+    """API レスポンスを Place のリストに変換する。"""
     places = data.get("places", [])
-    results: list[dict[str, Any]] = []
+    results: list[Place] = []
     for place in places:
         display_name = place.get("displayName", {})
         location = place.get("location", {})
         results.append(
-            {
-                "name": display_name.get("text", "不明"),
-                "address": place.get("formattedAddress", "不明"),
-                "rating": place.get("rating", 0),
-                "coords": {
-                    "latitude": location.get("latitude", 0),
-                    "longitude": location.get("longitude", 0),
-                },
-                "price_level": place.get("priceLevel", "UNKNOWN"),
-            }
+            Place(
+                name=display_name.get("text", "不明"),
+                address=place.get("formattedAddress", "不明"),
+                rating=place.get("rating", 0),
+                coords=Coords(
+                    latitude=location.get("latitude", 0),
+                    longitude=location.get("longitude", 0),
+                ),
+                price_level=place.get("priceLevel", "UNKNOWN"),
+            )
         )
 
     return results
 
 
-def calculate_route(
-    origin: str, destination: str, waypoints: list[str] | None = None
+def _place_entries(data: dict[str, Any]) -> list[tuple[str, dict[str, Any]]]:
+    """Places API の結果から、place_store に保存する (住所, Place ID・座標) を取り出す。
+
+    スポット名は別の場所（チェーン店の他店舗など）と重なるため保存しない。
+    """
+    entries = []
+    for place in data.get("places", []):
+        location = place.get("location")
+        address = place.get("formattedAddress")
+        if not place.get("id") or not location or not address:
+            continue
+        resolution = {
+            "place_id": place["id"],
+            "latitude": location.get("latitude", 0),
+            "longitude": location.get("longitude", 0),
+        }
+        entries.append((address, resolution))
+    return entries
+
+
+def _route_waypoint(
+    name: str, resolutions: dict[str, dict[str, Any]]
 ) -> dict[str, Any]:
+    """地名を Routes API の Waypoint に変換する。解決済みなら placeId、未解決なら住所で渡す。
+
+    resolutions は place_store の aget_many の結果。
+    """
+    resolution = resolutions.get(name)
+    if resolution:
+        return {"placeId": resolution["place_id"]}
+    return {"address": name}
+
+
+# ---------------------------------------------------------------------------
+# calculate_route
+# ---------------------------------------------------------------------------
+
+
+async def acalculate_route(
+    origin: str, destination: str, waypoints: list[str] | None = None
+) -> Route | dict[str, str]:
     """Routes API v2 でドライブルートを計算する。
 
     Args:
@@ -128,20 +301,169 @@ def calculate_route(
         waypoints: 経由地のリスト（省略可）
 
     Returns:
-        ルート情報の辞書。エラー時は {"error": "..."} を返す。
+        ルート（Route）。エラー時は {"error": "...", "error_type": "..."} を返す。
 
     ルート計算の設定:
         - travelMode: DRIVE（自動車）
         - routingPreference: TRAFFIC_AWARE（交通状況を考慮）
         - extraComputations: TOLLS（高速道路料金を算出）
-        - departureTime: 現在時刻+5分（リアルタイム交通情報の取得用）
+        - departureTime: 現在時刻+5分を ROUTES_DEPARTURE_BUCKET_MINUTES 単位に切り上げた時刻
+          （リアルタイム交通情報の取得用）
+
+    キャッシュ:
+        (origin, destination, waypoints, 出発時刻バケット) をキーにルートをキャッシュする
+        （settings.ROUTES_CACHE_*）。同じバケット内の同一リクエストは Routes API を呼ばない。
+        calculate-route / return-route / Gemini のツール呼び出しはすべてここを通る。
+        キャッシュミスした同じルートが同時に来た場合は、Routes API を1回だけ呼んで結果を共有する。
     """
     api_key = _get_api_key()
     if not api_key:
-        return {
-            "error": "サービスの設定に問題があります。管理者にお問い合わせください。"
-        }
+        return {"error": _CONFIG_ERROR}
+
+    departure_time = _departure_time()
+    routes_cache = get_cache("routes")
+    cache_key = _routes_cache_key(origin, destination, waypoints, departure_time)
+    cached = await routes_cache.aget(cache_key)
+    if cached is not MISSING:
+        return cached
+    return await single_flight.ado(
+        routes_cache,
+        cache_key,
+        lambda: _afetch_route(
+            api_key, origin, destination, waypoints, departure_time, cache_key
+        ),
+    )
+
+
+async def _afetch_route(
+    api_key: str,
+    origin: str,
+    destination: str,
+    waypoints: list[str] | None,
+    departure_time: str,
+    cache_key: str,
+) -> Route | dict[str, str]:
+    """Routes API を呼び、成功した結果をキャッシュに保存する。"""
+    # search_places で Place ID を取得済みの住所は placeId で渡す
+    resolutions = await get_place_store().aget_many(
+        [origin, destination, *(waypoints or [])]
+    )
+    headers, payload = _routes_request(
+        api_key, origin, destination, waypoints, departure_time, resolutions
+    )
+    try:
+        response = await _apost(
+            "routes",
+            settings.ROUTES_API_URL,
+            json=payload,
+            headers=headers,
+            timeout=settings.ROUTES_API_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+    except RateLimitExceeded:
+        return _routes_error(429)
+    except httpx.HTTPStatusError as e:
+        return _routes_error(e.response.status_code)
+    except httpx.HTTPError:
+        return _routes_error(None)
+
+    route_data = _parse_route(data, origin, destination, waypoints)
+    if isinstance(route_data, Route):
+        await get_cache("routes").aset(cache_key, route_data)
+    return route_data
+
+
+def calculate_route(
+    origin: str, destination: str, waypoints: list[str] | None = None
+) -> Route | dict[str, str]:
+    """acalculate_route の同期版（管理コマンド・結合テストなどイベントループ外から呼ぶ）。"""
+    return http_client.run_sync(acalculate_route(origin, destination, waypoints))
+
+
+async def acalculate_routes(
+    route_requests: list[tuple[str, str, list[str]]],
+    max_concurrency: int,
+) -> list[Route | dict[str, str]]:
+    """複数のルートを並行して計算する（バッチ API 用）。
+
+    同じ (origin, destination, waypoints) のリクエストは1回だけ計算し、
+    Routes API への同時リクエスト数は max_concurrency 以下に抑える。
+
+    Args:
+        route_requests: (origin, destination, waypoints) のリスト
+        max_concurrency: Routes API への最大同時リクエスト数
 
+    Returns:
+        入力と同じ順序の acalculate_route の結果のリスト（重複したリクエストは同じ Route）
+    """
+    keys = [
+        (origin, destination, tuple(waypoints))
+        for origin, destination, waypoints in route_requests
+    ]
+    unique_keys = list(dict.fromkeys(keys))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _calculate(
+        key: tuple[str, str, tuple[str, ...]],
+    ) -> Route | dict[str, str]:
+        origin, destination, waypoints = key
+        async with semaphore:
+            return await acalculate_route(origin, destination, list(waypoints))
+
+    results = await asyncio.gather(*(_calculate(key) for key in unique_keys))
+    by_key = dict(zip(unique_keys, results, strict=True))
+    # Route は変更できないため、重複したリクエストには同じオブジェクトを返す
+    return [by_key[key] for key in keys]
+
+
+def _departure_bucket(now: datetime) -> datetime:
+    """出発時刻（現在時刻の5分後）をバケット単位に切り上げる。
+
+    交通情報取得のため出発時刻は少し未来にする必要がある。
+    切り上げなので、バケット境界は常に「現在時刻+5分」以降になる。
+    """
+    lead_time = now + timedelta(minutes=5)
+    bucket_seconds = settings.ROUTES_DEPARTURE_BUCKET_MINUTES * 60
+    timestamp = math.ceil(lead_time.timestamp() / bucket_seconds) * bucket_seconds
+    return datetime.fromtimestamp(timestamp, tz=UTC)
+
+
+def _departure_time() -> str:
+    """Routes API に渡す departureTime（RFC 3339）を返す。"""
+    return _departure_bucket(datetime.now(tz=UTC)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def route_cache_key(
+    origin: str, destination: str, waypoints: list[str] | None = None
+) -> str:
+    """acalculate_route が今使うキャッシュキー（現在の出発時刻バケットを含む）を返す。
+
+    同じキーの間は同じルートを返すため、views の ETag に使う。
+    """
+    return _routes_cache_key(origin, destination, waypoints, _departure_time())
+
+
+def _routes_cache_key(
+    origin: str,
+    destination: str,
+    waypoints: list[str] | None,
+    departure_time: str,
+) -> str:
+    return get_cache("routes").key(
+        origin, destination, tuple(waypoints or ()), departure_time
+    )
+
+
+def _routes_request(
+    api_key: str,
+    origin: str,
+    destination: str,
+    waypoints: list[str] | None,
+    departure_time: str,
+    resolutions: dict[str, dict[str, Any]],
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """computeRoutes のリクエストヘッダーとボディを組み立てる。"""
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
@@ -158,16 +480,11 @@ def calculate_route(
     # 経由地を Routes API の intermediates 形式に変換
     intermediates = []
     if waypoints:
-        intermediates = [{"address": wp} for wp in waypoints]
-
-    # 出発時刻は現在時刻の5分後（交通情報取得のため少し未来にする）
-    departure_time = (datetime.now(tz=UTC) + timedelta(minutes=5)).strftime(
-        "%Y-%m-%dT%H:%M:%SZ"
-    )
+        intermediates = [_route_waypoint(wp, resolutions) for wp in waypoints]
 
     payload: dict[str, Any] = {
-        "origin": {"address": origin},
-        "destination": {"address": destination},
+        "origin": _route_waypoint(origin, resolutions),
+        "destination": _route_waypoint(destination, resolutions),
         "travelMode": "DRIVE",
         "routingPreference": "TRAFFIC_AWARE",
         "extraComputations": ["TOLLS"],
@@ -178,36 +495,31 @@ def calculate_route(
         payload["intermediates"] = intermediates
         payload["optimizeWaypointOrder"] = True
 
-    try:
-        response = requests.post(
-            ROUTES_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=settings.ROUTES_API_TIMEOUT,
-        )
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.HTTPError as e:
-        if e.response is not None and e.response.status_code == 429:
-            logger.warning("Routes API rate limit exceeded")
-            return {
-                "error": "リクエストが集中しています。しばらく待ってから再度お試しください。",
-                "error_type": "rate_limit",
-            }
-        logger.exception("Routes API request failed")
-        return {
-            "error": "ルート計算に失敗しました。ネットワークを確認してください。",
-            "error_type": "api_failure",
-        }
-    except requests.RequestException:
-        logger.exception("Routes API request failed")
-        return {
-            "error": "ルート計算に失敗しました。ネットワークを確認してください。",
-            "error_type": "api_failure",
-        }
+    return headers, payload
+
+
+def _routes_error(status_code: int | None) -> dict[str, str]:
+    """Routes API の失敗をエラー辞書に変換する（except 節の中から呼ぶ）。"""
+    if status_code == 429:
+        logger.warning("Routes API rate limit exceeded")
+        return {"error": _RATE_LIMIT_ERROR, "error_type": "rate_limit"}
+    logger.exception("Routes API request failed")
+    return {
+        "error": "ルート計算に失敗しました。ネットワークを確認してください。",
+        "error_type": "api_failure",
+    }
+
 
+def _parse_route(
+    data: dict[str, Any],
+    origin: str,
+    destination: str,
+    waypoints: list[str] | None,
+) -> Route | dict[str, str]:
+    """API レスポンスを Route に変換する。ルートがなければエラーの辞書を返す。"""
     routes = data.get("routes", [])
     if not routes:
+        metrics.upstream_error("routes", "not_found")
         return {
             "error": "ルートが見つかりませんでした。地名を確認してください。",
             "error_type": "not_found",
@@ -221,40 +533,189 @@ def calculate_route(
         waypoints = [waypoints[i] for i in optimized_indices]
 
     # 高速道路料金を取り出す
-    tolls: list[dict[str, str]] = []
     toll_info = (
         route.get("travelAdvisory", {}).get("tollInfo", {}).get("estimatedPrice", [])
     )
-    for price in toll_info:
-        tolls.append(
-            {
-                "currencyCode": price.get("currencyCode", "JPY"),
-                "units": price.get("units", "0"),
-            }
+    tolls = tuple(
+        Toll(
+            currencyCode=price.get("currencyCode", "JPY"),
+            units=price.get("units", "0"),
         )
+        for price in toll_info
+    )
 
     # 経由地の座標を抽出
     # legs 構造: legs[0].endLocation = 1番目の経由地, ..., legs[N-1].endLocation = 目的地
     # 経由地は legs[0] から legs[N-2] まで（最後の leg は目的地なので除外）
-    waypoint_coords: list[dict[str, float]] = []
+    waypoint_coords: list[Coords] = []
     legs = route.get("legs", [])
     if waypoints and len(legs) > 1:
         for leg in legs[:-1]:  # exclude last leg (destination)
             end_location = leg.get("endLocation", {}).get("latLng", {})
             waypoint_coords.append(
-                {
-                    "latitude": end_location.get("latitude", 0),
-                    "longitude": end_location.get("longitude", 0),
-                }
+                Coords(
+                    latitude=end_location.get("latitude", 0),
+                    longitude=end_location.get("longitude", 0),
+                )
             )
 
-    return {
-        "origin": origin,
-        "destination": destination,
-        "waypoints": waypoints or [],
-        "waypoint_coords": waypoint_coords,
-        "duration_seconds": route.get("duration", "0s"),
-        "distance_meters": route.get("distanceMeters", 0),
-        "encoded_polyline": route.get("polyline", {}).get("encodedPolyline", ""),
-        "tolls": tolls,
+    return Route(
+        origin=origin,
+        destination=destination,
+        waypoints=tuple(waypoints or ()),
+        waypoint_coords=tuple(waypoint_coords),
+        duration_seconds=route.get("duration", "0s"),
+        distance_meters=route.get("distanceMeters", 0),
+        encoded_polyline=route.get("polyline", {}).get("encodedPolyline", ""),
+        tolls=tolls,
+    )
+
+
+# ---------------------------------------------------------------------------
+# arank_by_detour
+# ---------------------------------------------------------------------------
+
+
+async def arank_by_detour(
+    origin: str, destination: str, candidates: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """経由地候補に寄り道コストを付与し、寄り道の少ない順に並べる。
+
+    Routes API の computeRouteMatrix を1回だけ呼び出し、
+    出発地→候補・候補→目的地・出発地→目的地の所要時間と距離をまとめて求める。
+    候補ごとに calculate_route を呼ぶ（N 回のルート計算）必要がなくなる。
+
+    Args:
+        origin: 出発地
+        destination: 目的地
+        candidates: 経由地候補のリスト（name / address / coords を持つ辞書）
+
+    Returns:
+        detour_seconds / detour_meters（寄り道による所要時間・距離の増分）を付与した
+        候補のリスト。寄り道の少ない順に並べ、求められなかった候補は None にして末尾に置く。
+        API エラー時も例外は送出せず、全候補を None にして元の順序で返す。
+    """
+    if not candidates:
+        return candidates
+    api_key = _get_api_key()
+    if not api_key:
+        return _apply_detours(candidates, None)
+
+    resolutions = await get_place_store().aget_many([origin, destination])
+    headers, payload = _route_matrix_request(
+        api_key, origin, destination, candidates, resolutions
+    )
+    try:
+        response = await _apost(
+            "routes",
+            settings.ROUTE_MATRIX_API_URL,
+            json=payload,
+            headers=headers,
+            timeout=settings.ROUTES_API_TIMEOUT,
+        )
+        response.raise_for_status()
+        elements = response.json()
+    except (RateLimitExceeded, httpx.HTTPError):
+        logger.exception("Route Matrix API request failed")
+        return _apply_detours(candidates, None)
+
+    return _apply_detours(candidates, _parse_route_matrix(elements))
+
+
+def _candidate_waypoint(candidate: dict[str, Any]) -> dict[str, Any]:
+    """経由地候補を Routes API の Waypoint に変換する（座標 > 住所 > 名前の順に使う）。"""
+    coords = candidate.get("coords")
+    if coords:
+        return {
+            "location": {
+                "latLng": {
+                    "latitude": coords["latitude"],
+                    "longitude": coords["longitude"],
+                }
+            }
+        }
+    return {"address": candidate.get("address") or candidate["name"]}
+
+
+def _route_matrix_request(
+    api_key: str,
+    origin: str,
+    destination: str,
+    candidates: list[dict[str, Any]],
+    resolutions: dict[str, dict[str, Any]],
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """computeRouteMatrix のリクエストヘッダーとボディを組み立てる。
+
+    origins = [出発地, 候補1..N]、destinations = [候補1..N, 目的地] とすることで、
+    出発地→候補i は (0, i)、候補i→目的地 は (i+1, N)、出発地→目的地 は (0, N) の要素になる。
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": api_key,
+        "X-Goog-FieldMask": (
+            "originIndex,destinationIndex,condition,duration,distanceMeters"
+        ),
+    }
+
+    origin_waypoint = _route_waypoint(origin, resolutions)
+    destination_waypoint = _route_waypoint(destination, resolutions)
+    waypoints = [_candidate_waypoint(candidate) for candidate in candidates]
+    payload = {
+        "origins": [
+            {"waypoint": waypoint} for waypoint in [origin_waypoint, *waypoints]
+        ],
+        "destinations": [
+            {"waypoint": waypoint} for waypoint in [*waypoints, destination_waypoint]
+        ],
+        "travelMode": "DRIVE",
+        "routingPreference": "TRAFFIC_AWARE",
+        "departureTime": _departure_time(),
     }
+    return headers, payload
+
+
+def _parse_route_matrix(
+    elements: list[dict[str, Any]],
+) -> dict[tuple[int, int], tuple[int, int]]:
+    """computeRouteMatrix の応答を {(origin_index, destination_index): (秒, メートル)} に変換する。
+
+    ルートが存在しない要素は含めない。インデックスが 0 の場合は応答で省略される。
+    """
+    matrix: dict[tuple[int, int], tuple[int, int]] = {}
+    for element in elements:
+        if element.get("condition") != "ROUTE_EXISTS":
+            continue
+        key = (element.get("originIndex", 0), element.get("destinationIndex", 0))
+        seconds = int(float(element.get("duration", "0s").rstrip("s")))
+        matrix[key] = (seconds, element.get("distanceMeters", 0))
+    return matrix
+
+
+def _apply_detours(
+    candidates: list[dict[str, Any]],
+    matrix: dict[tuple[int, int], tuple[int, int]] | None,
+) -> list[dict[str, Any]]:
+    """候補に detour_seconds / detour_meters を付与し、寄り道の少ない順に並べる。"""
+    n = len(candidates)
+    direct = matrix.get((0, n)) if matrix else None
+
+    ranked = []
+    for i, candidate in enumerate(candidates):
+        to_candidate = matrix.get((0, i)) if matrix else None
+        from_candidate = matrix.get((i + 1, n)) if matrix else None
+        if direct and to_candidate and from_candidate:
+            detour_seconds = to_candidate[0] + from_candidate[0] - direct[0]
+            detour_meters = to_candidate[1] + from_candidate[1] - direct[1]
+        else:
+            detour_seconds = detour_meters = None
+        ranked.append(
+            {
+                **candidate,
+                "detour_seconds": detour_seconds,
+                "detour_meters": detour_meters,
+            }
+        )
+
+    # sort は安定なので、寄り道コストが同じ（または不明な）候補は元の順序を保つ
+    ranked.sort(key=lambda c: (c["detour_seconds"] is None, c["detour_seconds"] or 0))
+    return ranked
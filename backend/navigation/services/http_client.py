@@ -0,0 +1,94 @@
+"""Google Maps API 呼び出し用の共有 HTTP クライアント。
+
+Places API / Routes API へのリクエストはすべてこのモジュールを経由する。
+httpx.AsyncClient を使い回すことで、places.googleapis.com / routes.googleapis.com への
+TCP + TLS ハンドシェイクをツール呼び出しのたびに行わずに済むようにしている
+（Keep-Alive + コネクションプール）。AsyncClient はイベントループに紐づくため、
+イベントループごとに1つ生成する。
+
+設定（settings.py / 環境変数）:
+  - MAPS_HTTP_POOL_MAXSIZE: Keep-Alive で保持する最大コネクション数
+  - MAPS_HTTP_MAX_RETRIES: 接続エラー時のリトライ回数
+  - MAPS_HTTP2_ENABLED: HTTP/2 を有効化する（h2 パッケージがある場合のみ）
+  - MAPS_HTTP_ASYNC_MAX_CONNECTIONS: 最大同時接続数
+
+5xx 応答の再試行（バックオフ付き）は google_maps が retry の "maps" ポリシーで行う。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import weakref
+from collections.abc import Coroutine
+from typing import Any
+
+import httpx
+from django.conf import settings
+
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def _http2_available() -> bool:
+    # h2 は任意の依存（httpx[http2]）のため、import せずに有無だけを調べる
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    """コネクションプールとリトライ設定を持つ AsyncClient を生成する。
+
+    httpx のトランスポートのリトライは接続エラーのみが対象（5xx は google_maps で再試行する）。
+    """
+    http2 = settings.MAPS_HTTP2_ENABLED and _http2_available()
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        retries=settings.MAPS_HTTP_MAX_RETRIES,
+        limits=httpx.Limits(
+            max_connections=settings.MAPS_HTTP_ASYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MAPS_HTTP_POOL_MAXSIZE,
+        ),
+    )
+    return httpx.AsyncClient(transport=transport)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """実行中のイベントループに対応する共有 AsyncClient を返す。"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _build_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+async def apost(url: str, **kwargs: Any) -> httpx.Response:
+    """共有 AsyncClient で POST リクエストを送信する。
+
+    引数は httpx.AsyncClient.post と同じ。
+    """
+    return await get_async_client().post(url, **kwargs)
+
+
+async def aclose_async_client() -> None:
+    """実行中のイベントループの AsyncClient を閉じる。"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def run_sync[T](coro: Coroutine[Any, Any, T]) -> T:
+    """asyncio 版の処理をイベントループの外から実行する（同期版ラッパー用）。
+
+    呼び出しごとに一時的なイベントループで実行し、終了前にそのループの AsyncClient を閉じる
+    （閉じずに捨てるとコネクションが残る）。
+    """
+
+    async def _run() -> T:
+        try:
+            return await coro
+        finally:
+            await aclose_async_client()
+
+    return asyncio.run(_run())
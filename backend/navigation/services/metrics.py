@@ -0,0 +1,256 @@
+"""Prometheus 形式のメトリクス（GET /api/metrics/ で公開する）。
+
+Cloud Run のメトリクスでは見えない、容量計画・コスト配分のための値を記録する。
+
+- 上流 API（"places" / "routes" / "vertex"）ごとのリクエスト数・所要時間のヒストグラム・
+  エラー数（error_type: "rate_limit" / "api_failure" / "not_found"）
+- Gemini の1ターンあたりのトークン数・ツール呼び出し回数と、トークン数の合計
+- キャッシュ（cache.py の名前ごと）のヒット・ミス数（ヒット率は PromQL で求める）
+- 429 の再試行（retry.py のポリシーごと）の回数・待機した秒数の合計・諦めた回数
+- エンドポイントごとのリクエスト数・所要時間
+
+上流 API と Gemini のメトリクスには、呼び出し元のエンドポイント（URL パターン）を
+endpoint ラベルとして付ける（MetricsMiddleware が set_endpoint() で設定する。
+リクエスト外の呼び出しは "none"）。
+
+prometheus_client パッケージがインストールされていなければ何も記録せず、
+/api/metrics/ は 503 を返す。
+gunicorn の複数ワーカーで動かす場合は、環境変数 PROMETHEUS_MULTIPROC_DIR に
+起動時に空にしたディレクトリを指定する（各ワーカーの値をファイル経由で合算して返す）。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client が無い環境では記録しない
+    _ENABLED = False
+else:
+    _ENABLED = True
+
+# 所要時間（秒）のバケット。Vertex AI の応答は数十秒かかることがある
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+# 1ターンあたりのトークン数・ツール呼び出し回数のバケット
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+_FUNCTION_CALL_BUCKETS = (0, 1, 2, 3, 4, 5, 8)
+
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "endpoint", default="none"
+)
+
+
+class _Metrics:
+    """メトリクスの定義（prometheus_client がある場合に1つだけ生成する）。"""
+
+    def __init__(self) -> None:
+        counter = prometheus_client.Counter
+        histogram = prometheus_client.Histogram
+        self.http_requests = counter(
+            "yorimichi_http_requests",
+            "API へのリクエスト数",
+            ["endpoint", "method", "status"],
+        )
+        self.http_duration = histogram(
+            "yorimichi_http_request_duration_seconds",
+            "API のリクエストの所要時間",
+            ["endpoint"],
+            buckets=_LATENCY_BUCKETS,
+        )
+        self.upstream_requests = counter(
+            "yorimichi_upstream_requests",
+            "上流 API へのリクエスト数",
+            ["upstream", "endpoint"],
+        )
+        self.upstream_errors = counter(
+            "yorimichi_upstream_errors",
+            "上流 API のエラー数",
+            ["upstream", "endpoint", "error_type"],
+        )
+        self.upstream_duration = histogram(
+            "yorimichi_upstream_request_duration_seconds",
+            "上流 API のリクエストの所要時間",
+            ["upstream"],
+            buckets=_LATENCY_BUCKETS,
+        )
+        self.gemini_tokens = counter(
+            "yorimichi_gemini_tokens",
+            "Gemini のトークン数の合計",
+            ["endpoint", "kind"],
+        )
+        self.gemini_turn_tokens = histogram(
+            "yorimichi_gemini_turn_tokens",
+            "Gemini の1ターンあたりのトークン数",
+            ["endpoint", "kind"],
+            buckets=_TOKEN_BUCKETS,
+        )
+        self.gemini_turn_function_calls = histogram(
+            "yorimichi_gemini_turn_function_calls",
+            "Gemini の1ターンあたりのツール呼び出し回数",
+            ["endpoint"],
+            buckets=_FUNCTION_CALL_BUCKETS,
+        )
+        self.cache_requests = counter(
+            "yorimichi_cache_requests",
+            "キャッシュの参照数",
+            ["cache", "result"],
+        )
+        self.retries = counter(
+            "yorimichi_retries",
+            "429 を受けて再試行した回数",
+            ["policy"],
+        )
+        self.retry_sleep = counter(
+            "yorimichi_retry_sleep_seconds",
+            "再試行の前に待機した秒数の合計",
+            ["policy"],
+        )
+        self.retry_gave_up = counter(
+            "yorimichi_retry_gave_up",
+            "再試行を諦めた回数（試行回数・期限の上限、FAIL_FAST）",
+            ["policy"],
+        )
+
+
+_metrics = _Metrics() if _ENABLED else None
+
+
+def available() -> bool:
+    """メトリクスを記録しているか（prometheus_client がインストールされているか）を返す。"""
+    return _metrics is not None
+
+
+def set_endpoint(endpoint: str) -> contextvars.Token[str]:
+    """以降の記録に付ける endpoint ラベルを設定する（リクエストの開始時に呼ぶ）。"""
+    return _endpoint.set(endpoint)
+
+
+def reset_endpoint(token: contextvars.Token[str]) -> None:
+    _endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+
+def observe_http_request(
+    endpoint: str, method: str, status: int, seconds: float
+) -> None:
+    if _metrics is None:
+        return
+    _metrics.http_requests.labels(endpoint, method, str(status)).inc()
+    _metrics.http_duration.labels(endpoint).observe(seconds)
+
+
+def error_type(status_code: int | None) -> str | None:
+    """上流 API の HTTP ステータスをエラーの種類に変換する（成功なら None）。"""
+    if status_code is not None and status_code < 400:
+        return None
+    if status_code == 429:
+        return "rate_limit"
+    if status_code == 404:
+        return "not_found"
+    return "api_failure"
+
+
+def upstream_error(upstream: str, kind: str) -> None:
+    """上流 API のエラーを記録する（送信前のレート制限や、結果が見つからなかった場合など）。"""
+    if _metrics is None:
+        return
+    _metrics.upstream_errors.labels(upstream, _endpoint.get(), kind).inc()
+
+
+class UpstreamRequest:
+    """upstream_request() のブロック内で送った1回のリクエスト。"""
+
+    __slots__ = ("status_code",)
+
+    def __init__(self) -> None:
+        self.status_code: int | None = None
+
+    def observe(self, status_code: int) -> None:
+        """HTTP レスポンスのステータスコードを記録する。"""
+        self.status_code = status_code
+
+
+@contextmanager
+def upstream_request(upstream: str) -> Iterator[UpstreamRequest]:
+    """上流 API へのリクエストの回数・所要時間・エラーを記録する。
+
+    ブロック内で送出された例外は、HTTP ステータスに相当する code 属性
+    （google.api_core の例外など）があればそれで、なければ "api_failure" として記録する。
+    """
+    request = UpstreamRequest()
+    start = time.perf_counter()
+    try:
+        yield request
+    except Exception as e:
+        code = getattr(e, "code", None)
+        kind = error_type(code) if isinstance(code, int) else None
+        upstream_error(upstream, kind or "api_failure")
+        raise
+    else:
+        # ステータスを記録しない呼び出し（Vertex AI の SDK）は、例外がなければ成功とする
+        if isinstance(request.status_code, int):
+            kind = error_type(request.status_code)
+            if kind is not None:
+                upstream_error(upstream, kind)
+    finally:
+        if _metrics is not None:
+            _metrics.upstream_requests.labels(upstream, _endpoint.get()).inc()
+            _metrics.upstream_duration.labels(upstream).observe(
+                time.perf_counter() - start
+            )
+
+
+def observe_gemini_turn(
+    prompt_tokens: int, output_tokens: int, function_calls: int
+) -> None:
+    """Gemini の1ターン分のトークン数・ツール呼び出し回数を記録する。"""
+    if _metrics is None:
+        return
+    endpoint = _endpoint.get()
+    for kind, tokens in (("prompt", prompt_tokens), ("output", output_tokens)):
+        _metrics.gemini_tokens.labels(endpoint, kind).inc(tokens)
+        _metrics.gemini_turn_tokens.labels(endpoint, kind).observe(tokens)
+    _metrics.gemini_turn_function_calls.labels(endpoint).observe(function_calls)
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+    if _metrics is None:
+        return
+    _metrics.cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_retry(policy: str, delay: float) -> None:
+    """再試行を1回記録する（delay は次の試行までに待つ秒数）。"""
+    if _metrics is None:
+        return
+    _metrics.retries.labels(policy).inc()
+    _metrics.retry_sleep.labels(policy).inc(delay)
+
+
+def observe_retry_give_up(policy: str) -> None:
+    if _metrics is None:
+        return
+    _metrics.retry_gave_up.labels(policy).inc()
+
+
+def render() -> tuple[bytes, str]:
+    """Prometheus のテキスト形式の本文と Content-Type を返す。
+
+    PROMETHEUS_MULTIPROC_DIR が設定されていれば、全ワーカーの値を合算する。
+    """
+    registry: Any = prometheus_client.REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    body = prometheus_client.generate_latest(registry)
+    return body, prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,188 @@
+"""住所 → Place ID・座標の解決結果を保存する永続ストア（SQLite）。
+
+calculate_route は出発地・目的地・経由地を自由入力の住所文字列のまま Routes API に送るため、
+Google 側で毎回ジオコーディングが行われる。search_places で取得済みの Places API の結果から
+「正規化した住所（formattedAddress）→ Place ID・緯度経度」の対応を保存しておき、
+同じ住所が渡された場合は Routes API に placeId で地点を渡す
+（ジオコーディングを省き、結果も呼び出しごとに揺れない）。
+
+スポット名（displayName）はチェーン店などで別の場所と重なるため、キーにしない
+（名前だけで渡された地点はこれまでどおり住所文字列として送る）。
+
+保存先は settings.PLACE_STORE_PATH の SQLite ファイル（既定はアプリの DB とは別の
+place_store.sqlite3）。エントリは settings.PLACE_STORE_TTL 秒で失効する
+（Google Maps Platform の規約上、緯度経度のキャッシュは30日まで）。
+SQLite へのアクセスはブロッキング I/O のため、イベントループ上からは aget_many / aput_many
+（asyncio.to_thread で実行する）を使う。
+
+SQLite を開けない環境（読み取り専用のファイルシステム等）では警告を記録し、
+何も保存しない（地名はこれまでどおり住所文字列で送られる）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.conf import settings
+
+from .cache import connect_sqlite, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# キーは正規化した formattedAddress（スポット名をキーにしていた旧テーブル place_resolution は使わない）
+_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS address_resolution (
+    key TEXT PRIMARY KEY,
+    place_id TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+class PlaceStore:
+    """住所の解決結果（{"place_id", "latitude", "longitude"}）を保存する SQLite ストア。
+
+    1つの接続をロックで保護して使い回す（スレッドセーフ）。
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._unavailable = False
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """接続を返す（ロック取得済みで呼ぶ）。開けない場合は None を返す。"""
+        if self._conn is None and not self._unavailable:
+            try:
+                conn = connect_sqlite(self._path)
+                conn.execute(_SCHEMA)
+            except sqlite3.Error:
+                logger.warning(
+                    "Place store is unavailable (%s); place names are sent as addresses",
+                    self._path,
+                    exc_info=True,
+                )
+                self._unavailable = True
+                return None
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, names: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """地名（住所）ごとの解決結果を返す。未登録・期限切れの地名は含めない。
+
+        Returns:
+            {元の地名: {"place_id", "latitude", "longitude"}} の辞書
+        """
+        keys = {name: normalize_query(name) for name in names}
+        if not keys:
+            return {}
+
+        unique_keys = list(set(keys.values()))
+        placeholders = ",".join("?" * len(unique_keys))
+        query = (
+            "SELECT key, place_id, latitude, longitude FROM address_resolution "
+            f"WHERE key IN ({placeholders}) AND expires_at > ?"
+        )
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return {}
+            try:
+                rows = conn.execute(query, [*unique_keys, time.time()]).fetchall()
+            except sqlite3.Error:
+                logger.warning("Failed to read place store", exc_info=True)
+                return {}
+
+        found = {
+            key: {"place_id": place_id, "latitude": latitude, "longitude": longitude}
+            for key, place_id, latitude, longitude in rows
+        }
+        return {name: found[key] for name, key in keys.items() if key in found}
+
+    def get(self, name: str) -> dict[str, Any] | None:
+        """地名の解決結果を返す。未登録・期限切れの場合は None を返す。"""
+        return self.get_many([name]).get(name)
+
+    async def aget_many(self, names: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """get_many の asyncio 版（SQLite へのアクセスは別スレッドで行う）。"""
+        return await asyncio.to_thread(self.get_many, list(names))
+
+    def put_many(self, entries: Iterable[tuple[str, dict[str, Any]]]) -> None:
+        """(住所, 解決結果) を保存する。同じ住所は上書きし、TTL を延長する。"""
+        expires_at = time.time() + self._ttl
+        rows = [
+            (
+                normalize_query(name),
+                resolution["place_id"],
+                resolution["latitude"],
+                resolution["longitude"],
+                expires_at,
+            )
+            for name, resolution in entries
+            if name
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute("BEGIN")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO address_resolution VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    # 期限切れのエントリはここでまとめて削除する
+                    conn.execute(
+                        "DELETE FROM address_resolution WHERE expires_at <= ?",
+                        (time.time(),),
+                    )
+            except sqlite3.Error:
+                logger.warning("Failed to write place store", exc_info=True)
+
+    async def aput_many(self, entries: Iterable[tuple[str, dict[str, Any]]]) -> None:
+        """put_many の asyncio 版（SQLite へのアクセスは別スレッドで行う）。"""
+        await asyncio.to_thread(self.put_many, list(entries))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store: PlaceStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_place_store() -> PlaceStore:
+    """プロセス共有の PlaceStore を返す（初回呼び出し時に生成）。"""
+    global _store  # noqa: PLW0603
+    with _store_lock:
+        if _store is None:
+            _store = PlaceStore(
+                path=str(settings.PLACE_STORE_PATH), ttl=settings.PLACE_STORE_TTL
+            )
+        return _store
+
+
+def reset_place_store() -> None:
+    """共有 PlaceStore を閉じる。次回の get_place_store() で設定から再生成される。"""
+    global _store  # noqa: PLW0603
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,178 @@
+"""Google Encoded Polyline の変換と簡略化。
+
+Routes API が返す encoded_polyline は全地点を含むため、長距離のルートでは
+レスポンスが大きくなり、クライアントのデコードにも時間がかかる。
+クライアントが指定した地図のズームレベルで見分けがつかない点を Douglas–Peucker 法で間引き、
+指定した精度（小数点以下の桁数）で再エンコードして返せるようにする。
+
+- simplify_polyline: ズームレベルに応じて簡略化し、指定精度で再エンコードする
+- polyline_levels: 複数のズームレベルについて簡略化したポリラインを粗い順に返す
+  （クライアントは粗い線を先に描画し、詳細な線に差し替えられる）
+
+点数は長距離ルートでも数千点程度なので、NumPy は使わず純 Python で計算する。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Sequence
+
+from .domain import PolylineLevel
+
+# Routes API が返すポリラインの精度（小数点以下5桁）
+DEFAULT_PRECISION = 5
+
+LatLng = tuple[float, float]
+
+
+def decode(encoded: str, precision: int = DEFAULT_PRECISION) -> list[LatLng]:
+    """Encoded Polyline を (緯度, 経度) のリストに変換する。"""
+    factor = 10**precision
+    points: list[LatLng] = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def _quantize(points: Iterable[LatLng], precision: int) -> list[tuple[int, int]]:
+    """座標を precision 桁の整数に丸める。
+
+    JavaScript の Math.round と同じく 0.5 は切り上げる（Python の round は偶数丸め）。
+    """
+    factor = 10**precision
+    return [
+        (math.floor(lat * factor + 0.5), math.floor(lng * factor + 0.5))
+        for lat, lng in points
+    ]
+
+
+def _encode_ints(points: Iterable[tuple[int, int]]) -> str:
+    chunks = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        chunks.append(_encode_value(lat - prev_lat))
+        chunks.append(_encode_value(lng - prev_lng))
+        prev_lat, prev_lng = lat, lng
+    return "".join(chunks)
+
+
+def encode(points: Iterable[LatLng], precision: int = DEFAULT_PRECISION) -> str:
+    """(緯度, 経度) のリストを Encoded Polyline に変換する。"""
+    return _encode_ints(_quantize(points, precision))
+
+
+def zoom_tolerance(zoom: int) -> float:
+    """ズームレベル zoom の地図で1ピクセルに相当する角度（度）を返す。
+
+    Web メルカトルでは、ズーム z で世界全体（経度360度）が 256 * 2^z ピクセルになる。
+    """
+    return 360 / (256 * 2**zoom)
+
+
+def _segment_distance(
+    point: LatLng, start: LatLng, end: LatLng, lng_scale: float
+) -> float:
+    """点と線分の距離（度。経度は lng_scale 倍して緯度と同じ縮尺にする）。"""
+    px, py = point[1] * lng_scale, point[0]
+    ax, ay = start[1] * lng_scale, start[0]
+    bx, by = end[1] * lng_scale, end[0]
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify(points: Sequence[LatLng], tolerance: float) -> list[LatLng]:
+    """Douglas–Peucker 法で、形状の誤差が tolerance（度）以内になるよう点を間引く。
+
+    始点・終点は必ず残す。再帰の代わりに明示的なスタックを使う（点数が多くても深さ制限に達しない）。
+    """
+    if len(points) <= 2 or tolerance <= 0:
+        return list(points)
+
+    # 経度1度の長さは緯度によって変わるため、ルートの平均緯度で縮尺をそろえる
+    mean_lat = sum(lat for lat, _ in points) / len(points)
+    lng_scale = math.cos(math.radians(mean_lat))
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance = 0.0
+        index = first
+        for i in range(first + 1, last):
+            distance = _segment_distance(
+                points[i], points[first], points[last], lng_scale
+            )
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+        if max_distance > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep, strict=True) if kept]
+
+
+def _reencode(points: Sequence[LatLng], zoom: int | None, precision: int) -> str:
+    if zoom is not None:
+        points = simplify(points, zoom_tolerance(zoom))
+    # 精度を下げて同じ座標になった連続する点は1つにまとめる
+    quantized = _quantize(points, precision)
+    deduped = [p for i, p in enumerate(quantized) if i == 0 or p != quantized[i - 1]]
+    return _encode_ints(deduped)
+
+
+def simplify_polyline(
+    encoded: str,
+    zoom: int | None = None,
+    precision: int = DEFAULT_PRECISION,
+) -> str:
+    """ポリラインをズームレベル zoom 向けに簡略化し、precision 桁で再エンコードする。
+
+    zoom が None なら簡略化せず、精度だけを変える。
+    """
+    if not encoded or (zoom is None and precision == DEFAULT_PRECISION):
+        return encoded
+    return _reencode(decode(encoded), zoom, precision)
+
+
+def polyline_levels(
+    encoded: str,
+    zooms: Iterable[int],
+    precision: int = DEFAULT_PRECISION,
+) -> list[PolylineLevel]:
+    """複数のズームレベル向けに簡略化したポリラインを、粗い（ズームが小さい）順に返す。"""
+    points = decode(encoded) if encoded else []
+    return [
+        PolylineLevel(zoom=zoom, encoded_polyline=_reencode(points, zoom, precision))
+        for zoom in sorted(set(zooms))
+    ]
@@ -0,0 +1,273 @@
+"""上流 API（Places API / Routes API / Vertex AI Gemini）ごとのクライアント側レート制限。
+
+アクセスが集中するとクォータを超えたリクエストが 429 で失敗し、再試行がさらに 429 を招く。
+上流ごとに1つの RateLimiter をプロセス内で共有し、リクエストを送る前に枠を取る。
+
+- トークンバケット: 1秒あたり <NAME>_RATE_LIMIT_QPS 件、最大 <NAME>_RATE_LIMIT_BURST 件まで
+  まとめて送る（QPS が 0 なら件数は制限しない）
+- AIMD による同時実行数の調整: 上限は <NAME>_MAX_CONCURRENCY から始め、429 を受けたら半分
+  （最小1）に下げ、成功するたびに 1/上限 ずつ（上限と同じ数の成功でおよそ1）戻す。
+  下げた時点より前に送ったリクエストの 429 は数えない（同じバーストの 429 で何度も下げない）
+- 枠が空くのを待っているコルーチン（aacquire / aslot）は到着順（FIFO）に枠を取る
+- 枠が空くまでの待ち時間は RATE_LIMIT_QUEUE_TIMEOUT 秒まで。それまでに取れなければ
+  RateLimitExceeded を送出する（呼び出し元は 429 と同じエラーとして扱う）
+
+<NAME> は get_limiter() に渡す名前（"places" / "routes" / "gemini"）の大文字。
+制限はプロセス（gunicorn のワーカー）ごとにかかるため、クォータはワーカー数で割って設定する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from django.conf import settings
+
+
+class RateLimitExceeded(Exception):
+    """待ち時間の上限までにレート制限の枠を取れなかった。"""
+
+
+class Permit:
+    """RateLimiter から取った1回分の枠。"""
+
+    __slots__ = ("is_failed", "is_throttled", "started_at")
+
+    def __init__(self, started_at: float) -> None:
+        self.started_at = started_at
+        self.is_throttled = False
+        self.is_failed = False
+
+    def throttled(self) -> None:
+        """上流から 429（クォータ超過）を受けたことを記録する。"""
+        self.is_throttled = True
+
+    def failed(self) -> None:
+        """例外にならなかった上流のエラー（5xx など）を記録する。"""
+        self.is_failed = True
+
+    def observe(self, status_code: int) -> None:
+        """HTTP レスポンスのステータスコードを記録する（429 / 5xx は成功に数えない）。"""
+        if status_code == 429:
+            self.throttled()
+        elif status_code >= 500:
+            self.failed()
+
+
+def _set_done(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _AsyncWaiter:
+    """aacquire で枠が空くのを待っているコルーチン。別スレッドの release からも起こせる。"""
+
+    __slots__ = ("_future", "_loop")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._future: asyncio.Future[None] | None = None
+
+    def arm(self) -> asyncio.Future[None]:
+        """次に起こされるまで待つための Future を作る（ロック取得済みで呼ぶ）。"""
+        self._future = self._loop.create_future()
+        return self._future
+
+    def wake(self) -> None:
+        """待っているコルーチンを起こす（ロック取得済みで呼ぶ）。"""
+        future = self._future
+        if future is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(_set_done, future)
+        except RuntimeError:
+            # イベントループが閉じられている
+            pass
+
+
+class RateLimiter:
+    """トークンバケットと AIMD で上流へのリクエストを制限する（スレッドセーフ）。"""
+
+    def __init__(
+        self,
+        name: str,
+        qps: float,
+        burst: int,
+        max_concurrency: int,
+        queue_timeout: float,
+    ) -> None:
+        self.name = name
+        self._qps = qps
+        self._burst = max(burst, 1)
+        self._max_limit = max(max_concurrency, 1)
+        self._limit = float(self._max_limit)
+        self._queue_timeout = queue_timeout
+        self._tokens = float(self._burst)
+        self._updated_at = time.monotonic()
+        self._in_flight = 0
+        self._decreased_at = -math.inf
+        self._lock = threading.Lock()
+        self._waiters: deque[_AsyncWaiter] = deque()
+        self.throttled = 0
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限。"""
+        return int(self._limit)
+
+    def _try_acquire(self, now: float) -> float | None:
+        """枠を取る（ロック取得済みで呼ぶ）。取れなければ次に試すまでの秒数を返す。"""
+        if self._qps > 0:
+            elapsed = now - self._updated_at
+            self._tokens = min(self._burst, self._tokens + elapsed * self._qps)
+            self._updated_at = now
+        if self._in_flight >= int(self._limit):
+            # 実行中のリクエストが終わるまで待つ
+            return math.inf
+        if self._qps > 0:
+            if self._tokens < 1:
+                return (1 - self._tokens) / self._qps
+            self._tokens -= 1
+        self._in_flight += 1
+        return None
+
+    def _reject(self) -> RateLimitExceeded:
+        self.rejected += 1
+        msg = f"Rate limit queue timeout for {self.name}"
+        return RateLimitExceeded(msg)
+
+    async def aacquire(self) -> Permit:
+        """枠を取る。空くまで待ち、待ち時間の上限を過ぎたら RateLimitExceeded を送出する。
+
+        待機中もイベントループをブロックしない。
+
+        待っているコルーチンは到着順に並び、先頭だけが枠を取りにいく。先頭は枠が返されたとき
+        （release）か、トークンが補充されるまでのタイマーが切れたときに起こされる。
+        """
+        deadline = time.monotonic() + self._queue_timeout
+        waiter: _AsyncWaiter | None = None
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    if waiter is None:
+                        is_head = not self._waiters
+                    else:
+                        is_head = self._waiters[0] is waiter
+                    wait = math.inf
+                    if is_head:
+                        wait = self._try_acquire(now)
+                        if wait is None:
+                            return Permit(now)
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._reject()
+                    if waiter is None:
+                        waiter = _AsyncWaiter(asyncio.get_running_loop())
+                        self._waiters.append(waiter)
+                    future = waiter.arm()
+                await asyncio.wait([future], timeout=min(wait, remaining))
+        finally:
+            if waiter is not None:
+                with self._lock:
+                    was_head = self._waiters[0] is waiter
+                    self._waiters.remove(waiter)
+                    # 次の待機者も枠を取れるかもしれない（取れなければまた待つ）
+                    if was_head:
+                        self._wake_next()
+
+    def _wake_next(self) -> None:
+        """待っている先頭のコルーチンを起こす（ロック取得済みで呼ぶ）。"""
+        if self._waiters:
+            self._waiters[0].wake()
+
+    def release(self, permit: Permit, *, succeeded: bool) -> None:
+        """枠を返し、結果に応じて同時実行数の上限を調整する。
+
+        429 を受けた場合は上限を半分にし、成功した場合は少しずつ戻す。
+        それ以外の失敗（ネットワークエラーなど）では上限を変えない。
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if permit.is_throttled:
+                self.throttled += 1
+                if permit.started_at >= self._decreased_at:
+                    self._limit = max(1.0, self._limit / 2)
+                    self._decreased_at = time.monotonic()
+                    # しばらく新しいリクエストを送らないよう、貯まったトークンも捨てる
+                    self._tokens = 0.0
+            elif succeeded:
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+            self._wake_next()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[Permit]:
+        """枠を取ってブロック内の処理を実行し、終了時に返す。
+
+        ブロックが例外で終わった場合と、permit に 429 / 5xx を記録した場合は失敗として返す。
+        """
+        permit = await self.aacquire()
+        succeeded = False
+        try:
+            yield permit
+            succeeded = not (permit.is_throttled or permit.is_failed)
+        finally:
+            self.release(permit, succeeded=succeeded)
+
+    def stats(self) -> dict[str, Any]:
+        """同時実行数の上限・実行中の数・429 の回数・待ち切れなかった回数を返す。"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "throttled": self.throttled,
+                "rejected": self.rejected,
+            }
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _build_limiter(name: str) -> RateLimiter:
+    """settings の <NAME>_RATE_LIMIT_* / <NAME>_MAX_CONCURRENCY から生成する。"""
+    prefix = name.upper()
+    return RateLimiter(
+        name,
+        qps=getattr(settings, f"{prefix}_RATE_LIMIT_QPS", 0),
+        burst=getattr(settings, f"{prefix}_RATE_LIMIT_BURST", 1),
+        max_concurrency=getattr(settings, f"{prefix}_MAX_CONCURRENCY", 10),
+        queue_timeout=settings.RATE_LIMIT_QUEUE_TIMEOUT,
+    )
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """名前に対応する RateLimiter を返す（初回呼び出し時に生成）。"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _build_limiter(name)
+                _limiters[name] = limiter
+    return limiter
+
+
+def limiter_stats() -> dict[str, dict[str, Any]]:
+    """生成済みの全 RateLimiter の状態を返す。"""
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return {name: limiter.stats() for name, limiter in items}
+
+
+def reset_limiters() -> None:
+    """全 RateLimiter を破棄する。次回の get_limiter() で設定から再生成される。"""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,210 @@
+"""上流 API のクォータ超過（429）・一時的な障害に対する再試行ポリシー。
+
+Gemini の asend_message / asuggest_waypoints とストリーミング版は "gemini" ポリシーで 429 を、
+Places API / Routes API の呼び出しは "maps" ポリシーで 5xx を再試行する。
+固定の 1, 2, 4 秒待ちの代わりに以下を行う:
+
+- ジッター付き指数バックオフ: n 回目の待ち時間は 0〜min(MAX_DELAY, BASE_DELAY * 2^n) 秒の一様乱数
+  （同時に 429 を受けたリクエストが同じタイミングで再送しないようにする）
+- サーバーが再試行までの時間を指定した場合（gRPC の RetryInfo / HTTP の Retry-After）はそれに従う
+- リクエスト全体の期限: 最初の試行から DEADLINE 秒を過ぎる待ち時間になる場合は再試行しない
+- FAIL_FAST: 待たずに諦め、呼び出し元の縮退応答（混雑メッセージ・キャッシュ済みの提案など）を返す
+- asyncio.sleep で待つ（イベントループをブロックしない）
+
+設定は settings の <NAME>_RETRY_MAX_ATTEMPTS / <NAME>_RETRY_BASE_DELAY / <NAME>_RETRY_MAX_DELAY /
+<NAME>_RETRY_DEADLINE / <NAME>_RETRY_FAIL_FAST から読み取る。
+再試行回数・待機時間・諦めた回数は retry_stats()（プロセス内）で参照でき、
+metrics の yorimichi_retries / yorimichi_retry_sleep_seconds / yorimichi_retry_gave_up にも記録する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after(error: BaseException) -> float | None:
+    """エラーに含まれる再試行までの待ち時間（秒）を返す。指定がなければ None を返す。
+
+    google.api_core の例外は gRPC の RetryInfo を details に、
+    REST の場合は HTTP レスポンスを response に持つ。
+    """
+    for detail in getattr(error, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "ToTimedelta"):
+            return delay.ToTimedelta().total_seconds()
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP-date 形式（例: "Wed, 21 Oct 2015 07:28:00 GMT"）
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (at - datetime.now(tz=UTC)).total_seconds())
+
+
+class RetryPolicy:
+    """ジッター付き指数バックオフ・全体の期限・Retry-After に従う再試行ポリシー（スレッドセーフ）。"""
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float,
+        fail_fast: bool = False,
+    ) -> None:
+        self.name = name
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.fail_fast = fail_fast
+        self.retries = 0
+        self.gave_up = 0
+        self.sleep_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def begin(self) -> RetryState:
+        """1リクエスト分の再試行の状態を返す（期限はこの時点から数える）。"""
+        return RetryState(self, time.monotonic() + self.deadline)
+
+    async def acall[T](
+        self,
+        fn: Callable[[], Awaitable[T]],
+        retry_on: tuple[type[BaseException], ...],
+    ) -> T:
+        """fn() を呼び、retry_on の例外は待ってから再試行する。
+
+        再試行しない（回数・期限の上限、FAIL_FAST）場合は最後の例外をそのまま送出する。
+        """
+        state = self.begin()
+        while True:
+            try:
+                return await fn()
+            except retry_on as e:
+                delay = state.backoff(e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def _record_retry(self, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.sleep_seconds += delay
+        metrics.observe_retry(self.name, delay)
+
+    def _record_give_up(self) -> None:
+        with self._lock:
+            self.gave_up += 1
+        metrics.observe_retry_give_up(self.name)
+
+    def stats(self) -> dict[str, Any]:
+        """再試行回数・待機した合計秒数・再試行を諦めた回数を返す。"""
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "sleep_seconds": self.sleep_seconds,
+                "gave_up": self.gave_up,
+            }
+
+
+class RetryState:
+    """1リクエスト分の再試行の状態（試行回数と期限）。"""
+
+    __slots__ = ("_deadline", "_policy", "attempt")
+
+    def __init__(self, policy: RetryPolicy, deadline: float) -> None:
+        self._policy = policy
+        self._deadline = deadline
+        self.attempt = 0
+
+    def backoff(self, error: BaseException) -> float | None:
+        """失敗した試行を記録し、次の試行までの待ち時間（秒）を返す。
+
+        再試行しない場合は None を返す。呼び出し元は返された秒数だけ待ってから再試行する。
+        """
+        policy = self._policy
+        self.attempt += 1
+        if policy.fail_fast or self.attempt >= policy.max_attempts:
+            policy._record_give_up()
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            cap = min(policy.max_delay, policy.base_delay * 2 ** (self.attempt - 1))
+            delay = random.uniform(0, cap)
+        if time.monotonic() + delay > self._deadline:
+            policy._record_give_up()
+            return None
+        policy._record_retry(delay)
+        logger.warning(
+            "%s request failed, retrying in %.2fs (attempt %d/%d)",
+            policy.name,
+            delay,
+            self.attempt,
+            policy.max_attempts,
+        )
+        return delay
+
+
+_policies: dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def _build_policy(name: str) -> RetryPolicy:
+    """settings の <NAME>_RETRY_* から生成する。"""
+    prefix = name.upper()
+    return RetryPolicy(
+        name,
+        max_attempts=getattr(settings, f"{prefix}_RETRY_MAX_ATTEMPTS", 3),
+        base_delay=getattr(settings, f"{prefix}_RETRY_BASE_DELAY", 1.0),
+        max_delay=getattr(settings, f"{prefix}_RETRY_MAX_DELAY", 8.0),
+        deadline=getattr(settings, f"{prefix}_RETRY_DEADLINE", 10.0),
+        fail_fast=getattr(settings, f"{prefix}_RETRY_FAIL_FAST", False),
+    )
+
+
+def get_policy(name: str) -> RetryPolicy:
+    """名前に対応する RetryPolicy を返す（初回呼び出し時に生成）。"""
+    policy = _policies.get(name)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(name)
+            if policy is None:
+                policy = _build_policy(name)
+                _policies[name] = policy
+    return policy
+
+
+def retry_stats() -> dict[str, dict[str, Any]]:
+    """生成済みの全 RetryPolicy の統計を返す。"""
+    with _policies_lock:
+        items = list(_policies.items())
+    return {name: policy.stats() for name, policy in items}
+
+
+def reset_policies() -> None:
+    """全 RetryPolicy を破棄する。次回の get_policy() で設定から再生成される。"""
+    with _policies_lock:
+        _policies.clear()
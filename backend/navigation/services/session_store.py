@@ -0,0 +1,75 @@
+"""チャットの会話履歴をサーバー側で保持するセッションストア。
+
+/chat/ は通常、フロントエンドが会話履歴（history）を毎回送る。リクエストに session_id を
+指定した場合は、サーバー側に保存した履歴（Function Calling の呼び出し・結果を含む Content）
+を使うため、クライアントは新しいメッセージだけを送ればよい。リクエストサイズ・検証・
+Content への変換のコストが会話の長さに比例して増えなくなる。
+
+保存先は cache モジュールのバックエンドを使い、settings の CHAT_SESSIONS_CACHE_* で選ぶ:
+  - "memory": プロセス内 LRU（既定。Cloud Run の複数インスタンス間では共有されない）
+  - "sqlite" / "tiered": SQLite ファイル（settings.MAPS_CACHE_SQLITE_PATH）
+  - "django": Django のキャッシュ（REDIS_URL を設定すれば Redis で共有できる）
+  - "none": 保存しない（毎回新しいセッションとして扱われる）
+
+同じセッションに同時にリクエストした場合は、後に完了した方の履歴で上書きされる。
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+from google.protobuf import json_format
+from vertexai.generative_models import Content
+
+from .cache import MISSING, get_cache
+
+_CACHE_NAME = "chat_sessions"
+
+
+def new_session_id() -> str:
+    """推測されにくいセッション ID を生成する。"""
+    return uuid.uuid4().hex
+
+
+def _dump_content(content: Content) -> dict[str, Any]:
+    # Content.to_dict() は proto-plus の非推奨引数を使うため、protobuf から直接変換する
+    raw = content._raw_content
+    return json_format.MessageToDict(
+        type(raw).pb(raw), preserving_proto_field_name=True
+    )
+
+
+def _cache_key(session_id: str) -> str:
+    return get_cache(_CACHE_NAME).key(session_id)
+
+
+def load_session(session_id: str) -> list[Content] | None:
+    """保存済みの会話履歴を返す。存在しないか期限切れの場合は None を返す。"""
+    stored = get_cache(_CACHE_NAME).get(_cache_key(session_id))
+    if stored is MISSING:
+        return None
+    return [Content.from_dict(content) for content in stored]
+
+
+def save_session(session_id: str, contents: list[Content]) -> None:
+    """会話履歴を保存する。
+
+    長さは保存前に制限しない（次回の送信時に gemini._compact_history で圧縮される）。
+    """
+    stored = [_dump_content(content) for content in contents]
+    get_cache(_CACHE_NAME).set(_cache_key(session_id), stored)
+
+
+async def aload_session(session_id: str) -> list[Content] | None:
+    """load_session の asyncio 版。"""
+    stored = await get_cache(_CACHE_NAME).aget(_cache_key(session_id))
+    if stored is MISSING:
+        return None
+    return [Content.from_dict(content) for content in stored]
+
+
+async def asave_session(session_id: str, contents: list[Content]) -> None:
+    """save_session の asyncio 版。"""
+    stored = [_dump_content(content) for content in contents]
+    await get_cache(_CACHE_NAME).aset(_cache_key(session_id), stored)
@@ -0,0 +1,80 @@
+"""同じ Google Maps API 呼び出しの同時実行をまとめる（single-flight）。
+
+テレビでスポットが紹介された直後などは、同じ検索・同じルートのリクエストが同時に届き、
+結果がキャッシュに載る前にそれぞれが有料の API を呼んでしまう。
+キャッシュミスした呼び出しをキャッシュキーごとに1回にまとめ、待っていた呼び出しにも同じ結果を返す。
+
+- プロセス内: 同じキーを呼び出し中なら、後から来たタスクは先行の呼び出しの完了を待ち、
+  その結果（エラーを含む）を共有する
+- プロセス間: キャッシュのバックエンドが複数プロセスで共有される場合（"sqlite" / "tiered" / "django"）は
+  キャッシュにロックを置く。ロックを取れなかったワーカーは、結果がキャッシュに載るのを待って使う。
+  ロックは settings.MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT 秒で失効し、それまでに結果が載らなければ
+  自分で API を呼ぶ（ロックを持ったワーカーが落ちても待ち続けない）。
+  エラーはキャッシュしないため、先行がエラーになった場合も待っていたワーカーは自分で呼び直す。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from django.conf import settings
+
+from .cache import MISSING, ResultCache
+
+# 他のワーカーの結果がキャッシュに載ったかを確認する間隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+_tasks: dict[str, asyncio.Task[Any]] = {}
+
+
+async def ado[T](cache: ResultCache, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+    """cache の key に保存される結果を取得する fetch() を、同じ key の呼び出しと1回にまとめて実行する。
+
+    fetch は API を呼び、成功した結果を cache の key に保存するコルーチン関数。
+    呼び出し元で cache.get(key) がミスした後に呼ぶ。
+    呼び出しは別タスクで実行するため、最初の呼び出し元がキャンセルされても
+    待っている他の呼び出し元には結果が返る。
+    """
+    loop = asyncio.get_running_loop()
+    task = _tasks.get(key)
+    if task is None or task.get_loop() is not loop:
+        task = loop.create_task(_afetch_locked(cache, key, fetch))
+        _tasks[key] = task
+        task.add_done_callback(functools.partial(_forget_task, key))
+    return await asyncio.shield(task)
+
+
+def _forget_task(key: str, task: asyncio.Task[Any]) -> None:
+    if _tasks.get(key) is task:
+        del _tasks[key]
+
+
+async def _afetch_locked[T](
+    cache: ResultCache, key: str, fetch: Callable[[], Awaitable[T]]
+) -> T:
+    """プロセス間ロックを取って fetch() を呼ぶ。他のワーカーが呼び出し中ならその結果を待つ。"""
+    timeout = settings.MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+    waited = False
+    while not await cache.alock(key, timeout):
+        if time.monotonic() >= deadline:
+            return await fetch()
+        waited = True
+        await asyncio.sleep(_POLL_INTERVAL)
+        value = await cache.apeek(key)
+        if value is not MISSING:
+            return value
+    try:
+        if waited:
+            # 最後に確認してからロックを取るまでの間に、先行のワーカーが保存した場合
+            value = await cache.apeek(key)
+            if value is not MISSING:
+                return value
+        return await fetch()
+    finally:
+        await cache.aunlock(key)
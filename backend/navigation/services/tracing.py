@@ -0,0 +1,165 @@
+"""処理段階ごとの所要時間の計測（トレーシング）。
+
+/chat/ が遅いときに、Gemini の呼び出し・ツール（search_places / calculate_route）・
+結果の抽出・レスポンスの生成のどこに時間がかかったかを調べるため、各段階を span() で囲む。
+
+- OpenTelemetry: opentelemetry-api がインストールされていれば、span() は OpenTelemetry の
+  スパンも作る。settings.OTEL_TRACES_EXPORTER が "console" / "otlp" の場合は、起動時に
+  configure() でスパンを標準出力 / OTLP コレクターに送るよう設定する
+  （必要なパッケージは extra の "otel" でインストールする）。
+  送信先などは OpenTelemetry の環境変数（OTEL_EXPORTER_OTLP_ENDPOINT など）で指定する。
+- Server-Timing: ServerTimingMiddleware（yorimichi_map_backend/middleware.py）が collect() で
+  リクエストごとに所要時間を集め、段階名ごとの合計をレスポンスヘッダーに付ける。
+  並行実行した段階（同じ応答内の複数のツール呼び出しなど）は合計するため、
+  リクエスト全体の所要時間を超えることがある。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from django.conf import settings
+
+try:
+    from opentelemetry import trace
+except (
+    ImportError
+):  # opentelemetry-api は任意の依存（未インストールなら Server-Timing のみ）
+    _ENABLED = False
+else:
+    _ENABLED = True
+
+logger = logging.getLogger(__name__)
+
+# TracerProvider を設定していなければ OpenTelemetry のスパンは何もしない（ほぼコストなし）
+_tracer = trace.get_tracer("yorimichi_map") if _ENABLED else None
+
+
+class Timings:
+    """1リクエスト分の段階ごとの所要時間（スレッドセーフ）。"""
+
+    def __init__(self) -> None:
+        self._durations: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def items(self) -> list[tuple[str, float]]:
+        """(段階名, 合計秒数) を最初に計測した順に返す。"""
+        with self._lock:
+            return list(self._durations.items())
+
+    def header(self) -> str:
+        """Server-Timing ヘッダーの値（例: "gemini.generate;dur=812.3, render;dur=1.2"）を返す。"""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.items()
+        )
+
+
+_timings: contextvars.ContextVar[Timings | None] = contextvars.ContextVar(
+    "timings", default=None
+)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """ブロック内（同じコンテキストで実行される処理）の span() の所要時間を集める。"""
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """ブロックを処理段階 name として計測する（OpenTelemetry のスパンと Server-Timing）。"""
+    timings = _timings.get()
+    start = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield
+        else:
+            with _tracer.start_as_current_span(name, attributes=attributes or None):
+                yield
+    finally:
+        if timings is not None:
+            timings.add(name, time.perf_counter() - start)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """関数（コルーチン関数を含む）の呼び出しを処理段階 name として計測するデコレーター。"""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def awrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure() -> None:
+    """settings.OTEL_TRACES_EXPORTER に従ってスパンの送信先を設定する（起動時に1回呼ぶ）。"""
+    exporter_name = settings.OTEL_TRACES_EXPORTER
+    if exporter_name == "none":
+        return
+    if exporter_name not in ("console", "otlp"):
+        logger.warning(
+            "Unknown OTEL_TRACES_EXPORTER %r; spans are not exported", exporter_name
+        )
+        return
+    if not _ENABLED:
+        logger.warning("opentelemetry-api is not installed; spans are not exported")
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+
+        if exporter_name == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+
+            exporter = OTLPSpanExporter()
+        else:
+            exporter = ConsoleSpanExporter()
+    except ImportError:
+        logger.warning(
+            "OpenTelemetry SDK for the %r exporter is not installed; spans are not exported",
+            exporter_name,
+        )
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME})
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
@@ -2,9 +2,12 @@
 
 エンドポイント:
   POST /api/navigation/chat/             - AI チャット（Gemini Function Calling でルート・スポット自動検索）
+  POST /api/navigation/chat/stream/      - AI チャットのストリーミング版（Server-Sent Events）
   POST /api/navigation/return-route/     - 帰路ルート生成（出発地⇔目的地を入れ替え、経由地を逆順）
   POST /api/navigation/suggest-waypoints/ - 経由地候補提案（AI が3件提案）
   POST /api/navigation/calculate-route/  - ルート計算（AI 不使用、直接 Routes API 呼び出し）
+  GET  /api/navigation/calculate-route/  - 同上（クエリパラメータ指定。ETag / 304 対応）
+  POST /api/navigation/calculate-routes/batch/ - ルート一括計算（重複除去・並行実行）
 """
 
 from django.urls import path
@@ -13,6 +16,7 @@ from . import views
 
 urlpatterns = [
     path("chat/", views.chat, name="navigation-chat"),
+    path("chat/stream/", views.chat_stream, name="navigation-chat-stream"),
     path("return-route/", views.return_route, name="navigation-return-route"),
     path(
         "suggest-waypoints/",
@@ -24,4 +28,9 @@ urlpatterns = [
         views.calculate_route_view,
         name="navigation-calculate-route",
     ),
+    path(
+        "calculate-routes/batch/",
+        views.calculate_routes_batch_view,
+        name="navigation-calculate-routes-batch",
+    ),
 ]
@@ -4,52 +4,159 @@ chat:
   フロントエンドからのメッセージを Vertex AI Gemini に送信し、
   Automatic Function Calling により search_places / calculate_route が自動実行される。
   AIの応答テキストに加え、ルートデータやスポット情報があればまとめて返却する。
+  session_id を指定すると会話履歴をサーバー側に保存し、以降は新しいメッセージだけを受け取る。
+
+calculate_routes_batch:
+  複数のルート計算リクエストをまとめて受け取り、重複を除いて Routes API を並行実行する。
+  結果は要素ごとに成功・失敗を持ち、リクエストと同じ順序で返す。
 
 return_route:
   行きのルート情報（origin, destination, waypoints）を受け取り、
   出発地⇔目的地を入れ替え・経由地を逆順にして Routes API で帰り道を計算する。
+
+calculate_route / return_route / chat は polyline_options を指定すると、
+ルートのポリラインを地図のズームレベルに合わせて簡略化・精度変更して返す（services/polyline.py）。
+
+外部 API（Gemini / Google Maps）を待つ間ワーカーを占有しないよう、
+ビューは adrf の非同期 api_view で実装し、サービス層の asyncio 版を await する。
+ASGI サーバー（yorimichi_map_backend/asgi.py）で動かすと1プロセスで多数のリクエストを並行処理できる。
+
+chat_stream:
+  chat と同じリクエストを受け取り、Gemini のストリーミング API の出力を
+  Server-Sent Events（text/event-stream）で逐次返す。
+  応答テキストの差分・ツール呼び出しの開始/終了を届け、最後に chat と同じ形の結果を返す。
 """
 
 from __future__ import annotations
 
+import dataclasses
+import hashlib
+import json
 import logging
+from collections.abc import AsyncIterator
 from typing import Any
 
-from drf_spectacular.utils import OpenApiResponse, extend_schema
+from adrf.decorators import api_view
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import status
-from rest_framework.decorators import api_view
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 from .serializers import (
     CalculateRouteRequestSerializer,
     CalculateRouteResponseSerializer,
+    CalculateRoutesBatchRequestSerializer,
+    CalculateRoutesBatchResponseSerializer,
     ChatRequestSerializer,
     ChatResponseSerializer,
     ReturnRouteRequestSerializer,
     ReturnRouteResponseSerializer,
     WaypointSuggestRequestSerializer,
     WaypointSuggestResponseSerializer,
+    calculate_route_response_data,
+    calculate_routes_batch_response_data,
+    chat_response_data,
+    return_route_response_data,
+    waypoint_suggest_response_data,
 )
+from .services import metrics, tracing
 from .services.deep_link import generate_google_maps_url
-from .services.gemini import send_message, suggest_waypoints
-from .services.google_maps import calculate_route
+from .services.domain import Place, Route
+from .services.gemini import asend_message, astream_message, asuggest_waypoints
+from .services.google_maps import (
+    acalculate_route,
+    acalculate_routes,
+    arank_by_detour,
+    route_cache_key,
+)
+from .services.place_store import get_place_store
+from .services.polyline import polyline_levels, simplify_polyline
+from .services.session_store import new_session_id
 
 logger = logging.getLogger(__name__)
 
 
-def _attach_deep_link(route_data: dict[str, Any]) -> dict[str, Any]:
-    """ルートデータに Google Maps ディープリンクURLを付与する。
+@tracing.traced("deep_link")
+async def _attach_deep_link(route: Route) -> Route:
+    """ルートに Google Maps ディープリンクURLを付与する。
 
-    ルート計算結果に google_maps_url フィールドを追加して返す。
+    google_maps_url を設定した Route を返す（キャッシュ上の Route は変更しない）。
     このURLをタップ/クリックすると Google Maps アプリでナビが起動する。
+    Place ID を解決済みの地点は Place ID も URL に含める。
+    """
+    resolutions = await get_place_store().aget_many(
+        [route.origin, route.destination, *route.waypoints]
+    )
+    return dataclasses.replace(
+        route,
+        google_maps_url=generate_google_maps_url(
+            origin=route.origin,
+            destination=route.destination,
+            waypoints=list(route.waypoints),
+            place_ids={name: r["place_id"] for name, r in resolutions.items()},
+        ),
+    )
+
+
+def _apply_polyline_options(route: Route, options: dict[str, Any] | None) -> Route:
+    """リクエストの polyline_options に従ってルートのポリラインを軽量化する。
+
+    options が None（指定なし）の場合は Routes API の結果をそのまま返す。
     """
-    route_data["google_maps_url"] = generate_google_maps_url(
-        origin=route_data["origin"],
-        destination=route_data["destination"],
-        waypoints=route_data.get("waypoints"),
+    if options is None:
+        return route
+    encoded = route.encoded_polyline
+    precision = options["precision"]
+    polylines = None
+    if options["levels"]:
+        polylines = tuple(polyline_levels(encoded, options["levels"], precision))
+    return dataclasses.replace(
+        route,
+        encoded_polyline=simplify_polyline(encoded, options.get("zoom"), precision),
+        polyline_precision=precision,
+        polylines=polylines,
     )
-    return route_data
+
+
+def _route_etag(
+    origin: str,
+    destination: str,
+    waypoints: list[str],
+    polyline_options: dict[str, Any] | None,
+) -> str:
+    """GET のルートの ETag を、ルートのキャッシュキー（出発時刻バケットを含む）と
+    polyline_options から求める（ルートを計算・出力せずに If-None-Match と比べられる）。
+    """
+    raw = json.dumps(
+        [route_cache_key(origin, destination, waypoints), polyline_options],
+        sort_keys=True,
+    )
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match に etag が含まれるかを返す（弱い比較。圧縮時は W/ が付くため）。"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = {tag.removeprefix("W/") for tag in parse_etags(header)}
+    return "*" in etags or etag in etags
+
+
+def _route_error_status(route_data: dict[str, Any]) -> int:
+    """ルート計算エラーに対応する HTTP ステータスを返す。
+
+    地点が見つからない場合は 400、それ以外（API 障害・レート制限等）は 502。
+    """
+    error_type = route_data.get("error_type", "api_failure")
+    if error_type == "not_found":
+        return status.HTTP_400_BAD_REQUEST
+    return status.HTTP_502_BAD_GATEWAY
 
 
 @extend_schema(
@@ -63,7 +170,7 @@ def _attach_deep_link(route_data: dict[str, Any]) -> dict[str, Any]:
     },
 )
 @api_view(["POST"])
-def chat(request: Request) -> Response:
+async def chat(request: Request) -> Response:
     """AI チャットエンドポイント。
 
     処理フロー:
@@ -77,9 +184,13 @@ def chat(request: Request) -> Response:
 
     message: str = serializer.validated_data["message"]
     history: list[dict[str, str]] = serializer.validated_data.get("history", [])
+    session_id = _session_id(serializer.validated_data)
+    polyline_options = serializer.validated_data.get("polyline_options")
 
     try:
-        reply_text, route_data, places_data = send_message(message, history)
+        reply_text, route_data, places_data = await asend_message(
+            message, history, session_id=session_id
+        )
     except Exception:
         logger.exception("Gemini API call failed")
         return Response(
@@ -89,19 +200,128 @@ def chat(request: Request) -> Response:
             status=status.HTTP_503_SERVICE_UNAVAILABLE,
         )
 
-    # ルート計算成功時 → ディープリンクを付与 / エラー時 → null にする
-    if route_data and "error" not in route_data:
-        route_data = _attach_deep_link(route_data)
-    elif route_data and "error" in route_data:
-        route_data = None
+    return Response(
+        await _chat_response(
+            reply_text, route_data, places_data, session_id, polyline_options
+        )
+    )
+
+
+def _session_id(validated_data: dict[str, Any]) -> str | None:
+    """リクエストの session_id を返す。空文字なら新しいセッション ID を発行する。
+
+    session_id を指定しないリクエストは従来どおり history を使う（None を返す）。
+    """
+    session_id = validated_data.get("session_id")
+    if session_id is None:
+        return None
+    return session_id or new_session_id()
+
+
+async def _chat_response(
+    reply_text: str,
+    route_data: Route | None,
+    places_data: list[Place] | None,
+    session_id: str | None = None,
+    polyline_options: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Gemini の応答を ChatResponseSerializer の形に整える。"""
+    # ルート計算成功時はディープリンクを付与する（エラー時は Gemini 側で None になっている）
+    if route_data is not None:
+        route_data = _apply_polyline_options(
+            await _attach_deep_link(route_data), polyline_options
+        )
 
     result = {
         "reply": reply_text,
         "route": route_data,
         "places": places_data,
     }
+    if session_id is not None:
+        result["session_id"] = session_id
+    return chat_response_data(result)
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> bytes:
+    """Server-Sent Events の1イベントを組み立てる。"""
+    payload = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+async def _chat_event_stream(
+    message: str,
+    history: list[dict[str, str]],
+    session_id: str | None,
+    polyline_options: dict[str, Any] | None,
+    endpoint: str,
+) -> AsyncIterator[bytes]:
+    """astream_message のイベントを SSE に変換する。done イベントは chat と同じ形にする。"""
+    # ストリームはビューから戻った後（MetricsMiddleware の外）で生成されるため、
+    # メトリクスの endpoint ラベルを改めて設定する
+    metrics.set_endpoint(endpoint)
+    try:
+        async for event, data in astream_message(
+            message, history, session_id=session_id
+        ):
+            if event == "done":
+                data = await _chat_response(
+                    data["reply"],
+                    data["route"],
+                    data["places"],
+                    session_id,
+                    polyline_options,
+                )
+            yield _sse_event(event, data)
+    except Exception:
+        # ステータスコードは送信済みのため、エラーはイベントとして通知する
+        logger.exception("Gemini streaming API call failed")
+        yield _sse_event(
+            "error",
+            {
+                "detail": "AIとの通信に失敗しました。しばらく待ってから再度お試しください。"
+            },
+        )
 
-    return Response(ChatResponseSerializer(result).data)
+
+@extend_schema(
+    summary="AIチャット（ストリーミング）",
+    description=(
+        "AIチャットの応答を Server-Sent Events で逐次返す。"
+        "イベント: delta（応答テキストの差分）、tool_start / tool_end（ツール呼び出しの開始・終了）、"
+        "done（AIチャットと同じ形の最終結果）、error（エラー）。"
+    ),
+    request=ChatRequestSerializer,
+    responses={
+        (200, "text/event-stream"): OpenApiResponse(
+            description="Server-Sent Events のストリーム"
+        ),
+        400: OpenApiResponse(description="Bad Request"),
+    },
+)
+@api_view(["POST"])
+async def chat_stream(request: Request) -> StreamingHttpResponse:
+    """AI チャットのストリーミングエンドポイント。
+
+    リクエストの検証までは chat と同じで、以降は Gemini の出力を SSE で逐次返す。
+    """
+    serializer = ChatRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    message: str = serializer.validated_data["message"]
+    history: list[dict[str, str]] = serializer.validated_data.get("history", [])
+    session_id = _session_id(serializer.validated_data)
+    polyline_options = serializer.validated_data.get("polyline_options")
+
+    response = StreamingHttpResponse(
+        _chat_event_stream(
+            message, history, session_id, polyline_options, metrics.current_endpoint()
+        ),
+        content_type="text/event-stream; charset=utf-8",
+    )
+    # プロキシ・ブラウザでバッファリング・キャッシュされないようにする
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @extend_schema(
@@ -116,7 +336,7 @@ def chat(request: Request) -> Response:
     },
 )
 @api_view(["POST"])
-def return_route(request: Request) -> Response:
+async def return_route(request: Request) -> Response:
     """帰路ルート生成エンドポイント。
 
     行きのルート情報をそのまま受け取り、以下の変換を行って Routes API を再呼び出しする:
@@ -132,23 +352,20 @@ def return_route(request: Request) -> Response:
     destination: str = serializer.validated_data["origin"]
     waypoints: list[str] = list(reversed(serializer.validated_data["waypoints"]))
 
-    route_data = calculate_route(origin, destination, waypoints)
+    route_data = await acalculate_route(origin, destination, waypoints)
 
-    if "error" in route_data:
-        error_type = route_data.get("error_type", "api_failure")
-        http_status = (
-            status.HTTP_400_BAD_REQUEST
-            if error_type == "not_found"
-            else status.HTTP_502_BAD_GATEWAY
-        )
+    if not isinstance(route_data, Route):
         return Response(
             {"detail": route_data["error"]},
-            status=http_status,
+            status=_route_error_status(route_data),
         )
 
-    route_data = _attach_deep_link(route_data)
+    route_data = _apply_polyline_options(
+        await _attach_deep_link(route_data),
+        serializer.validated_data.get("polyline_options"),
+    )
 
-    return Response(ReturnRouteResponseSerializer({"route": route_data}).data)
+    return Response(return_route_response_data({"route": route_data}))
 
 
 @extend_schema(
@@ -162,13 +379,14 @@ def return_route(request: Request) -> Response:
     },
 )
 @api_view(["POST"])
-def suggest_waypoints_view(request: Request) -> Response:
+async def suggest_waypoints_view(request: Request) -> Response:
     """経由地候補提案エンドポイント。
 
     処理フロー:
     1. リクエストから出発地・目的地・プロンプトを取得
     2. Gemini に候補提案を依頼（JSON出力モード）
-    3. 候補3件とAIコメントを返却
+    3. Routes API の computeRouteMatrix で各候補の寄り道コストを求め、少ない順に並べる
+    4. 候補3件とAIコメントを返却
     """
     serializer = WaypointSuggestRequestSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -178,7 +396,7 @@ def suggest_waypoints_view(request: Request) -> Response:
     prompt: str = serializer.validated_data["prompt"]
 
     try:
-        result = suggest_waypoints(origin, destination, prompt)
+        result = await asuggest_waypoints(origin, destination, prompt)
     except Exception:
         logger.exception("Gemini API call failed")
         return Response(
@@ -200,50 +418,166 @@ def suggest_waypoints_view(request: Request) -> Response:
             status=status.HTTP_503_SERVICE_UNAVAILABLE,
         )
 
-    return Response(WaypointSuggestResponseSerializer(result).data)
+    # 寄り道コストを付与し、寄り道の少ない順に並べる
+    if settings.WAYPOINT_DETOUR_RANKING_ENABLED:
+        result["candidates"] = await arank_by_detour(
+            origin, destination, result["candidates"]
+        )
+
+    return Response(waypoint_suggest_response_data(result))
+
+
+_CALCULATE_ROUTE_RESPONSES = {
+    200: CalculateRouteResponseSerializer,
+    400: OpenApiResponse(description="Bad Request"),
+    429: OpenApiResponse(description="Too Many Requests"),
+    502: OpenApiResponse(description="Bad Gateway"),
+}
 
 
 @extend_schema(
+    methods=["POST"],
     summary="ルート計算",
     description="出発地・目的地・経由地を指定してルートを計算する。AIは使用しない。",
     request=CalculateRouteRequestSerializer,
-    responses={
-        200: CalculateRouteResponseSerializer,
-        400: OpenApiResponse(description="Bad Request"),
-        429: OpenApiResponse(description="Too Many Requests"),
-        502: OpenApiResponse(description="Bad Gateway"),
-    },
+    responses=_CALCULATE_ROUTE_RESPONSES,
 )
-@api_view(["POST"])
-def calculate_route_view(request: Request) -> Response:
+@extend_schema(
+    methods=["GET"],
+    summary="ルート計算（GET）",
+    description=(
+        "POST と同じルート計算をクエリパラメータで行う。"
+        "レスポンスには ETag が付き、If-None-Match が一致すれば 304 を返す。"
+    ),
+    parameters=[
+        OpenApiParameter("origin", str, required=True, description="出発地"),
+        OpenApiParameter("destination", str, required=True, description="目的地"),
+        OpenApiParameter(
+            "waypoints", str, many=True, description="経由地（複数指定可）"
+        ),
+        OpenApiParameter(
+            "polyline_options.zoom", int, description="簡略化に使う地図のズームレベル"
+        ),
+        OpenApiParameter(
+            "polyline_options.precision", int, description="ポリラインの精度"
+        ),
+        OpenApiParameter(
+            "polyline_options.levels",
+            int,
+            many=True,
+            description="多段階表示用のズームレベル（複数指定可）",
+        ),
+    ],
+    responses=_CALCULATE_ROUTE_RESPONSES,
+)
+@api_view(["GET", "POST"])
+async def calculate_route_view(request: Request) -> Response:
     """ルート計算エンドポイント。
 
     処理フロー:
-    1. リクエストから出発地・目的地・経由地を取得
+    1. リクエストから出発地・目的地・経由地を取得（GET はクエリパラメータ、POST は本文）
     2. Routes API でルート計算
     3. Google Maps ディープリンクを付与して返却
+
+    GET のレスポンスには、ルートのキャッシュキー（出発時刻バケットを含む）から求めた ETag を
+    付ける。If-None-Match が一致すれば、ルートの計算・出力の前に 304 を返す
+    （POST では If-None-Match に 304 を返せない。RFC 9110 13.1.2）。
     """
-    serializer = CalculateRouteRequestSerializer(data=request.data)
+    data = request.query_params if request.method == "GET" else request.data
+    serializer = CalculateRouteRequestSerializer(data=data)
     serializer.is_valid(raise_exception=True)
 
     origin: str = serializer.validated_data["origin"]
     destination: str = serializer.validated_data["destination"]
     waypoints: list[str] = serializer.validated_data.get("waypoints", [])
+    polyline_options = serializer.validated_data.get("polyline_options")
 
-    route_data = calculate_route(origin, destination, waypoints)
+    etag = None
+    if request.method == "GET":
+        etag = _route_etag(origin, destination, waypoints, polyline_options)
+        if _etag_matches(request, etag):
+            return _revalidate(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
 
-    if "error" in route_data:
-        error_type = route_data.get("error_type", "api_failure")
-        http_status = (
-            status.HTTP_400_BAD_REQUEST
-            if error_type == "not_found"
-            else status.HTTP_502_BAD_GATEWAY
-        )
+    route_data = await acalculate_route(origin, destination, waypoints)
+
+    if not isinstance(route_data, Route):
         return Response(
             {"detail": route_data["error"]},
-            status=http_status,
+            status=_route_error_status(route_data),
         )
 
-    route_data = _attach_deep_link(route_data)
+    route_data = _apply_polyline_options(
+        await _attach_deep_link(route_data), polyline_options
+    )
+
+    response = Response(calculate_route_response_data({"route": route_data}))
+    if etag is not None:
+        _revalidate(response, etag)
+    return response
+
+
+def _revalidate(response: Response, etag: str) -> Response:
+    """ETag を付け、交通状況でルートが変わるため再利用する前に必ず再検証させる。"""
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@extend_schema(
+    summary="ルート一括計算",
+    description=(
+        "複数のルートをまとめて計算する。同じ条件のリクエストは1回だけ計算し、"
+        "結果はリクエストと同じ順序で要素ごとに返す（失敗した要素は detail にエラー）。AIは使用しない。"
+    ),
+    request=CalculateRoutesBatchRequestSerializer,
+    responses={
+        200: CalculateRoutesBatchResponseSerializer,
+        400: OpenApiResponse(description="Bad Request"),
+        429: OpenApiResponse(description="Too Many Requests"),
+    },
+)
+@api_view(["POST"])
+async def calculate_routes_batch_view(request: Request) -> Response:
+    """ルート一括計算エンドポイント。
+
+    処理フロー:
+    1. リクエストからルート計算条件のリストを取得
+    2. 重複を除き、同時実行数を ROUTES_BATCH_MAX_CONCURRENCY に制限して Routes API を呼び出す
+    3. 成功した要素には Google Maps ディープリンクを付与し、リクエスト順に返却
+    """
+    serializer = CalculateRoutesBatchRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    items = serializer.validated_data["routes"]
+    route_requests = [
+        (item["origin"], item["destination"], item.get("waypoints", []))
+        for item in items
+    ]
+
+    route_results = await acalculate_routes(
+        route_requests, settings.ROUTES_BATCH_MAX_CONCURRENCY
+    )
+
+    results = []
+    for item, route_data in zip(items, route_results, strict=True):
+        if not isinstance(route_data, Route):
+            results.append(
+                {
+                    "status": _route_error_status(route_data),
+                    "route": None,
+                    "detail": route_data["error"],
+                }
+            )
+        else:
+            results.append(
+                {
+                    "status": status.HTTP_200_OK,
+                    "route": _apply_polyline_options(
+                        await _attach_deep_link(route_data),
+                        item.get("polyline_options"),
+                    ),
+                    "detail": None,
+                }
+            )
 
-    return Response(CalculateRouteResponseSerializer({"route": route_data}).data)
+    return Response(calculate_routes_batch_response_data({"results": results}))
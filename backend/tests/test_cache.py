@@ -0,0 +1,393 @@
+"""cache（Google Maps API 結果キャッシュ）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from navigation.services.cache import (  # noqa: E402
+    MISSING,
+    DjangoCacheBackend,
+    LRUCache,
+    NullCache,
+    ResultCache,
+    SharedCacheBackend,
+    SQLiteCache,
+    TieredCache,
+    cache_stats,
+    get_cache,
+    make_key,
+    normalize_query,
+    reset_caches,
+)
+from navigation.services.domain import Coords, Place, Route, Toll  # noqa: E402
+
+_ROUTE = Route(
+    origin="東京駅",
+    destination="横浜駅",
+    waypoints=("川崎大師",),
+    waypoint_coords=(Coords(latitude=35.53, longitude=139.72),),
+    duration_seconds="3600s",
+    distance_meters=32000,
+    encoded_polyline="_p~iF~ps|U",
+    tolls=(Toll(currencyCode="JPY", units="1200"),),
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    reset_caches()
+    yield
+    reset_caches()
+
+
+class TestNormalizeQuery:
+    """normalize_query のユニットテスト。"""
+
+    def test_whitespace_and_case(self) -> None:
+        """前後・連続する空白と大文字小文字の違いを吸収すること。"""
+        assert normalize_query("  Tokyo   Station ") == "tokyo station"
+
+    def test_fullwidth(self) -> None:
+        """全角英数字・全角スペースを半角に揃えること。"""
+        assert normalize_query("ｒａｍｅｎ　箱根") == "ramen 箱根"
+
+
+class TestMakeKey:
+    """make_key のユニットテスト。"""
+
+    def test_same_parts_same_key(self) -> None:
+        assert make_key("places", "箱根", 4.0) == make_key("places", "箱根", 4.0)
+
+    def test_namespace_and_parts_affect_key(self) -> None:
+        assert make_key("places", "箱根") != make_key("routes", "箱根")
+        assert make_key("places", "箱根") != make_key("places", "熱海")
+
+    def test_key_is_memcached_safe(self) -> None:
+        """長い入力でもキーが短く、空白を含まないこと。"""
+        key = make_key("places", "あ" * 1000, "with space")
+        assert len(key) < 250
+        assert " " not in key
+
+
+class TestLRUCache:
+    """LRUCache のユニットテスト。"""
+
+    def test_get_missing(self) -> None:
+        assert LRUCache(max_entries=2, ttl=60).get("a") is MISSING
+
+    def test_set_and_get(self) -> None:
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set("a", [1, 2])
+        assert cache.get("a") == [1, 2]
+
+    def test_evicts_least_recently_used(self) -> None:
+        """最大件数を超えたら最も使われていないエントリを破棄すること。"""
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_shares_immutable_models(self) -> None:
+        """domain のモデルはコピーせず、リストだけコピーすること。"""
+        cache = LRUCache(max_entries=2, ttl=60)
+        place = Place(
+            name="箱根湯本",
+            address="神奈川県",
+            rating=4.5,
+            coords=Coords(latitude=35.23, longitude=139.10),
+            price_level="UNKNOWN",
+        )
+        cache.set("route", _ROUTE)
+        cache.set("places", [place])
+
+        assert cache.get("route") is _ROUTE
+        places = cache.get("places")
+        assert places[0] is place
+        places.clear()
+        assert cache.get("places") == [place]
+
+    def test_expires_after_ttl(self) -> None:
+        """TTL を過ぎたエントリは MISSING になること。"""
+        cache = LRUCache(max_entries=2, ttl=10)
+        with patch("navigation.services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("navigation.services.cache.time.monotonic", return_value=109.0):
+            assert cache.get("a") == 1
+        with patch("navigation.services.cache.time.monotonic", return_value=110.0):
+            assert cache.get("a") is MISSING
+
+
+class TestSQLiteCache:
+    """SQLiteCache のユニットテスト（一時ファイル使用）。"""
+
+    @pytest.fixture
+    def path(self, tmp_path: Path) -> str:
+        return str(tmp_path / "cache.sqlite3")
+
+    def test_set_and_get(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        cache.set("a", {"name": "東京駅", "items": [1, 2]})
+
+        assert cache.get("a") == {"name": "東京駅", "items": [1, 2]}
+        assert cache.get("b") is MISSING
+
+    def test_stores_models(self, path: str) -> None:
+        """domain のモデル（リスト内を含む）を JSON で保存し、モデルとして復元すること。"""
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        cache.set("route", _ROUTE)
+        cache.set("routes", [_ROUTE, {"error": "失敗"}])
+
+        assert cache.get("route") == _ROUTE
+        assert cache.get("routes") == [_ROUTE, {"error": "失敗"}]
+
+    def test_persists_across_instances(self, path: str) -> None:
+        """別インスタンス（再起動後のプロセス）からも読めること。"""
+        SQLiteCache(path, table="test", max_entries=10, ttl=60).set("a", [1])
+
+        assert SQLiteCache(path, table="test", max_entries=10, ttl=60).get("a") == [1]
+        assert SQLiteCache(path, table="other", max_entries=10, ttl=60).get("a") is (
+            MISSING
+        )
+
+    def test_stores_compressed_json(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        value = {"polyline": "abc" * 1000}
+        cache.set("a", value)
+
+        blob = sqlite3.connect(path).execute("SELECT value FROM cache_test").fetchone()
+        assert len(blob[0]) < len(str(value))
+
+    def test_evicts_least_recently_used(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=2, ttl=60)
+        clock = "navigation.services.cache.time.time"
+        with patch(clock, return_value=1.0):
+            cache.set("a", 1)
+        with patch(clock, return_value=2.0):
+            cache.set("b", 2)
+        with patch(clock, return_value=3.0):
+            cache.get("a")
+        with patch(clock, return_value=4.0):
+            cache.set("c", 3)
+            assert cache.get("a") == 1
+            assert cache.get("b") is MISSING
+            assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_expires_after_ttl(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=10)
+        clock = "navigation.services.cache.time.time"
+        with patch(clock, return_value=100.0):
+            cache.set("a", 1)
+        with patch(clock, return_value=109.0):
+            assert cache.get("a") == 1
+        with patch(clock, return_value=110.0):
+            assert cache.get("a") is MISSING
+
+    def test_unavailable_path_always_misses(self, tmp_path: Path) -> None:
+        """SQLite を開けない場合は例外を出さず、常にミスになること。"""
+        path = str(tmp_path / "missing" / "cache.sqlite3")
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") is MISSING
+
+    def test_rejects_invalid_table_name(self, path: str) -> None:
+        with pytest.raises(ValueError, match="Invalid cache table name"):
+            SQLiteCache(path, table="a; DROP TABLE x", max_entries=10, ttl=60)
+
+    def test_async_set_and_get(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        asyncio.run(cache.aset("a", {"x": 1}))
+
+        assert asyncio.run(cache.aget("a")) == {"x": 1}
+
+    def test_add_only_when_absent(self, path: str) -> None:
+        """add は key が無いか期限切れの場合だけ保存すること（プロセス間ロック用）。"""
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        clock = "navigation.services.cache.time.time"
+        with patch(clock, return_value=100.0):
+            assert cache.add("lock", True, timeout=10)
+            assert not cache.add("lock", True, timeout=10)
+        with patch(clock, return_value=110.0):
+            assert cache.add("lock", True, timeout=10)
+
+    def test_delete(self, path: str) -> None:
+        cache = SQLiteCache(path, table="test", max_entries=10, ttl=60)
+        assert asyncio.run(cache.aadd("lock", True, timeout=10))
+        asyncio.run(cache.adelete("lock"))
+
+        assert cache.get("lock") is MISSING
+        assert cache.add("lock", True, timeout=10)
+
+    def test_lock_is_not_evicted(self, path: str) -> None:
+        """ロックは追い出しの対象外で、キャッシュの件数にも含まれないこと。"""
+        cache = SQLiteCache(path, table="test", max_entries=2, ttl=60)
+        assert cache.add("lock", True, timeout=10)
+        for i in range(5):
+            cache.set(f"key{i}", i)
+
+        assert len(cache) == 2
+        assert not cache.add("lock", True, timeout=10)
+
+
+class TestTieredCache:
+    """TieredCache のユニットテスト。"""
+
+    def test_backfills_front_from_back(self, tmp_path: Path) -> None:
+        """前段でミスした値を後段から取得し、前段に載せること。"""
+        back = SQLiteCache(
+            str(tmp_path / "cache.sqlite3"), table="test", max_entries=10, ttl=60
+        )
+        back.set("a", 1)
+        front = LRUCache(max_entries=10, ttl=60)
+        cache = TieredCache(front, back)
+
+        assert cache.get("a") == 1
+        assert front.get("a") == 1
+        assert cache.get("b") is MISSING
+
+    def test_set_writes_both_tiers(self) -> None:
+        front = LRUCache(max_entries=10, ttl=60)
+        back = LRUCache(max_entries=10, ttl=60)
+        TieredCache(front, back).set("a", 1)
+
+        assert front.get("a") == 1
+        assert back.get("a") == 1
+
+    def test_async_backfill(self) -> None:
+        front = LRUCache(max_entries=10, ttl=60)
+        back = LRUCache(max_entries=10, ttl=60)
+        back.set("a", 1)
+        cache = TieredCache(front, back)
+
+        assert asyncio.run(cache.aget("a")) == 1
+        assert front.get("a") == 1
+
+
+class TestDjangoCacheBackend:
+    """DjangoCacheBackend のユニットテスト（LocMemCache 使用）。"""
+
+    def test_set_and_get(self) -> None:
+        backend = DjangoCacheBackend(alias="default", ttl=60)
+        key = make_key("test", "django-backend")
+        backend.set(key, {"a": 1})
+
+        assert backend.get(key) == {"a": 1}
+        assert backend.get(make_key("test", "missing")) is MISSING
+
+    def test_add_and_delete(self) -> None:
+        backend = DjangoCacheBackend(alias="default", ttl=60)
+        key = make_key("test", "django-lock")
+
+        assert backend.add(key, True, timeout=10)
+        assert not backend.add(key, True, timeout=10)
+        backend.delete(key)
+        assert asyncio.run(backend.aadd(key, True, timeout=10))
+        asyncio.run(backend.adelete(key))
+
+
+class TestResultCache:
+    """ResultCache のユニットテスト。"""
+
+    def test_hit_and_miss_counters(self) -> None:
+        cache = ResultCache("test", LRUCache(max_entries=10, ttl=60))
+        key = cache.key("a")
+
+        assert cache.get(key) is MISSING
+        cache.set(key, "value")
+        assert cache.get(key) == "value"
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+    def test_null_cache_always_misses(self) -> None:
+        cache = ResultCache("test", NullCache())
+        cache.set(cache.key("a"), 1)
+
+        assert cache.get(cache.key("a")) is MISSING
+
+    def test_lock_on_shared_backend(self) -> None:
+        """共有バックエンドでは lock / unlock がプロセス間ロックとして働くこと。"""
+        cache = ResultCache("test", DjangoCacheBackend(alias="default", ttl=60))
+        key = cache.key("lock")
+
+        assert cache.shared
+        assert cache.lock(key, timeout=10)
+        assert not cache.lock(key, timeout=10)
+        cache.unlock(key)
+        assert cache.lock(key, timeout=10)
+        cache.unlock(key)
+
+    def test_lock_on_local_backend(self) -> None:
+        """プロセス内のバックエンドでは lock は常に取れ、キャッシュに何も保存しないこと。"""
+        cache = ResultCache("test", LRUCache(max_entries=10, ttl=60))
+        key = cache.key("lock")
+
+        assert not cache.shared
+        assert not isinstance(cache.backend, SharedCacheBackend)
+        assert cache.lock(key, timeout=10)
+        assert cache.lock(key, timeout=10)
+        assert len(cache.backend) == 0
+
+    def test_peek_does_not_record_stats(self) -> None:
+        cache = ResultCache("test", LRUCache(max_entries=10, ttl=60))
+        cache.set(cache.key("a"), 1)
+
+        assert cache.peek(cache.key("a")) == 1
+        assert cache.peek(cache.key("b")) is MISSING
+        assert cache.stats()["hits"] == 0
+        assert cache.stats()["misses"] == 0
+
+
+class TestGetCache:
+    """get_cache のユニットテスト。"""
+
+    def test_returns_same_instance(self) -> None:
+        assert get_cache("places") is get_cache("places")
+
+    def test_backend_from_settings(self) -> None:
+        """settings.<NAME>_CACHE_BACKEND に応じたバックエンドが選ばれること。"""
+        original = settings.PLACES_CACHE_BACKEND
+        try:
+            settings.PLACES_CACHE_BACKEND = "django"
+            assert isinstance(get_cache("places").backend, DjangoCacheBackend)
+            reset_caches()
+            settings.PLACES_CACHE_BACKEND = "none"
+            assert isinstance(get_cache("places").backend, NullCache)
+            reset_caches()
+            settings.PLACES_CACHE_BACKEND = "tiered"
+            with patch.object(settings, "MAPS_CACHE_SQLITE_PATH", ":memory:"):
+                backend = get_cache("places").backend
+            assert isinstance(backend, TieredCache)
+            assert isinstance(backend.back, SQLiteCache)
+            reset_caches()
+            settings.PLACES_CACHE_BACKEND = "unknown"
+            with pytest.raises(ValueError, match="Unknown cache backend"):
+                get_cache("places")
+        finally:
+            settings.PLACES_CACHE_BACKEND = original
+
+    def test_cache_stats(self) -> None:
+        get_cache("places").get(get_cache("places").key("x"))
+        assert cache_stats()["places"]["misses"] == 1
@@ -0,0 +1,250 @@
+"""context_cache（Vertex AI コンテキストキャッシュ管理）のユニットテスト（モック使用）。"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from google.api_core.exceptions import InvalidArgument  # noqa: E402
+
+from navigation.services.context_cache import ContextCache  # noqa: E402
+
+
+@pytest.fixture
+def mock_cached_content_class():
+    with patch("navigation.services.context_cache.CachedContent") as mock_class:
+        yield mock_class
+
+
+@pytest.fixture
+def on_invalidate() -> MagicMock:
+    return MagicMock()
+
+
+@pytest.fixture
+def on_ready() -> MagicMock:
+    return MagicMock()
+
+
+def _create_inline(self: ContextCache, stop: threading.Event) -> None:
+    self._create(stop)
+
+
+@pytest.fixture
+def context_cache(on_invalidate: MagicMock, on_ready: MagicMock):
+    cache = ContextCache(
+        model_name="gemini-test",
+        system_instruction="system prompt",
+        tools=["tool"],
+        ttl=timedelta(seconds=100),
+        retry_interval=30,
+        on_invalidate=on_invalidate,
+        on_ready=on_ready,
+    )
+    # 作成はスレッドを使わずにその場で行い、TTL 延長は refresh() を直接呼んで検証する
+    with patch.object(ContextCache, "_start_worker", _create_inline):
+        yield cache
+    cache.close()
+
+
+class TestContextCacheGet:
+    """ContextCache.get のテスト。"""
+
+    def test_creates_once_and_reuses(
+        self,
+        context_cache: ContextCache,
+        mock_cached_content_class: MagicMock,
+        on_ready: MagicMock,
+    ) -> None:
+        """初回は作成を始めて None を返し、作成後は有効期限内は同じキャッシュを返すこと。"""
+        assert context_cache.get() is None
+        first = context_cache.get()
+        second = context_cache.get()
+
+        assert first is mock_cached_content_class.create.return_value
+        assert second is first
+        on_ready.assert_called_once_with()
+        mock_cached_content_class.create.assert_called_once()
+        kwargs = mock_cached_content_class.create.call_args.kwargs
+        assert kwargs["model_name"] == "gemini-test"
+        assert kwargs["system_instruction"].text == "system prompt"
+        assert kwargs["tools"] == ["tool"]
+        assert kwargs["ttl"] == timedelta(seconds=100)
+
+    def test_recreates_after_expiry(
+        self, context_cache: ContextCache, mock_cached_content_class: MagicMock
+    ) -> None:
+        """TTL を過ぎたら作り直すこと。"""
+        monotonic = "navigation.services.context_cache.time.monotonic"
+        with patch(monotonic, return_value=0.0):
+            context_cache.get()
+        with patch(monotonic, return_value=100.0):
+            assert context_cache.get() is None
+            assert context_cache.get() is not None
+
+        assert mock_cached_content_class.create.call_count == 2
+
+    def test_creation_failure_returns_none_until_retry_interval(
+        self,
+        context_cache: ContextCache,
+        mock_cached_content_class: MagicMock,
+        on_ready: MagicMock,
+    ) -> None:
+        """作成に失敗したら None を返し、retry_interval の間は再作成しないこと。"""
+        mock_cached_content_class.create.side_effect = [
+            RuntimeError("too few tokens"),
+            MagicMock(),
+        ]
+        monotonic = "navigation.services.context_cache.time.monotonic"
+
+        with patch(monotonic, return_value=0.0):
+            assert context_cache.get() is None
+        with patch(monotonic, return_value=29.0):
+            assert context_cache.get() is None
+        assert mock_cached_content_class.create.call_count == 1
+        on_ready.assert_not_called()
+
+        with patch(monotonic, return_value=30.0):
+            context_cache.get()
+            assert context_cache.get() is not None
+        assert mock_cached_content_class.create.call_count == 2
+
+    def test_invalid_argument_disables_cache(
+        self, context_cache: ContextCache, mock_cached_content_class: MagicMock
+    ) -> None:
+        """リクエストが拒否された（最小トークン数未満など）場合は以降作成を試みないこと。"""
+        mock_cached_content_class.create.side_effect = InvalidArgument("too few tokens")
+        monotonic = "navigation.services.context_cache.time.monotonic"
+
+        with patch(monotonic, return_value=0.0):
+            assert context_cache.get() is None
+        with patch(monotonic, return_value=1000.0):
+            assert context_cache.get() is None
+        assert mock_cached_content_class.create.call_count == 1
+
+    def test_does_not_block_caller(self, mock_cached_content_class: MagicMock) -> None:
+        """作成中も呼び出し元をブロックせず、作成を重複して始めないこと。"""
+        release = threading.Event()
+        ready = threading.Event()
+        mock_cached_content_class.create.side_effect = lambda **_: (
+            release.wait(5) and MagicMock()
+        )
+        cache = ContextCache(
+            model_name="gemini-test",
+            system_instruction="system prompt",
+            tools=[],
+            ttl=timedelta(seconds=100),
+            on_ready=ready.set,
+        )
+
+        assert cache.get() is None
+        assert cache.get() is None
+        release.set()
+        assert ready.wait(5)
+
+        assert cache.get() is not None
+        assert mock_cached_content_class.create.call_count == 1
+        cache.close()
+        cache._worker.join(5)
+        assert not cache._worker.is_alive()
+
+
+class TestContextCacheClose:
+    """ContextCache.close のテスト。"""
+
+    def test_close_deletes_remote_cache(
+        self, context_cache: ContextCache, mock_cached_content_class: MagicMock
+    ) -> None:
+        """close() で Vertex AI 側のキャッシュを削除すること。"""
+        context_cache.get()
+        cached_content = context_cache.get()
+
+        context_cache.close()
+        context_cache.close()
+
+        cached_content.delete.assert_called_once_with()
+        assert context_cache.get() is None
+
+    def test_delete_failure_is_ignored(
+        self, context_cache: ContextCache, mock_cached_content_class: MagicMock
+    ) -> None:
+        """削除に失敗しても例外を送出しないこと。"""
+        context_cache.get()
+        context_cache.get().delete.side_effect = RuntimeError("not found")
+
+        context_cache.close()
+
+    def test_closed_while_creating_deletes_new_cache(
+        self, mock_cached_content_class: MagicMock, on_ready: MagicMock
+    ) -> None:
+        """作成中に close() された場合は、作成したキャッシュを使わずに削除すること。"""
+        cache = ContextCache(
+            model_name="gemini-test",
+            system_instruction="system prompt",
+            tools=[],
+            ttl=timedelta(seconds=100),
+            on_ready=on_ready,
+        )
+
+        def close_then_create(self: ContextCache, stop: threading.Event) -> None:
+            self.close()
+            self._create(stop)
+
+        with patch.object(ContextCache, "_start_worker", close_then_create):
+            cache.get()
+
+        mock_cached_content_class.create.return_value.delete.assert_called_once_with()
+        on_ready.assert_not_called()
+
+
+class TestContextCacheRefresh:
+    """ContextCache.refresh / invalidate のテスト。"""
+
+    def test_refresh_extends_ttl(
+        self, context_cache: ContextCache, mock_cached_content_class: MagicMock
+    ) -> None:
+        """refresh() で TTL を延長すること。"""
+        context_cache.get()
+        cached_content = context_cache.get()
+
+        assert context_cache.refresh() is True
+        cached_content.update.assert_called_once_with(ttl=timedelta(seconds=100))
+
+    def test_refresh_failure_invalidates(
+        self,
+        context_cache: ContextCache,
+        mock_cached_content_class: MagicMock,
+        on_invalidate: MagicMock,
+    ) -> None:
+        """延長に失敗したらキャッシュを破棄し、on_invalidate を呼ぶこと。"""
+        context_cache.get()
+        cached_content = context_cache.get()
+        cached_content.update.side_effect = RuntimeError("expired")
+
+        assert context_cache.refresh() is False
+        on_invalidate.assert_called_once_with()
+
+        context_cache.get()
+        assert mock_cached_content_class.create.call_count == 2
+
+    def test_refresh_without_cache(
+        self, context_cache: ContextCache, on_invalidate: MagicMock
+    ) -> None:
+        """キャッシュが無い場合は何もしないこと。"""
+        assert context_cache.refresh() is False
+        context_cache.invalidate()
+        on_invalidate.assert_not_called()
@@ -102,3 +102,27 @@ class TestGenerateGoogleMapsUrl:
             generate_google_maps_url(
                 origin="A", destination="B", waypoints=["あ" * 201]
             )
+
+    def test_place_ids(self) -> None:
+        """Place ID が分かっている地点は *_place_id パラメータを付与すること。"""
+        url = generate_google_maps_url(
+            origin="東京駅",
+            destination="箱根湯本駅",
+            waypoints=["小田原駅"],
+            place_ids={"箱根湯本駅": "ChIJ-hakone", "小田原駅": "ChIJ-odawara"},
+        )
+
+        assert "origin_place_id" not in url
+        assert "destination_place_id=ChIJ-hakone" in url
+        assert "waypoint_place_ids=ChIJ-odawara" in url
+
+    def test_partial_waypoint_place_ids_are_omitted(self) -> None:
+        """一部の経由地しか Place ID が無い場合は waypoint_place_ids を付与しないこと。"""
+        url = generate_google_maps_url(
+            origin="東京駅",
+            destination="箱根湯本駅",
+            waypoints=["小田原駅", "熱海駅"],
+            place_ids={"小田原駅": "ChIJ-odawara"},
+        )
+
+        assert "waypoint_place_ids" not in url
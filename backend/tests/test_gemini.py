@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
+import threading
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import django
 from dotenv import load_dotenv
-from google.api_core.exceptions import ResourceExhausted
+from google.api_core.exceptions import NotFound, ResourceExhausted
 
 backend_dir = Path(__file__).resolve().parent.parent
 load_dotenv(backend_dir / ".env")
@@ -17,7 +19,55 @@ sys.path.insert(0, str(backend_dir))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
 django.setup()
 
-from navigation.services.gemini import _build_history, send_message  # noqa: E402
+import pytest  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from vertexai.generative_models import Content, Part  # noqa: E402
+from vertexai.preview.caching import CachedContent  # noqa: E402
+
+from navigation.services import tracing  # noqa: E402
+from navigation.services.cache import reset_caches  # noqa: E402
+from navigation.services.domain import Coords, Place, Route  # noqa: E402
+from navigation.exceptions import GeminiFunctionCallingError  # noqa: E402
+from navigation.services.context_cache import ContextCache  # noqa: E402
+from navigation.services.gemini import (  # noqa: E402
+    _acall_functions,
+    _get_chat_context_cache,
+    _build_history,
+    _compact_history,
+    _estimate_tokens,
+    asend_message,
+    astream_message,
+    asuggest_waypoints,
+    get_model,
+    reset_models,
+    send_message,
+    suggest_waypoints,
+    warm_up_models,
+)
+from navigation.services.rate_limit import (  # noqa: E402
+    RateLimitExceeded,
+    get_limiter,
+    reset_limiters,
+)
+from navigation.services.retry import reset_policies, retry_stats  # noqa: E402
+from navigation.services.session_store import new_session_id  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _reset_models():
+    # モデルは共有インスタンスなので、GenerativeModel のモックが効くよう毎回破棄する
+    reset_models()
+    reset_limiters()
+    reset_policies()
+    # 再試行の待ち時間のジッターを外し、上限（1, 2, 4 秒…）で待つようにする
+    with patch(
+        "navigation.services.retry.random.uniform", side_effect=lambda low, high: high
+    ):
+        yield
+    reset_models()
+    reset_limiters()
+    reset_policies()
+
 
 # _build_history はローカルロジックのみなのでモック不要
 
@@ -58,96 +108,1262 @@ class TestBuildHistory:
         assert result[0].parts[0].text == ""
 
 
-class TestSendMessageRetry:
-    """send_message のリトライロジックのテスト。"""
+def _history_turn(message: str, reply: str, route: dict | None = None) -> list[Content]:
+    """1往復分の Content を生成する。route を渡すと calculate_route の結果を含める。"""
+    contents = [Content(role="user", parts=[Part.from_text(message)])]
+    if route is not None:
+        contents += [
+            Content(
+                role="model",
+                parts=[
+                    Part.from_dict(
+                        {"function_call": {"name": "calculate_route", "args": {}}}
+                    )
+                ],
+            ),
+            Content(
+                role="user",
+                parts=[
+                    Part.from_function_response(name="calculate_route", response=route)
+                ],
+            ),
+        ]
+    contents.append(Content(role="model", parts=[Part.from_text(reply)]))
+    return contents
+
+
+def _route(origin: str, destination: str) -> Route:
+    """calculate_route の戻り値（Route）を生成する。"""
+    return Route(
+        origin=origin,
+        destination=destination,
+        waypoints=(),
+        waypoint_coords=(),
+        duration_seconds="3600s",
+        distance_meters=32000,
+        encoded_polyline="abc",
+        tolls=(),
+    )
+
+
+_ROUTE = {
+    "origin": "東京駅",
+    "destination": "横浜駅",
+    "waypoints": ["川崎大師"],
+    "distance_meters": 32000,
+    "duration_seconds": "3600s",
+}
+
+
+class TestCompactHistory:
+    """_compact_history（会話履歴の圧縮）のユニットテスト。"""
+
+    def test_estimate_tokens(self) -> None:
+        """ASCII は4文字、非 ASCII は1文字を1トークンとして数えること。"""
+        assert _estimate_tokens("abcdefgh") == 2
+        assert _estimate_tokens("東京駅") == 3
+        assert _estimate_tokens("") == 0
+
+    def test_short_history_is_unchanged(self) -> None:
+        contents = _history_turn("こんにちは", "どうぞ")
+
+        assert _compact_history(contents, 10, 4000) is contents
+
+    def test_summarizes_turns_over_message_limit(self) -> None:
+        """最大メッセージ数を超えた古いターンを要約1件にまとめること。"""
+        contents = [c for i in range(6) for c in _history_turn(f"質問{i}", f"回答{i}")]
+
+        result = _compact_history(contents, 10, 4000)
+
+        assert len(result) == 11
+        summary = result[0].parts[0].text
+        assert result[0].role == "user"
+        assert summary.splitlines() == [
+            "（これまでの会話の要約）",
+            "ユーザー: 質問0",
+            "AI: 回答0",
+        ]
+        assert result[1].parts[0].text == "質問1"
+
+    def test_summarizes_turns_over_token_budget(self) -> None:
+        """推定トークン数が上限を超える長い発言は切り詰めて要約に入ること。"""
+        contents = _history_turn("あ" * 5000, "了解") + _history_turn("次", "はい")
+
+        result = _compact_history(contents, 10, 1000)
+
+        assert len(result) == 3
+        summary_line = result[0].parts[0].text.splitlines()[1]
+        assert summary_line.startswith("ユーザー: ああ")
+        assert len(summary_line) <= len("ユーザー: ") + 80
+        assert sum(_estimate_tokens(c.parts[0].text) for c in result) <= 1000
+
+    def test_keeps_last_route_from_dropped_turns(self) -> None:
+        """古いターンにしかないルートは要約に残すこと。"""
+        contents = _history_turn("東京から横浜", "ルートです", route=_ROUTE)
+        contents += [c for i in range(5) for c in _history_turn(f"質問{i}", "はい")]
+
+        result = _compact_history(contents, 10, 4000)
+
+        summary = result[0].parts[0].text
+        assert (
+            "確定したルート: 東京駅 → 横浜駅（経由: 川崎大師） / 距離 32.0km / 所要 60分"
+            in summary
+        )
+
+    def test_keeps_last_places_from_dropped_turns(self) -> None:
+        """古いターンの search_places の結果（{"result": [...]}）を要約に残すこと。"""
+        places = [{"name": f"カフェ{i}", "address": f"箱根町{i}"} for i in range(7)]
+        contents = [
+            Content(role="user", parts=[Part.from_text("箱根のカフェ")]),
+            Content(
+                role="model",
+                parts=[
+                    Part.from_dict(
+                        {"function_call": {"name": "search_places", "args": {}}}
+                    )
+                ],
+            ),
+            Content(
+                role="user",
+                parts=[
+                    Part.from_function_response(
+                        name="search_places", response={"result": places}
+                    )
+                ],
+            ),
+            Content(role="model", parts=[Part.from_text("候補です")]),
+        ]
+        contents += [c for i in range(5) for c in _history_turn(f"質問{i}", "はい")]
+
+        result = _compact_history(contents, 10, 4000)
+
+        assert result[0].parts[0].text.splitlines()[-1] == (
+            "直近のスポット候補: カフェ0（箱根町0）、カフェ1（箱根町1）、"
+            "カフェ2（箱根町2）、カフェ3（箱根町3）、カフェ4（箱根町4）"
+        )
+
+    def test_route_in_recent_turns_is_not_duplicated(self) -> None:
+        """残したターンにルートがあれば要約には入れないこと。"""
+        contents = _history_turn("東京から横浜", "ルートです", route=_ROUTE)
+        contents += _history_turn("もう一度", "どうぞ", route=_ROUTE)
+
+        result = _compact_history(contents, 2, 4000)
+
+        assert "確定したルート" not in result[0].parts[0].text
+        assert result[3].parts[0].function_response.name == "calculate_route"
+
+    def test_previous_summary_is_carried_over(self) -> None:
+        """要約済みの履歴を再び圧縮しても、以前の要約とルートを引き継ぐこと。"""
+        contents = _history_turn("東京から横浜", "ルートです", route=_ROUTE)
+        contents += _history_turn("質問1", "回答1")
+        compacted = _compact_history(contents, 2, 4000)
+
+        result = _compact_history(compacted + _history_turn("質問2", "回答2"), 2, 4000)
+
+        lines = result[0].parts[0].text.splitlines()
+        assert lines[1:4] == [
+            "ユーザー: 東京から横浜",
+            "AI: ルートです",
+            "ユーザー: 質問1",
+        ]
+        assert lines[-1].startswith("確定したルート: 東京駅")
+        assert result[1].parts[0].text == "質問2"
+
+
+class TestModelRegistry:
+    """get_model / warm_up_models のテスト。"""
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_model_is_built_once(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """同じ用途のモデルはプロセスで1回だけ生成されること。"""
+        assert get_model("chat") is get_model("chat")
+        assert mock_model_class.call_count == 1
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_send_message_reuses_model(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """asend_message を繰り返してもモデルを再生成しないこと。"""
+        mock_model_class.return_value.generate_content_async = AsyncMock(
+            return_value=_model_response("ok")
+        )
+
+        async def _run():
+            await asend_message("1回目")
+            await asend_message("2回目")
+
+        asyncio.run(_run())
+
+        assert mock_model_class.call_count == 1
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_warm_up_builds_all_models(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """warm_up_models で全用途のモデルが生成されること。"""
+        warm_up_models()
+        assert mock_model_class.call_count == 2
+
+        get_model("chat")
+        get_model("waypoints")
+        assert mock_model_class.call_count == 2
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_separate_model_per_event_loop(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """イベントループごとに別のインスタンスを使い、モデルの生成は1回だけであること。"""
+
+        async def _get():
+            return get_model("chat"), get_model("chat")
+
+        first_a, first_b = asyncio.run(_get())
+        second_a, _ = asyncio.run(_get())
+
+        assert first_a is first_b
+        assert first_a is not second_a
+        assert mock_model_class.call_count == 1
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_warmed_model_is_used_in_event_loop(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """起動時に生成したモデルを、イベントループ上でも作り直さずに使うこと。"""
+        warm_up_models()
+        warmed = mock_model_class.return_value
+        warmed.generate_content_async = AsyncMock(return_value=_model_response("ok"))
+        warmed.__dict__["_prediction_async_client"] = MagicMock()
+
+        async def _get():
+            return get_model("chat")
+
+        model = asyncio.run(_get())
+
+        assert mock_model_class.call_count == 2
+        assert model is not warmed
+        # 設定は共有し、イベントループに紐づく非同期クライアントだけを持たないこと
+        assert model.generate_content_async is warmed.generate_content_async
+        assert "_prediction_async_client" not in model.__dict__
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_sync_wrapper_closes_loop_client(
+        self, mock_init: MagicMock, mock_model_class: MagicMock
+    ) -> None:
+        """同期版は一時的なイベントループで生成した非同期クライアントを閉じること。"""
+        client = MagicMock()
+        client.transport.close = AsyncMock()
+
+        async def generate(contents):
+            # 初回使用時に非同期クライアントが生成されたことを模す
+            get_model("waypoints").__dict__["_prediction_async_client"] = client
+            return _model_response('{"candidates": []}')
+
+        mock_model_class.return_value.generate_content_async = generate
+
+        suggest_waypoints("東京駅", "横浜駅", "温泉")
+
+        client.transport.close.assert_awaited_once()
+        assert "_prediction_async_client" not in mock_model_class.return_value.__dict__
+
+
+def _cached_content() -> MagicMock:
+    cached_content = MagicMock(spec=CachedContent)
+    cached_content.resource_name = "cachedContents/test"
+    return cached_content
+
+
+def _cached_model(cached_content: MagicMock) -> MagicMock:
+    """GenerativeModel.from_cached_content の戻り値を模したモックを生成する。"""
+    model = MagicMock()
+    model._cached_content = cached_content
+    return model
+
+
+class TestContextCachedModel:
+    """コンテキストキャッシュを使うチャット用モデルのテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _enable_context_cache(self):
+        # キャッシュの作成だけをスレッドで行う（TTL 延長のループは始めない）
+        def start_worker(context_cache: ContextCache, stop: threading.Event) -> None:
+            context_cache._worker = threading.Thread(
+                target=context_cache._create, args=(stop,)
+            )
+            context_cache._worker.start()
+
+        with (
+            override_settings(GEMINI_CONTEXT_CACHE_ENABLED=True),
+            patch.object(ContextCache, "_start_worker", start_worker),
+        ):
+            yield
+
+    @staticmethod
+    def _wait_for_context_cache() -> None:
+        worker = _get_chat_context_cache()._worker
+        if worker is not None:
+            worker.join(5)
+
+    @patch("navigation.services.context_cache.CachedContent")
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_chat_model_uses_cached_content(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        mock_cached_content_class: MagicMock,
+    ) -> None:
+        """作成中はキャッシュなしのモデルを使い、作成後はキャッシュから生成したモデルを使うこと。"""
+        cached_content = _cached_content()
+        mock_cached_content_class.create.return_value = cached_content
+
+        assert get_model("chat") is mock_model_class.return_value
+        self._wait_for_context_cache()
+        model = get_model("chat")
+
+        assert model is mock_model_class.from_cached_content.return_value
+        mock_model_class.from_cached_content.assert_called_once_with(cached_content)
+        mock_model_class.assert_called_once()
+        mock_cached_content_class.create.assert_called_once()
+
+    @patch("navigation.services.context_cache.CachedContent")
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_falls_back_when_cache_creation_fails(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        mock_cached_content_class: MagicMock,
+    ) -> None:
+        """キャッシュを作成できない場合、通常のモデルにフォールバックすること。"""
+        mock_cached_content_class.create.side_effect = RuntimeError("too small")
 
+        get_model("chat")
+        self._wait_for_context_cache()
+        model = get_model("chat")
+
+        assert model is mock_model_class.return_value
+        assert mock_model_class.call_count == 1
+        mock_model_class.from_cached_content.assert_not_called()
+
+    @patch("navigation.services.context_cache.CachedContent")
     @patch("navigation.services.gemini.GenerativeModel")
     @patch("navigation.services.gemini._ensure_initialized")
-    @patch("navigation.services.gemini.time.sleep")
-    def test_retry_on_resource_exhausted(
+    def test_disabled_by_default(
         self,
-        mock_sleep: MagicMock,
         mock_init: MagicMock,
         mock_model_class: MagicMock,
+        mock_cached_content_class: MagicMock,
     ) -> None:
-        """ResourceExhausted 発生時にリトライして成功すること。"""
-        mock_chat = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = "成功しました"
+        """無効な場合はキャッシュを作成しないこと。"""
+        with override_settings(GEMINI_CONTEXT_CACHE_ENABLED=False):
+            assert get_model("chat") is mock_model_class.return_value
+        mock_cached_content_class.create.assert_not_called()
 
-        # 1回目: ResourceExhausted, 2回目: 成功
-        mock_chat.send_message.side_effect = [
-            ResourceExhausted("Rate limited"),
-            mock_response,
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_not_found_without_cache_is_raised(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """キャッシュを使っていないモデルの NotFound はそのまま送出すること。"""
+        with override_settings(GEMINI_CONTEXT_CACHE_ENABLED=False):
+            mock_model_class.return_value.generate_content_async = AsyncMock(
+                side_effect=NotFound("model not found")
+            )
+
+            with pytest.raises(NotFound):
+                asyncio.run(asend_message("テスト"))
+
+    @patch("navigation.services.context_cache.CachedContent")
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_asend_message_rebuilds_model_when_cache_expired(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        mock_cached_content_class: MagicMock,
+    ) -> None:
+        """asyncio 版でも、キャッシュが期限切れの場合はモデルを作り直して再試行すること。"""
+        cached_content = _cached_content()
+        mock_cached_content_class.create.side_effect = [
+            cached_content,
+            RuntimeError("unavailable"),
         ]
-        mock_chat.history = []
+        cached_model = _cached_model(cached_content)
+        cached_model.generate_content_async = AsyncMock(
+            side_effect=NotFound("cached content not found")
+        )
+        mock_model_class.from_cached_content.return_value = cached_model
+        mock_model_class.return_value.generate_content_async = AsyncMock(
+            return_value=_model_response("再試行しました")
+        )
+        get_model("chat")
+        self._wait_for_context_cache()
 
-        mock_model = MagicMock()
-        mock_model.start_chat.return_value = mock_chat
-        mock_model_class.return_value = mock_model
+        reply, _, _ = asyncio.run(asend_message("テスト"))
+        self._wait_for_context_cache()
 
-        reply, route, places = send_message("テスト")
+        assert reply == "再試行しました"
+        cached_model.generate_content_async.assert_awaited_once()
+        assert mock_cached_content_class.create.call_count == 2
+
+    @patch("navigation.services.context_cache.CachedContent")
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_reset_deletes_context_cache(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        mock_cached_content_class: MagicMock,
+    ) -> None:
+        """reset_models でコンテキストキャッシュを Vertex AI 側からも削除すること。"""
+        cached_content = _cached_content()
+        mock_cached_content_class.create.return_value = cached_content
+        get_model("chat")
+        self._wait_for_context_cache()
 
-        assert reply == "成功しました"
-        assert mock_chat.send_message.call_count == 2
-        mock_sleep.assert_called_once_with(1)  # 2^0 = 1 second
+        reset_models()
+
+        cached_content.delete.assert_called_once_with()
+
+
+class TestSendMessageRetry:
+    """asend_message のリトライロジックのテスト。"""
 
     @patch("navigation.services.gemini.GenerativeModel")
     @patch("navigation.services.gemini._ensure_initialized")
-    @patch("navigation.services.gemini.time.sleep")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
     def test_retry_exhausted_returns_error(
         self,
-        mock_sleep: MagicMock,
+        mock_sleep: AsyncMock,
         mock_init: MagicMock,
         mock_model_class: MagicMock,
     ) -> None:
         """3回リトライしても失敗した場合、エラーメッセージを返すこと。"""
-        mock_chat = MagicMock()
-        mock_chat.send_message.side_effect = ResourceExhausted("Rate limited")
-        mock_chat.history = []
-
         mock_model = MagicMock()
-        mock_model.start_chat.return_value = mock_chat
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=ResourceExhausted("Rate limited")
+        )
         mock_model_class.return_value = mock_model
 
-        reply, route, places = send_message("テスト")
+        reply, route, places = asyncio.run(asend_message("テスト"))
 
         assert "サーバーが混み合っています" in reply
         assert route is None
         assert places is None
-        assert mock_chat.send_message.call_count == 3
+        assert mock_model.generate_content_async.await_count == 3
         # sleep calls: 1s, 2s (not called after 3rd failure)
-        assert mock_sleep.call_count == 2
+        assert mock_sleep.await_count == 2
+        assert get_limiter("gemini").stats()["in_flight"] == 0
 
     @patch("navigation.services.gemini.GenerativeModel")
     @patch("navigation.services.gemini._ensure_initialized")
-    @patch("navigation.services.gemini.time.sleep")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
     def test_exponential_backoff_timing(
         self,
-        mock_sleep: MagicMock,
+        mock_sleep: AsyncMock,
         mock_init: MagicMock,
         mock_model_class: MagicMock,
     ) -> None:
         """指数バックオフが 1, 2, 4 秒で動作すること。"""
-        mock_chat = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = "成功"
-
         # 2回失敗、3回目で成功
-        mock_chat.send_message.side_effect = [
-            ResourceExhausted("Rate limited"),
-            ResourceExhausted("Rate limited"),
-            mock_response,
-        ]
-        mock_chat.history = []
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                ResourceExhausted("Rate limited"),
+                ResourceExhausted("Rate limited"),
+                _model_response("成功"),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        reply, _, _ = asyncio.run(asend_message("テスト"))
+
+        assert reply == "成功"
+        assert [call.args for call in mock_sleep.await_args_list] == [(1,), (2,)]
+        assert retry_stats()["gemini"]["retries"] == 2
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
+    def test_retry_after_from_server(
+        self,
+        mock_sleep: AsyncMock,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """サーバーが Retry-After を指定した場合はその秒数だけ待つこと。"""
+        response = MagicMock()
+        response.headers = {"Retry-After": "3"}
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                ResourceExhausted("Rate limited", response=response),
+                _model_response("成功"),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        reply, _, _ = asyncio.run(asend_message("テスト"))
+
+        assert reply == "成功"
+        mock_sleep.assert_awaited_once_with(3.0)
 
+    @override_settings(GEMINI_RETRY_FAIL_FAST=True)
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
+    def test_fail_fast(
+        self,
+        mock_sleep: AsyncMock,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """GEMINI_RETRY_FAIL_FAST の場合は待たずにエラーメッセージを返すこと。"""
         mock_model = MagicMock()
-        mock_model.start_chat.return_value = mock_chat
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=ResourceExhausted("Rate limited")
+        )
         mock_model_class.return_value = mock_model
 
+        reply, _, _ = asyncio.run(asend_message("テスト"))
+
+        assert "サーバーが混み合っています" in reply
+        assert mock_model.generate_content_async.await_count == 1
+        mock_sleep.assert_not_awaited()
+        assert retry_stats()["gemini"]["gave_up"] == 1
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_sync_wrapper(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """同期版の send_message は asend_message と同じ処理で応答すること。"""
+        mock_model_class.return_value.generate_content_async = AsyncMock(
+            return_value=_model_response("同期版")
+        )
+
         reply, route, places = send_message("テスト")
 
+        assert reply == "同期版"
+        assert route is None
+        assert places is None
+
+
+def _model_response(text: str = "", function_calls: list | None = None) -> MagicMock:
+    """generate_content_async の戻り値を模したモックを生成する。"""
+    candidate = MagicMock()
+    candidate.content = Content(role="model", parts=[Part.from_text(text or "...")])
+    candidate.function_calls = function_calls or []
+    response = MagicMock()
+    response.candidates = [candidate]
+    response.text = text
+    return response
+
+
+def _function_call(name: str, args: dict) -> MagicMock:
+    function_call = MagicMock()
+    function_call.name = name
+    function_call.args = args
+    return function_call
+
+
+class TestAsyncSendMessage:
+    """asend_message（asyncio 版）のテスト。"""
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_executes_tools_and_extracts_route(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """ツール呼び出しを asyncio 版の関数で実行し、ルートを抽出すること。"""
+        route = _route("東京駅", "横浜駅")
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                _model_response(
+                    function_calls=[
+                        _function_call(
+                            "calculate_route",
+                            {"origin": "東京駅", "destination": "横浜駅"},
+                        )
+                    ]
+                ),
+                _model_response("ルートです"),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"calculate_route": AsyncMock(return_value=route)},
+        ) as tools:
+            reply, route_data, places = asyncio.run(asend_message("東京から横浜"))
+            tools["calculate_route"].assert_awaited_once_with(
+                origin="東京駅", destination="横浜駅"
+            )
+
+        assert reply == "ルートです"
+        # ツールの戻り値をそのまま返し、Gemini には辞書で渡すこと
+        assert route_data is route
+        assert places is None
+        assert mock_model.generate_content_async.await_count == 2
+        contents = mock_model.generate_content_async.await_args_list[1].args[0]
+        function_response = contents[2].parts[0].function_response
+        assert function_response.response["origin"] == "東京駅"
+        assert "google_maps_url" not in function_response.response
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_observes_turn_metrics(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """1ターン分のトークン数（全応答の合計）とツール呼び出し回数を記録すること。"""
+        responses = [
+            _model_response(
+                function_calls=[
+                    _function_call(
+                        "calculate_route", {"origin": "東京駅", "destination": "横浜駅"}
+                    )
+                ]
+            ),
+            _model_response("ルートです"),
+        ]
+        for response, (prompt, output) in zip(
+            responses, [(100, 10), (150, 30)], strict=True
+        ):
+            response.usage_metadata.prompt_token_count = prompt
+            response.usage_metadata.candidates_token_count = output
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(side_effect=responses)
+        mock_model_class.return_value = mock_model
+
+        with (
+            patch.dict(
+                "navigation.services.gemini._async_tool_functions",
+                {"calculate_route": AsyncMock(return_value=_route("東京駅", "横浜駅"))},
+            ),
+            patch("navigation.services.gemini.metrics.observe_gemini_turn") as observe,
+        ):
+            asyncio.run(asend_message("東京から横浜"))
+
+        observe.assert_called_once_with(250, 40, 1)
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
+    def test_retry_uses_async_sleep(
+        self,
+        mock_sleep: AsyncMock,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """ResourceExhausted 時は asyncio.sleep で待機して再試行すること。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[ResourceExhausted("Rate limited"), _model_response("成功")]
+        )
+        mock_model_class.return_value = mock_model
+
+        reply, _, _ = asyncio.run(asend_message("テスト"))
+
         assert reply == "成功"
-        assert mock_sleep.call_count == 2
-        mock_sleep.assert_any_call(1)  # 2^0
-        mock_sleep.assert_any_call(2)  # 2^1
+        mock_sleep.assert_awaited_once_with(1)
+        assert get_limiter("gemini").stats()["throttled"] == 1
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_rate_limiter_queue_timeout(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """レート制限の枠を取れなかった場合は送信せずにエラーメッセージを返すこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock()
+        mock_model_class.return_value = mock_model
+
+        with patch.object(
+            get_limiter("gemini"), "aacquire", side_effect=RateLimitExceeded
+        ):
+            reply, _, _ = asyncio.run(asend_message("テスト"))
+
+        assert "混み合っています" in reply
+        mock_model.generate_content_async.assert_not_awaited()
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_function_call_limit(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """関数呼び出しが上限を超えた場合、エラーメッセージを返すこと。"""
+        looping = _model_response(
+            function_calls=[_function_call("search_places", {"location_query": "箱根"})]
+        )
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(return_value=looping)
+        mock_model_class.return_value = mock_model
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"search_places": AsyncMock(return_value=[])},
+        ):
+            reply, route, places = asyncio.run(asend_message("テスト"))
+
+        assert "エラーが発生しました" in reply
+        assert route is None
+        assert places is None
+
+
+class TestServerSession:
+    """session_id 指定時（サーバー側セッション）の asend_message のテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _reset_caches(self):
+        reset_caches()
+        yield
+        reset_caches()
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_continues_from_stored_history(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """保存した履歴（ツール結果を含む）で続きを生成し、結果は今回のターンから抽出すること。"""
+        route = _route("東京駅", "横浜駅")
+        responses = iter(
+            [
+                _model_response(
+                    function_calls=[
+                        _function_call(
+                            "calculate_route",
+                            {"origin": "東京駅", "destination": "横浜駅"},
+                        )
+                    ]
+                ),
+                _model_response("ルートです"),
+                _model_response("どういたしまして"),
+            ]
+        )
+        sent: list[list[Content]] = []
+
+        async def _generate(contents):
+            sent.append(list(contents))
+            return next(responses)
+
+        mock_model = MagicMock()
+        mock_model.generate_content_async = _generate
+        mock_model_class.return_value = mock_model
+        session_id = new_session_id()
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"calculate_route": AsyncMock(return_value=route)},
+        ):
+            _, first_route, _ = asyncio.run(
+                asend_message("東京から横浜", session_id=session_id)
+            )
+            # history は送らず、新しいメッセージだけで続ける
+            reply, second_route, _ = asyncio.run(
+                asend_message("ありがとう", session_id=session_id)
+            )
+
+        assert first_route is route
+        assert reply == "どういたしまして"
+        assert second_route is None
+        last_request = sent[-1]
+        assert len(last_request) == 5
+        assert last_request[2].parts[0].function_response.name == "calculate_route"
+        assert last_request[-1].parts[0].text == "ありがとう"
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_unknown_session_falls_back_to_history(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """セッションが見つからない場合は history を使うこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            return_value=_model_response("はい")
+        )
+        mock_model_class.return_value = mock_model
+        history = [
+            {"role": "user", "content": "こんにちは"},
+            {"role": "assistant", "content": "どうぞ"},
+        ]
+
+        asyncio.run(asend_message("テスト", history, session_id=new_session_id()))
+
+        contents = mock_model.generate_content_async.await_args.args[0]
+        assert contents[0].parts[0].text == "こんにちは"
+
+
+class TestAsyncSuggestWaypoints:
+    """asuggest_waypoints（asyncio 版）のテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _reset_caches(self):
+        reset_caches()
+        yield
+        reset_caches()
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_parses_json(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """JSON 応答から候補とコメントを取り出すこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            return_value=_model_response(
+                '{"candidates": [{"name": "大涌谷"}], "ai_comment": "どうぞ"}'
+            )
+        )
+        mock_model_class.return_value = mock_model
+
+        result = asyncio.run(asuggest_waypoints("東京駅", "箱根", "温泉"))
+
+        assert result == {"candidates": [{"name": "大涌谷"}], "ai_comment": "どうぞ"}
+
+    @override_settings(GEMINI_RETRY_FAIL_FAST=True)
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_rate_limit_returns_previous_suggestion(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """混み合っている場合は、同じ条件で直近に返した提案を返すこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                _model_response(
+                    '{"candidates": [{"name": "大涌谷"}], "ai_comment": "どうぞ"}'
+                ),
+                ResourceExhausted("Rate limited"),
+                ResourceExhausted("Rate limited"),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        first = asyncio.run(asuggest_waypoints("東京駅", "箱根", "温泉"))
+        cached = asyncio.run(asuggest_waypoints("東京駅", "箱根", "温泉"))
+        other = asyncio.run(asuggest_waypoints("東京駅", "箱根", "美術館"))
+
+        assert cached == first
+        assert other["error"] == "rate_limit"
+        assert other["candidates"] == []
+
+
+def _stream(*chunks: list[Part]):
+    """generate_content_async(stream=True) の戻り値を模した非同期イテレータを生成する。"""
+
+    async def _chunks():
+        for parts in chunks:
+            chunk = MagicMock()
+            chunk.candidates = [MagicMock()]
+            chunk.candidates[0].content.parts = parts
+            yield chunk
+
+    return _chunks()
+
+
+def _collect(stream) -> list[tuple[str, dict]]:
+    async def _run():
+        return [event async for event in stream]
+
+    return asyncio.run(_run())
+
+
+class TestAsyncStreamMessage:
+    """astream_message（ストリーミング版）のテスト。"""
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_streams_text_and_tool_events(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """テキスト差分・ツール呼び出しイベント・最終結果を順に返すこと。"""
+        route = _route("東京駅", "横浜駅")
+        function_call = Part.from_dict(
+            {
+                "function_call": {
+                    "name": "calculate_route",
+                    "args": {"origin": "東京駅", "destination": "横浜駅"},
+                }
+            }
+        )
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                _stream([Part.from_text("調べます。")], [function_call]),
+                _stream([Part.from_text("ルートは")], [Part.from_text("こちら")]),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"calculate_route": AsyncMock(return_value=route)},
+        ):
+            events = _collect(astream_message("東京から横浜"))
+
+        assert events[:-1] == [
+            ("delta", {"text": "調べます。"}),
+            (
+                "tool_start",
+                {
+                    "name": "calculate_route",
+                    "args": {"origin": "東京駅", "destination": "横浜駅"},
+                },
+            ),
+            ("tool_end", {"name": "calculate_route", "ok": True}),
+            ("delta", {"text": "ルートは"}),
+            ("delta", {"text": "こちら"}),
+        ]
+        event, data = events[-1]
+        assert event == "done"
+        assert data["reply"] == "調べます。ルートはこちら"
+        assert data["route"] is route
+        assert data["places"] is None
+
+        # 2回目の呼び出しには、まとめたテキストと関数呼び出し・実行結果が含まれること
+        contents = mock_model.generate_content_async.await_args_list[1][0][0]
+        assert contents[1].role == "model"
+        assert contents[1].parts[0].text == "調べます。"
+        assert contents[1].parts[1].function_call.name == "calculate_route"
+        assert contents[2].parts[0].function_response.name == "calculate_route"
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_tool_error_is_reported(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """ツールがエラーを返した場合、tool_end の ok が False になること。"""
+        function_call = Part.from_dict(
+            {
+                "function_call": {
+                    "name": "search_places",
+                    "args": {"location_query": "x"},
+                }
+            }
+        )
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[_stream([function_call]), _stream([Part.from_text("なし")])]
+        )
+        mock_model_class.return_value = mock_model
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"search_places": AsyncMock(return_value={"error": "failed"})},
+        ):
+            events = _collect(astream_message("テスト"))
+
+        assert ("tool_end", {"name": "search_places", "ok": False}) in events
+        assert events[-1][0] == "done"
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
+    def test_rate_limit_before_first_chunk_is_retried(
+        self,
+        mock_sleep: AsyncMock,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """最初のチャンク前の ResourceExhausted は再試行すること。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                ResourceExhausted("Rate limited"),
+                _stream([Part.from_text("成功")]),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        events = _collect(astream_message("テスト"))
+
+        assert events == [
+            ("delta", {"text": "成功"}),
+            ("done", {"reply": "成功", "route": None, "places": None}),
+        ]
+        mock_sleep.assert_awaited_once_with(1)
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    @patch("navigation.services.gemini.asyncio.sleep", new_callable=AsyncMock)
+    def test_rate_limit_exhausted_returns_error_event(
+        self,
+        mock_sleep: AsyncMock,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """再試行しても 429 の場合、error イベントを返すこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=ResourceExhausted("Rate limited")
+        )
+        mock_model_class.return_value = mock_model
+
+        events = _collect(astream_message("テスト"))
+
+        assert len(events) == 1
+        assert events[0][0] == "error"
+        assert "サーバーが混み合っています" in events[0][1]["detail"]
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_slot_released_when_upstream_finishes(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """上流のストリームを読み終えたら、呼び出し側が読み終える前に枠を返すこと。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            return_value=_stream([Part.from_text("a")], [Part.from_text("b")])
+        )
+        mock_model_class.return_value = mock_model
+
+        async def _run() -> int:
+            stream = astream_message("テスト")
+            assert await anext(stream) == ("delta", {"text": "a"})
+            # 上流のタスクを最後まで進める
+            for _ in range(10):
+                await asyncio.sleep(0)
+            in_flight = get_limiter("gemini").stats()["in_flight"]
+            await stream.aclose()
+            return in_flight
+
+        assert asyncio.run(_run()) == 0
+
+
+class TestParallelFunctionCalls:
+    """同じ応答内の関数呼び出しの並行実行のテスト。"""
+
+    def test_calls_are_traced(self) -> None:
+        """並行実行したツールの所要時間も計測すること。"""
+        function_calls = [
+            _function_call("calculate_route", {"origin": "A", "destination": "B"}),
+            _function_call("search_places", {"location_query": "箱根"}),
+        ]
+
+        async def _run():
+            with tracing.collect() as timings:
+                await _acall_functions(function_calls)
+            return timings
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {
+                "search_places": AsyncMock(return_value=[]),
+                "calculate_route": AsyncMock(return_value=_route("A", "B")),
+            },
+        ):
+            timings = asyncio.run(_run())
+
+        assert {name for name, _ in timings.items()} == {
+            "tool.calculate_route",
+            "tool.search_places",
+        }
+
+    def test_places_are_wrapped_for_gemini(self) -> None:
+        """スポットのリストは {"result": [...]} で包んだ辞書で Gemini に渡すこと。"""
+        places = [
+            Place(
+                name="箱根湯本",
+                address="神奈川県足柄下郡箱根町",
+                rating=4.5,
+                coords=Coords(latitude=35.23, longitude=139.10),
+                price_level="UNKNOWN",
+            )
+        ]
+
+        with patch.dict(
+            "navigation.services.gemini._async_tool_functions",
+            {"search_places": AsyncMock(return_value=places)},
+        ):
+            [(part, result)] = asyncio.run(
+                _acall_functions(
+                    [_function_call("search_places", {"location_query": "箱根"})]
+                )
+            )
+
+        assert result is places
+        assert part.function_response.response["result"][0]["name"] == "箱根湯本"
+
+    def test_error_cancels_other_calls(self) -> None:
+        """ツールの例外は GeminiFunctionCallingError として送出し、残りの呼び出しを取り消すこと。"""
+        cancelled = []
+
+        async def failing(location_query: str) -> list:
+            raise ValueError(location_query)
+
+        async def slow(origin: str, destination: str) -> Route:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(origin)
+                raise
+            return _route(origin, destination)
+
+        async def _run():
+            await _acall_functions(
+                [
+                    _function_call("search_places", {"location_query": "a"}),
+                    _function_call(
+                        "calculate_route", {"origin": "A", "destination": "B"}
+                    ),
+                ]
+            )
+
+        with (
+            patch.dict(
+                "navigation.services.gemini._async_tool_functions",
+                {"search_places": failing, "calculate_route": slow},
+            ),
+            pytest.raises(GeminiFunctionCallingError, match="search_places"),
+        ):
+            asyncio.run(_run())
+
+        assert cancelled == ["A"]
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_async_calls_run_concurrently_in_order(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """asyncio 版: 複数の呼び出しを並行実行し、呼び出し順に履歴へ追加すること。"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[
+                _model_response(
+                    function_calls=[
+                        _function_call("search_places", {"location_query": "箱根"}),
+                        _function_call(
+                            "calculate_route", {"origin": "A", "destination": "B"}
+                        ),
+                    ]
+                ),
+                _model_response("完了"),
+            ]
+        )
+        mock_model_class.return_value = mock_model
+
+        async def _run():
+            # search_places は calculate_route の開始を待つため、順に実行すると終わらない
+            route_started = asyncio.Event()
+
+            async def search_places(location_query: str) -> list:
+                await asyncio.wait_for(route_started.wait(), timeout=5)
+                return [{"name": location_query}]
+
+            async def calculate_route(origin: str, destination: str) -> Route:
+                route_started.set()
+                return _route(origin, destination)
+
+            with patch.dict(
+                "navigation.services.gemini._async_tool_functions",
+                {"search_places": search_places, "calculate_route": calculate_route},
+            ):
+                return await asend_message("テスト")
+
+        reply, route, _ = asyncio.run(_run())
+
+        assert reply == "完了"
+        assert route.origin == "A"
+        contents = mock_model.generate_content_async.await_args_list[1][0][0]
+        names = [part.function_response.name for part in contents[-2].parts]
+        assert names == ["search_places", "calculate_route"]
+
+    @patch("navigation.services.gemini.GenerativeModel")
+    @patch("navigation.services.gemini._ensure_initialized")
+    def test_stream_reports_tool_end_in_completion_order(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+    ) -> None:
+        """ストリーミング版: tool_end は完了順、履歴は呼び出し順であること。"""
+        function_calls = [
+            Part.from_dict(
+                {
+                    "function_call": {
+                        "name": "search_places",
+                        "args": {"location_query": "x"},
+                    }
+                }
+            ),
+            Part.from_dict(
+                {
+                    "function_call": {
+                        "name": "calculate_route",
+                        "args": {"origin": "A", "destination": "B"},
+                    }
+                }
+            ),
+        ]
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[_stream(function_calls), _stream([Part.from_text("完了")])]
+        )
+        mock_model_class.return_value = mock_model
+
+        async def _run():
+            route_done = asyncio.Event()
+
+            async def search_places(location_query: str) -> list:
+                await asyncio.wait_for(route_done.wait(), timeout=5)
+                return []
+
+            async def calculate_route(origin: str, destination: str) -> Route:
+                route_done.set()
+                return _route(origin, destination)
+
+            with patch.dict(
+                "navigation.services.gemini._async_tool_functions",
+                {"search_places": search_places, "calculate_route": calculate_route},
+            ):
+                return [event async for event in astream_message("テスト")]
+
+        events = asyncio.run(_run())
+
+        tool_events = [(event, data["name"]) for event, data in events[:4]]
+        assert tool_events == [
+            ("tool_start", "search_places"),
+            ("tool_start", "calculate_route"),
+            ("tool_end", "calculate_route"),
+            ("tool_end", "search_places"),
+        ]
+        contents = mock_model.generate_content_async.await_args_list[1][0][0]
+        names = [part.function_response.name for part in contents[-2].parts]
+        assert names == ["search_places", "calculate_route"]
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import django
 from dotenv import load_dotenv
@@ -16,15 +18,83 @@ sys.path.insert(0, str(backend_dir))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
 django.setup()
 
-import requests  # noqa: E402
+import httpx  # noqa: E402
+import pytest  # noqa: E402
 from django.conf import settings  # noqa: E402
 
+from navigation.services.cache import get_cache, reset_caches  # noqa: E402
+from navigation.services.domain import Coords, Place, Route, Toll  # noqa: E402
+from navigation.services.place_store import reset_place_store  # noqa: E402
+from navigation.services.rate_limit import (  # noqa: E402
+    RateLimitExceeded,
+    get_limiter,
+    reset_limiters,
+)
+from navigation.services.retry import reset_policies, retry_stats  # noqa: E402
 from navigation.services.google_maps import (  # noqa: E402
+    _departure_bucket,
+    _place_entries,
+    acalculate_route,
+    acalculate_routes,
+    arank_by_detour,
+    asearch_places,
     calculate_route,
     search_places,
 )
 
 
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    reset_caches()
+    reset_limiters()
+    reset_policies()
+    yield
+    reset_caches()
+    reset_limiters()
+    reset_policies()
+
+
+@pytest.fixture(autouse=True)
+def _no_retry_delay():
+    """5xx の再試行（"maps" ポリシー）で実際には待たない。"""
+    original = settings.MAPS_RETRY_BASE_DELAY
+    settings.MAPS_RETRY_BASE_DELAY = 0
+    yield
+    settings.MAPS_RETRY_BASE_DELAY = original
+
+
+@pytest.fixture(autouse=True)
+def _place_store():
+    original = settings.PLACE_STORE_PATH
+    settings.PLACE_STORE_PATH = ":memory:"
+    reset_place_store()
+    yield
+    reset_place_store()
+    settings.PLACE_STORE_PATH = original
+
+
+def _httpx_response(status_code: int, body: dict | list) -> httpx.Response:
+    return httpx.Response(
+        status_code, json=body, request=httpx.Request("POST", "https://example.com")
+    )
+
+
+def _places_response(name: str = "テストレストラン") -> httpx.Response:
+    return _httpx_response(
+        200,
+        {
+            "places": [
+                {
+                    "displayName": {"text": name},
+                    "formattedAddress": "神奈川県足柄下郡箱根町",
+                    "rating": 4.5,
+                    "location": {"latitude": 35.23, "longitude": 139.1},
+                },
+            ]
+        },
+    )
+
+
 # ---------------------------------------------------------------------------
 # search_places
 # ---------------------------------------------------------------------------
@@ -33,13 +103,10 @@ from navigation.services.google_maps import (  # noqa: E402
 class TestSearchPlaces:
     """search_places のユニットテスト。"""
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_success(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success(self, mock_apost: AsyncMock) -> None:
         """正常なレスポンスからスポット情報を抽出できること。"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "places": [
                 {
                     "displayName": {"text": "テストレストラン"},
@@ -51,26 +118,24 @@ class TestSearchPlaces:
                 },
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("東京駅", "restaurant")
 
         assert isinstance(result, list)
         assert len(result) == 1
-        assert result[0]["name"] == "テストレストラン"
-        assert result[0]["address"] == "東京都千代田区丸の内1-1"
-        assert result[0]["rating"] == 4.5
-        assert result[0]["coords"]["latitude"] == 35.6812
-        assert result[0]["coords"]["longitude"] == 139.7671
-
-    @patch("navigation.services.google_maps.requests.post")
-    def test_empty_response(self, mock_post: Mock) -> None:
+        assert result[0].name == "テストレストラン"
+        assert result[0].address == "東京都千代田区丸の内1-1"
+        assert result[0].rating == 4.5
+        assert result[0].coords.latitude == 35.6812
+        assert result[0].coords.longitude == 139.7671
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_empty_response(self, mock_apost: AsyncMock) -> None:
         """結果が0件の場合、空リストを返すこと。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {"places": []}
-        mock_post.return_value = mock_response
+        body = {"places": []}
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("存在しない場所")
@@ -86,10 +151,10 @@ class TestSearchPlaces:
         assert isinstance(result, dict)
         assert "error" in result
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_network_error(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_network_error(self, mock_apost: AsyncMock) -> None:
         """ネットワークエラー時にエラー辞書を返すこと。"""
-        mock_post.side_effect = requests.ConnectionError("接続エラー")
+        mock_apost.side_effect = httpx.ConnectError("接続エラー")
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("東京駅")
@@ -97,12 +162,10 @@ class TestSearchPlaces:
         assert isinstance(result, dict)
         assert "error" in result
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_http_error(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_http_error(self, mock_apost: AsyncMock) -> None:
         """HTTP 4xx/5xx エラー時にエラー辞書を返すこと。"""
-        mock_response = Mock()
-        mock_response.raise_for_status.side_effect = requests.HTTPError("403 Forbidden")
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(403, {})
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("東京駅")
@@ -110,43 +173,148 @@ class TestSearchPlaces:
         assert isinstance(result, dict)
         assert "error" in result
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_rate_limit_error(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_rate_limit_error(self, mock_apost: AsyncMock) -> None:
         """429 レート制限エラー時に専用メッセージを返すこと。"""
-        mock_response = Mock()
-        mock_response.status_code = 429
-        http_error = requests.HTTPError("429 Too Many Requests")
-        http_error.response = mock_response
-        mock_response.raise_for_status.side_effect = http_error
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(429, {})
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("東京駅")
 
         assert isinstance(result, dict)
         assert "リクエストが集中" in result["error"]
+        # 429 はレート制限の同時実行数の上限を下げる
+        assert get_limiter("places").stats()["throttled"] == 1
+        assert get_limiter("places").limit == settings.PLACES_MAX_CONCURRENCY // 2
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_missing_fields_handled(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_rate_limiter_queue_timeout(self, mock_apost: AsyncMock) -> None:
+        """レート制限の枠を取れなかった場合は API を呼ばず、429 と同じエラーを返すこと。"""
+        settings.MAPS_API_KEY = "test-api-key"
+        with patch.object(
+            get_limiter("places"), "aacquire", side_effect=RateLimitExceeded
+        ):
+            result = search_places("東京駅")
+
+        assert "リクエストが集中" in result["error"]
+        mock_apost.assert_not_called()
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_missing_fields_handled(self, mock_apost: AsyncMock) -> None:
         """APIレスポンスにフィールドが欠けていてもデフォルト値で処理できること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "places": [
                 {
                     # displayName, location 等が欠落
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = search_places("箱根")
 
         assert isinstance(result, list)
         assert len(result) == 1
-        assert result[0]["name"] == "不明"
-        assert result[0]["coords"]["latitude"] == 0
+        assert result[0].name == "不明"
+        assert result[0].coords.latitude == 0
+
+
+class TestSearchPlacesCache:
+    """search_places の結果キャッシュのテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_cache_hit_skips_api(self, mock_apost: AsyncMock) -> None:
+        """同じ条件の2回目の検索では API を呼ばないこと。"""
+        mock_apost.return_value = _places_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        first = search_places("箱根", "ramen")
+        second = search_places("箱根", "ramen")
+
+        assert first == second
+        assert mock_apost.call_count == 1
+        assert get_cache("places").stats()["hits"] == 1
+        assert get_cache("places").stats()["misses"] == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_concurrent_misses_call_api_once(self, mock_apost: AsyncMock) -> None:
+        """キャッシュミスした同じ検索が同時に来た場合、API を1回だけ呼ぶこと。"""
+
+        async def apost(*args, **kwargs) -> httpx.Response:
+            await asyncio.sleep(0.01)
+            return _places_response()
+
+        async def run() -> list:
+            return await asyncio.gather(
+                *(asearch_places("箱根", "ramen") for _ in range(4))
+            )
+
+        mock_apost.side_effect = apost
+        settings.MAPS_API_KEY = "test-api-key"
+        results = asyncio.run(run())
+
+        assert mock_apost.call_count == 1
+        assert len(results) == 4
+        assert all(result[0].name == "テストレストラン" for result in results)
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_cache_key_is_normalized(self, mock_apost: AsyncMock) -> None:
+        """空白・全角半角・大文字小文字の違いは同じキーとして扱うこと。"""
+        mock_apost.return_value = _places_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        search_places("箱根", "Ramen")
+        search_places("  箱根 ", "ｒａｍｅｎ")
+
+        assert mock_apost.call_count == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_cache_key_includes_filters(self, mock_apost: AsyncMock) -> None:
+        """PLACES_MIN_RATING が変わった場合は別のキーになること。"""
+        mock_apost.return_value = _places_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        original = settings.PLACES_MIN_RATING
+        try:
+            search_places("箱根", "ramen")
+            settings.PLACES_MIN_RATING = 3.0
+            search_places("箱根", "ramen")
+        finally:
+            settings.PLACES_MIN_RATING = original
+
+        assert mock_apost.call_count == 2
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_errors_are_not_cached(self, mock_apost: AsyncMock) -> None:
+        """エラー結果はキャッシュされず、次回は API を再度呼ぶこと。"""
+        mock_apost.side_effect = [
+            httpx.ConnectError("接続エラー"),
+            _places_response(),
+        ]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        assert "error" in search_places("箱根")
+        assert isinstance(search_places("箱根"), list)
+        assert mock_apost.call_count == 2
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_cached_result_is_not_shared(self, mock_apost: AsyncMock) -> None:
+        """返却したリストを書き換えてもキャッシュ内容に影響しないこと。
+
+        Place は変更できないため、コピーせずに同じオブジェクトを返す。
+        """
+        mock_apost.return_value = _places_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        first = search_places("箱根")
+        place = first[0]
+        first.clear()
+
+        second = search_places("箱根")
+        assert second[0].name == "テストレストラン"
+        assert second[0] is place
+        assert isinstance(place, Place)
 
 
 # ---------------------------------------------------------------------------
@@ -157,12 +325,10 @@ class TestSearchPlaces:
 class TestCalculateRoute:
     """calculate_route のユニットテスト。"""
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_success_basic(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success_basic(self, mock_apost: AsyncMock) -> None:
         """基本的なルート計算が成功すること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "3600s",
@@ -176,25 +342,23 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("東京駅", "横浜駅")
 
-        assert "error" not in result
-        assert result["origin"] == "東京駅"
-        assert result["destination"] == "横浜駅"
-        assert result["duration_seconds"] == "3600s"
-        assert result["distance_meters"] == 50000
-        assert result["encoded_polyline"] == "abc123"
-        assert result["tolls"] == [{"currencyCode": "JPY", "units": "1200"}]
+        assert isinstance(result, Route)
+        assert result.origin == "東京駅"
+        assert result.destination == "横浜駅"
+        assert result.duration_seconds == "3600s"
+        assert result.distance_meters == 50000
+        assert result.encoded_polyline == "abc123"
+        assert result.tolls == (Toll(currencyCode="JPY", units="1200"),)
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_success_with_waypoints(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success_with_waypoints(self, mock_apost: AsyncMock) -> None:
         """経由地付きのルート計算が成功すること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "7200s",
@@ -203,16 +367,16 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("東京駅", "箱根湯本駅", waypoints=["小田原駅"])
 
-        assert "error" not in result
-        assert result["waypoints"] == ["小田原駅"]
+        assert isinstance(result, Route)
+        assert result.waypoints == ("小田原駅",)
 
         # intermediates と optimizeWaypointOrder がリクエストに含まれていること
-        call_kwargs = mock_post.call_args
+        call_kwargs = mock_apost.call_args
         payload = call_kwargs.kwargs.get("json") or call_kwargs[1].get("json")
         assert payload["intermediates"] == [{"address": "小田原駅"}]
         assert payload["optimizeWaypointOrder"] is True
@@ -224,13 +388,11 @@ class TestCalculateRoute:
 
         assert "error" in result
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_no_routes_found(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_no_routes_found(self, mock_apost: AsyncMock) -> None:
         """ルートが見つからない場合にエラーを返すこと。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {"routes": []}
-        mock_post.return_value = mock_response
+        body = {"routes": []}
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("無効な場所A", "無効な場所B")
@@ -238,25 +400,20 @@ class TestCalculateRoute:
         assert "error" in result
         assert "見つかりませんでした" in result["error"]
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_network_error(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_network_error(self, mock_apost: AsyncMock) -> None:
         """ネットワークエラー時にエラー辞書を返すこと。"""
-        mock_post.side_effect = requests.Timeout("タイムアウト")
+        mock_apost.side_effect = httpx.ReadTimeout("タイムアウト")
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("東京駅", "横浜駅")
 
         assert "error" in result
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_rate_limit_error(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_rate_limit_error(self, mock_apost: AsyncMock) -> None:
         """429 レート制限エラー時に専用メッセージを返すこと。"""
-        mock_response = Mock()
-        mock_response.status_code = 429
-        http_error = requests.HTTPError("429 Too Many Requests")
-        http_error.response = mock_response
-        mock_response.raise_for_status.side_effect = http_error
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(429, {})
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("東京駅", "横浜駅")
@@ -265,12 +422,22 @@ class TestCalculateRoute:
         assert "リクエストが集中" in result["error"]
         assert result["error_type"] == "rate_limit"
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_no_toll_info(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_rate_limiter_queue_timeout(self, mock_apost: AsyncMock) -> None:
+        """レート制限の枠を取れなかった場合は API を呼ばず、rate_limit エラーを返すこと。"""
+        settings.MAPS_API_KEY = "test-api-key"
+        with patch.object(
+            get_limiter("routes"), "aacquire", side_effect=RateLimitExceeded
+        ):
+            result = calculate_route("東京駅", "横浜駅")
+
+        assert result["error_type"] == "rate_limit"
+        mock_apost.assert_not_called()
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_no_toll_info(self, mock_apost: AsyncMock) -> None:
         """高速料金情報がない場合でも正常に処理できること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "1800s",
@@ -279,19 +446,17 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("A", "B")
 
-        assert result["tolls"] == []
+        assert result.tolls == ()
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_success_with_waypoint_coords(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success_with_waypoint_coords(self, mock_apost: AsyncMock) -> None:
         """経由地の座標が legs から正しく抽出されること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "7200s",
@@ -320,31 +485,24 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route(
             "東京駅", "箱根湯本駅", waypoints=["小田原城", "芦ノ湖"]
         )
 
-        assert "error" not in result
-        assert "waypoint_coords" in result
-        assert len(result["waypoint_coords"]) == 2
-        assert result["waypoint_coords"][0] == {
-            "latitude": 35.2474,
-            "longitude": 139.1549,
-        }
-        assert result["waypoint_coords"][1] == {
-            "latitude": 35.2074,
-            "longitude": 139.1028,
-        }
+        assert isinstance(result, Route)
+        assert len(result.waypoint_coords) == 2
+        assert result.waypoint_coords == (
+            Coords(latitude=35.2474, longitude=139.1549),
+            Coords(latitude=35.2074, longitude=139.1028),
+        )
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_optimized_waypoint_order(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_optimized_waypoint_order(self, mock_apost: AsyncMock) -> None:
         """経由地が最適化された順序で返されること。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "10800s",
@@ -377,24 +535,22 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route(
             "東京駅", "箱根湯本駅", waypoints=["A地点", "B地点", "C地点"]
         )
 
-        assert "error" not in result
+        assert isinstance(result, Route)
         # Original order: [A, B, C] -> Optimized order: [B, A, C]
-        assert result["waypoints"] == ["B地点", "A地点", "C地点"]
-        assert len(result["waypoint_coords"]) == 3
+        assert result.waypoints == ("B地点", "A地点", "C地点")
+        assert len(result.waypoint_coords) == 3
 
-    @patch("navigation.services.google_maps.requests.post")
-    def test_no_waypoints_returns_empty_coords(self, mock_post: Mock) -> None:
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_no_waypoints_returns_empty_coords(self, mock_apost: AsyncMock) -> None:
         """経由地なしの場合は空配列を返すこと。"""
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.return_value = {
+        body = {
             "routes": [
                 {
                     "duration": "3600s",
@@ -411,11 +567,534 @@ class TestCalculateRoute:
                 }
             ]
         }
-        mock_post.return_value = mock_response
+        mock_apost.return_value = _httpx_response(200, body)
 
         settings.MAPS_API_KEY = "test-api-key"
         result = calculate_route("東京駅", "横浜駅")
 
-        assert "error" not in result
-        assert "waypoint_coords" in result
-        assert result["waypoint_coords"] == []
+        assert isinstance(result, Route)
+        assert result.waypoint_coords == ()
+
+
+# ---------------------------------------------------------------------------
+# calculate_route のキャッシュ・出発時刻バケット
+# ---------------------------------------------------------------------------
+
+
+def _routes_response() -> httpx.Response:
+    return _httpx_response(
+        200,
+        {
+            "routes": [
+                {
+                    "duration": "3600s",
+                    "distanceMeters": 50000,
+                    "polyline": {"encodedPolyline": "abc123"},
+                }
+            ]
+        },
+    )
+
+
+class TestDepartureBucket:
+    """_departure_bucket のユニットテスト。"""
+
+    def test_rounds_up_to_bucket(self) -> None:
+        """現在時刻+5分をバケット単位に切り上げること。"""
+        original = settings.ROUTES_DEPARTURE_BUCKET_MINUTES
+        settings.ROUTES_DEPARTURE_BUCKET_MINUTES = 15
+        try:
+            now = datetime(2026, 1, 1, 9, 2, 30, tzinfo=UTC)
+            assert _departure_bucket(now) == datetime(2026, 1, 1, 9, 15, tzinfo=UTC)
+        finally:
+            settings.ROUTES_DEPARTURE_BUCKET_MINUTES = original
+
+    def test_never_earlier_than_lead_time(self) -> None:
+        """バケット境界は常に現在時刻+5分以降であること。"""
+        now = datetime(2026, 1, 1, 9, 0, 1, tzinfo=UTC)
+        assert _departure_bucket(now) >= now + timedelta(minutes=5)
+
+    def test_same_bucket_for_nearby_times(self) -> None:
+        """同じバケット内の時刻は同じ出発時刻になること。"""
+        first = datetime(2026, 1, 1, 9, 0, 10, tzinfo=UTC)
+        second = datetime(2026, 1, 1, 9, 4, 50, tzinfo=UTC)
+        assert _departure_bucket(first) == _departure_bucket(second)
+
+
+class TestCalculateRouteCache:
+    """calculate_route のルートキャッシュのテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_cache_hit_skips_api(self, mock_apost: AsyncMock) -> None:
+        """同じバケット内の同一リクエストでは Routes API を呼ばないこと。"""
+        mock_apost.return_value = _routes_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        first = calculate_route("東京駅", "横浜駅", ["川崎駅"])
+        second = calculate_route("東京駅", "横浜駅", ["川崎駅"])
+
+        assert first == second
+        assert mock_apost.call_count == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_departure_time_is_bucketed(self, mock_apost: AsyncMock) -> None:
+        """リクエストの departureTime がバケット境界の時刻になること。"""
+        mock_apost.return_value = _routes_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        calculate_route("東京駅", "横浜駅")
+
+        payload = mock_apost.call_args.kwargs["json"]
+        departure = datetime.strptime(
+            payload["departureTime"], "%Y-%m-%dT%H:%M:%SZ"
+        ).replace(tzinfo=UTC)
+        bucket_seconds = settings.ROUTES_DEPARTURE_BUCKET_MINUTES * 60
+        assert departure.timestamp() % bucket_seconds == 0
+
+    @patch("navigation.services.google_maps._departure_bucket")
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_new_bucket_calls_api(
+        self, mock_apost: AsyncMock, mock_bucket: Mock
+    ) -> None:
+        """バケットが変わった場合は Routes API を再度呼ぶこと。"""
+        mock_apost.return_value = _routes_response()
+        mock_bucket.side_effect = [
+            datetime(2026, 1, 1, 9, 5, tzinfo=UTC),
+            datetime(2026, 1, 1, 9, 10, tzinfo=UTC),
+        ]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        calculate_route("東京駅", "横浜駅")
+        calculate_route("東京駅", "横浜駅")
+
+        assert mock_apost.call_count == 2
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_waypoints_are_part_of_key(self, mock_apost: AsyncMock) -> None:
+        """経由地が異なるリクエストは別のキーになること。"""
+        mock_apost.return_value = _routes_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        calculate_route("東京駅", "横浜駅", ["川崎駅"])
+        calculate_route("東京駅", "横浜駅", ["品川駅"])
+
+        assert mock_apost.call_count == 2
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_errors_are_not_cached(self, mock_apost: AsyncMock) -> None:
+        """ルートが見つからない結果はキャッシュしないこと。"""
+        mock_apost.side_effect = [
+            _httpx_response(200, {"routes": []}),
+            _routes_response(),
+        ]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        assert "error" in calculate_route("東京駅", "横浜駅")
+        assert isinstance(calculate_route("東京駅", "横浜駅"), Route)
+
+
+# ---------------------------------------------------------------------------
+# asyncio 版（asearch_places / acalculate_route）
+# ---------------------------------------------------------------------------
+
+
+class TestAsyncSearchPlaces:
+    """asearch_places のユニットテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success(self, mock_apost: AsyncMock) -> None:
+        """同期版と同じ形式でスポット情報を返すこと。"""
+        mock_apost.return_value = _httpx_response(
+            200, {"places": [{"displayName": {"text": "テスト"}}]}
+        )
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(asearch_places("箱根", "cafe"))
+
+        assert result[0].name == "テスト"
+        assert mock_apost.call_args.kwargs["json"]["textQuery"] == "cafe near 箱根"
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_shares_cache_with_sync(self, mock_apost: AsyncMock) -> None:
+        """同期版（asyncio 版のラッパー）でキャッシュした結果を asyncio 版でも使うこと。"""
+        mock_apost.return_value = _places_response()
+
+        settings.MAPS_API_KEY = "test-api-key"
+        search_places("箱根", "ramen")
+        result = asyncio.run(asearch_places("箱根", "ramen"))
+
+        assert result[0].name == "テストレストラン"
+        assert mock_apost.await_count == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_rate_limit_error(self, mock_apost: AsyncMock) -> None:
+        """429 レート制限エラー時に専用メッセージを返すこと。"""
+        mock_apost.return_value = _httpx_response(429, {})
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(asearch_places("東京駅"))
+
+        assert "リクエストが集中" in result["error"]
+        assert get_limiter("places").stats()["throttled"] == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_network_error(self, mock_apost: AsyncMock) -> None:
+        """ネットワークエラー時にエラー辞書を返すこと。"""
+        mock_apost.side_effect = httpx.ConnectError("接続エラー")
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(asearch_places("東京駅"))
+
+        assert "error" in result
+
+
+class TestAsyncCalculateRoute:
+    """acalculate_route のユニットテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_success_and_cache(self, mock_apost: AsyncMock) -> None:
+        """ルートを計算し、2回目はキャッシュから返すこと。"""
+        mock_apost.return_value = _httpx_response(
+            200,
+            {
+                "routes": [
+                    {
+                        "duration": "3600s",
+                        "distanceMeters": 50000,
+                        "polyline": {"encodedPolyline": "abc123"},
+                    }
+                ]
+            },
+        )
+
+        settings.MAPS_API_KEY = "test-api-key"
+        first = asyncio.run(acalculate_route("東京駅", "横浜駅"))
+        second = asyncio.run(acalculate_route("東京駅", "横浜駅"))
+
+        assert first.encoded_polyline == "abc123"
+        assert first == second
+        assert mock_apost.await_count == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_http_errors(self, mock_apost: AsyncMock) -> None:
+        """429 は rate_limit、それ以外は api_failure になること。"""
+        settings.MAPS_API_KEY = "test-api-key"
+
+        mock_apost.return_value = _httpx_response(429, {})
+        assert asyncio.run(acalculate_route("A", "B"))["error_type"] == "rate_limit"
+
+        mock_apost.return_value = _httpx_response(500, {})
+        assert asyncio.run(acalculate_route("A", "B"))["error_type"] == "api_failure"
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_server_error_is_retried(self, mock_apost: AsyncMock) -> None:
+        """5xx は "maps" ポリシーでバックオフしてから再試行すること。"""
+        mock_apost.side_effect = [_httpx_response(503, {}), _routes_response()]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(acalculate_route("A", "B"))
+
+        assert isinstance(result, Route)
+        assert mock_apost.await_count == 2
+        assert retry_stats()["maps"]["retries"] == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_server_error_gives_up(self, mock_apost: AsyncMock) -> None:
+        """再試行しても 5xx の場合は api_failure を返し、429 は再試行しないこと。"""
+        mock_apost.return_value = _httpx_response(500, {})
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(acalculate_route("A", "B"))
+
+        assert result["error_type"] == "api_failure"
+        assert mock_apost.await_count == settings.MAPS_RETRY_MAX_ATTEMPTS
+
+        mock_apost.reset_mock()
+        mock_apost.return_value = _httpx_response(429, {})
+        asyncio.run(acalculate_route("C", "D"))
+        assert mock_apost.await_count == 1
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_no_routes_found(self, mock_apost: AsyncMock) -> None:
+        """ルートが見つからない場合に not_found を返すこと。"""
+        mock_apost.return_value = _httpx_response(200, {"routes": []})
+
+        settings.MAPS_API_KEY = "test-api-key"
+        result = asyncio.run(acalculate_route("A", "B"))
+
+        assert result["error_type"] == "not_found"
+
+    def test_concurrent_misses_call_api_once(self) -> None:
+        """キャッシュミスした同じルートが同時に来た場合、API を1回だけ呼ぶこと。"""
+
+        async def apost(*args, **kwargs) -> Mock:
+            await asyncio.sleep(0.01)
+            return _httpx_response(
+                200,
+                {
+                    "routes": [
+                        {
+                            "duration": "60s",
+                            "distanceMeters": 100,
+                            "polyline": {"encodedPolyline": "abc"},
+                        }
+                    ]
+                },
+            )
+
+        async def run() -> list:
+            return await asyncio.gather(
+                *(acalculate_route("東京駅", "横浜駅") for _ in range(3))
+            )
+
+        settings.MAPS_API_KEY = "test-api-key"
+        with patch(
+            "navigation.services.google_maps.http_client.apost", side_effect=apost
+        ) as mock_apost:
+            results = asyncio.run(run())
+
+        assert mock_apost.call_count == 1
+        assert results[0] is results[1] is results[2]
+
+
+class TestAsyncCalculateRoutes:
+    """acalculate_routes（一括計算）のユニットテスト。"""
+
+    def test_dedup_order_and_concurrency(self) -> None:
+        """重複を除いて並行計算し、入力順に結果を返すこと。同時実行数は上限以下であること。"""
+        running = 0
+        max_running = 0
+
+        async def fake_calculate_route(origin, destination, waypoints=None):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return Route(
+                origin=origin,
+                destination=destination,
+                waypoints=tuple(waypoints),
+                waypoint_coords=(),
+                duration_seconds="0s",
+                distance_meters=0,
+                encoded_polyline="",
+                tolls=(),
+            )
+
+        route_requests = [
+            ("A", "B", []),
+            ("C", "D", ["E"]),
+            ("A", "B", []),
+            ("F", "G", []),
+            ("H", "I", []),
+        ]
+        with patch(
+            "navigation.services.google_maps.acalculate_route",
+            side_effect=fake_calculate_route,
+        ) as mock_calculate_route:
+            results = asyncio.run(acalculate_routes(route_requests, max_concurrency=2))
+
+        assert [r.origin for r in results] == ["A", "C", "A", "F", "H"]
+        assert results[1].waypoints == ("E",)
+        assert mock_calculate_route.call_count == 4
+        assert max_running == 2
+        # 重複した要素には同じ（変更できない）Route を返すこと
+        assert results[0] is results[2]
+
+
+def _matrix_element(
+    origin_index: int, destination_index: int, seconds: int, meters: int
+) -> dict:
+    element = {
+        "condition": "ROUTE_EXISTS",
+        "duration": f"{seconds}s",
+        "distanceMeters": meters,
+    }
+    # インデックス 0 は応答で省略される
+    if origin_index:
+        element["originIndex"] = origin_index
+    if destination_index:
+        element["destinationIndex"] = destination_index
+    return element
+
+
+# 候補2件: origins = [出発地, 候補A, 候補B]、destinations = [候補A, 候補B, 目的地]
+_MATRIX_ELEMENTS = [
+    _matrix_element(0, 2, 3600, 50000),  # 出発地→目的地
+    _matrix_element(0, 0, 3000, 40000),  # 出発地→候補A
+    _matrix_element(1, 2, 2400, 30000),  # 候補A→目的地
+    _matrix_element(0, 1, 1200, 15000),  # 出発地→候補B
+    _matrix_element(2, 2, 2700, 36000),  # 候補B→目的地
+    _matrix_element(1, 1, 900, 8000),
+    _matrix_element(2, 0, 900, 8000),
+    {"originIndex": 1, "condition": "ROUTE_NOT_FOUND"},
+]
+
+
+class TestRankByDetour:
+    """arank_by_detour のユニットテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_ranks_candidates_with_one_request(self, mock_apost: AsyncMock) -> None:
+        """1回の computeRouteMatrix で寄り道コストを求め、少ない順に並べること。"""
+        mock_apost.return_value = _httpx_response(200, _MATRIX_ELEMENTS)
+        candidates = [
+            {"name": "候補A", "description": "", "address": "住所A"},
+            {
+                "name": "候補B",
+                "description": "",
+                "coords": {"latitude": 35.0, "longitude": 139.0},
+            },
+        ]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        ranked = asyncio.run(arank_by_detour("東京駅", "箱根", candidates))
+
+        assert [c["name"] for c in ranked] == ["候補B", "候補A"]
+        assert ranked[0]["detour_seconds"] == 1200 + 2700 - 3600
+        assert ranked[0]["detour_meters"] == 15000 + 36000 - 50000
+        assert ranked[1]["detour_seconds"] == 3000 + 2400 - 3600
+        assert mock_apost.await_count == 1
+
+        payload = mock_apost.call_args[1]["json"]
+        assert payload["origins"][0] == {"waypoint": {"address": "東京駅"}}
+        assert payload["origins"][1] == {"waypoint": {"address": "住所A"}}
+        assert payload["origins"][2]["waypoint"]["location"]["latLng"] == {
+            "latitude": 35.0,
+            "longitude": 139.0,
+        }
+        assert payload["destinations"][-1] == {"waypoint": {"address": "箱根"}}
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_missing_elements_are_unranked(self, mock_apost: AsyncMock) -> None:
+        """ルートが無い候補は None にして末尾に置くこと。"""
+        elements = [e for e in _MATRIX_ELEMENTS if e.get("originIndex") != 1]
+        mock_apost.return_value = _httpx_response(200, elements)
+        candidates = [
+            {"name": "候補A", "description": ""},
+            {"name": "候補B", "description": ""},
+        ]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        ranked = asyncio.run(arank_by_detour("東京駅", "箱根", candidates))
+
+        assert [c["name"] for c in ranked] == ["候補B", "候補A"]
+        assert ranked[1]["detour_seconds"] is None
+        assert ranked[1]["detour_meters"] is None
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_api_error_keeps_order(self, mock_apost: AsyncMock) -> None:
+        """API エラー時は例外を送出せず、元の順序のまま None を付与すること。"""
+        mock_apost.side_effect = httpx.ConnectError("down")
+        candidates = [{"name": "候補A"}, {"name": "候補B"}]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        ranked = asyncio.run(arank_by_detour("東京駅", "箱根", candidates))
+
+        assert [c["name"] for c in ranked] == ["候補A", "候補B"]
+        assert all(c["detour_seconds"] is None for c in ranked)
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_no_candidates(self, mock_apost: AsyncMock) -> None:
+        """候補が無い場合は API を呼ばないこと。"""
+        assert asyncio.run(arank_by_detour("東京駅", "箱根", [])) == []
+        mock_apost.assert_not_called()
+
+
+class TestPlaceResolution:
+    """search_places の結果を使った地点解決（Place ID）のテスト。"""
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_search_places_then_route_uses_place_id(
+        self, mock_apost: AsyncMock
+    ) -> None:
+        """search_places で取得したスポットの住所は、ルート計算で placeId として渡すこと。"""
+        places_response = _httpx_response(
+            200,
+            {
+                "places": [
+                    {
+                        "id": "ChIJ-hakone",
+                        "displayName": {"text": "箱根湯本駅"},
+                        "formattedAddress": "神奈川県足柄下郡箱根町湯本",
+                        "rating": 4.5,
+                        "location": {"latitude": 35.23, "longitude": 139.1},
+                    }
+                ]
+            },
+        )
+        mock_apost.side_effect = [places_response, _routes_response()]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        search_places("箱根", "station")
+        calculate_route("東京駅", " 神奈川県足柄下郡箱根町湯本 ", ["箱根湯本駅"])
+
+        payload = mock_apost.call_args_list[1][1]["json"]
+        assert payload["origin"] == {"address": "東京駅"}
+        assert payload["destination"] == {"placeId": "ChIJ-hakone"}
+        # スポット名は解決せず、住所文字列のまま送る
+        assert payload["intermediates"] == [{"address": "箱根湯本駅"}]
+        assert (
+            "places.id"
+            in mock_apost.call_args_list[0][1]["headers"]["X-Goog-FieldMask"]
+        )
+
+    @patch("navigation.services.google_maps.http_client.apost", new_callable=AsyncMock)
+    def test_chain_names_do_not_collide(self, mock_apost: AsyncMock) -> None:
+        """同名のスポット（チェーン店の別店舗）が別の場所に解決されないこと。"""
+        places_response = _httpx_response(
+            200,
+            {
+                "places": [
+                    {
+                        "id": "ChIJ-odawara",
+                        "displayName": {"text": "スターバックス コーヒー"},
+                        "formattedAddress": "神奈川県小田原市栄町1丁目",
+                        "location": {"latitude": 35.26, "longitude": 139.15},
+                    },
+                    {
+                        "id": "ChIJ-hakone",
+                        "displayName": {"text": "スターバックス コーヒー"},
+                        "formattedAddress": "神奈川県足柄下郡箱根町湯本",
+                        "location": {"latitude": 35.23, "longitude": 139.1},
+                    },
+                ]
+            },
+        )
+        mock_apost.side_effect = [places_response, _routes_response()]
+
+        settings.MAPS_API_KEY = "test-api-key"
+        search_places("箱根", "cafe")
+        calculate_route(
+            "東京駅", "神奈川県足柄下郡箱根町湯本", ["スターバックス コーヒー"]
+        )
+
+        payload = mock_apost.call_args_list[1][1]["json"]
+        assert payload["destination"] == {"placeId": "ChIJ-hakone"}
+        assert payload["intermediates"] == [{"address": "スターバックス コーヒー"}]
+
+    def test_place_entries_are_keyed_on_address(self) -> None:
+        """住所をキーにし、id・住所・座標のいずれかを持たないスポットは保存しないこと。"""
+        location = {"latitude": 35.23, "longitude": 139.1}
+        entries = _place_entries(
+            {
+                "places": [
+                    {
+                        "id": "ChIJ-hakone",
+                        "displayName": {"text": "箱根湯本駅"},
+                        "formattedAddress": "神奈川県足柄下郡箱根町湯本",
+                        "location": location,
+                    },
+                    {"displayName": {"text": "名無し"}, "location": location},
+                    {"id": "ChIJ-no-address", "location": location},
+                ]
+            }
+        )
+
+        assert entries == [
+            (
+                "神奈川県足柄下郡箱根町湯本",
+                {"place_id": "ChIJ-hakone", "latitude": 35.23, "longitude": 139.1},
+            )
+        ]
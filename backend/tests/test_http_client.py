@@ -0,0 +1,105 @@
+"""http_client（Google Maps API 用共有 HTTP クライアント）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from navigation.services import http_client  # noqa: E402
+
+
+def _in_loop(fn):
+    """fn をイベントループ内で呼び、その結果を返す（ループの AsyncClient は閉じる）。"""
+
+    async def run():
+        return fn()
+
+    return http_client.run_sync(run())
+
+
+class TestGetAsyncClient:
+    """get_async_client のユニットテスト。"""
+
+    def test_client_is_reused_within_loop(self) -> None:
+        """同じイベントループ内では同じ AsyncClient が返されること。"""
+        first, second = _in_loop(
+            lambda: (http_client.get_async_client(), http_client.get_async_client())
+        )
+        assert first is second
+
+    def test_client_per_loop(self) -> None:
+        """イベントループが異なれば別の AsyncClient が生成されること。"""
+        first = _in_loop(http_client.get_async_client)
+        second = _in_loop(http_client.get_async_client)
+        assert first is not second
+
+    def test_pool_and_retry_settings(self) -> None:
+        """settings のプールサイズ・リトライ設定がトランスポートに反映されること。"""
+        pool = _in_loop(http_client.get_async_client)._transport._pool
+
+        assert pool._max_connections == settings.MAPS_HTTP_ASYNC_MAX_CONNECTIONS
+        assert pool._max_keepalive_connections == settings.MAPS_HTTP_POOL_MAXSIZE
+        assert pool._retries == settings.MAPS_HTTP_MAX_RETRIES
+
+    def test_http2_falls_back_when_unavailable(self) -> None:
+        """h2 が無い環境で HTTP/2 を有効化しても AsyncClient を生成できること。"""
+        original = settings.MAPS_HTTP2_ENABLED
+        settings.MAPS_HTTP2_ENABLED = True
+        try:
+            with patch.dict(sys.modules, {"h2": None}):
+                pool = _in_loop(http_client.get_async_client)._transport._pool
+        finally:
+            settings.MAPS_HTTP2_ENABLED = original
+
+        assert not pool._http2
+
+
+class TestApost:
+    """apost のユニットテスト。"""
+
+    def test_apost_uses_shared_client(self) -> None:
+        """apost が共有 AsyncClient 経由で送信されること。"""
+        mock_client = Mock()
+        mock_client.post = AsyncMock(return_value="response")
+
+        async def run():
+            with patch.object(
+                http_client, "get_async_client", return_value=mock_client
+            ):
+                return await http_client.apost(
+                    "https://example.com", json={"a": 1}, timeout=5
+                )
+
+        assert asyncio.run(run()) == "response"
+        mock_client.post.assert_awaited_once_with(
+            "https://example.com", json={"a": 1}, timeout=5
+        )
+
+
+class TestRunSync:
+    """run_sync のユニットテスト。"""
+
+    def test_closes_loop_client(self) -> None:
+        """結果を返し、一時的なイベントループの AsyncClient を閉じること。"""
+
+        async def use_client():
+            return http_client.get_async_client()
+
+        client = http_client.run_sync(use_client())
+
+        assert client.is_closed
+        assert not http_client._async_clients
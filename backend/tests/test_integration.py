@@ -33,6 +33,8 @@ import json  # noqa: E402
 import pytest  # noqa: E402
 from django.conf import settings  # noqa: E402
 
+from navigation.services.domain import Route  # noqa: E402
+
 # ---------------------------------------------------------------------------
 # 1. Places API (New) 疎通テスト
 # ---------------------------------------------------------------------------
@@ -57,15 +59,14 @@ class TestPlacesAPI:
 
         # 各スポットに必須フィールドがあること
         for place in results:
-            assert "name" in place, f"name フィールドがありません: {place}"
-            assert "address" in place, f"address フィールドがありません: {place}"
-            assert "coords" in place, f"coords フィールドがありません: {place}"
-            assert "latitude" in place["coords"]
-            assert "longitude" in place["coords"]
+            assert place.name, f"name が空です: {place}"
+            assert place.address, f"address が空です: {place}"
+            assert place.coords.latitude != 0
+            assert place.coords.longitude != 0
 
         print(f"\n[Places API] 成功: {len(results)} 件のスポットを取得")
         for p in results:
-            print(f"  - {p['name']} ({p['address']}) 評価: {p.get('rating', 'N/A')}")
+            print(f"  - {p.name} ({p.address}) 評価: {p.rating}")
 
     def test_search_places_with_different_type(self) -> None:
         """異なる place_type でも結果が返ることを確認する。"""
@@ -79,7 +80,7 @@ class TestPlacesAPI:
         assert isinstance(results, list), f"エラーが返されました: {results}"
         print(f"\n[Places API] 成功 (観光地): {len(results)} 件")
         for p in results:
-            print(f"  - {p['name']}")
+            print(f"  - {p.name}")
 
 
 # ---------------------------------------------------------------------------
@@ -100,16 +101,14 @@ class TestRoutesAPI:
 
         result = calculate_route(origin="東京駅", destination="横浜駅")
 
-        assert "error" not in result, f"エラーが返されました: {result}"
-        assert "duration_seconds" in result
-        assert "distance_meters" in result
-        assert "encoded_polyline" in result
-        assert result["distance_meters"] > 0
+        assert isinstance(result, Route), f"エラーが返されました: {result}"
+        assert result.encoded_polyline
+        assert result.distance_meters > 0
 
         print("\n[Routes API] 成功: 東京駅 → 横浜駅")
-        print(f"  所要時間: {result['duration_seconds']}")
-        print(f"  距離: {result['distance_meters']} m")
-        print(f"  高速料金: {result.get('tolls', [])}")
+        print(f"  所要時間: {result.duration_seconds}")
+        print(f"  距離: {result.distance_meters} m")
+        print(f"  高速料金: {result.tolls}")
 
     def test_calculate_route_with_waypoints(self) -> None:
         """経由地付きのルート計算が成功することを確認する。"""
@@ -124,13 +123,13 @@ class TestRoutesAPI:
             waypoints=["小田原駅"],
         )
 
-        assert "error" not in result, f"エラーが返されました: {result}"
-        assert result["distance_meters"] > 0
-        assert result["waypoints"] == ["小田原駅"]
+        assert isinstance(result, Route), f"エラーが返されました: {result}"
+        assert result.distance_meters > 0
+        assert result.waypoints == ("小田原駅",)
 
         print("\n[Routes API] 成功: 東京駅 → 小田原駅(経由) → 箱根湯本駅")
-        print(f"  所要時間: {result['duration_seconds']}")
-        print(f"  距離: {result['distance_meters']} m")
+        print(f"  所要時間: {result.duration_seconds}")
+        print(f"  距離: {result.distance_meters} m")
 
 
 # ---------------------------------------------------------------------------
@@ -181,7 +180,7 @@ class TestGeminiAPI:
         if places_data:
             print(f"  取得スポット数: {len(places_data)}")
             for p in places_data:
-                print(f"    - {p.get('name', '不明')}")
+                print(f"    - {p.name}")
         else:
             print("  (Gemini がツールを呼ばなかった可能性があります)")
 
@@ -203,10 +202,8 @@ class TestGeminiAPI:
         print("\n[Gemini + Routes] 成功")
         print(f"  応答: {reply_text[:200]}...")
         if route_data:
-            print(
-                f"  ルート: {route_data.get('origin')} → {route_data.get('destination')}"
-            )
-            print(f"  距離: {route_data.get('distance_meters')} m")
+            print(f"  ルート: {route_data.origin} → {route_data.destination}")
+            print(f"  距離: {route_data.distance_meters} m")
         else:
             print("  (Gemini がルート計算ツールを呼ばなかった可能性があります)")
 
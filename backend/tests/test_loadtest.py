@@ -0,0 +1,268 @@
+"""loadtest（疑似 Google API と負荷試験のレポート）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from google.api_core.exceptions import InternalServerError, ResourceExhausted  # noqa: E402
+from vertexai.generative_models import Content, Part  # noqa: E402
+
+from loadtest.fake_google import (  # noqa: E402
+    Behavior,
+    FakeGoogle,
+    Latency,
+    parse_upstreams,
+)
+from loadtest.runner import (  # noqa: E402
+    Report,
+    RunConfig,
+    backend_args,
+    backend_env,
+    percentile,
+    summarize_latency,
+)
+from loadtest.scenarios import SCENARIOS  # noqa: E402
+from loadtest.vertex import _check, _contents  # noqa: E402
+from navigation.services.domain import Route  # noqa: E402
+from navigation.services.google_maps import (  # noqa: E402
+    _parse_places,
+    _parse_route,
+    _parse_route_matrix,
+)
+from navigation.services.retry import retry_after  # noqa: E402
+
+
+def _post(app: FakeGoogle, path: str, payload: dict) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://fake"
+        ) as client:
+            return await client.post(path, json=payload)
+
+    return asyncio.run(run())
+
+
+class TestSpecs:
+    """待ち時間の分布・上流の振る舞いの指定のテスト。"""
+
+    def test_latency(self) -> None:
+        rng = random.Random(0)
+        assert Latency.parse("fixed:250").sample(rng) == 0.25
+        assert 0.1 <= Latency.parse("uniform:100:200").sample(rng) <= 0.2
+        assert Latency.parse("lognormal:150:0.4").sample(rng) > 0
+
+    @pytest.mark.parametrize(
+        "spec", ["fixed", "fixed:1:2", "gamma:1:2", "uniform:-1:2", "fixed:x"]
+    )
+    def test_invalid_latency(self, spec: str) -> None:
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+
+    def test_behavior(self) -> None:
+        behavior = Behavior.parse("fixed:10,error=0.1,throttle=0.2,retry_after=1")
+
+        assert behavior.latency == Latency("fixed", (10.0,))
+        assert (behavior.error_rate, behavior.throttle_rate) == (0.1, 0.2)
+        assert behavior.retry_after == 1.0
+
+    def test_parse_upstreams_overrides_defaults(self) -> None:
+        behaviors = parse_upstreams(["vertex=fixed:5,throttle=0.5"])
+
+        assert behaviors["vertex"].throttle_rate == 0.5
+        assert behaviors["places"].latency.distribution == "lognormal"
+
+    @pytest.mark.parametrize(
+        "spec", ["maps=fixed:1", "vertex", "vertex=fixed:1,error=0.6,throttle=0.6"]
+    )
+    def test_invalid_upstreams(self, spec: str) -> None:
+        with pytest.raises(ValueError):
+            parse_upstreams([spec])
+
+
+class TestFakeGoogle:
+    """疑似サーバーの応答がバックエンドでそのまま読めることのテスト。"""
+
+    def test_places(self) -> None:
+        response = _post(
+            FakeGoogle(),
+            "/v1/places:searchText",
+            {"textQuery": "cafe near 箱根", "maxResultCount": 3},
+        )
+
+        places = _parse_places(response.json())
+        assert response.status_code == 200
+        assert len(places) == 3
+        assert places[0].rating >= 4.0
+
+    def test_routes(self) -> None:
+        payload = {
+            "origin": {"address": "東京駅"},
+            "destination": {"address": "箱根湯本駅"},
+            "intermediates": [{"address": "鎌倉駅"}],
+        }
+        response = _post(
+            FakeGoogle(polyline_points=50), "/directions/v2:computeRoutes", payload
+        )
+
+        route = _parse_route(response.json(), "東京駅", "箱根湯本駅", ["鎌倉駅"])
+        assert isinstance(route, Route)
+        assert len(route.waypoint_coords) == 1
+        assert route.encoded_polyline
+
+    def test_route_matrix(self) -> None:
+        payload = {"origins": [{}, {}], "destinations": [{}, {}, {}]}
+        response = _post(FakeGoogle(), "/distanceMatrix/v2:computeRouteMatrix", payload)
+
+        assert len(_parse_route_matrix(response.json())) == 6
+
+    def test_chat_calls_tools_then_replies(self) -> None:
+        """発話にはツール呼び出し、ツールの実行結果にはテキストで応答すること。"""
+        app = FakeGoogle()
+        user = Content(role="user", parts=[Part.from_text("鎌倉駅から熱海駅まで")])
+        response = _check(
+            _post(app, "/vertex/chat:generateContent", {"contents": _contents(user)})
+        )
+
+        calls = response.candidates[0].function_calls
+        assert [call.name for call in calls] == ["search_places", "calculate_route"]
+        assert dict(calls[1].args) == {"origin": "鎌倉駅", "destination": "熱海駅"}
+        assert response.usage_metadata.prompt_token_count > 0
+
+        tool_result = Content(
+            role="user",
+            parts=[Part.from_function_response("calculate_route", {"content": {}})],
+        )
+        response = _check(
+            _post(
+                app,
+                "/vertex/chat:generateContent",
+                {"contents": _contents([user, tool_result])},
+            )
+        )
+        assert "calculate_route" in response.text
+
+    def test_waypoint_suggestions(self) -> None:
+        response = _check(
+            _post(
+                FakeGoogle(),
+                "/vertex/waypoints:generateContent",
+                {"contents": _contents("出発地: 東京駅\n目的地: 熱海駅")},
+            )
+        )
+
+        assert '"candidates"' in response.text
+
+    def test_throttle_and_error_injection(self) -> None:
+        """429 は Retry-After 付きで返し、ResourceExhausted に変換されること。"""
+        app = FakeGoogle(
+            {
+                "vertex": Behavior(throttle_rate=1.0, retry_after=2),
+                "places": Behavior(error_rate=1.0),
+            }
+        )
+        response = _post(app, "/vertex/chat:generateContent", {"contents": []})
+        assert response.status_code == 429
+        with pytest.raises(ResourceExhausted) as excinfo:
+            _check(response)
+        assert retry_after(excinfo.value) == 2.0
+
+        response = _post(app, "/v1/places:searchText", {"textQuery": "x"})
+        assert response.status_code == 500
+        with pytest.raises(InternalServerError):
+            _check(response)
+
+        assert app.stats["vertex"] == {"requests": 1, "errors": 0, "throttled": 1}
+        assert app.stats["places"] == {"requests": 1, "errors": 1, "throttled": 0}
+
+    def test_unknown_path(self) -> None:
+        assert _post(FakeGoogle(), "/v1/unknown", {}).status_code == 404
+
+
+class TestReport:
+    """レポートの集計のテスト。"""
+
+    def test_percentile(self) -> None:
+        values = [float(i) for i in range(1, 101)]
+
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) == 0.0
+
+    def test_summarize_latency(self) -> None:
+        summary = summarize_latency([0.1, 0.2, 0.3])
+
+        assert summary["p50_ms"] == pytest.approx(200)
+        assert summary["max_ms"] == pytest.approx(300)
+
+    def test_rps_and_error_rate(self) -> None:
+        report = Report(
+            config=RunConfig(scenario="chat"),
+            requests=10,
+            elapsed=2.0,
+            statuses={"200": 8, "429": 1, "error": 1},
+            latency=summarize_latency([]),
+            worker_rss_mib={},
+        )
+
+        assert report.rps == 5.0
+        assert report.error_rate == pytest.approx(0.2)
+        assert report.to_dict()["config"]["scenario"] == "chat"
+
+    def test_cache_off_env(self) -> None:
+        env = backend_env(
+            RunConfig(scenario="chat", cache=False, env=(("PLACES_MAX_RESULTS", "5"),)),
+            "http://127.0.0.1:9",
+        )
+
+        assert env["DJANGO_SETTINGS_MODULE"] == "loadtest.settings"
+        assert env["ROUTES_CACHE_BACKEND"] == "none"
+        assert env["PLACES_MAX_RESULTS"] == "5"
+
+    def test_gthread_server_args(self) -> None:
+        args = backend_args(
+            RunConfig(scenario="chat", server="gthread", threads=4), 8000
+        )
+
+        assert args[args.index("--worker-class") + 1] == "gthread"
+        assert args[args.index("--threads") + 1] == "4"
+        assert args[-1] == "yorimichi_map_backend.wsgi"
+        assert (
+            Report(
+                config=RunConfig(scenario="chat", server="gthread", threads=4),
+                requests=0,
+                elapsed=0.0,
+                statuses={},
+                latency=summarize_latency([]),
+                worker_rss_mib={},
+            )
+            .label()
+            .startswith("chat gthread 2wx4t")
+        )
+
+
+class TestScenarios:
+    """シナリオのリクエストのテスト。"""
+
+    @pytest.mark.parametrize("name", list(SCENARIOS))
+    def test_distinct(self, name: str) -> None:
+        """distinct 種類のリクエストを繰り返すこと。"""
+        scenario = SCENARIOS[name]
+        bodies = {str(scenario.request(i, 10)) for i in range(100)}
+
+        assert len(bodies) == 10
@@ -0,0 +1,289 @@
+"""metrics（Prometheus 形式のメトリクス）のユニットテスト。"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from google.api_core.exceptions import NotFound, ResourceExhausted  # noqa: E402
+
+from navigation.services import metrics  # noqa: E402
+from navigation.services.cache import LRUCache, ResultCache  # noqa: E402
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def _value(name: str, **labels: str) -> float:
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _errors(upstream: str, error_type: str, endpoint: str = "none") -> float:
+    return _value(
+        "yorimichi_upstream_errors_total",
+        upstream=upstream,
+        endpoint=endpoint,
+        error_type=error_type,
+    )
+
+
+class TestUpstreamRequest:
+    """upstream_request / upstream_error のテスト。"""
+
+    def test_counts_request_and_latency(self) -> None:
+        requests_before = _value(
+            "yorimichi_upstream_requests_total", upstream="places", endpoint="none"
+        )
+        observed_before = _value(
+            "yorimichi_upstream_request_duration_seconds_count", upstream="places"
+        )
+
+        with metrics.upstream_request("places") as request:
+            request.observe(200)
+
+        assert (
+            _value(
+                "yorimichi_upstream_requests_total", upstream="places", endpoint="none"
+            )
+            == requests_before + 1
+        )
+        assert (
+            _value(
+                "yorimichi_upstream_request_duration_seconds_count", upstream="places"
+            )
+            == observed_before + 1
+        )
+
+    @pytest.mark.parametrize(
+        ("status_code", "error_type"),
+        [(429, "rate_limit"), (404, "not_found"), (500, "api_failure")],
+    )
+    def test_error_status(self, status_code: int, error_type: str) -> None:
+        before = _errors("routes", error_type)
+
+        with metrics.upstream_request("routes") as request:
+            request.observe(status_code)
+
+        assert _errors("routes", error_type) == before + 1
+
+    @pytest.mark.parametrize(
+        ("error", "error_type"),
+        [
+            (ResourceExhausted("quota"), "rate_limit"),
+            (NotFound("cache"), "not_found"),
+            (ConnectionError("reset"), "api_failure"),
+        ],
+    )
+    def test_exception(self, error: Exception, error_type: str) -> None:
+        """例外は code 属性（HTTP ステータス）から種類を判定すること。"""
+        before = _errors("vertex", error_type)
+
+        with pytest.raises(type(error)), metrics.upstream_request("vertex"):
+            raise error
+
+        assert _errors("vertex", error_type) == before + 1
+
+    def test_endpoint_label(self) -> None:
+        before = _errors("places", "rate_limit", endpoint="/api/navigation/chat/")
+
+        token = metrics.set_endpoint("/api/navigation/chat/")
+        try:
+            metrics.upstream_error("places", "rate_limit")
+        finally:
+            metrics.reset_endpoint(token)
+
+        assert (
+            _errors("places", "rate_limit", endpoint="/api/navigation/chat/")
+            == before + 1
+        )
+        assert metrics.current_endpoint() == "none"
+
+
+class TestGeminiTurn:
+    """observe_gemini_turn のテスト。"""
+
+    def test_tokens_and_function_calls(self) -> None:
+        prompt_before = _value(
+            "yorimichi_gemini_tokens_total", endpoint="none", kind="prompt"
+        )
+        turns_before = _value(
+            "yorimichi_gemini_turn_function_calls_count", endpoint="none"
+        )
+        calls_before = _value(
+            "yorimichi_gemini_turn_function_calls_sum", endpoint="none"
+        )
+
+        metrics.observe_gemini_turn(1200, 80, 2)
+
+        assert (
+            _value("yorimichi_gemini_tokens_total", endpoint="none", kind="prompt")
+            == prompt_before + 1200
+        )
+        assert (
+            _value("yorimichi_gemini_turn_function_calls_count", endpoint="none")
+            == turns_before + 1
+        )
+        assert (
+            _value("yorimichi_gemini_turn_function_calls_sum", endpoint="none")
+            == calls_before + 2
+        )
+
+
+class TestCache:
+    """キャッシュのヒット・ミスの記録のテスト。"""
+
+    def test_hits_and_misses(self) -> None:
+        cache = ResultCache("metrics_test", LRUCache(max_entries=10, ttl=60))
+        hits = _value(
+            "yorimichi_cache_requests_total", cache="metrics_test", result="hit"
+        )
+        misses = _value(
+            "yorimichi_cache_requests_total", cache="metrics_test", result="miss"
+        )
+
+        cache.get("key")
+        cache.set("key", "value")
+        cache.get("key")
+        cache.peek("key")
+
+        assert (
+            _value("yorimichi_cache_requests_total", cache="metrics_test", result="hit")
+            == hits + 1
+        )
+        assert (
+            _value(
+                "yorimichi_cache_requests_total", cache="metrics_test", result="miss"
+            )
+            == misses + 1
+        )
+
+
+class TestRetry:
+    """observe_retry / observe_retry_give_up のテスト。"""
+
+    def test_retries_sleep_and_give_up(self) -> None:
+        retries = _value("yorimichi_retries_total", policy="metrics_test")
+        sleep = _value("yorimichi_retry_sleep_seconds_total", policy="metrics_test")
+        gave_up = _value("yorimichi_retry_gave_up_total", policy="metrics_test")
+
+        metrics.observe_retry("metrics_test", 1.5)
+        metrics.observe_retry("metrics_test", 0.5)
+        metrics.observe_retry_give_up("metrics_test")
+
+        assert _value("yorimichi_retries_total", policy="metrics_test") == retries + 2
+        assert (
+            _value("yorimichi_retry_sleep_seconds_total", policy="metrics_test")
+            == sleep + 2.0
+        )
+        assert (
+            _value("yorimichi_retry_gave_up_total", policy="metrics_test")
+            == gave_up + 1
+        )
+
+
+class TestMetricsEndpoint:
+    """GET /api/metrics/ と MetricsMiddleware のテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _allow_all_hosts(self):
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            yield
+
+    def test_records_requests_per_endpoint(self) -> None:
+        labels = {"endpoint": "/api/health/", "method": "GET", "status": "200"}
+        before = _value("yorimichi_http_requests_total", **labels)
+
+        Client().get("/api/health/")
+
+        assert _value("yorimichi_http_requests_total", **labels) == before + 1
+
+    def test_exposes_metrics(self) -> None:
+        with metrics.upstream_request("places") as request:
+            request.observe(200)
+
+        response = Client().get("/api/metrics/")
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        assert b"yorimichi_upstream_requests_total" in response.content
+
+    @override_settings(METRICS_AUTH_TOKEN="secret")
+    def test_requires_token(self) -> None:
+        assert Client().get("/api/metrics/").status_code == 401
+        response = Client().get(
+            "/api/metrics/", headers={"Authorization": "Bearer secret"}
+        )
+        assert response.status_code == 200
+
+
+_RECORD = """
+import os, sys
+sys.path.insert(0, {backend_dir!r})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+import django
+django.setup()
+from navigation.services import metrics
+metrics.observe_gemini_turn(100, 10, 1)
+"""
+
+_RENDER = """
+import os, sys
+sys.path.insert(0, {backend_dir!r})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+import django
+django.setup()
+from navigation.services import metrics
+sys.stdout.write(metrics.render()[0].decode())
+"""
+
+
+class TestMultiprocess:
+    """PROMETHEUS_MULTIPROC_DIR を使ったワーカー間の合算のテスト。"""
+
+    def test_sums_values_across_processes(self, tmp_path: Path) -> None:
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+        def run(script: str) -> str:
+            return subprocess.run(
+                [sys.executable, "-c", script.format(backend_dir=str(backend_dir))],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+                timeout=60,
+            ).stdout
+
+        for _ in range(2):
+            run(_RECORD)
+        body = run(_RENDER)
+
+        assert (
+            'yorimichi_gemini_tokens_total{endpoint="none",kind="prompt"} 200.0' in body
+        )
+
+
+def test_usage_from_response() -> None:
+    """応答の usage_metadata から (入力, 出力) のトークン数を取り出すこと。"""
+    from navigation.services.gemini import _usage
+
+    response = SimpleNamespace(
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=120, candidates_token_count=30
+        )
+    )
+
+    assert _usage(response) == (120, 30)
+    assert _usage(SimpleNamespace()) == (0, 0)
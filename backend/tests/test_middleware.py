@@ -0,0 +1,150 @@
+"""yorimichi_map_backend.middleware のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+from django.http import HttpResponse, StreamingHttpResponse  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from navigation.services import tracing  # noqa: E402
+from yorimichi_map_backend.middleware import (  # noqa: E402
+    CompressionMiddleware,
+    ServerTimingMiddleware,
+)
+
+_BODY = b'{"encoded_polyline": "' + b"abc" * 200 + b'"}'
+
+
+def _process(response, accept_encoding: str = "gzip, deflate, br"):
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    middleware = CompressionMiddleware(lambda request: response)
+    return middleware(request)
+
+
+def _json_response(body: bytes = _BODY) -> HttpResponse:
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = '"abc"'
+    return response
+
+
+class TestCompressionMiddleware:
+    """CompressionMiddleware のユニットテスト。"""
+
+    @patch("yorimichi_map_backend.middleware.brotli", None)
+    def test_gzip_large_json(self) -> None:
+        """brotli が無い場合は gzip で圧縮し、ETag を弱い ETag にすること。"""
+        response = _process(_json_response())
+
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == _BODY
+        assert response["ETag"] == 'W/"abc"'
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_brotli_preferred_when_available(self) -> None:
+        """brotli が使えてクライアントが br を受け付ける場合は brotli で圧縮すること。"""
+        fake_brotli = MagicMock()
+        fake_brotli.compress.return_value = b"compressed"
+        with patch("yorimichi_map_backend.middleware.brotli", fake_brotli):
+            response = _process(_json_response())
+
+        assert response["Content-Encoding"] == "br"
+        assert response.content == b"compressed"
+        assert response["Content-Length"] == str(len(b"compressed"))
+        assert response["ETag"] == 'W/"abc"'
+
+    def test_brotli_not_used_without_accept_encoding(self) -> None:
+        fake_brotli = MagicMock()
+        with patch("yorimichi_map_backend.middleware.brotli", fake_brotli):
+            response = _process(_json_response(), accept_encoding="gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        fake_brotli.compress.assert_not_called()
+
+    def test_small_response_is_not_compressed(self) -> None:
+        response = _process(_json_response(b'{"status": "ok"}'))
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_event_stream_is_not_compressed(self) -> None:
+        """SSE のストリームは圧縮せず、そのまま流すこと。"""
+        response = _process(
+            StreamingHttpResponse(
+                iter([b"event: delta\ndata: {}\n\n"] * 100),
+                content_type="text/event-stream; charset=utf-8",
+            )
+        )
+
+        assert not response.has_header("Content-Encoding")
+        assert b"".join(response.streaming_content).startswith(b"event: delta")
+
+
+def _view(request) -> HttpResponse:
+    with tracing.span("gemini.generate"):
+        pass
+    with tracing.span("tool.search_places"), tracing.span("places.request"):
+        pass
+    return HttpResponse("ok")
+
+
+def _metrics(response) -> dict[str, float]:
+    metrics = {}
+    for metric in response["Server-Timing"].split(", "):
+        name, dur = metric.split(";dur=")
+        metrics[name] = float(dur)
+    return metrics
+
+
+class TestServerTimingMiddleware:
+    """ServerTimingMiddleware のユニットテスト。"""
+
+    def test_reports_stages(self) -> None:
+        """ビューの中で計測した段階とリクエスト全体の所要時間を返すこと。"""
+        response = ServerTimingMiddleware(_view)(RequestFactory().get("/"))
+
+        metrics = _metrics(response)
+        assert set(metrics) == {
+            "request",
+            "gemini.generate",
+            "tool.search_places",
+            "places.request",
+        }
+        assert metrics["request"] >= metrics["tool.search_places"]
+
+    def test_async(self) -> None:
+        async def view(request) -> HttpResponse:
+            with tracing.span("gemini.generate"):
+                await asyncio.sleep(0)
+            return HttpResponse("ok")
+
+        middleware = ServerTimingMiddleware(view)
+        response = asyncio.run(middleware(RequestFactory().get("/")))
+
+        assert set(_metrics(response)) == {"request", "gemini.generate"}
+
+    def test_requests_do_not_share_timings(self) -> None:
+        middleware = ServerTimingMiddleware(_view)
+        middleware(RequestFactory().get("/"))
+        response = middleware(RequestFactory().get("/"))
+
+        assert response["Server-Timing"].count("gemini.generate") == 1
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self) -> None:
+        response = ServerTimingMiddleware(_view)(RequestFactory().get("/"))
+
+        assert not response.has_header("Server-Timing")
@@ -0,0 +1,85 @@
+"""place_store（住所 → Place ID・座標の永続ストア）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+
+from navigation.services.place_store import PlaceStore  # noqa: E402
+
+_HAKONE = {"place_id": "ChIJ-hakone", "latitude": 35.23, "longitude": 139.1}
+
+
+@pytest.fixture
+def store(tmp_path):
+    place_store = PlaceStore(path=str(tmp_path / "places.sqlite3"), ttl=60)
+    yield place_store
+    place_store.close()
+
+
+class TestPlaceStore:
+    """PlaceStore のユニットテスト。"""
+
+    def test_put_and_get_normalized(self, store: PlaceStore) -> None:
+        """正規化した住所で保存・取得できること。"""
+        store.put_many([("神奈川県足柄下郡箱根町湯本", _HAKONE)])
+
+        assert store.get("神奈川県足柄下郡箱根町湯本") == _HAKONE
+        assert store.get("  神奈川県足柄下郡箱根町湯本 ") == _HAKONE
+        assert store.get("熱海駅") is None
+
+    def test_get_many_returns_original_names(self, store: PlaceStore) -> None:
+        """get_many は呼び出し時の地名をキーに返すこと。"""
+        store.put_many([("Hakone", _HAKONE)])
+
+        assert store.get_many(["HAKONE", "熱海駅"]) == {"HAKONE": _HAKONE}
+
+    def test_async_put_and_get(self, store: PlaceStore) -> None:
+        """aput_many / aget_many でも保存・取得できること。"""
+
+        async def _run() -> dict:
+            await store.aput_many([("Hakone", _HAKONE)])
+            return await store.aget_many(["HAKONE", "熱海駅"])
+
+        assert asyncio.run(_run()) == {"HAKONE": _HAKONE}
+
+    def test_persists_across_instances(self, tmp_path) -> None:
+        """別インスタンス（プロセス再起動相当）からも読めること。"""
+        path = str(tmp_path / "places.sqlite3")
+        first = PlaceStore(path=path, ttl=60)
+        first.put_many([("神奈川県足柄下郡箱根町湯本", _HAKONE)])
+        first.close()
+
+        second = PlaceStore(path=path, ttl=60)
+        assert second.get("神奈川県足柄下郡箱根町湯本") == _HAKONE
+        second.close()
+
+    def test_expires_after_ttl(self, store: PlaceStore) -> None:
+        """TTL を過ぎたエントリは返さないこと。"""
+        with patch("navigation.services.place_store.time.time", return_value=1000.0):
+            store.put_many([("神奈川県足柄下郡箱根町湯本", _HAKONE)])
+        with patch("navigation.services.place_store.time.time", return_value=1059.0):
+            assert store.get("神奈川県足柄下郡箱根町湯本") == _HAKONE
+        with patch("navigation.services.place_store.time.time", return_value=1060.0):
+            assert store.get("神奈川県足柄下郡箱根町湯本") is None
+
+    def test_unavailable_path_is_noop(self, tmp_path) -> None:
+        """SQLite を開けない場合は例外を送出せず、何も保存しないこと。"""
+        store = PlaceStore(path=str(tmp_path / "missing" / "places.sqlite3"), ttl=60)
+
+        store.put_many([("神奈川県足柄下郡箱根町湯本", _HAKONE)])
+        assert store.get("神奈川県足柄下郡箱根町湯本") is None
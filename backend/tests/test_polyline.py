@@ -0,0 +1,128 @@
+"""polyline（Encoded Polyline の変換・簡略化）のユニットテスト。"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import sys
+from pathlib import Path
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+from navigation.services.polyline import (  # noqa: E402
+    _segment_distance,
+    decode,
+    encode,
+    polyline_levels,
+    simplify,
+    simplify_polyline,
+    zoom_tolerance,
+)
+
+# Google のドキュメントにあるサンプル（精度5桁）
+_SAMPLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+_SAMPLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def _wavy_route(n: int = 2000) -> list[tuple[float, float]]:
+    """北へ進みながら東西に揺れるルート（点数の多いポリラインの代わり）。"""
+    return [(35 + i * 1e-4, 139 + math.sin(i / 50) * 0.01) for i in range(n)]
+
+
+class TestEncodeDecode:
+    """encode / decode のユニットテスト。"""
+
+    def test_decode_sample(self) -> None:
+        assert decode(_SAMPLE) == _SAMPLE_POINTS
+
+    def test_encode_sample(self) -> None:
+        assert encode(_SAMPLE_POINTS) == _SAMPLE
+
+    def test_round_trip_with_precision(self) -> None:
+        points = [(35.6812, 139.7671), (35.4658, 139.6223)]
+
+        assert decode(encode(points, 4), 4) == points
+
+    def test_empty(self) -> None:
+        assert decode("") == []
+        assert encode([]) == ""
+
+
+class TestSimplify:
+    """simplify（Douglas–Peucker 法）のユニットテスト。"""
+
+    def test_removes_collinear_points(self) -> None:
+        """直線上の中間点は間引き、始点・終点は残すこと。"""
+        points = [(35.0 + i * 0.01, 139.0) for i in range(11)]
+
+        assert simplify(points, 1e-6) == [points[0], points[-1]]
+
+    def test_keeps_corners(self) -> None:
+        """許容誤差より大きく曲がる点は残すこと。"""
+        points = [(35.0, 139.0), (35.0, 139.5), (35.1, 139.5), (35.1, 140.0)]
+
+        assert simplify(points, 0.01) == points
+
+    def test_error_stays_within_tolerance(self) -> None:
+        """間引いた後の線と元の点のずれが許容誤差以内であること。"""
+        points = _wavy_route()
+        tolerance = zoom_tolerance(12)
+
+        simplified = simplify(points, tolerance)
+
+        assert 2 < len(simplified) < len(points)
+        assert simplified[0] == points[0]
+        assert simplified[-1] == points[-1]
+        # 間引いた点は、それを挟む残った2点の線分から tolerance 以内にある
+        lng_scale = math.cos(math.radians(sum(p[0] for p in points) / len(points)))
+        kept = [points.index(point) for point in simplified]
+        for first, last in itertools.pairwise(kept):
+            for point in points[first + 1 : last]:
+                distance = _segment_distance(
+                    point, points[first], points[last], lng_scale
+                )
+                assert distance <= tolerance
+
+    def test_zoom_tolerance_halves_per_level(self) -> None:
+        assert zoom_tolerance(0) == 360 / 256
+        assert zoom_tolerance(11) == zoom_tolerance(10) / 2
+
+
+class TestSimplifyPolyline:
+    """simplify_polyline / polyline_levels のユニットテスト。"""
+
+    def test_unchanged_without_options(self) -> None:
+        assert simplify_polyline(_SAMPLE) == _SAMPLE
+
+    def test_lower_zoom_gives_shorter_polyline(self) -> None:
+        encoded = encode(_wavy_route())
+
+        coarse = simplify_polyline(encoded, zoom=8)
+        fine = simplify_polyline(encoded, zoom=14)
+
+        assert len(coarse) < len(fine) < len(encoded)
+
+    def test_precision_merges_duplicate_points(self) -> None:
+        """精度を下げて同じ座標になった連続する点は1つにまとめること。"""
+        encoded = encode([(35.00001, 139.0), (35.00002, 139.0), (35.1, 139.0)])
+
+        result = simplify_polyline(encoded, precision=3)
+
+        assert decode(result, 3) == [(35.0, 139.0), (35.1, 139.0)]
+
+    def test_levels_are_sorted_coarse_first(self) -> None:
+        encoded = encode(_wavy_route())
+
+        levels = polyline_levels(encoded, [14, 8, 14])
+
+        assert [level.zoom for level in levels] == [8, 14]
+        assert levels[0].encoded_polyline == simplify_polyline(encoded, zoom=8)
+        assert len(levels[0].encoded_polyline) < len(levels[1].encoded_polyline)
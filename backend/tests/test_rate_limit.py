@@ -0,0 +1,309 @@
+"""rate_limit（上流 API ごとのクライアント側レート制限）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from navigation.services.rate_limit import (  # noqa: E402
+    Permit,
+    RateLimiter,
+    RateLimitExceeded,
+    get_limiter,
+    limiter_stats,
+    reset_limiters,
+)
+
+_CLOCK = "navigation.services.rate_limit.time.monotonic"
+
+
+@pytest.fixture(autouse=True)
+def _reset_limiters():
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
+def _limiter(**kwargs) -> RateLimiter:
+    options = {"qps": 0, "burst": 1, "max_concurrency": 4, "queue_timeout": 0}
+    options.update(kwargs)
+    return RateLimiter("test", **options)
+
+
+def _acquire(limiter: RateLimiter) -> Permit:
+    return asyncio.run(limiter.aacquire())
+
+
+class TestTokenBucket:
+    """トークンバケット（1秒あたりの件数制限）のテスト。"""
+
+    def test_burst_then_refill(self) -> None:
+        """バースト分はすぐに取れ、その後は QPS に応じて補充されること。"""
+        with patch(_CLOCK, return_value=100.0):
+            limiter = _limiter(qps=2, burst=2)
+            for _ in range(2):
+                limiter.release(_acquire(limiter), succeeded=True)
+            with pytest.raises(RateLimitExceeded):
+                _acquire(limiter)
+        with patch(_CLOCK, return_value=100.5):
+            limiter.release(_acquire(limiter), succeeded=True)
+
+        assert limiter.stats()["rejected"] == 1
+
+    def test_zero_qps_is_unlimited(self) -> None:
+        limiter = _limiter(qps=0, max_concurrency=1)
+        for _ in range(100):
+            limiter.release(_acquire(limiter), succeeded=True)
+
+    def test_waits_until_token_available(self) -> None:
+        """待ち時間の上限内であれば、トークンが補充されるまで待って取れること。"""
+        limiter = _limiter(qps=50, burst=1, queue_timeout=1)
+        limiter.release(_acquire(limiter), succeeded=True)
+        limiter.release(_acquire(limiter), succeeded=True)
+
+        assert limiter.stats()["rejected"] == 0
+
+
+class TestConcurrency:
+    """同時実行数の上限と AIMD の調整のテスト。"""
+
+    def test_limits_in_flight(self) -> None:
+        limiter = _limiter(max_concurrency=2)
+        first = _acquire(limiter)
+        _acquire(limiter)
+        with pytest.raises(RateLimitExceeded):
+            _acquire(limiter)
+
+        limiter.release(first, succeeded=True)
+        _acquire(limiter)
+        assert limiter.stats()["in_flight"] == 2
+
+    def test_waiter_gets_released_slot(self) -> None:
+        """上限で待っている呼び出しは、実行中の呼び出しが枠を返すと取れること。"""
+        limiter = _limiter(max_concurrency=1, queue_timeout=5)
+        permit = _acquire(limiter)
+        acquired = threading.Event()
+
+        def waiter() -> None:
+            _acquire(limiter)
+            acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        assert not acquired.wait(0.05)
+        limiter.release(permit, succeeded=True)
+        thread.join(5)
+
+        assert acquired.is_set()
+
+    def test_throttled_halves_limit(self) -> None:
+        """429 を受けると上限を半分にし、成功で少しずつ戻すこと。"""
+        limiter = _limiter(max_concurrency=8)
+        permit = _acquire(limiter)
+        permit.observe(429)
+        limiter.release(permit, succeeded=True)
+        assert limiter.limit == 4
+
+        for _ in range(5):
+            limiter.release(_acquire(limiter), succeeded=True)
+        assert limiter.limit == 5
+
+    def test_limit_never_below_one_or_above_max(self) -> None:
+        limiter = _limiter(max_concurrency=2)
+        for _ in range(5):
+            permit = _acquire(limiter)
+            permit.throttled()
+            limiter.release(permit, succeeded=False)
+        assert limiter.limit == 1
+
+        for _ in range(20):
+            limiter.release(_acquire(limiter), succeeded=True)
+        assert limiter.limit == 2
+
+    def test_burst_of_429_decreases_once(self) -> None:
+        """同じ時点に送ったリクエストの 429 が続いても、上限は1回だけ下げること。"""
+        limiter = _limiter(max_concurrency=8)
+        permits = [_acquire(limiter) for _ in range(4)]
+        for permit in permits:
+            permit.throttled()
+            limiter.release(permit, succeeded=True)
+
+        assert limiter.limit == 4
+        assert limiter.stats()["throttled"] == 4
+
+    def test_failure_keeps_limit(self) -> None:
+        """429 以外の失敗では上限を変えないこと。"""
+        limiter = _limiter(max_concurrency=8)
+        permit = _acquire(limiter)
+        permit.throttled()
+        limiter.release(permit, succeeded=False)
+        limiter.release(_acquire(limiter), succeeded=False)
+
+        assert limiter.limit == 4
+
+
+class TestSlot:
+    """aslot（コンテキストマネージャー）と待ち行列のテスト。"""
+
+    def test_releases_on_exception(self) -> None:
+        limiter = _limiter(max_concurrency=1)
+
+        async def run() -> None:
+            async with limiter.aslot():
+                raise ValueError
+
+        with pytest.raises(ValueError):
+            asyncio.run(run())
+
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_error_status_is_not_success(self) -> None:
+        """ブロック内で 429 / 5xx を記録した場合は成功として上限を戻さないこと。"""
+        limiter = _limiter(max_concurrency=8)
+        permit = _acquire(limiter)
+        permit.throttled()
+        limiter.release(permit, succeeded=False)
+        assert limiter.limit == 4
+
+        async def call(status_code: int) -> None:
+            async with limiter.aslot() as permit:
+                permit.observe(status_code)
+
+        for _ in range(5):
+            asyncio.run(call(503))
+        assert limiter.limit == 4
+
+        for _ in range(5):
+            asyncio.run(call(200))
+        assert limiter.limit == 5
+
+    def test_async_slot(self) -> None:
+        limiter = _limiter(max_concurrency=1, queue_timeout=5)
+        running = 0
+        max_running = 0
+
+        async def call() -> None:
+            nonlocal running, max_running
+            async with limiter.aslot():
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        async def run() -> None:
+            await asyncio.gather(*(call() for _ in range(3)))
+
+        asyncio.run(run())
+
+        assert max_running == 1
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_async_queue_timeout(self) -> None:
+        limiter = _limiter(max_concurrency=1, queue_timeout=0.05)
+        _acquire(limiter)
+
+        with pytest.raises(RateLimitExceeded):
+            asyncio.run(limiter.aacquire())
+
+    def test_async_waiters_are_fifo(self) -> None:
+        """待っているコルーチンは到着順に枠を取ること。"""
+        limiter = _limiter(max_concurrency=1, queue_timeout=5)
+        order: list[int] = []
+
+        async def call(index: int) -> None:
+            async with limiter.aslot():
+                order.append(index)
+                await asyncio.sleep(0)
+
+        async def run() -> None:
+            permit = await limiter.aacquire()
+            tasks = []
+            for index in range(5):
+                tasks.append(asyncio.create_task(call(index)))
+                # 到着順を確定させる（各タスクが待ち行列に並ぶまで進める）
+                await asyncio.sleep(0)
+            limiter.release(permit, succeeded=True)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+        assert order == [0, 1, 2, 3, 4]
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_async_waiter_woken_by_release_from_other_thread(self) -> None:
+        """別スレッドで枠が返されたら、待っているコルーチンがすぐに起こされること。"""
+        limiter = _limiter(max_concurrency=1, queue_timeout=5)
+        permit = _acquire(limiter)
+        timer = threading.Timer(0.05, lambda: limiter.release(permit, succeeded=True))
+
+        async def run() -> float:
+            started = time.monotonic()
+            timer.start()
+            await limiter.aacquire()
+            return time.monotonic() - started
+
+        try:
+            assert asyncio.run(run()) < 1
+        finally:
+            timer.join()
+
+    def test_async_waits_for_token_refill(self) -> None:
+        """トークンが尽きている場合は、補充されるまで待って枠を取ること。"""
+        limiter = _limiter(qps=20, burst=1, queue_timeout=5)
+
+        async def run() -> float:
+            await limiter.aacquire()
+            started = time.monotonic()
+            await limiter.aacquire()
+            return time.monotonic() - started
+
+        assert 0.03 < asyncio.run(run()) < 1
+
+    def test_cancelled_waiter_leaves_queue(self) -> None:
+        """キャンセルされた待機者は待ち行列から外れ、後ろの待機者が枠を取れること。"""
+        limiter = _limiter(max_concurrency=1, queue_timeout=5)
+
+        async def run() -> None:
+            permit = await limiter.aacquire()
+            first = asyncio.create_task(limiter.aacquire())
+            await asyncio.sleep(0)
+            second = asyncio.create_task(limiter.aacquire())
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+            limiter.release(permit, succeeded=True)
+            await asyncio.wait_for(second, timeout=1)
+
+        asyncio.run(run())
+
+        assert limiter._waiters == deque()
+
+
+class TestGetLimiter:
+    """get_limiter のユニットテスト。"""
+
+    def test_returns_same_instance(self) -> None:
+        assert get_limiter("places") is get_limiter("places")
+
+    def test_settings(self) -> None:
+        """settings.<NAME>_MAX_CONCURRENCY から同時実行数の上限を読むこと。"""
+        assert get_limiter("routes").limit == settings.ROUTES_MAX_CONCURRENCY
+        assert set(limiter_stats()) == {"routes"}
@@ -0,0 +1,74 @@
+"""yorimichi_map_backend.renderers のユニットテスト。"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from yorimichi_map_backend import renderers  # noqa: E402
+from yorimichi_map_backend.renderers import FastJSONRenderer  # noqa: E402
+
+_DATA = {"reply": "東京駅から\u2028横浜駅へ", "route": None, "places": [1.5, 2]}
+
+
+def _fake_orjson():
+    """json モジュールで orjson.dumps と同じ形式（コンパクト・非 ASCII のまま）を返す"""
+    fake = MagicMock()
+    fake.dumps.side_effect = lambda data, default: json.dumps(
+        data, default=default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    return fake
+
+
+class TestFastJSONRenderer:
+    """FastJSONRenderer"""
+
+    def test_same_output_as_json_renderer(self):
+        """orjson を使った場合も JSONRenderer と同じバイト列になる"""
+        with patch.object(renderers, "orjson", _fake_orjson()) as fake:
+            result = FastJSONRenderer().render(_DATA, "application/json")
+
+        fake.dumps.assert_called_once()
+        assert result == JSONRenderer().render(_DATA, "application/json")
+        assert b"\\u2028" in result
+
+    def test_without_orjson(self):
+        """orjson がなければ JSONRenderer と同じ処理になる"""
+        with patch.object(renderers, "orjson", None):
+            result = FastJSONRenderer().render(_DATA, "application/json")
+        assert result == JSONRenderer().render(_DATA, "application/json")
+
+    def test_indent_falls_back(self):
+        """インデント指定時は orjson を使わない"""
+        with patch.object(renderers, "orjson", _fake_orjson()) as fake:
+            result = FastJSONRenderer().render(_DATA, "application/json; indent=2")
+
+        fake.dumps.assert_not_called()
+        assert result == JSONRenderer().render(_DATA, "application/json; indent=2")
+
+    def test_type_error_falls_back(self):
+        """orjson が扱えない値の場合は JSONRenderer に任せる"""
+        fake = MagicMock()
+        fake.dumps.side_effect = TypeError("Integer exceeds 64-bit range")
+        data = {"value": 2**70}
+        with patch.object(renderers, "orjson", fake):
+            result = FastJSONRenderer().render(data, "application/json")
+        assert json.loads(result) == data
+
+    def test_none_renders_empty(self):
+        with patch.object(renderers, "orjson", _fake_orjson()):
+            assert FastJSONRenderer().render(None) == b""
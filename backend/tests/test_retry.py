@@ -0,0 +1,196 @@
+"""retry（429 に対する再試行ポリシー）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.conf import settings  # noqa: E402
+from google.api_core.exceptions import ResourceExhausted  # noqa: E402
+from google.protobuf.duration_pb2 import Duration  # noqa: E402
+from google.rpc.error_details_pb2 import RetryInfo  # noqa: E402
+
+from navigation.services.retry import (  # noqa: E402
+    RetryPolicy,
+    get_policy,
+    reset_policies,
+    retry_after,
+    retry_stats,
+)
+
+_CLOCK = "navigation.services.retry.time.monotonic"
+
+
+@pytest.fixture(autouse=True)
+def _reset_policies():
+    reset_policies()
+    yield
+    reset_policies()
+
+
+def _policy(**kwargs) -> RetryPolicy:
+    options = {"max_attempts": 3, "base_delay": 1, "max_delay": 8, "deadline": 30}
+    options.update(kwargs)
+    return RetryPolicy("test", **options)
+
+
+def _with_retry_after(value: str) -> ResourceExhausted:
+    response = MagicMock()
+    response.headers = {"Retry-After": value}
+    return ResourceExhausted("Rate limited", response=response)
+
+
+class TestRetryAfter:
+    """retry_after（サーバーが指定した待ち時間）のテスト。"""
+
+    def test_none_when_not_specified(self) -> None:
+        assert retry_after(ResourceExhausted("Rate limited")) is None
+
+    def test_retry_info(self) -> None:
+        """gRPC の RetryInfo から待ち時間を読むこと。"""
+        info = RetryInfo(retry_delay=Duration(seconds=2, nanos=500_000_000))
+        error = ResourceExhausted("Rate limited", details=[info])
+
+        assert retry_after(error) == 2.5
+
+    def test_seconds_header(self) -> None:
+        assert retry_after(_with_retry_after("4")) == 4.0
+
+    def test_http_date_header(self) -> None:
+        at = datetime.now(tz=UTC) + timedelta(seconds=60)
+        delay = retry_after(_with_retry_after(format_datetime(at, usegmt=True)))
+
+        assert delay is not None
+        assert 50 < delay <= 60
+
+    def test_invalid_header(self) -> None:
+        assert retry_after(_with_retry_after("soon")) is None
+
+
+class TestBackoff:
+    """RetryState.backoff（次の試行までの待ち時間）のテスト。"""
+
+    def test_jitter_within_exponential_cap(self) -> None:
+        """待ち時間は 0〜min(MAX_DELAY, BASE_DELAY * 2^n) の範囲になること。"""
+        policy = _policy(max_attempts=10, base_delay=1, max_delay=4, deadline=1000)
+        state = policy.begin()
+        with patch(
+            "navigation.services.retry.random.uniform", return_value=0.5
+        ) as uniform:
+            for _ in range(4):
+                assert state.backoff(ResourceExhausted("Rate limited")) == 0.5
+
+        caps = [call.args for call in uniform.call_args_list]
+        assert caps == [(0, 1), (0, 2), (0, 4), (0, 4)]
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        policy = _policy(max_attempts=2)
+        state = policy.begin()
+
+        assert state.backoff(ResourceExhausted("Rate limited")) is not None
+        assert state.backoff(ResourceExhausted("Rate limited")) is None
+        assert policy.stats()["gave_up"] == 1
+
+    def test_gives_up_past_deadline(self) -> None:
+        """待つと期限を過ぎる場合は再試行しないこと。"""
+        with patch(_CLOCK, return_value=100.0):
+            policy = _policy(deadline=5)
+            state = policy.begin()
+            assert state.backoff(_with_retry_after("4")) == 4.0
+        with patch(_CLOCK, return_value=104.0):
+            assert state.backoff(_with_retry_after("4")) is None
+
+    def test_fail_fast(self) -> None:
+        policy = _policy(fail_fast=True)
+
+        assert policy.begin().backoff(ResourceExhausted("Rate limited")) is None
+        assert policy.stats() == {"retries": 0, "sleep_seconds": 0.0, "gave_up": 1}
+
+    def test_exported_as_metrics(self) -> None:
+        """再試行回数・待機時間・諦めた回数を metrics に記録すること。"""
+        policy = _policy(max_attempts=2)
+        with (
+            patch("navigation.services.retry.metrics.observe_retry") as observe,
+            patch("navigation.services.retry.metrics.observe_retry_give_up") as give_up,
+        ):
+            state = policy.begin()
+            delay = state.backoff(_with_retry_after("3"))
+            state.backoff(ResourceExhausted("Rate limited"))
+
+        assert delay == 3.0
+        observe.assert_called_once_with("test", 3.0)
+        give_up.assert_called_once_with("test")
+
+
+class TestCall:
+    """acall のテスト。"""
+
+    @patch("navigation.services.retry.asyncio.sleep", new_callable=AsyncMock)
+    def test_retries_then_succeeds(self, mock_sleep: AsyncMock) -> None:
+        fn = AsyncMock(side_effect=[ResourceExhausted("Rate limited"), "ok"])
+        policy = _policy()
+
+        assert asyncio.run(policy.acall(fn, retry_on=(ResourceExhausted,))) == "ok"
+        assert fn.await_count == 2
+        mock_sleep.assert_awaited_once()
+        assert policy.stats()["retries"] == 1
+
+    @patch("navigation.services.retry.asyncio.sleep", new_callable=AsyncMock)
+    def test_other_errors_are_not_retried(self, mock_sleep: AsyncMock) -> None:
+        fn = AsyncMock(side_effect=ValueError)
+
+        with pytest.raises(ValueError):
+            asyncio.run(_policy().acall(fn, retry_on=(ResourceExhausted,)))
+        assert fn.await_count == 1
+        mock_sleep.assert_not_awaited()
+
+    @patch("navigation.services.retry.asyncio.sleep", new_callable=AsyncMock)
+    def test_raises_last_error(self, mock_sleep: AsyncMock) -> None:
+        fn = AsyncMock(side_effect=ResourceExhausted("Rate limited"))
+
+        with pytest.raises(ResourceExhausted):
+            asyncio.run(
+                _policy(max_attempts=3).acall(fn, retry_on=(ResourceExhausted,))
+            )
+        assert fn.await_count == 3
+        assert mock_sleep.await_count == 2
+
+    @patch("navigation.services.retry.asyncio.sleep", new_callable=AsyncMock)
+    def test_uses_asyncio_sleep(self, mock_sleep: AsyncMock) -> None:
+        """asyncio.sleep で待ち、Retry-After に従うこと（イベントループをブロックしない）。"""
+        fn = AsyncMock(side_effect=[_with_retry_after("2"), "ok"])
+
+        result = asyncio.run(_policy().acall(fn, retry_on=(ResourceExhausted,)))
+
+        assert result == "ok"
+        mock_sleep.assert_awaited_once_with(2.0)
+
+
+class TestGetPolicy:
+    """get_policy のユニットテスト。"""
+
+    def test_returns_same_instance(self) -> None:
+        assert get_policy("gemini") is get_policy("gemini")
+
+    def test_settings(self) -> None:
+        """settings.<NAME>_RETRY_* から設定を読むこと。"""
+        policy = get_policy("gemini")
+
+        assert policy.max_attempts == settings.GEMINI_RETRY_MAX_ATTEMPTS
+        assert policy.deadline == settings.GEMINI_RETRY_DEADLINE
+        assert set(retry_stats()) == {"gemini"}
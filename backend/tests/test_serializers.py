@@ -0,0 +1,163 @@
+"""navigation.serializers の compile_output のユニットテスト。
+
+compile_output で生成した関数の出力が Serializer(...).data と一致することを確認する。
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import sys
+from pathlib import Path
+
+import django
+import pytest
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+from rest_framework import serializers  # noqa: E402
+
+from navigation.serializers import (  # noqa: E402
+    CalculateRoutesBatchResponseSerializer,
+    ChatResponseSerializer,
+    ReturnRouteResponseSerializer,
+    WaypointSuggestResponseSerializer,
+    calculate_routes_batch_response_data,
+    chat_response_data,
+    compile_output,
+    return_route_response_data,
+    waypoint_suggest_response_data,
+)
+from navigation.services.domain import PolylineLevel, Route  # noqa: E402
+
+_ROUTE = {
+    "origin": "東京駅",
+    "destination": "横浜駅",
+    "waypoints": ["品川駅"],
+    "waypoint_coords": [{"latitude": 35.6284, "longitude": 139.7387}],
+    "duration_seconds": "1800s",
+    "distance_meters": 30000,
+    "encoded_polyline": "_p~iF~ps|U_ulLnnqC",
+    "tolls": [{"currencyCode": "JPY", "units": "500"}],
+    "google_maps_url": "https://www.google.com/maps/dir/?api=1",
+}
+
+_PLACE = {
+    "name": "箱根湯本温泉",
+    "address": "神奈川県足柄下郡箱根町湯本",
+    "rating": 4,
+    "coords": {"latitude": 35.2327, "longitude": 139.1069},
+    "price_level": "PRICE_LEVEL_MODERATE",
+}
+
+
+class TestCompileOutput:
+    """compile_output の出力が .data と一致する"""
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"reply": "こんにちは", "route": None, "places": None},
+            {"reply": "ルートです", "route": _ROUTE, "places": None},
+            {"reply": "スポットです", "route": None, "places": [_PLACE]},
+            {
+                "reply": "セッション",
+                "route": None,
+                "places": None,
+                "session_id": "a" * 32,
+            },
+            # route / places が欠けている場合は null になる（allow_null）
+            {"reply": "キーなし"},
+        ],
+    )
+    def test_chat_response(self, data):
+        assert chat_response_data(data) == ChatResponseSerializer(data).data
+
+    def test_route_without_optional_fields(self):
+        """waypoint_coords / tolls は既定値（[]）、polylines 等は省略される"""
+        route = {
+            key: value
+            for key, value in _ROUTE.items()
+            if key not in ("waypoint_coords", "tolls")
+        }
+        result = return_route_response_data({"route": route})
+        assert result == ReturnRouteResponseSerializer({"route": route}).data
+        assert result["route"]["waypoint_coords"] == []
+        assert result["route"]["tolls"] == []
+        assert "polylines" not in result["route"]
+
+    def test_route_with_polyline_options(self):
+        route = {
+            **_ROUTE,
+            "polyline_precision": 4,
+            "polylines": [{"zoom": 10, "encoded_polyline": "abc"}],
+        }
+        assert (
+            return_route_response_data({"route": route})
+            == ReturnRouteResponseSerializer({"route": route}).data
+        )
+
+    def test_converts_types_like_serializer(self):
+        """rating の int は float に、distance_meters の文字列は int に変換される"""
+        data = {
+            "reply": "x",
+            "route": {**_ROUTE, "distance_meters": "30000"},
+            "places": [_PLACE],
+        }
+        result = chat_response_data(data)
+        assert result == ChatResponseSerializer(data).data
+        assert isinstance(result["places"][0]["rating"], float)
+        assert result["route"]["distance_meters"] == 30000
+
+    def test_route_object(self):
+        """Route（オブジェクト）からも辞書と同じ出力になり、未設定（None）の任意項目は省略される"""
+        route = dataclasses.replace(
+            Route.from_dict(_ROUTE), google_maps_url=_ROUTE["google_maps_url"]
+        )
+        result = chat_response_data({"reply": "x", "route": route})
+        assert result == ChatResponseSerializer({"reply": "x", "route": _ROUTE}).data
+        assert "polyline_precision" not in result["route"]
+
+        route = dataclasses.replace(
+            route,
+            polyline_precision=4,
+            polylines=(PolylineLevel(zoom=10, encoded_polyline="abc"),),
+        )
+        result = return_route_response_data({"route": route})
+        assert result["route"]["polyline_precision"] == 4
+        assert result["route"]["polylines"] == [{"zoom": 10, "encoded_polyline": "abc"}]
+
+    def test_waypoint_suggest_defaults(self):
+        data = {"candidates": [{"name": "道の駅", "description": "休憩"}]}
+        result = waypoint_suggest_response_data(data)
+        assert result == WaypointSuggestResponseSerializer(data).data
+        assert result["ai_comment"] == ""
+        assert result["candidates"][0]["coords"] is None
+
+    def test_batch_response(self):
+        data = {
+            "results": [
+                {"status": 200, "route": _ROUTE, "detail": None},
+                {"status": 400, "route": None, "detail": "invalid"},
+            ]
+        }
+        assert (
+            calculate_routes_batch_response_data(data)
+            == CalculateRoutesBatchResponseSerializer(data).data
+        )
+
+    def test_missing_required_field_raises(self):
+        with pytest.raises(KeyError):
+            chat_response_data({"route": None})
+
+    def test_unsupported_source_raises(self):
+        class DottedSerializer(serializers.Serializer):
+            name = serializers.CharField(source="place.name")
+
+        with pytest.raises(ValueError, match="place.name"):
+            compile_output(DottedSerializer)
@@ -0,0 +1,100 @@
+"""session_store（サーバー側チャットセッション）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from vertexai.generative_models import Content, Part  # noqa: E402
+
+from navigation.services.cache import reset_caches  # noqa: E402
+from navigation.services.session_store import (  # noqa: E402
+    aload_session,
+    asave_session,
+    load_session,
+    new_session_id,
+    save_session,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    reset_caches()
+    yield
+    reset_caches()
+
+
+def _turn(message: str, reply: str, *, tool: bool = False) -> list[Content]:
+    """1往復分の Content（tool=True ならツール呼び出しと結果を含む）を生成する。"""
+    contents = [Content(role="user", parts=[Part.from_text(message)])]
+    if tool:
+        contents += [
+            Content(
+                role="model",
+                parts=[
+                    Part.from_dict(
+                        {
+                            "function_call": {
+                                "name": "calculate_route",
+                                "args": {"origin": "東京駅", "destination": "横浜駅"},
+                            }
+                        }
+                    )
+                ],
+            ),
+            Content(
+                role="user",
+                parts=[
+                    Part.from_function_response(
+                        name="calculate_route", response={"distance_meters": 30000}
+                    )
+                ],
+            ),
+        ]
+    contents.append(Content(role="model", parts=[Part.from_text(reply)]))
+    return contents
+
+
+class TestSessionStore:
+    """load_session / save_session のユニットテスト。"""
+
+    def test_new_session_id_is_unique(self) -> None:
+        assert new_session_id() != new_session_id()
+        assert len(new_session_id()) == 32
+
+    def test_unknown_session_returns_none(self) -> None:
+        assert load_session(new_session_id()) is None
+
+    def test_round_trip_keeps_function_calls(self) -> None:
+        """ツール呼び出し・実行結果を含めて保存・復元できること。"""
+        session_id = new_session_id()
+        save_session(session_id, _turn("東京から横浜", "ルートです", tool=True))
+
+        contents = load_session(session_id)
+
+        assert [c.role for c in contents] == ["user", "model", "user", "model"]
+        assert contents[0].parts[0].text == "東京から横浜"
+        assert contents[1].parts[0].function_call.name == "calculate_route"
+        response = contents[2].parts[0].function_response
+        assert response.name == "calculate_route"
+        assert response.response["distance_meters"] == 30000
+
+    def test_async_round_trip(self) -> None:
+        session_id = new_session_id()
+        asyncio.run(asave_session(session_id, _turn("こんにちは", "どうぞ")))
+
+        contents = asyncio.run(aload_session(session_id))
+
+        assert [c.parts[0].text for c in contents] == ["こんにちは", "どうぞ"]
@@ -0,0 +1,212 @@
+"""single_flight（同じ API 呼び出しの同時実行をまとめる）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+
+from navigation.services import single_flight  # noqa: E402
+from navigation.services.cache import (  # noqa: E402
+    DjangoCacheBackend,
+    LRUCache,
+    ResultCache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fast_poll():
+    with patch.object(single_flight, "_POLL_INTERVAL", 0.01):
+        yield
+
+
+@pytest.fixture
+def local_cache() -> ResultCache:
+    return ResultCache("test", LRUCache(max_entries=10, ttl=60))
+
+
+@pytest.fixture
+def shared_cache():
+    caches["default"].clear()
+    yield ResultCache("test", DjangoCacheBackend(alias="default", ttl=60))
+    caches["default"].clear()
+
+
+def _returning(value: str):
+    async def fetch() -> str:
+        return value
+
+    return fetch
+
+
+class TestAdo:
+    """ado（プロセス内のタスク間でまとめる）のテスト。"""
+
+    def test_concurrent_calls_share_one_fetch(self, local_cache: ResultCache) -> None:
+        """同じキーの同時呼び出しは fetch を1回だけ実行し、同じ結果を共有すること。"""
+        calls = []
+
+        async def fetch() -> list[str]:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        async def run() -> list:
+            return await asyncio.gather(
+                *(single_flight.ado(local_cache, "key", fetch) for _ in range(5))
+            )
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert single_flight._tasks == {}
+
+    def test_different_keys_are_not_shared(self, local_cache: ResultCache) -> None:
+        """キーが異なる呼び出しはそれぞれ fetch を実行すること。"""
+
+        async def run() -> list:
+            return await asyncio.gather(
+                single_flight.ado(local_cache, "a", _returning("a")),
+                single_flight.ado(local_cache, "b", _returning("b")),
+            )
+
+        assert asyncio.run(run()) == ["a", "b"]
+
+    def test_exception_is_shared(self, local_cache: ResultCache) -> None:
+        """先行の呼び出しで発生した例外は待っていた呼び出しにも送出されること。"""
+        calls = []
+
+        async def fetch() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream")
+
+        async def run() -> list:
+            return await asyncio.gather(
+                *(single_flight.ado(local_cache, "key", fetch) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        errors = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(isinstance(error, RuntimeError) for error in errors)
+
+    def test_completed_call_is_not_reused(self, local_cache: ResultCache) -> None:
+        """完了した呼び出しの結果は使い回さず、次の呼び出しで再び fetch すること。"""
+        calls = []
+
+        async def fetch() -> int:
+            calls.append(1)
+            return len(calls)
+
+        async def run() -> list[int]:
+            return [
+                await single_flight.ado(local_cache, "key", fetch),
+                await single_flight.ado(local_cache, "key", fetch),
+            ]
+
+        assert asyncio.run(run()) == [1, 2]
+        assert single_flight._tasks == {}
+
+    def test_cancelled_caller_does_not_cancel_others(
+        self, local_cache: ResultCache
+    ) -> None:
+        """最初の呼び出し元がキャンセルされても、待っている呼び出し元には結果が返ること。"""
+
+        async def fetch() -> str:
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def run() -> str:
+            first = asyncio.create_task(single_flight.ado(local_cache, "key", fetch))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(single_flight.ado(local_cache, "key", fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == "value"
+
+
+class TestAdoSharedCache:
+    """ado（共有キャッシュのロックでワーカー間をまとめる）のテスト。"""
+
+    def test_lock_is_released(self, shared_cache: ResultCache) -> None:
+        """fetch の実行中はロックを持ち、完了後に外すこと。"""
+        locked_during_fetch = []
+
+        async def fetch() -> str:
+            locked_during_fetch.append(not await shared_cache.alock("key", 60))
+            return "value"
+
+        assert asyncio.run(single_flight.ado(shared_cache, "key", fetch)) == "value"
+        assert locked_during_fetch == [True]
+        assert shared_cache.lock("key", 60)
+
+    def test_waits_for_other_worker(self, shared_cache: ResultCache) -> None:
+        """他のワーカーがロックを持つ間は fetch せず、キャッシュに載った結果を使うこと。"""
+        assert shared_cache.lock("key", 60)
+
+        async def fetch() -> str:
+            pytest.fail("fetched")
+
+        async def other_worker() -> None:
+            await asyncio.sleep(0.05)
+            await shared_cache.aset("key", "from other worker")
+            await shared_cache.aunlock("key")
+
+        async def run() -> str:
+            result, _ = await asyncio.gather(
+                single_flight.ado(shared_cache, "key", fetch), other_worker()
+            )
+            return result
+
+        assert asyncio.run(run()) == "from other worker"
+
+    def test_fetches_when_other_worker_fails(self, shared_cache: ResultCache) -> None:
+        """他のワーカーが結果を保存せずにロックを外した場合は自分で fetch すること。"""
+        assert shared_cache.lock("key", 60)
+
+        async def other_worker() -> None:
+            await asyncio.sleep(0.05)
+            await shared_cache.aunlock("key")
+
+        async def run() -> str:
+            result, _ = await asyncio.gather(
+                single_flight.ado(shared_cache, "key", _returning("fetched")),
+                other_worker(),
+            )
+            return result
+
+        assert asyncio.run(run()) == "fetched"
+
+    def test_fetches_after_lock_timeout(self, shared_cache: ResultCache) -> None:
+        """ロックが外れないまま期限を過ぎた場合は自分で fetch すること。"""
+        assert shared_cache.lock("key", 60)
+        original = settings.MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT
+        settings.MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT = 0
+        try:
+            result = asyncio.run(
+                single_flight.ado(shared_cache, "key", _returning("fetched"))
+            )
+        finally:
+            settings.MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT = original
+
+        assert result == "fetched"
@@ -0,0 +1,146 @@
+"""tracing（処理段階ごとの所要時間の計測）のユニットテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import django
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(backend_dir / ".env")
+sys.path.insert(0, str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yorimichi_map_backend.settings")
+django.setup()
+
+import pytest  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from navigation.services import tracing  # noqa: E402
+
+
+class TestSpan:
+    """span / collect のテスト。"""
+
+    def test_records_duration(self) -> None:
+        with (
+            patch(
+                "navigation.services.tracing.time.perf_counter",
+                side_effect=[1.0, 1.25],
+            ),
+            tracing.collect() as timings,
+            tracing.span("gemini.generate"),
+        ):
+            pass
+
+        assert timings.items() == [("gemini.generate", 0.25)]
+        assert timings.header() == "gemini.generate;dur=250.0"
+
+    def test_same_stage_is_summed(self) -> None:
+        """同じ段階を複数回計測した場合は合計すること。"""
+        with (
+            patch(
+                "navigation.services.tracing.time.perf_counter",
+                side_effect=[0.0, 0.1, 1.0, 1.2],
+            ),
+            tracing.collect() as timings,
+        ):
+            for _ in range(2):
+                with tracing.span("tool.search_places"):
+                    pass
+
+        [(name, seconds)] = timings.items()
+        assert name == "tool.search_places"
+        assert seconds == pytest.approx(0.3)
+
+    def test_records_on_exception(self) -> None:
+        with (
+            tracing.collect() as timings,
+            pytest.raises(ValueError),
+            tracing.span("render"),
+        ):
+            raise ValueError
+
+        assert [name for name, _ in timings.items()] == ["render"]
+
+    def test_without_collect(self) -> None:
+        """collect() の外では計測結果を集めない（エラーにもしない）こと。"""
+        with tracing.span("render"):
+            pass
+
+    def test_other_threads_are_not_collected(self) -> None:
+        """コンテキストを引き継がないスレッドの計測は含めないこと。"""
+        with tracing.collect() as timings:
+            thread = threading.Thread(target=lambda: tracing.span("other").__enter__())
+            thread.start()
+            thread.join()
+
+        assert timings.items() == []
+
+    def test_async_tasks_share_collector(self) -> None:
+        """asyncio のタスクで計測した段階も集めること。"""
+
+        async def tool(name: str) -> None:
+            with tracing.span(name):
+                await asyncio.sleep(0)
+
+        async def run() -> tracing.Timings:
+            with tracing.collect() as timings:
+                await asyncio.gather(
+                    tool("tool.search_places"), tool("tool.calculate_route")
+                )
+            return timings
+
+        timings = asyncio.run(run())
+
+        assert {name for name, _ in timings.items()} == {
+            "tool.search_places",
+            "tool.calculate_route",
+        }
+
+
+class TestTraced:
+    """traced デコレーターのテスト。"""
+
+    def test_sync_and_async(self) -> None:
+        @tracing.traced("sync")
+        def sync_fn(value: int) -> int:
+            return value + 1
+
+        @tracing.traced("async")
+        async def async_fn(value: int) -> int:
+            return value + 2
+
+        with tracing.collect() as timings:
+            assert sync_fn(1) == 2
+            assert asyncio.run(async_fn(1)) == 3
+
+        assert [name for name, _ in timings.items()] == ["sync", "async"]
+        assert sync_fn.__name__ == "sync_fn"
+
+
+class TestConfigure:
+    """configure（スパンの送信先の設定）のテスト。"""
+
+    @override_settings(OTEL_TRACES_EXPORTER="none")
+    def test_none_does_not_set_provider(self) -> None:
+        with patch.object(tracing, "trace", MagicMock(), create=True) as trace:
+            tracing.configure()
+
+        trace.set_tracer_provider.assert_not_called()
+
+    @override_settings(OTEL_TRACES_EXPORTER="otlp")
+    def test_missing_sdk_is_ignored(self) -> None:
+        """SDK がインストールされていない場合は警告を出して送信しないこと。"""
+        with (
+            patch.object(tracing, "trace", MagicMock(), create=True) as trace,
+            patch.dict(sys.modules, {"opentelemetry.sdk.trace": None}),
+        ):
+            tracing.configure()
+
+        trace.set_tracer_provider.assert_not_called()
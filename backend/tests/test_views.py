@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import sys
@@ -19,7 +20,27 @@ django.setup()
 
 import pytest  # noqa: E402
 from django.conf import settings  # noqa: E402
-from django.test import Client  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+
+from navigation.services.domain import Route  # noqa: E402
+from navigation.services.place_store import reset_place_store  # noqa: E402
+from navigation.services.polyline import decode, encode  # noqa: E402
+
+
+def _route(**fields) -> Route:
+    """acalculate_route / asend_message が返す Route を生成する。"""
+    return Route.from_dict({"waypoint_coords": [], **fields})
+
+
+@pytest.fixture(autouse=True)
+def _place_store():
+    # ディープリンク生成時に参照する地点ストアをテストごとのインメモリ DB にする
+    original = settings.PLACE_STORE_PATH
+    settings.PLACE_STORE_PATH = ":memory:"
+    reset_place_store()
+    yield
+    reset_place_store()
+    settings.PLACE_STORE_PATH = original
 
 
 class TestChatEndpoint:
@@ -36,7 +57,7 @@ class TestChatEndpoint:
     def client(self):
         return Client()
 
-    @patch("navigation.views.send_message")
+    @patch("navigation.views.asend_message")
     def test_chat_success(self, mock_send_message, client) -> None:
         """正常なチャットリクエストが 200 を返すこと。"""
         mock_send_message.return_value = ("こんにちは！", None, None)
@@ -53,20 +74,20 @@ class TestChatEndpoint:
         assert data["route"] is None
         assert data["places"] is None
 
-    @patch("navigation.views.send_message")
+    @patch("navigation.views.asend_message")
     def test_chat_with_route_data(self, mock_send_message, client) -> None:
         """ルートデータ付きの応答が正しくシリアライズされること。"""
         mock_send_message.return_value = (
             "ルートが見つかりました！",
-            {
-                "origin": "東京駅",
-                "destination": "横浜駅",
-                "waypoints": [],
-                "duration_seconds": "3600s",
-                "distance_meters": 50000,
-                "encoded_polyline": "abc123",
-                "tolls": [],
-            },
+            _route(
+                origin="東京駅",
+                destination="横浜駅",
+                waypoints=[],
+                duration_seconds="3600s",
+                distance_meters=50000,
+                encoded_polyline="abc123",
+                tolls=[],
+            ),
             None,
         )
 
@@ -82,7 +103,35 @@ class TestChatEndpoint:
         assert data["route"]["origin"] == "東京駅"
         assert "google_maps_url" in data["route"]
 
-    @patch("navigation.views.send_message")
+    @patch("navigation.views.asend_message")
+    def test_chat_server_timing(self, mock_send_message, client) -> None:
+        """処理段階ごとの所要時間を Server-Timing ヘッダーで返すこと。"""
+        mock_send_message.return_value = (
+            "ルートです",
+            _route(
+                origin="東京駅",
+                destination="横浜駅",
+                waypoints=[],
+                duration_seconds="3600s",
+                distance_meters=50000,
+                encoded_polyline="abc123",
+                tolls=[],
+            ),
+            None,
+        )
+
+        response = client.post(
+            "/api/navigation/chat/",
+            data=json.dumps({"message": "ルート", "history": []}),
+            content_type="application/json",
+        )
+
+        stages = [
+            metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+        ]
+        assert {"request", "deep_link", "render"} <= set(stages)
+
+    @patch("navigation.views.asend_message")
     def test_chat_gemini_error(self, mock_send_message, client) -> None:
         """Gemini API エラー時に 503 を返すこと。"""
         mock_send_message.side_effect = Exception("API Error")
@@ -95,6 +144,48 @@ class TestChatEndpoint:
 
         assert response.status_code == 503
 
+    @patch("navigation.views.asend_message")
+    def test_chat_starts_server_session(self, mock_send_message, client) -> None:
+        """session_id に空文字を指定すると新しいセッション ID を発行して返すこと。"""
+        mock_send_message.return_value = ("こんにちは！", None, None)
+
+        response = client.post(
+            "/api/navigation/chat/",
+            data=json.dumps({"message": "こんにちは", "session_id": ""}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        session_id = response.json()["session_id"]
+        assert len(session_id) == 32
+        mock_send_message.assert_called_once_with(
+            "こんにちは", [], session_id=session_id
+        )
+
+    @patch("navigation.views.asend_message")
+    def test_chat_without_session(self, mock_send_message, client) -> None:
+        """session_id を指定しない場合は従来どおり history を使い、ID を返さないこと。"""
+        mock_send_message.return_value = ("こんにちは！", None, None)
+
+        response = client.post(
+            "/api/navigation/chat/",
+            data=json.dumps({"message": "こんにちは"}),
+            content_type="application/json",
+        )
+
+        assert "session_id" not in response.json()
+        mock_send_message.assert_called_once_with("こんにちは", [], session_id=None)
+
+    def test_chat_invalid_session_id(self, client) -> None:
+        """形式が不正な session_id は 400 を返すこと。"""
+        response = client.post(
+            "/api/navigation/chat/",
+            data=json.dumps({"message": "テスト", "session_id": "../etc"}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+
     def test_chat_missing_message(self, client) -> None:
         """message フィールドがない場合に 400 を返すこと。"""
         response = client.post(
@@ -106,6 +197,117 @@ class TestChatEndpoint:
         assert response.status_code == 400
 
 
+def _parse_sse(body: bytes) -> list[tuple[str, dict]]:
+    """SSE のレスポンスボディを (イベント名, データ) のリストに変換する。"""
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream_events(*events: tuple[str, dict]):
+    """astream_message の代わりに、指定したイベントを順に返す関数を生成する。"""
+
+    async def _astream_message(message, history, session_id=None):
+        for event in events:
+            yield event
+
+    return _astream_message
+
+
+class TestChatStreamEndpoint:
+    """POST /api/navigation/chat/stream/ のユニットテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _allow_all_hosts(self):
+        original = settings.ALLOWED_HOSTS
+        settings.ALLOWED_HOSTS = ["*"]
+        yield
+        settings.ALLOWED_HOSTS = original
+
+    @pytest.fixture()
+    def client(self):
+        return AsyncClient()
+
+    def _post(self, client, body: dict):
+        return asyncio.run(
+            client.post(
+                "/api/navigation/chat/stream/",
+                data=json.dumps(body),
+                content_type="application/json",
+            )
+        )
+
+    def _read(self, response) -> bytes:
+        async def _collect():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        return asyncio.run(_collect())
+
+    def test_streams_events(self, client) -> None:
+        """テキスト差分・ツールイベント・最終結果を SSE で返すこと。"""
+        route = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline="abc123",
+            tolls=[],
+        )
+        events = _stream_events(
+            ("tool_start", {"name": "calculate_route", "args": {"origin": "東京駅"}}),
+            ("tool_end", {"name": "calculate_route", "ok": True}),
+            ("delta", {"text": "ルートが"}),
+            ("delta", {"text": "見つかりました"}),
+            (
+                "done",
+                {"reply": "ルートが見つかりました", "route": route, "places": None},
+            ),
+        )
+
+        with patch("navigation.views.astream_message", events):
+            response = self._post(client, {"message": "東京から横浜へ"})
+            body = self._read(response)
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/event-stream")
+        parsed = _parse_sse(body)
+        assert [event for event, _ in parsed] == [
+            "tool_start",
+            "tool_end",
+            "delta",
+            "delta",
+            "done",
+        ]
+        done = parsed[-1][1]
+        assert done["reply"] == "ルートが見つかりました"
+        assert "google_maps_url" in done["route"]
+        assert done["places"] is None
+
+    def test_error_during_stream(self, client) -> None:
+        """ストリーム中の例外は error イベントとして返すこと。"""
+
+        async def _failing(message, history, session_id=None):
+            yield "delta", {"text": "途中"}
+            raise RuntimeError("API Error")
+
+        with patch("navigation.views.astream_message", _failing):
+            response = self._post(client, {"message": "テスト"})
+            body = self._read(response)
+
+        parsed = _parse_sse(body)
+        assert parsed[0] == ("delta", {"text": "途中"})
+        assert parsed[-1][0] == "error"
+
+    def test_missing_message(self, client) -> None:
+        """message フィールドがない場合に 400 を返すこと。"""
+        response = self._post(client, {"history": []})
+
+        assert response.status_code == 400
+
+
 class TestReturnRouteEndpoint:
     """POST /api/navigation/return-route/ のユニットテスト。"""
 
@@ -120,18 +322,18 @@ class TestReturnRouteEndpoint:
     def client(self):
         return Client()
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
     def test_return_route_success(self, mock_calculate_route, client) -> None:
         """正常な帰路計算が 200 を返すこと。"""
-        mock_calculate_route.return_value = {
-            "origin": "横浜駅",
-            "destination": "東京駅",
-            "waypoints": [],
-            "duration_seconds": "3600s",
-            "distance_meters": 50000,
-            "encoded_polyline": "abc123",
-            "tolls": [],
-        }
+        mock_calculate_route.return_value = _route(
+            origin="横浜駅",
+            destination="東京駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline="abc123",
+            tolls=[],
+        )
 
         response = client.post(
             "/api/navigation/return-route/",
@@ -151,20 +353,20 @@ class TestReturnRouteEndpoint:
         # origin と destination が入れ替わっていること
         mock_calculate_route.assert_called_once_with("横浜駅", "東京駅", [])
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
     def test_return_route_swaps_and_reverses(
         self, mock_calculate_route, client
     ) -> None:
         """origin/destination の入替と waypoints の逆順が正しいこと。"""
-        mock_calculate_route.return_value = {
-            "origin": "C",
-            "destination": "A",
-            "waypoints": ["B"],
-            "duration_seconds": "1800s",
-            "distance_meters": 25000,
-            "encoded_polyline": "xyz",
-            "tolls": [],
-        }
+        mock_calculate_route.return_value = _route(
+            origin="C",
+            destination="A",
+            waypoints=["B"],
+            duration_seconds="1800s",
+            distance_meters=25000,
+            encoded_polyline="xyz",
+            tolls=[],
+        )
 
         response = client.post(
             "/api/navigation/return-route/",
@@ -181,7 +383,7 @@ class TestReturnRouteEndpoint:
         assert response.status_code == 200
         mock_calculate_route.assert_called_once_with("C", "A", ["B"])
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
     def test_return_route_api_error_returns_400(
         self, mock_calculate_route, client
     ) -> None:
@@ -230,7 +432,17 @@ class TestSuggestWaypointsEndpoint:
     def client(self):
         return Client()
 
-    @patch("navigation.views.suggest_waypoints")
+    @pytest.fixture(autouse=True)
+    def mock_rank(self):
+        """寄り道コストの計算（Routes API）はモックし、候補をそのまま返す。"""
+
+        async def _rank(origin, destination, candidates):
+            return candidates
+
+        with patch("navigation.views.arank_by_detour", side_effect=_rank) as mock:
+            yield mock
+
+    @patch("navigation.views.asuggest_waypoints")
     def test_suggest_waypoints_success(self, mock_suggest, client) -> None:
         """正常な候補提案リクエストが 200 を返すこと。"""
         mock_suggest.return_value = {
@@ -272,7 +484,7 @@ class TestSuggestWaypointsEndpoint:
         assert data["candidates"][0]["name"] == "箱根温泉"
         assert "ai_comment" in data
 
-    @patch("navigation.views.suggest_waypoints")
+    @patch("navigation.views.asuggest_waypoints")
     def test_suggest_waypoints_rate_limit(self, mock_suggest, client) -> None:
         """レート制限時に 429 を返すこと。"""
         mock_suggest.return_value = {
@@ -295,7 +507,7 @@ class TestSuggestWaypointsEndpoint:
 
         assert response.status_code == 429
 
-    @patch("navigation.views.suggest_waypoints")
+    @patch("navigation.views.asuggest_waypoints")
     def test_suggest_waypoints_api_error(self, mock_suggest, client) -> None:
         """API エラー時に 503 を返すこと。"""
         mock_suggest.side_effect = Exception("API Error")
@@ -324,6 +536,41 @@ class TestSuggestWaypointsEndpoint:
 
         assert response.status_code == 400
 
+    @patch("navigation.views.asuggest_waypoints")
+    def test_candidates_ranked_by_detour(self, mock_suggest, client, mock_rank) -> None:
+        """寄り道コストを付与した順に候補を返すこと。"""
+        mock_suggest.return_value = {
+            "candidates": [
+                {"name": "遠い", "description": "説明"},
+                {"name": "近い", "description": "説明"},
+            ],
+            "ai_comment": "",
+        }
+
+        async def _rank(origin, destination, candidates):
+            return [
+                {**candidates[1], "detour_seconds": 300, "detour_meters": 2000},
+                {**candidates[0], "detour_seconds": 1800, "detour_meters": 20000},
+            ]
+
+        mock_rank.side_effect = _rank
+
+        response = client.post(
+            "/api/navigation/suggest-waypoints/",
+            data=json.dumps(
+                {"origin": "東京駅", "destination": "箱根", "prompt": "温泉"}
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        candidates = response.json()["candidates"]
+        assert [c["name"] for c in candidates] == ["近い", "遠い"]
+        assert candidates[0]["detour_seconds"] == 300
+        assert candidates[0]["detour_meters"] == 2000
+        mock_rank.assert_called_once()
+        assert mock_rank.call_args[0][:2] == ("東京駅", "箱根")
+
 
 class TestCalculateRouteEndpoint:
     """POST /api/navigation/calculate-route/ のユニットテスト。"""
@@ -339,18 +586,18 @@ class TestCalculateRouteEndpoint:
     def client(self):
         return Client()
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
     def test_calculate_route_success(self, mock_calculate_route, client) -> None:
         """正常なルート計算が 200 を返すこと。"""
-        mock_calculate_route.return_value = {
-            "origin": "東京駅",
-            "destination": "横浜駅",
-            "waypoints": ["鎌倉"],
-            "duration_seconds": "5400s",
-            "distance_meters": 60000,
-            "encoded_polyline": "abc123",
-            "tolls": [],
-        }
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=["鎌倉"],
+            duration_seconds="5400s",
+            distance_meters=60000,
+            encoded_polyline="abc123",
+            tolls=[],
+        )
 
         response = client.post(
             "/api/navigation/calculate-route/",
@@ -371,20 +618,166 @@ class TestCalculateRouteEndpoint:
         assert "google_maps_url" in data["route"]
         mock_calculate_route.assert_called_once_with("東京駅", "横浜駅", ["鎌倉"])
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
+    def test_calculate_route_with_polyline_options(
+        self, mock_calculate_route, client
+    ) -> None:
+        """polyline_options 指定時はポリラインを簡略化し、多段階のポリラインも返すこと。"""
+        points = [(35.0 + i * 0.001, 139.0 + (i % 2) * 1e-5) for i in range(200)]
+        encoded = encode(points)
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline=encoded,
+            tolls=[],
+        )
+
+        response = client.post(
+            "/api/navigation/calculate-route/",
+            data=json.dumps(
+                {
+                    "origin": "東京駅",
+                    "destination": "横浜駅",
+                    "polyline_options": {"zoom": 12, "precision": 4, "levels": [8]},
+                }
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        route = response.json()["route"]
+        assert route["polyline_precision"] == 4
+        assert len(route["encoded_polyline"]) < len(encoded)
+        assert decode(route["encoded_polyline"], 4)[-1] == (35.199, 139.0)
+        assert [level["zoom"] for level in route["polylines"]] == [8]
+
+    @patch("navigation.views.acalculate_route")
+    def test_calculate_route_without_polyline_options(
+        self, mock_calculate_route, client
+    ) -> None:
+        """polyline_options を指定しない場合はポリラインをそのまま返すこと。"""
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline="_p~iF~ps|U",
+            tolls=[],
+        )
+
+        response = client.post(
+            "/api/navigation/calculate-route/",
+            data=json.dumps({"origin": "東京駅", "destination": "横浜駅"}),
+            content_type="application/json",
+        )
+
+        route = response.json()["route"]
+        assert route["encoded_polyline"] == "_p~iF~ps|U"
+        assert "polyline_precision" not in route
+        assert "polylines" not in route
+
+    @patch("navigation.views.acalculate_route")
+    def test_calculate_route_get_with_etag(self, mock_calculate_route, client) -> None:
+        """GET ではクエリパラメータで計算し、ETag が一致すれば 304 を返すこと。"""
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=["鎌倉"],
+            duration_seconds="5400s",
+            distance_meters=60000,
+            encoded_polyline="_p~iF~ps|U" * 50,
+            tolls=[],
+        )
+        url = "/api/navigation/calculate-route/"
+        params = {"origin": "東京駅", "destination": "横浜駅", "waypoints": ["鎌倉"]}
+
+        response = client.get(url, params, HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response.status_code == 200
+        assert response["Content-Encoding"] == "gzip"
+        assert "no-cache" in response["Cache-Control"]
+        etag = response["ETag"]
+        mock_calculate_route.assert_called_once_with("東京駅", "横浜駅", ["鎌倉"])
+
+        not_modified = client.get(
+            url, params, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        # 304 はルートを計算せずに返す
+        mock_calculate_route.assert_called_once()
+
+    @patch("navigation.views.acalculate_route")
+    def test_calculate_route_get_etag_changes_with_departure_bucket(
+        self, mock_calculate_route, client
+    ) -> None:
+        """出発時刻のバケットや polyline_options が変われば ETag も変わること。"""
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline="_p~iF~ps|U",
+            tolls=[],
+        )
+        url = "/api/navigation/calculate-route/"
+        params = {"origin": "東京駅", "destination": "横浜駅"}
+        departure_time = "navigation.services.google_maps._departure_time"
+
+        with patch(departure_time, return_value="2026-01-01T00:05:00Z"):
+            etag = client.get(url, params)["ETag"]
+            with_options = client.get(url, {**params, "polyline_options.zoom": 10})
+        with patch(departure_time, return_value="2026-01-01T00:10:00Z"):
+            next_bucket = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        assert with_options["ETag"] != etag
+        assert next_bucket.status_code == 200
+        assert next_bucket["ETag"] != etag
+        assert mock_calculate_route.call_count == 3
+
+    def test_calculate_route_get_missing_origin(self, client) -> None:
+        response = client.get(
+            "/api/navigation/calculate-route/", {"destination": "横浜駅"}
+        )
+
+        assert response.status_code == 400
+
+    def test_calculate_route_invalid_polyline_precision(self, client) -> None:
+        """精度が範囲外の場合は 400 を返すこと。"""
+        response = client.post(
+            "/api/navigation/calculate-route/",
+            data=json.dumps(
+                {
+                    "origin": "東京駅",
+                    "destination": "横浜駅",
+                    "polyline_options": {"precision": 7},
+                }
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+
+    @patch("navigation.views.acalculate_route")
     def test_calculate_route_without_waypoints(
         self, mock_calculate_route, client
     ) -> None:
         """経由地なしでルート計算が正常に動作すること。"""
-        mock_calculate_route.return_value = {
-            "origin": "東京駅",
-            "destination": "横浜駅",
-            "waypoints": [],
-            "duration_seconds": "3600s",
-            "distance_meters": 50000,
-            "encoded_polyline": "xyz",
-            "tolls": [],
-        }
+        mock_calculate_route.return_value = _route(
+            origin="東京駅",
+            destination="横浜駅",
+            waypoints=[],
+            duration_seconds="3600s",
+            distance_meters=50000,
+            encoded_polyline="xyz",
+            tolls=[],
+        )
 
         response = client.post(
             "/api/navigation/calculate-route/",
@@ -400,7 +793,7 @@ class TestCalculateRouteEndpoint:
         assert response.status_code == 200
         mock_calculate_route.assert_called_once_with("東京駅", "横浜駅", [])
 
-    @patch("navigation.views.calculate_route")
+    @patch("navigation.views.acalculate_route")
     def test_calculate_route_not_found(self, mock_calculate_route, client) -> None:
         """ルートが見つからない場合に 400 を返すこと。"""
         mock_calculate_route.return_value = {
@@ -430,3 +823,90 @@ class TestCalculateRouteEndpoint:
         )
 
         assert response.status_code == 400
+
+
+class TestCalculateRoutesBatchEndpoint:
+    """POST /api/navigation/calculate-routes/batch/ のユニットテスト。"""
+
+    @pytest.fixture(autouse=True)
+    def _allow_all_hosts(self):
+        original = settings.ALLOWED_HOSTS
+        settings.ALLOWED_HOSTS = ["*"]
+        yield
+        settings.ALLOWED_HOSTS = original
+
+    @pytest.fixture()
+    def client(self):
+        return Client()
+
+    @patch("navigation.views.acalculate_routes")
+    def test_mixed_results_in_order(self, mock_calculate_routes, client) -> None:
+        """成功・失敗が混在しても、リクエスト順に要素ごとの結果を返すこと。"""
+        mock_calculate_routes.return_value = [
+            _route(
+                origin="東京駅",
+                destination="横浜駅",
+                waypoints=["鎌倉"],
+                duration_seconds="5400s",
+                distance_meters=60000,
+                encoded_polyline="abc123",
+                tolls=[],
+            ),
+            {"error": "ルートが見つかりませんでした。", "error_type": "not_found"},
+            {"error": "API エラー", "error_type": "api_failure"},
+        ]
+
+        response = client.post(
+            "/api/navigation/calculate-routes/batch/",
+            data=json.dumps(
+                {
+                    "routes": [
+                        {
+                            "origin": "東京駅",
+                            "destination": "横浜駅",
+                            "waypoints": ["鎌倉"],
+                        },
+                        {"origin": "存在しない場所", "destination": "横浜駅"},
+                        {"origin": "A", "destination": "B"},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [200, 400, 502]
+        assert "google_maps_url" in results[0]["route"]
+        assert results[0]["detail"] is None
+        assert results[1]["route"] is None
+        assert results[1]["detail"] == "ルートが見つかりませんでした。"
+        route_requests = mock_calculate_routes.call_args[0][0]
+        assert route_requests == [
+            ("東京駅", "横浜駅", ["鎌倉"]),
+            ("存在しない場所", "横浜駅", []),
+            ("A", "B", []),
+        ]
+
+    def test_empty_routes(self, client) -> None:
+        """routes が空の場合に 400 を返すこと。"""
+        response = client.post(
+            "/api/navigation/calculate-routes/batch/",
+            data=json.dumps({"routes": []}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+
+    def test_too_many_routes(self, client) -> None:
+        """routes が上限を超える場合に 400 を返すこと。"""
+        routes = [{"origin": "A", "destination": "B"}] * (
+            settings.ROUTES_BATCH_MAX_ITEMS + 1
+        )
+        response = client.post(
+            "/api/navigation/calculate-routes/batch/",
+            data=json.dumps({"routes": routes}),
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,194 @@
+"""プロジェクト共通のミドルウェア。
+
+CompressionMiddleware:
+  JSON レスポンスを gzip / brotli で圧縮する（ポリラインを含むルートのレスポンスは大きいため）。
+  Django の GZipMiddleware に以下を加えたもの:
+  - brotli パッケージがインストールされていて、クライアントが br を受け付ける場合は brotli を優先する
+  - Server-Sent Events（text/event-stream）は圧縮しない
+    （gzip はバッファリングするため、イベントがクライアントにすぐ届かなくなる）
+
+ServerTimingMiddleware:
+  リクエストの処理段階（Gemini の呼び出し・ツール・レスポンスの生成など）ごとの所要時間を
+  Server-Timing ヘッダーで返す（navigation/services/tracing.py）。
+  リクエスト全体は "request" として計測し、OpenTelemetry のスパンの親になる。
+  settings.SERVER_TIMING_ENABLED が False の場合はヘッダーを付けない（計測は行う）。
+
+MetricsMiddleware:
+  エンドポイント（URL パターン）ごとのリクエスト数・所要時間を記録し、
+  リクエスト中の上流 API・Gemini・キャッシュのメトリクスに endpoint ラベルを付ける
+  （navigation/services/metrics.py）。ストリーミングレスポンスの所要時間はヘッダーを返すまで。
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Awaitable, Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+from django.middleware.gzip import GZipMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+from navigation.services import metrics, tracing
+
+try:
+    import brotli
+except ImportError:  # brotli は任意の依存（未インストールなら gzip のみ）
+    brotli = None
+
+_RE_ACCEPTS_BROTLI = re.compile(r"\bbr\b")
+
+# これより短いレスポンスは圧縮しない（GZipMiddleware と同じ基準）
+_MIN_LENGTH = 200
+# 既定の最高品質（11）はリクエストごとの圧縮には遅すぎるため、速度寄りの品質にする
+_BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """gzip / brotli でレスポンスを圧縮する。SSE のストリームは圧縮しない。"""
+
+    def process_response(
+        self, request: HttpRequest, response: HttpResponseBase
+    ) -> HttpResponseBase:
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        if self._should_use_brotli(request, response):
+            return self._compress_brotli(response)
+        return super().process_response(request, response)
+
+    @staticmethod
+    def _should_use_brotli(request: HttpRequest, response: HttpResponseBase) -> bool:
+        # ストリーミングレスポンスは GZipMiddleware の gzip に任せる
+        return (
+            brotli is not None
+            and not response.streaming
+            and len(response.content) >= _MIN_LENGTH
+            and not response.has_header("Content-Encoding")
+            and bool(
+                _RE_ACCEPTS_BROTLI.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+            )
+        )
+
+    @staticmethod
+    def _compress_brotli(response: HttpResponseBase) -> HttpResponseBase:
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        # 圧縮後は強い ETag を弱い ETag にする（GZipMiddleware と同じ。RFC 9110 8.8.1）
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+class ServerTimingMiddleware:
+    """処理段階ごとの所要時間を集め、Server-Timing ヘッダーを付ける。"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self,
+        get_response: Callable[[HttpRequest], HttpResponseBase]
+        | Callable[[HttpRequest], Awaitable[HttpResponseBase]],
+    ) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if self.async_mode:
+            return self.__acall__(request)
+        with tracing.collect() as timings:
+            with tracing.span("request", **self._attributes(request)):
+                response = self.get_response(request)
+            return self._add_header(response, timings)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        with tracing.collect() as timings:
+            with tracing.span("request", **self._attributes(request)):
+                response = await self.get_response(request)
+            return self._add_header(response, timings)
+
+    @staticmethod
+    def _attributes(request: HttpRequest) -> dict[str, str]:
+        return {"http.request.method": request.method or "", "url.path": request.path}
+
+    @staticmethod
+    def _add_header(
+        response: HttpResponseBase, timings: tracing.Timings
+    ) -> HttpResponseBase:
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = timings.header()
+        return response
+
+
+class MetricsMiddleware:
+    """エンドポイントごとのリクエスト数・所要時間を metrics に記録する。"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self,
+        get_response: Callable[[HttpRequest], HttpResponseBase]
+        | Callable[[HttpRequest], Awaitable[HttpResponseBase]],
+    ) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if self.async_mode:
+            return self.__acall__(request)
+        endpoint = self._endpoint(request)
+        token = metrics.set_endpoint(endpoint)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.reset_endpoint(token)
+        self._observe(request, endpoint, response, start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        endpoint = self._endpoint(request)
+        token = metrics.set_endpoint(endpoint)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.reset_endpoint(token)
+        self._observe(request, endpoint, response, start)
+        return response
+
+    @staticmethod
+    def _endpoint(request: HttpRequest) -> str:
+        # ラベルの種類が増えすぎないよう、パスではなく URL パターンを使う
+        try:
+            return "/" + resolve(request.path_info).route
+        except Resolver404:
+            return "unmatched"
+
+    @staticmethod
+    def _observe(
+        request: HttpRequest,
+        endpoint: str,
+        response: HttpResponseBase,
+        start: float,
+    ) -> None:
+        metrics.observe_http_request(
+            endpoint,
+            request.method or "",
+            response.status_code,
+            time.perf_counter() - start,
+        )
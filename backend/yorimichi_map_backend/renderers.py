@@ -0,0 +1,60 @@
+"""プロジェクト共通のレンダラー。
+
+FastJSONRenderer:
+  orjson パッケージがインストールされていれば、JSON の生成に orjson を使う JSONRenderer。
+  ルートのポリライン等を含む大きなレスポンスで json モジュールより速い。
+  インデント指定（?indent や Accept の indent パラメータ）や ASCII エスケープが必要な場合、
+  orjson が扱えない値（64ビットを超える整数など）を含む場合は JSONRenderer にそのまま任せる。
+  JSON の生成にかかった時間は "render" として計測する（navigation/services/tracing.py）。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from rest_framework.renderers import JSONRenderer
+
+from navigation.services import tracing
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では json モジュールを使う
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """orjson で JSON を生成する JSONRenderer。出力は JSONRenderer と同じ。"""
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: dict[str, Any] | None = None,
+    ) -> bytes:
+        with tracing.span("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(
+        self,
+        data: Any,
+        accepted_media_type: str | None,
+        renderer_context: dict[str, Any] | None,
+    ) -> bytes:
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer と同じく、JavaScript で改行として扱われる U+2028 / U+2029 をエスケープする
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -47,9 +47,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # リクエスト全体（他のミドルウェアを含む）の所要時間を計測するため先頭に置く
+    "yorimichi_map_backend.middleware.ServerTimingMiddleware",
+    "yorimichi_map_backend.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # レスポンス本文を書き換える他のミドルウェアより前に置く（最後に圧縮される）
+    "yorimichi_map_backend.middleware.CompressionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # GET / HEAD に本文のハッシュから ETag を付け、If-None-Match が一致すれば 304 を返す
+    # （圧縮前の本文で ETag を計算するよう CompressionMiddleware より後に置く）
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -104,6 +112,11 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson がインストールされていれば orjson で JSON を生成する（なければ JSONRenderer と同じ）
+    "DEFAULT_RENDERER_CLASSES": [
+        "yorimichi_map_backend.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [],
     "DEFAULT_PERMISSION_CLASSES": [],
     "UNAUTHENTICATED_USER": None,
@@ -136,6 +149,159 @@ PLACES_API_TIMEOUT = int(os.environ.get("PLACES_API_TIMEOUT", "10"))
 ROUTES_API_TIMEOUT = int(os.environ.get("ROUTES_API_TIMEOUT", "15"))
 PLACES_MIN_RATING = float(os.environ.get("PLACES_MIN_RATING", "4.0"))
 PLACES_MAX_RESULTS = int(os.environ.get("PLACES_MAX_RESULTS", "3"))
+# Google Maps API (New) のエンドポイント（負荷試験では loadtest の疑似サーバーに向ける）
+PLACES_API_URL = os.environ.get(
+    "PLACES_API_URL", "https://places.googleapis.com/v1/places:searchText"
+)
+ROUTES_API_URL = os.environ.get(
+    "ROUTES_API_URL", "https://routes.googleapis.com/directions/v2:computeRoutes"
+)
+ROUTE_MATRIX_API_URL = os.environ.get(
+    "ROUTE_MATRIX_API_URL",
+    "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix",
+)
+# 経由地候補に寄り道コスト（computeRouteMatrix）を付与して並べ替える
+WAYPOINT_DETOUR_RANKING_ENABLED = os.environ.get(
+    "WAYPOINT_DETOUR_RANKING_ENABLED", "True"
+).lower() in ("true", "1", "yes")
+# ルート一括計算（POST /api/navigation/calculate-routes/batch/）
+ROUTES_BATCH_MAX_ITEMS = int(os.environ.get("ROUTES_BATCH_MAX_ITEMS", "100"))
+ROUTES_BATCH_MAX_CONCURRENCY = int(os.environ.get("ROUTES_BATCH_MAX_CONCURRENCY", "8"))
+
+# Google Maps API 用の共有 HTTP クライアント（navigation/services/http_client.py）
+MAPS_HTTP_POOL_MAXSIZE = int(os.environ.get("MAPS_HTTP_POOL_MAXSIZE", "10"))
+# 接続エラー時のリトライ回数（5xx の再試行は下の MAPS_RETRY_*）
+MAPS_HTTP_MAX_RETRIES = int(os.environ.get("MAPS_HTTP_MAX_RETRIES", "2"))
+MAPS_HTTP_ASYNC_MAX_CONNECTIONS = int(
+    os.environ.get("MAPS_HTTP_ASYNC_MAX_CONNECTIONS", "100")
+)
+MAPS_HTTP2_ENABLED = os.environ.get("MAPS_HTTP2_ENABLED", "False").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+# Places API / Routes API の 5xx の再試行（navigation/services/retry.py の "maps" ポリシー）
+# 待ち時間は 0〜min(MAX_DELAY, BASE_DELAY * 2^n) 秒のジッター付き指数バックオフ
+MAPS_RETRY_MAX_ATTEMPTS = int(os.environ.get("MAPS_RETRY_MAX_ATTEMPTS", "3"))
+MAPS_RETRY_BASE_DELAY = float(os.environ.get("MAPS_RETRY_BASE_DELAY", "0.3"))
+MAPS_RETRY_MAX_DELAY = float(os.environ.get("MAPS_RETRY_MAX_DELAY", "2"))
+MAPS_RETRY_DEADLINE = float(os.environ.get("MAPS_RETRY_DEADLINE", "10"))
+
+# 上流 API ごとのクライアント側レート制限（navigation/services/rate_limit.py）
+# *_RATE_LIMIT_QPS: 1秒あたりの最大リクエスト数（0 なら制限しない）。ワーカーごとにかかる
+# *_MAX_CONCURRENCY: 同時実行数の初期上限（429 を受けると半分に下げ、成功で徐々に戻す）
+PLACES_RATE_LIMIT_QPS = float(os.environ.get("PLACES_RATE_LIMIT_QPS", "10"))
+PLACES_RATE_LIMIT_BURST = int(os.environ.get("PLACES_RATE_LIMIT_BURST", "20"))
+PLACES_MAX_CONCURRENCY = int(os.environ.get("PLACES_MAX_CONCURRENCY", "16"))
+ROUTES_RATE_LIMIT_QPS = float(os.environ.get("ROUTES_RATE_LIMIT_QPS", "50"))
+ROUTES_RATE_LIMIT_BURST = int(os.environ.get("ROUTES_RATE_LIMIT_BURST", "50"))
+ROUTES_MAX_CONCURRENCY = int(os.environ.get("ROUTES_MAX_CONCURRENCY", "32"))
+GEMINI_RATE_LIMIT_QPS = float(os.environ.get("GEMINI_RATE_LIMIT_QPS", "0"))
+GEMINI_RATE_LIMIT_BURST = int(os.environ.get("GEMINI_RATE_LIMIT_BURST", "1"))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "16"))
+# 枠が空くのを待つ最大秒数（超えたら 429 と同じ「混み合っています」エラーを返す）
+RATE_LIMIT_QUEUE_TIMEOUT = float(os.environ.get("RATE_LIMIT_QUEUE_TIMEOUT", "5"))
+
+# キャッシュ
+# REDIS_URL を設定すると Redis を使う（redis パッケージが必要）。
+# Cloud Run の複数インスタンス間でキャッシュを共有したい場合に指定する。
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Google Maps API 結果キャッシュ（navigation/services/cache.py）
+# *_CACHE_BACKEND: "memory"（プロセス内 LRU）/ "sqlite"（永続）/ "tiered"（memory + sqlite）
+#                  / "django"（CACHES を使用）/ "none"
+MAPS_CACHE_ALIAS = os.environ.get("MAPS_CACHE_ALIAS", "default")
+# "sqlite" / "tiered" の保存先。コールドスタートをまたいで使うには永続ボリューム上のパスを指定する
+# （WAL を使うため、ロックと共有メモリに対応したファイルシステムが必要。GCS FUSE は不可）
+MAPS_CACHE_SQLITE_PATH = os.environ.get(
+    "MAPS_CACHE_SQLITE_PATH", str(BASE_DIR / "maps_cache.sqlite3")
+)
+PLACES_CACHE_BACKEND = os.environ.get("PLACES_CACHE_BACKEND", "memory")
+PLACES_CACHE_TTL = int(os.environ.get("PLACES_CACHE_TTL", "3600"))
+PLACES_CACHE_MAX_ENTRIES = int(os.environ.get("PLACES_CACHE_MAX_ENTRIES", "1000"))
+PLACES_CACHE_DISK_MAX_ENTRIES = int(
+    os.environ.get("PLACES_CACHE_DISK_MAX_ENTRIES", "10000")
+)
+ROUTES_CACHE_BACKEND = os.environ.get("ROUTES_CACHE_BACKEND", "memory")
+ROUTES_CACHE_TTL = int(os.environ.get("ROUTES_CACHE_TTL", "900"))
+ROUTES_CACHE_MAX_ENTRIES = int(os.environ.get("ROUTES_CACHE_MAX_ENTRIES", "1000"))
+ROUTES_CACHE_DISK_MAX_ENTRIES = int(
+    os.environ.get("ROUTES_CACHE_DISK_MAX_ENTRIES", "10000")
+)
+# 同じ API 呼び出しをワーカー間でまとめるロックの有効期限（秒。navigation/services/single_flight.py）
+# キャッシュが共有される "sqlite" / "tiered" / "django" で使う。API のタイムアウトより長くする
+MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT = int(
+    os.environ.get("MAPS_SINGLE_FLIGHT_LOCK_TIMEOUT", "20")
+)
+# Routes API の出発時刻をこの分単位に丸める（同じバケット内のルートはキャッシュを共有）
+ROUTES_DEPARTURE_BUCKET_MINUTES = int(
+    os.environ.get("ROUTES_DEPARTURE_BUCKET_MINUTES", "5")
+)
+
+# サーバー側チャットセッションの保存先（navigation/services/session_store.py）
+# バックエンドの選択肢は上の *_CACHE_BACKEND と同じ。インスタンス間で共有するには
+# "django"（REDIS_URL を設定）を指定する
+CHAT_SESSIONS_CACHE_BACKEND = os.environ.get("CHAT_SESSIONS_CACHE_BACKEND", "memory")
+CHAT_SESSIONS_CACHE_TTL = int(os.environ.get("CHAT_SESSIONS_CACHE_TTL", "86400"))
+CHAT_SESSIONS_CACHE_MAX_ENTRIES = int(
+    os.environ.get("CHAT_SESSIONS_CACHE_MAX_ENTRIES", "1000")
+)
+CHAT_SESSIONS_CACHE_DISK_MAX_ENTRIES = int(
+    os.environ.get("CHAT_SESSIONS_CACHE_DISK_MAX_ENTRIES", "10000")
+)
+
+# 経由地の提案の保存先（Vertex AI が混み合っている場合に、同じ条件の直近の提案を返す）
+WAYPOINT_SUGGESTIONS_CACHE_BACKEND = os.environ.get(
+    "WAYPOINT_SUGGESTIONS_CACHE_BACKEND", "memory"
+)
+WAYPOINT_SUGGESTIONS_CACHE_TTL = int(
+    os.environ.get("WAYPOINT_SUGGESTIONS_CACHE_TTL", "3600")
+)
+WAYPOINT_SUGGESTIONS_CACHE_MAX_ENTRIES = int(
+    os.environ.get("WAYPOINT_SUGGESTIONS_CACHE_MAX_ENTRIES", "1000")
+)
+
+# 住所 → Place ID・座標の解決結果の保存先（navigation/services/place_store.py）
+# アプリの DB とは別のファイルにする（ストアの書き込みで DB をロックしないように）。
+# Cloud Run 等でアプリのディレクトリが書き込めない場合は /tmp 配下などを指定する
+PLACE_STORE_PATH = os.environ.get(
+    "PLACE_STORE_PATH", str(BASE_DIR / "place_store.sqlite3")
+)
+# 規約上、緯度経度のキャッシュは30日まで
+PLACE_STORE_TTL = int(os.environ.get("PLACE_STORE_TTL", str(30 * 24 * 60 * 60)))
+
+# 処理段階ごとの所要時間の計測（navigation/services/tracing.py）
+# OTEL_TRACES_EXPORTER: "none" / "console"（標準出力）/ "otlp"（OTLP/HTTP のコレクター）
+# "console" / "otlp" には extra の "otel"（uv sync --extra otel）でパッケージをインストールする。
+# 送信先は OpenTelemetry の環境変数 OTEL_EXPORTER_OTLP_ENDPOINT で指定する（既定は localhost:4318）
+OTEL_TRACES_EXPORTER = os.environ.get("OTEL_TRACES_EXPORTER", "none")
+OTEL_SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "yorimichi-map-backend")
+# レスポンスに段階ごとの所要時間を Server-Timing ヘッダーで付ける
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+# Prometheus 形式のメトリクス（GET /api/metrics/。navigation/services/metrics.py）
+# prometheus_client パッケージが必要。gunicorn の複数ワーカーの値を合算するには、
+# 環境変数 PROMETHEUS_MULTIPROC_DIR に起動時に空にしたディレクトリを指定する。
+# METRICS_AUTH_TOKEN を設定すると Authorization: Bearer <token> のリクエストにだけ返す
+METRICS_AUTH_TOKEN = os.environ.get("METRICS_AUTH_TOKEN", "")
 
 # リクエストサイズ制限（メモリリーク防止）
 DATA_UPLOAD_MAX_MEMORY_SIZE = int(
@@ -145,3 +311,33 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = int(
 # Vertex AI (Gemini)
 GOOGLE_CLOUD_PROJECT = "yorimichi-map-485411"
 GOOGLE_CLOUD_LOCATION = "asia-northeast1"
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-pro")
+# 起動時（NavigationConfig.ready()）に GenerativeModel を生成しておく
+GEMINI_WARM_UP = os.environ.get("GEMINI_WARM_UP", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+# 会話履歴の推定トークン数の上限（超えた古いターンは要約1件にまとめる）
+GEMINI_HISTORY_TOKEN_BUDGET = int(os.environ.get("GEMINI_HISTORY_TOKEN_BUDGET", "4000"))
+# 429（ResourceExhausted）の再試行（navigation/services/retry.py）
+# 待ち時間は 0〜min(MAX_DELAY, BASE_DELAY * 2^n) 秒のジッター付き指数バックオフ
+# （Vertex AI が再試行までの時間を返した場合はそれに従う）。
+# 最初の試行から DEADLINE 秒を過ぎる再試行はしない。
+# FAIL_FAST を有効にすると再試行せず、すぐに混雑メッセージ（経由地の提案は直近の同じ提案）を返す
+GEMINI_RETRY_MAX_ATTEMPTS = int(os.environ.get("GEMINI_RETRY_MAX_ATTEMPTS", "3"))
+GEMINI_RETRY_BASE_DELAY = float(os.environ.get("GEMINI_RETRY_BASE_DELAY", "1"))
+GEMINI_RETRY_MAX_DELAY = float(os.environ.get("GEMINI_RETRY_MAX_DELAY", "8"))
+GEMINI_RETRY_DEADLINE = float(os.environ.get("GEMINI_RETRY_DEADLINE", "30"))
+GEMINI_RETRY_FAIL_FAST = os.environ.get("GEMINI_RETRY_FAIL_FAST", "False").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+# システムプロンプトとツール宣言を Vertex AI のコンテキストキャッシュに載せる（オプトイン）。
+# Vertex AI の最小トークン数に満たないプレフィックスは作成に失敗するため（失敗後は
+# キャッシュを使わずに動作する）、プロンプト・ツールが十分に大きい場合だけ有効にする。
+GEMINI_CONTEXT_CACHE_ENABLED = os.environ.get(
+    "GEMINI_CONTEXT_CACHE_ENABLED", "False"
+).lower() in ("true", "1", "yes")
+GEMINI_CONTEXT_CACHE_TTL = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
@@ -5,6 +5,7 @@ from . import views
 
 urlpatterns = [
     path("api/health/", views.health_check),
+    path("api/metrics/", views.metrics_view),
     path("api/navigation/", include("navigation.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema")),
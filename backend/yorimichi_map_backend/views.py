@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
 from drf_spectacular.utils import extend_schema
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from navigation.services import metrics
+
 
 @extend_schema(
     summary="ヘルスチェック",
@@ -19,3 +23,21 @@ from rest_framework.response import Response
 @api_view(["GET"])
 def health_check(request):
     return Response({"status": "ok", "message": "寄り道マップ API"})
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus 形式のメトリクスを返す（navigation/services/metrics.py）。
+
+    settings.METRICS_AUTH_TOKEN を設定した場合は Authorization: Bearer <token> を要求する。
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    if not metrics.available():
+        return HttpResponse(
+            "prometheus_client is not installed",
+            status=503,
+            content_type="text/plain",
+        )
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
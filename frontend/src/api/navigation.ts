@@ -32,6 +32,7 @@ export interface Route {
   duration_seconds: string;
   distance_meters: number;
   encoded_polyline: string;
+  polyline_precision?: number;
   tolls?: Toll[];
   google_maps_url: string;
 }
@@ -27,7 +27,9 @@ interface RouteMapProps {
 }
 
 export function RouteMap({ route }: RouteMapProps) {
-  const routePoints = route ? decodePolyline(route.encoded_polyline) : [];
+  const routePoints = route
+    ? decodePolyline(route.encoded_polyline, route.polyline_precision)
+    : [];
 
   const hasRoute = routePoints.length > 0;
 
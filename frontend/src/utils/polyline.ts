@@ -2,8 +2,9 @@ import { decode } from '@googlemaps/polyline-codec';
 
 export type LatLng = [number, number];
 
-export function decodePolyline(encoded: string): LatLng[] {
+// precision はバックエンドで polyline_options.precision を指定した場合の桁数（既定は 5）
+export function decodePolyline(encoded: string, precision = 5): LatLng[] {
   if (!encoded) return [];
-  const decoded = decode(encoded);
+  const decoded = decode(encoded, precision);
   return decoded as LatLng[];
 }
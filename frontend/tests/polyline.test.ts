@@ -14,6 +14,18 @@ describe('polyline', () => {
     expect(result[2]).toEqual([43.252, -126.453]);
   });
 
+  it('should decode with the given precision', () => {
+    // 精度4桁でエンコードした (38.5, -120.2), (40.7, -120.95)
+    const encoded = 'o}nV~sjhA_~i@vsM';
+
+    const result = decodePolyline(encoded, 4);
+
+    expect(result).toEqual([
+      [38.5, -120.2],
+      [40.7, -120.95],
+    ]);
+  });
+
   it('should return empty array for empty string', () => {
     const result = decodePolyline('');
 